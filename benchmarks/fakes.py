@@ -0,0 +1,390 @@
+"""
+Local stand-ins for OpenRouter and Toolhouse, for offline benchmarks
+
+`FakeOpenRouter` serves OpenAI-compatible chat completions; `FakeToolhouse`
+serves tool schemas and tool runs, and `ToolhouseClient` talks to it with
+the same methods the assistant uses on the Toolhouse SDK. Both servers
+draw latencies from a `LatencyModel`, can inject tool calls and errors at
+configurable rates, and count what they served.
+
+Example:
+    with FakeOpenRouter(latency=LatencyModel.parse("lognormal:0.2:0.5")) as openrouter, \\
+            FakeToolhouse() as toolhouse:
+        coach.Toolhouse = toolhouse.client_factory()
+        assistant = ResearchAnalysisAssistant(base_url=openrouter.base_url)
+"""
+
+import json
+import math
+import random
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Sequence
+from urllib.parse import urlsplit
+
+
+DEFAULT_TOOLS = ("web_search", "get_page_contents", "code_interpreter", "memory_fetch")
+
+
+class LatencyModel:
+    """
+    Random latency distribution
+
+    Kinds: "constant" (value), "uniform" (low, high), "normal" (mean,
+    stddev) and "lognormal" (median, sigma). Samples are clamped to
+    [0, `maximum`].
+    """
+
+    KINDS = {"constant": 1, "uniform": 2, "normal": 2, "lognormal": 2}
+
+    def __init__(self, kind: str = "constant", *params: float,
+                 maximum: float = 60.0, seed: Optional[int] = None):
+        """
+        Initialize the distribution
+
+        Args:
+            kind: Distribution name
+            params: Distribution parameters in seconds (see class docstring)
+            maximum: Upper bound for any sample
+            seed: Seed for reproducible samples
+        """
+        if kind not in self.KINDS:
+            raise ValueError(f"Unknown latency distribution: {kind}")
+        if len(params) != self.KINDS[kind]:
+            raise ValueError(f"{kind} takes {self.KINDS[kind]} parameter(s), got {len(params)}")
+        self.kind = kind
+        self.params = tuple(params)
+        self.maximum = maximum
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def parse(cls, spec: str, seed: Optional[int] = None) -> "LatencyModel":
+        """
+        Build a distribution from "kind:param[:param]", e.g. "uniform:0.05:0.2"
+
+        Args:
+            spec: Distribution spec; a bare number means a constant
+            seed: Seed for reproducible samples
+
+        Returns:
+            Latency model
+        """
+        kind, *params = spec.split(":")
+        try:
+            return cls("constant", float(kind), seed=seed)
+        except ValueError:
+            return cls(kind, *(float(p) for p in params), seed=seed)
+
+    def sample(self) -> float:
+        """Draw one latency in seconds"""
+        with self._lock:
+            if self.kind == "constant":
+                value = self.params[0]
+            elif self.kind == "uniform":
+                value = self._random.uniform(*self.params)
+            elif self.kind == "normal":
+                value = self._random.gauss(*self.params)
+            else:
+                median, sigma = self.params
+                value = self._random.lognormvariate(math.log(median), sigma) if median > 0 else 0.0
+        return min(self.maximum, max(0.0, value))
+
+    def describe(self) -> Dict[str, Any]:
+        return {"kind": self.kind, "params": list(self.params)}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; without this, delayed ACKs
+    # add ~40ms to every keep-alive response
+    disable_nagle_algorithm = True
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def _body(self) -> Any:
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def _send(self, status: int, payload: Any, headers: Optional[Dict[str, str]] = None) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_HEAD(self) -> None:
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_GET(self) -> None:
+        self.server.fake.handle_get(self)
+
+    def do_POST(self) -> None:
+        self.server.fake.handle_post(self)
+
+
+class _FakeServer:
+    """HTTP server on a free local port, served from a daemon thread"""
+
+    def __init__(self, latency: Optional[LatencyModel], seed: Optional[int]):
+        self.latency = latency or LatencyModel("constant", 0.0)
+        self._random = random.Random(seed)
+        self._random_lock = threading.Lock()
+        self.stats: Dict[str, int] = {}
+        self._stats_lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _chance(self, rate: float) -> bool:
+        with self._random_lock:
+            return self._random.random() < rate
+
+    def _count(self, name: str) -> None:
+        with self._stats_lock:
+            self.stats[name] = self.stats.get(name, 0) + 1
+
+    def start(self) -> "_FakeServer":
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self._server.daemon_threads = True
+        self._server.fake = self
+        # A short poll interval keeps shutdown() from stalling for half a second
+        self._thread = threading.Thread(target=self._server.serve_forever, args=(0.05,), daemon=True,
+                                        name=f"{type(self).__name__}-server")
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def handle_get(self, handler: _Handler) -> None:
+        handler._send(404, {"error": {"message": "not found"}})
+
+    def handle_post(self, handler: _Handler) -> None:
+        handler._send(404, {"error": {"message": "not found"}})
+
+
+class FakeOpenRouter(_FakeServer):
+    """
+    OpenAI-compatible chat completions endpoint
+
+    A completion whose last message is not a tool result asks for a tool
+    call with probability `tool_call_rate`; otherwise it answers with
+    `answer_words` words. Any completion fails with `error_status` with
+    probability `error_rate` (429s carry a Retry-After header). Point the
+    assistant at `base_url`.
+    """
+
+    def __init__(self, latency: Optional[LatencyModel] = None, tool_call_rate: float = 0.5,
+                 error_rate: float = 0.0, error_status: int = 500, answer_words: int = 200,
+                 seed: Optional[int] = None):
+        """
+        Initialize the fake
+
+        Args:
+            latency: Time to answer each completion
+            tool_call_rate: Probability that a first-round completion calls a tool
+            error_rate: Probability that a completion fails
+            error_status: HTTP status of injected failures
+            answer_words: Length of final answers
+            seed: Seed for reproducible tool-call and error injection
+        """
+        super().__init__(latency, seed)
+        self.tool_call_rate = tool_call_rate
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.answer_words = answer_words
+
+    @property
+    def base_url(self) -> str:
+        return f"{self.url}/api/v1"
+
+    def handle_post(self, handler: _Handler) -> None:
+        if not handler.path.endswith("/chat/completions"):
+            return super().handle_post(handler)
+        request = handler._body()
+        time.sleep(self.latency.sample())
+
+        if self._chance(self.error_rate):
+            self._count("errors")
+            headers = {"Retry-After": "0"} if self.error_status == 429 else None
+            return handler._send(self.error_status, {"error": {"message": "injected failure",
+                                                                "code": self.error_status}}, headers)
+        if request.get("stream"):
+            self._count("rejected_streams")
+            return handler._send(400, {"error": {"message": "streaming is not simulated"}})
+
+        messages = request.get("messages") or [{}]
+        tools = [tool.get("function", {}).get("name") for tool in request.get("tools") or []]
+        wants_tool = messages[-1].get("role") != "tool" and tools and self._chance(self.tool_call_rate)
+        self._count("tool_calls" if wants_tool else "answers")
+        handler._send(200, self.completion(request, tools if wants_tool else None))
+
+    def completion(self, request: Dict[str, Any], tools: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Build a chat completion payload
+
+        Args:
+            request: Chat completion request body
+            tools: Tool names to pick a call from; None answers directly
+
+        Returns:
+            Chat completion as the OpenAI API returns it
+        """
+        self._count("completions")
+        prompt = str(request.get("messages", [{}])[-1].get("content") or "")
+        prompt_tokens = sum(len(str(m.get("content") or "")) // 4 for m in request.get("messages", []))
+        if tools:
+            with self._random_lock:
+                tool = self._random.choice([t for t in tools if t] or ["web_search"])
+            message = {"role": "assistant", "content": None, "tool_calls": [{
+                "id": f"call_{self.stats['completions']}", "type": "function",
+                "function": {"name": tool, "arguments": json.dumps({"query": prompt[:80]})}
+            }]}
+            finish_reason, completion_tokens = "tool_calls", 20
+        else:
+            message = {"role": "assistant", "content": " ".join(["finding"] * self.answer_words)}
+            finish_reason, completion_tokens = "stop", self.answer_words
+        return {
+            "id": f"chatcmpl-{self.stats['completions']}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "fake-model"),
+            "choices": [{"index": 0, "message": message, "finish_reason": finish_reason}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                      "total_tokens": prompt_tokens + completion_tokens}
+        }
+
+
+class FakeToolhouse(_FakeServer):
+    """
+    Toolhouse stand-in: GET /tools returns the bundle schema, POST /run_tools
+    runs the calls it is sent, each taking a sample of `latency` and
+    returning about `result_bytes` of search-result JSON
+    """
+
+    def __init__(self, latency: Optional[LatencyModel] = None, tools: Sequence[str] = DEFAULT_TOOLS,
+                 result_bytes: int = 8000, error_rate: float = 0.0, seed: Optional[int] = None):
+        """
+        Initialize the fake
+
+        Args:
+            latency: Time each tool call takes
+            tools: Tool names in the bundle
+            result_bytes: Approximate size of each tool result
+            error_rate: Probability that a tool run fails with HTTP 500
+            seed: Seed for reproducible error injection
+        """
+        super().__init__(latency, seed)
+        self.tools = list(tools)
+        self.result_bytes = result_bytes
+        self.error_rate = error_rate
+
+    def schema(self) -> List[Dict[str, Any]]:
+        return [{
+            "type": "function",
+            "function": {
+                "name": name,
+                "description": f"Fake {name.replace('_', ' ')} tool",
+                "parameters": {"type": "object",
+                               "properties": {"query": {"type": "string"}},
+                               "required": ["query"]}
+            }
+        } for name in self.tools]
+
+    def handle_get(self, handler: _Handler) -> None:
+        if urlsplit(handler.path).path != "/tools":
+            return super().handle_get(handler)
+        self._count("get_tools")
+        handler._send(200, self.schema())
+
+    def handle_post(self, handler: _Handler) -> None:
+        if urlsplit(handler.path).path != "/run_tools":
+            return super().handle_post(handler)
+        calls = handler._body().get("tool_calls", [])
+        # Calls in one request run back to back, like a single Toolhouse run
+        time.sleep(sum(self.latency.sample() for _ in calls))
+        if self._chance(self.error_rate):
+            self._count("errors")
+            return handler._send(500, {"error": "injected failure"})
+        self._count("run_tools")
+        handler._send(200, [{"role": "tool", "tool_call_id": call["id"],
+                             "content": self.result(call["name"], call.get("arguments"))}
+                            for call in calls])
+
+    def result(self, tool: str, arguments: Any) -> str:
+        try:
+            query = json.loads(arguments or "{}").get("query", "")
+        except (ValueError, AttributeError):
+            query = ""
+        hits, index = [], 0
+        while sum(len(json.dumps(hit)) for hit in hits) < self.result_bytes:
+            hits.append({"title": f"{tool} result {index} for {query}",
+                         "url": f"https://example.com/{tool}/{index}",
+                         "snippet": "Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 3})
+            index += 1
+        return json.dumps({"query": query, "results": hits})
+
+    def client_factory(self) -> Callable[[], "ToolhouseClient"]:
+        """Factory to install as `life_coach.coach.Toolhouse`"""
+        return lambda *args, **kwargs: ToolhouseClient(self.url)
+
+
+class ToolhouseClient:
+    """The subset of the Toolhouse SDK the assistant uses, backed by `FakeToolhouse`"""
+
+    def __init__(self, base_url: str, timeout: float = 60.0):
+        self.base_url = base_url
+        self.timeout = timeout
+        self.metadata: Dict[str, Any] = {}
+        self.provider = "openai"
+
+    def set_api_key(self, api_key: Optional[str]) -> None:
+        pass
+
+    def set_provider(self, provider: str) -> None:
+        self.provider = provider
+
+    def set_metadata(self, key: str, value: Any) -> None:
+        self.metadata[key] = value
+
+    def _request(self, path: str, payload: Any = None) -> Any:
+        data = None if payload is None else json.dumps(payload).encode("utf-8")
+        request = urllib.request.Request(self.base_url + path, data=data,
+                                         headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            return json.loads(response.read())
+
+    def get_tools(self, bundle: str = "default") -> List[Dict[str, Any]]:
+        return self._request(f"/tools?bundle={bundle}")
+
+    def run_tools(self, response: Any, append: bool = True) -> List[Dict[str, Any]]:
+        message = response.choices[0].message
+        calls = [{"id": call.id, "name": call.function.name, "arguments": call.function.arguments}
+                 for call in message.tool_calls or []]
+        results = self._request("/run_tools", {"tool_calls": calls, "metadata": self.metadata})
+        if append:
+            return [message.model_dump(exclude_none=True), *results]
+        return results
+
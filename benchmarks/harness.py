@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+Offline load benchmark against local stand-ins for OpenRouter and Toolhouse
+
+Starts FakeOpenRouter and FakeToolhouse (see benchmarks/fakes.py), points
+a fresh assistant at them for each workload and drives `handle_request`:
+
+    sequential  one request at a time
+    batch       `handle_requests` with --concurrency workers
+    concurrent  --concurrency client threads calling `handle_request` back to back
+
+For each workload it reports throughput and p50/p95/p99 request latency,
+plus errors, fallbacks, tool rounds and what the fake servers served. The
+configuration and results are written to a JSON file so runs can be
+compared. No API keys or network access are needed; markdown logs go to a
+temporary directory.
+
+Usage:
+    python benchmarks/harness.py [--workloads sequential,batch,concurrent]
+        [--requests N] [--warmup N] [--concurrency N] [--latency SPEC] [--tool-latency SPEC]
+        [--tool-call-rate P] [--error-rate P] [--seed N] [--output PATH]
+
+SPEC is a latency distribution: a number of seconds, or "uniform:LOW:HIGH",
+"normal:MEAN:STDDEV" or "lognormal:MEDIAN:SIGMA".
+"""
+
+import argparse
+import json
+import math
+import os
+import platform
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fakes import FakeOpenRouter, FakeToolhouse, LatencyModel  # noqa: E402
+
+
+ROOT = Path(__file__).resolve().parent.parent
+WORKLOADS = ("sequential", "batch", "concurrent")
+DEFAULT_TASK_TYPES = ("general", "fast", "reasoning")
+TOPICS = ("solar panel efficiency", "EV battery recycling", "small-language-model benchmarks",
+          "urban heat islands", "global shipping rates", "open-source licensing trends")
+
+Request = Tuple[str, str]
+
+
+def percentile(samples: Sequence[float], fraction: float) -> float:
+    """
+    Nearest-rank percentile
+
+    Args:
+        samples: Values (need not be sorted)
+        fraction: Percentile as a fraction, e.g. 0.95
+
+    Returns:
+        The percentile, or NaN for no samples
+    """
+    if not samples:
+        return float("nan")
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+def make_requests(count: int, task_types: Sequence[str]) -> List[Request]:
+    """Build distinct (request, task_type) pairs, cycling topics and task types"""
+    return [(f"Summarize recent findings on {TOPICS[i % len(TOPICS)]} (item {i})",
+             task_types[i % len(task_types)])
+            for i in range(count)]
+
+
+def timed_assistant(assistant: Any, latencies: List[float]) -> Any:
+    """Record the latency of every `handle_request` call, including batch items"""
+    handle = assistant.handle_request
+    lock = threading.Lock()
+
+    def timed(*args: Any, **kwargs: Any) -> Dict[str, Any]:
+        started = time.perf_counter()
+        try:
+            return handle(*args, **kwargs)
+        finally:
+            with lock:
+                latencies.append(time.perf_counter() - started)
+
+    assistant.handle_request = timed
+    return assistant
+
+
+def run_sequential(assistant: Any, requests: List[Request], concurrency: int) -> List[Dict[str, Any]]:
+    return [assistant.handle_request(request, task_type) for request, task_type in requests]
+
+
+def run_batch(assistant: Any, requests: List[Request], concurrency: int) -> List[Dict[str, Any]]:
+    return assistant.handle_requests(requests, max_workers=concurrency)
+
+
+def run_concurrent(assistant: Any, requests: List[Request], concurrency: int) -> List[Dict[str, Any]]:
+    # Closed-loop clients: each thread sends its next request as soon as the last one returns
+    pending = list(reversed(requests))
+    lock = threading.Lock()
+    results: List[Dict[str, Any]] = []
+
+    def client() -> None:
+        while True:
+            with lock:
+                if not pending:
+                    return
+                request, task_type = pending.pop()
+            result = assistant.handle_request(request, task_type)
+            with lock:
+                results.append(result)
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="bench-client") as pool:
+        for _ in range(concurrency):
+            pool.submit(client)
+    return results
+
+
+RUNNERS: Dict[str, Callable[[Any, List[Request], int], List[Dict[str, Any]]]] = {
+    "sequential": run_sequential,
+    "batch": run_batch,
+    "concurrent": run_concurrent,
+}
+
+
+def summarize(latencies: List[float], wall_seconds: float, results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Aggregate one workload's measurements
+
+    Args:
+        latencies: Per-request latencies in seconds
+        wall_seconds: Duration of the whole workload
+        results: Responses returned by the assistant
+
+    Returns:
+        Dict with throughput, latency percentiles (ms) and outcome counts
+    """
+    metadata = [result.get("metadata", {}) for result in results]
+    return {
+        "requests": len(results),
+        "wall_seconds": round(wall_seconds, 4),
+        "throughput_rps": round(len(results) / wall_seconds, 3) if wall_seconds else None,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 0.50) * 1000, 2),
+            "p95": round(percentile(latencies, 0.95) * 1000, 2),
+            "p99": round(percentile(latencies, 0.99) * 1000, 2),
+            "mean": round(sum(latencies) / len(latencies) * 1000, 2) if latencies else None,
+            "max": round(max(latencies) * 1000, 2) if latencies else None,
+        },
+        "errors": sum(1 for m in metadata if "error" in m),
+        "fallbacks": sum(1 for m in metadata if m.get("fallback_model")),
+        "tool_rounds": sum(m.get("tool_loop", {}).get("tool_rounds", 0) for m in metadata),
+    }
+
+
+def run_workload(name: str, args: argparse.Namespace) -> Dict[str, Any]:
+    """
+    Run one workload against freshly started fake servers
+
+    Args:
+        name: Workload name from `WORKLOADS`
+        args: Parsed command line options
+
+    Returns:
+        Workload summary, including what each fake server served
+    """
+    import life_coach.coach as coach
+    from life_coach.coach import ResearchAnalysisAssistant
+
+    openrouter = FakeOpenRouter(latency=LatencyModel.parse(args.latency, seed=args.seed),
+                                tool_call_rate=args.tool_call_rate, error_rate=args.error_rate,
+                                error_status=args.error_status, answer_words=args.answer_words,
+                                seed=args.seed)
+    toolhouse = FakeToolhouse(latency=LatencyModel.parse(args.tool_latency, seed=args.seed),
+                              result_bytes=args.result_bytes, seed=args.seed)
+    with openrouter, toolhouse:
+        coach.Toolhouse = toolhouse.client_factory()
+        assistant = ResearchAnalysisAssistant(base_url=openrouter.base_url,
+                                              max_tool_rounds=args.max_tool_rounds)
+        # Unmeasured: the first requests pay for SDK imports and connection set-up
+        for request, task_type in make_requests(args.warmup, args.task_types):
+            assistant.handle_request(f"Warm-up: {request}", task_type)
+        openrouter.stats.clear()
+        toolhouse.stats.clear()
+
+        latencies: List[float] = []
+        timed_assistant(assistant, latencies)
+        requests = make_requests(args.requests, args.task_types)
+
+        started = time.perf_counter()
+        results = RUNNERS[name](assistant, requests, args.concurrency)
+        summary = summarize(latencies, time.perf_counter() - started, results)
+        summary["servers"] = {"openrouter": dict(openrouter.stats), "toolhouse": dict(toolhouse.stats)}
+    return summary
+
+
+def print_table(results: Dict[str, Dict[str, Any]]) -> None:
+    print(f"{'workload':<12}{'requests':>9}{'rps':>9}{'p50 ms':>10}{'p95 ms':>10}"
+          f"{'p99 ms':>10}{'errors':>8}{'fallbacks':>11}")
+    for name, summary in results.items():
+        latency = summary["latency_ms"]
+        print(f"{name:<12}{summary['requests']:>9}{summary['throughput_rps']:>9}"
+              f"{latency['p50']:>10}{latency['p95']:>10}{latency['p99']:>10}"
+              f"{summary['errors']:>8}{summary['fallbacks']:>11}")
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workloads", default=",".join(WORKLOADS),
+                        help=f"comma-separated workloads (default {','.join(WORKLOADS)})")
+    parser.add_argument("--requests", type=int, default=50, help="requests per workload (default 50)")
+    parser.add_argument("--warmup", type=int, default=2,
+                        help="unmeasured requests sent before each workload (default 2)")
+    parser.add_argument("--concurrency", type=int, default=8,
+                        help="workers for batch and concurrent workloads (default 8)")
+    parser.add_argument("--task-types", default=",".join(DEFAULT_TASK_TYPES),
+                        help="task types to cycle through (default general,fast,reasoning)")
+    parser.add_argument("--latency", default="lognormal:0.15:0.4",
+                        help="completion latency distribution (default lognormal:0.15:0.4)")
+    parser.add_argument("--tool-latency", default="uniform:0.05:0.2",
+                        help="per-tool-call latency distribution (default uniform:0.05:0.2)")
+    parser.add_argument("--tool-call-rate", type=float, default=0.5,
+                        help="probability that a completion asks for a tool (default 0.5)")
+    parser.add_argument("--error-rate", type=float, default=0.0,
+                        help="probability that a completion fails (default 0)")
+    parser.add_argument("--error-status", type=int, default=500, help="HTTP status of injected failures")
+    parser.add_argument("--answer-words", type=int, default=200, help="length of final answers")
+    parser.add_argument("--result-bytes", type=int, default=8000, help="size of each tool result")
+    parser.add_argument("--max-tool-rounds", type=int, default=3, help="tool rounds per request")
+    parser.add_argument("--seed", type=int, default=1, help="seed for latencies and injection")
+    parser.add_argument("--output", help="JSON results file (default benchmarks/results/harness-<time>.json)")
+    args = parser.parse_args(argv)
+
+    args.workloads = [w.strip() for w in args.workloads.split(",") if w.strip()]
+    unknown = set(args.workloads) - set(WORKLOADS)
+    if unknown:
+        parser.error(f"unknown workloads: {', '.join(sorted(unknown))}")
+    args.task_types = [t.strip() for t in args.task_types.split(",") if t.strip()]
+    for spec in (args.latency, args.tool_latency):
+        try:
+            LatencyModel.parse(spec)
+        except (ValueError, TypeError) as e:
+            parser.error(f"bad latency spec {spec!r}: {e}")
+    return args
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    started_at = datetime.now(timezone.utc)
+    output = Path(args.output) if args.output else (
+        ROOT / "benchmarks" / "results" / f"harness-{started_at.strftime('%Y%m%dT%H%M%SZ')}.json"
+    )
+    output = output.resolve()
+
+    os.environ.setdefault("OPENROUTER_API_KEY", "offline-benchmark")
+    os.environ.setdefault("TOOLHOUSE_API_KEY", "offline-benchmark")
+
+    results: Dict[str, Dict[str, Any]] = {}
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="research-bench-") as workdir:
+        # Markdown logs are written relative to the working directory
+        os.chdir(workdir)
+        try:
+            for name in args.workloads:
+                print(f"Running {name} workload ({args.requests} requests)...", flush=True)
+                results[name] = run_workload(name, args)
+        finally:
+            os.chdir(cwd)
+
+    print()
+    print_table(results)
+
+    report = {
+        "started_at": started_at.isoformat(),
+        "config": {key: value for key, value in vars(args).items() if key != "output"},
+        "environment": {"python": platform.python_version(), "platform": platform.platform(),
+                        "cpus": os.cpu_count()},
+        "workloads": results,
+    }
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+    print(f"\nResults written to {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
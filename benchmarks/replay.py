@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Record and replay cassettes of OpenRouter and Toolhouse traffic
+
+    record  drive requests through the assistant and save every exchange
+            to a cassette; by default against the local fakes in
+            benchmarks/fakes.py (with optional error injection, so the
+            cassette exercises retries and fallbacks), or with --live
+            against the real services using the keys in .env
+    play    replay a cassette's requests through a fresh assistant with no
+            network access, --runs times, and report p50/p95 latency; exits
+            with status 1 if any request had no recorded answer
+
+Replays are deterministic: each model or tool call gets the response that
+was recorded for it. By default they run as fast as possible; --realtime
+waits as long as each recorded call took (scaled by --speed), so a replay
+reproduces the latency profile of the recording.
+
+Usage:
+    python benchmarks/replay.py record CASSETTE [--requests N] [--task-types LIST]
+        [--latency SPEC] [--tool-call-rate P] [--error-rate P] [--seed N] [--live]
+    python benchmarks/replay.py play CASSETTE [--runs N] [--realtime] [--speed X]
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fakes import FakeOpenRouter, FakeToolhouse, LatencyModel  # noqa: E402
+from harness import DEFAULT_TASK_TYPES, make_requests, percentile  # noqa: E402
+
+
+def record(args: argparse.Namespace) -> Dict[str, Any]:
+    """
+    Record a cassette
+
+    Args:
+        args: Parsed `record` options
+
+    Returns:
+        Cassette stats after saving
+    """
+    import life_coach.coach as coach
+    from life_coach.cassette import Cassette
+    from life_coach.transport import HttpPool
+
+    requests = make_requests(args.requests, args.task_types)
+    with Cassette.record(args.cassette) as cassette:
+        if args.live:
+            assistant = coach.ResearchAnalysisAssistant(cassette=cassette, http_pool=HttpPool())
+            for request, task_type in requests:
+                assistant.handle_request(request, task_type)
+        else:
+            openrouter = FakeOpenRouter(latency=LatencyModel.parse(args.latency, seed=args.seed),
+                                        tool_call_rate=args.tool_call_rate, error_rate=args.error_rate,
+                                        error_status=args.error_status, answer_words=args.answer_words,
+                                        seed=args.seed)
+            toolhouse = FakeToolhouse(latency=LatencyModel.parse(args.tool_latency, seed=args.seed),
+                                      result_bytes=args.result_bytes, seed=args.seed)
+            with openrouter, toolhouse:
+                coach.Toolhouse = toolhouse.client_factory()
+                assistant = coach.ResearchAnalysisAssistant(base_url=openrouter.base_url,
+                                                            cassette=cassette, http_pool=HttpPool())
+                for request, task_type in requests:
+                    assistant.handle_request(request, task_type)
+    return cassette.stats()
+
+
+def play(args: argparse.Namespace) -> Dict[str, Any]:
+    """
+    Replay a cassette's requests `args.runs` times
+
+    Args:
+        args: Parsed `play` options
+
+    Returns:
+        Latency percentiles (ms), fallbacks, errors and cassette misses
+    """
+    from life_coach.cassette import Cassette
+    from life_coach.coach import ResearchAnalysisAssistant
+
+    cassette = Cassette.replay(args.cassette, realtime=args.realtime, speed=args.speed)
+    latencies: List[float] = []
+    fallbacks = errors = 0
+    misses: List[str] = []
+    for _ in range(args.runs):
+        cassette.rewind()
+        assistant = ResearchAnalysisAssistant(cassette=cassette)
+        for item in cassette.requests:
+            started = time.perf_counter()
+            result = assistant.handle_request(item["request"], item["task_type"])
+            latencies.append(time.perf_counter() - started)
+            fallbacks += bool(result["metadata"].get("fallback_model"))
+            errors += "error" in result["metadata"]
+        misses.extend(cassette.stats()["misses"])
+    return {
+        "runs": args.runs,
+        "requests": len(latencies),
+        "latency_ms": {"p50": round(percentile(latencies, 0.50) * 1000, 2),
+                       "p95": round(percentile(latencies, 0.95) * 1000, 2)},
+        "fallbacks": fallbacks,
+        "errors": errors,
+        "misses": misses,
+    }
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    rec = commands.add_parser("record", help="record a cassette")
+    rec.add_argument("cassette", help="cassette file to write (.json or .json.gz)")
+    rec.add_argument("--requests", type=int, default=10, help="requests to record (default 10)")
+    rec.add_argument("--task-types", default=",".join(DEFAULT_TASK_TYPES),
+                     help="task types to cycle through (default general,fast,reasoning)")
+    rec.add_argument("--live", action="store_true", help="record the real services instead of the fakes")
+    rec.add_argument("--latency", default="lognormal:0.15:0.4", help="fake completion latency")
+    rec.add_argument("--tool-latency", default="uniform:0.05:0.2", help="fake per-tool-call latency")
+    rec.add_argument("--tool-call-rate", type=float, default=0.5, help="fake tool-call probability")
+    rec.add_argument("--error-rate", type=float, default=0.0, help="fake completion failure probability")
+    rec.add_argument("--error-status", type=int, default=500, help="HTTP status of injected failures")
+    rec.add_argument("--answer-words", type=int, default=200, help="length of fake answers")
+    rec.add_argument("--result-bytes", type=int, default=8000, help="size of each fake tool result")
+    rec.add_argument("--seed", type=int, default=1, help="seed for the fakes")
+
+    replay = commands.add_parser("play", help="replay a cassette offline")
+    replay.add_argument("cassette", help="cassette file to replay")
+    replay.add_argument("--runs", type=int, default=1, help="times to replay the cassette (default 1)")
+    replay.add_argument("--realtime", action="store_true", help="wait as long as each recorded call took")
+    replay.add_argument("--speed", type=float, default=1.0, help="divide recorded delays by this with --realtime")
+
+    args = parser.parse_args(argv)
+    if args.command == "record":
+        args.task_types = [t.strip() for t in args.task_types.split(",") if t.strip()]
+    return args
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    args.cassette = str(Path(args.cassette).resolve())
+    if not getattr(args, "live", False):
+        os.environ.setdefault("OPENROUTER_API_KEY", "offline-replay")
+        os.environ.setdefault("TOOLHOUSE_API_KEY", "offline-replay")
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="research-replay-") as workdir:
+        # Markdown logs are written relative to the working directory
+        os.chdir(workdir)
+        try:
+            report = record(args) if args.command == "record" else play(args)
+        finally:
+            os.chdir(cwd)
+
+    print(json.dumps(report, indent=2))
+    return 1 if report.get("misses") else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
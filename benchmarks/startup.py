@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Startup benchmark for the command line interface
+
+Prints an import-time report for the `life_coach` package, then measures how
+long `python main.py` takes to show its menu. Exits with status 1 when the
+median time-to-menu exceeds the budget, so it can gate CI.
+
+Usage:
+    python benchmarks/startup.py [--budget SECONDS] [--runs N] [--top N]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+
+ROOT = Path(__file__).resolve().parent.parent
+MENU_MARKER = "What would you like to research or analyze?"
+DEFAULT_BUDGET = 1.0
+
+
+def import_report(top: int = 15) -> Tuple[float, List[Tuple[str, float, float]]]:
+    """
+    Measure what `import life_coach` costs, module by module
+
+    Args:
+        top: Number of modules to report
+
+    Returns:
+        Tuple of (total seconds, [(module, self seconds, cumulative seconds)])
+        with the most expensive modules first
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c",
+         "import life_coach; life_coach.ResearchAnalysisAssistant"],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    )
+
+    modules: Dict[str, Tuple[float, float]] = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        modules[name.strip()] = (int(self_us) / 1e6, int(cumulative_us) / 1e6)
+
+    total = sum(self_seconds for self_seconds, _ in modules.values())
+    ranked = sorted(((name, s, c) for name, (s, c) in modules.items()),
+                    key=lambda item: item[2], reverse=True)
+    return total, ranked[:top]
+
+
+def time_to_menu(timeout: float = 30.0) -> float:
+    """
+    Launch `python main.py` and time how long it takes to print the menu
+
+    Dummy API keys are supplied when none are set; nothing is sent over the
+    network before the menu appears. The process is told to exit afterwards.
+
+    Args:
+        timeout: Seconds to wait for the menu before giving up
+
+    Returns:
+        Seconds from launch until the menu was printed
+    """
+    env = dict(os.environ, PYTHONUNBUFFERED="1")
+    env.setdefault("OPENROUTER_API_KEY", "benchmark")
+    env.setdefault("TOOLHOUSE_API_KEY", "benchmark")
+
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, str(ROOT / "main.py")], cwd=ROOT, env=env, text=True,
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+    )
+    try:
+        for line in process.stdout:
+            if MENU_MARKER in line:
+                elapsed = time.perf_counter() - started
+                break
+            if time.perf_counter() - started > timeout:
+                raise TimeoutError(f"menu did not appear within {timeout}s")
+        else:
+            raise RuntimeError(f"main.py exited with status {process.wait()} before showing the menu")
+        process.communicate("9\n", timeout=timeout)
+        return elapsed
+    finally:
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--budget", type=float, default=DEFAULT_BUDGET,
+                        help=f"maximum median seconds to reach the menu (default {DEFAULT_BUDGET})")
+    parser.add_argument("--runs", type=int, default=5, help="number of main.py launches (default 5)")
+    parser.add_argument("--top", type=int, default=15, help="modules listed in the import report (default 15)")
+    args = parser.parse_args()
+
+    total, ranked = import_report(args.top)
+    print(f"Import time for life_coach: {total * 1000:.1f} ms")
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for name, self_seconds, cumulative in ranked:
+        print(f"{cumulative * 1000:14.1f} {self_seconds * 1000:9.1f}  {name}")
+    print()
+
+    timings = [time_to_menu() for _ in range(args.runs)]
+    median = statistics.median(timings)
+    print(f"Time to menu over {args.runs} runs: median {median * 1000:.1f} ms, "
+          f"min {min(timings) * 1000:.1f} ms, max {max(timings) * 1000:.1f} ms "
+          f"(budget {args.budget * 1000:.0f} ms)")
+
+    if median > args.budget:
+        print("FAIL: startup budget exceeded")
+        return 1
+    print("OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,494 @@
+#!/usr/bin/env python3
+"""
+Token estimator calibration, accuracy report and microbenchmark
+
+Subcommands:
+    label     Build tests/data/token_corpus.jsonl and label it with the real
+              tokenizers of each model family; --kinds rebuilds only some
+              kinds of samples
+    fit       Fit the estimator's per-family coefficients to the corpus and
+              print them for life_coach/tokens.py
+    accuracy  Report estimator error against the corpus; exits 1 when a
+              family is outside the stated bound (default)
+    bench     Time the estimator against the real tokenizers
+
+`label` and the tokenizer half of `bench` need the reference tokenizers,
+which are development-only dependencies:
+
+    pip install tiktoken tokenizers
+    pip install --no-deps deepseek-tokenizer llama-models dashscope mistral-common
+
+Gemini's tokenizer is not published, so the "gemini" family uses the
+coefficients fitted to all labelled families together.
+"""
+
+import argparse
+import base64
+import importlib.util
+import inspect
+import json
+import os
+import random
+import re
+import statistics
+import sys
+import sysconfig
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from life_coach.tokens import (  # noqa: E402
+    ERROR_BOUND, TokenEstimator, text_features
+)
+
+CORPUS = ROOT / "tests" / "data" / "token_corpus.jsonl"
+FAMILIES = ("deepseek", "llama", "mistral", "qwen")
+
+LLAMA4_PATTERN = (
+    r"""[^\r\n\p{L}\p{N}]?[\p{Lu}\p{Lt}\p{Lm}\p{Lo}\p{M}]*[\p{Ll}\p{Lm}\p{Lo}\p{M}]+(?i:'s|'t|'re|'ve|'m|'ll|'d)?"""
+    r"""|[^\r\n\p{L}\p{N}]?[\p{Lu}\p{Lt}\p{Lm}\p{Lo}\p{M}]+[\p{Ll}\p{Lm}\p{Lo}\p{M}]*(?i:'s|'t|'re|'ve|'m|'ll|'d)?"""
+    r"""|\p{N}{1,3}| ?[^\s\p{L}\p{N}]+[\r\n/]*|\s*[\r\n]+|\s+(?!\S)|\s+"""
+)
+QWEN_PATTERN = (
+    r"""(?i:'s|'t|'re|'ve|'m|'ll|'d)|[^\r\n\p{L}\p{N}]?\p{L}+|\p{N}| ?[^\s\p{L}\p{N}]+[\r\n]*"""
+    r"""|\s*[\r\n]+|\s+(?!\S)|\s+"""
+)
+
+# Hand-written CJK passages; the standard library's CJK codec test texts
+# are added to these when the corpus is built
+CJK_PASSAGES = [
+    "研究助理会先在网络上搜索相关资料，然后对结果进行整理和分析。每一条结论都应该注明来源，"
+    "并说明数据的时间范围。如果不同来源之间存在矛盾，助理需要指出差异，并给出可能的原因。",
+    "本季度的销售数据显示，华东地区的增长率达到百分之十二，而华南地区则略有下降。"
+    "分析表明，主要原因是物流成本上升以及部分门店调整营业时间。建议下一季度重点关注库存周转。",
+    "趋势跟踪功能会定期记录关键指标的变化，例如搜索热度、新闻报道数量和社交媒体讨论量。"
+    "通过比较不同时间段的数据，可以发现长期趋势和短期波动之间的区别。",
+    "在撰写综合研究报告时，首先要明确研究问题，其次收集可靠的数据，最后形成结构清晰的结论。"
+    "报告应包括摘要、方法、主要发现、局限性以及后续行动建议。",
+    "机器学习模型的性能不仅取决于算法本身，还与训练数据的质量密切相关。"
+    "数据清洗、特征工程和模型评估都是不可忽视的环节。",
+    "研究アシスタントは、ウェブ検索、データ分析、トレンドの追跡を組み合わせて、"
+    "利用者の質問に根拠のある回答を返します。結果には必ず出典と日付を添えてください。",
+    "今月の調査では、回答者の約六割がオンラインでの情報収集を重視していると答えました。"
+    "一方で、情報の信頼性に不安を感じている人も少なくありません。",
+    "長期的な傾向を把握するためには、同じ指標を同じ条件で継続的に測定することが重要です。"
+    "測定方法を途中で変更した場合は、その旨を記録しておく必要があります。",
+    "データ分析の第一歩は、データの出所と収集方法を確認することです。"
+    "欠損値や外れ値の扱いによって、結論が大きく変わることがあります。",
+    "연구 도우미는 웹 검색과 데이터 분석을 통해 사용자의 질문에 근거 있는 답변을 제공합니다. "
+    "모든 결론에는 출처와 날짜를 함께 표시해야 합니다.",
+    "이번 분기 보고서에 따르면 온라인 매출은 전년 대비 15퍼센트 증가했으며, "
+    "오프라인 매장의 방문객 수는 소폭 감소했습니다. 원인 분석과 대응 전략이 필요합니다.",
+    "추세를 정확하게 파악하려면 동일한 지표를 일정한 간격으로 측정하고, "
+    "측정 방법이 바뀐 경우 그 사실을 기록해 두어야 합니다.",
+]
+
+# Two-byte scripts: Cyrillic on its own, since it is the most common, and
+# Greek, Arabic, Hebrew and accented Latin together
+CYRILLIC_PASSAGES = [
+    "Исследовательский помощник сначала ищет информацию в интернете, затем анализирует "
+    "найденные материалы и составляет краткий отчёт. Каждый вывод должен сопровождаться "
+    "ссылкой на источник и датой публикации.",
+    "По данным квартального отчёта, выручка компании выросла на двенадцать процентов, "
+    "а расходы на логистику увеличились почти вдвое. Аналитики связывают это с ростом цен "
+    "на топливо и перестройкой цепочек поставок.",
+    "Чтобы отслеживать долгосрочные тенденции, важно измерять одни и те же показатели "
+    "в одинаковых условиях. Если методика измерения изменилась, это нужно отметить в журнале.",
+    "Модель машинного обучения хороша настолько, насколько хороши данные, на которых она "
+    "обучена. Очистка данных, отбор признаков и честная оценка качества требуют времени.",
+    "Дослідницький помічник допомагає збирати інформацію, аналізувати дані та відстежувати "
+    "тенденції. Усі висновки мають містити посилання на джерела та дату.",
+    "Цього року кількість учасників опитування зросла, проте частка тих, хто довіряє "
+    "онлайн-джерелам, трохи зменшилася. Причини варто дослідити окремо.",
+    "Изследователският асистент търси информация, анализира данни и проследява тенденции "
+    "във времето. Всички заключения трябва да посочват източник.",
+    "Истраживачки асистент претражује интернет, анализира податке и прати трендове. "
+    "Сваки закључак мора да садржи извор и датум објављивања.",
+]
+
+TWO_BYTE_PASSAGES = [
+    "Ο ερευνητικός βοηθός αναζητά πληροφορίες στο διαδίκτυο, αναλύει τα δεδομένα και "
+    "καταγράφει τις τάσεις. Κάθε συμπέρασμα πρέπει να συνοδεύεται από την πηγή του.",
+    "Τα στοιχεία του τριμήνου δείχνουν αύξηση των πωλήσεων κατά δώδεκα τοις εκατό, "
+    "ενώ το κόστος μεταφοράς αυξήθηκε σημαντικά.",
+    "يقوم المساعد البحثي بالبحث في الإنترنت وتحليل البيانات وتتبع الاتجاهات بمرور الوقت. "
+    "يجب أن يتضمن كل استنتاج مصدره وتاريخ نشره.",
+    "העוזר המחקרי מחפש מידע ברשת, מנתח נתונים ועוקב אחר מגמות לאורך זמן. "
+    "כל מסקנה צריכה לכלול את המקור ואת תאריך הפרסום.",
+    "Der Forschungsassistent durchsucht das Web, wertet Daten aus und verfolgt Trends über "
+    "längere Zeiträume. Jede Schlussfolgerung muss Quelle und Datum nennen; Größenangaben "
+    "werden in Euro ausgewiesen.",
+    "L'assistant de recherche interroge le Web, analyse les données et suit les tendances. "
+    "Chaque conclusion doit préciser sa source, sa date et, le cas échéant, ses limites.",
+    "El asistente de investigación busca información, analiza los datos y sigue las tendencias "
+    "a lo largo del tiempo. Cada conclusión debe indicar su fuente y la fecha de publicación.",
+    "Asystent badawczy przeszukuje sieć, analizuje dane i śledzi trendy. Każdy wniosek musi "
+    "zawierać źródło oraz datę publikacji, a wyniki należy porównać z zeszłorocznymi.",
+    "Araştırma asistanı interneti tarar, verileri analiz eder ve eğilimleri takip eder. "
+    "Her sonuç kaynağını ve yayın tarihini belirtmelidir.",
+]
+
+EMOJI = (
+    "😀😃😄😁😆😅😂🤣😊😇🙂🙃😉😍🥰😘😎🤓🧐🤔🤗🤩🥳😏😢😭😤😡🤯😱👍👎👏🙌🙏💪🔥✨🎉🎯🚀📈📉📊"
+    "💡🔍📚📝✅❌⚠️💰🌍🌱☕🍕🐍🦀💻📱🕒"
+)
+EMOJI_SEQUENCES = ["👩‍💻", "👨‍👩‍👧‍👦", "🏳️‍🌈", "👍🏽", "🙋🏻‍♀️", "🇺🇸", "🇩🇪", "🇯🇵", "❤️‍🔥", "🧑🏿‍🔬"]
+
+WORDS = (
+    "market growth analysis report trend data source quarterly revenue survey "
+    "respondents increase decrease regional forecast model accuracy benchmark "
+    "latency throughput inflation energy climate policy research evidence"
+).split()
+
+
+def _stdlib() -> Path:
+    return Path(sysconfig.get_paths()["stdlib"])
+
+
+def _chunks(text: str, rng: random.Random, count: int, low: int, high: int) -> List[str]:
+    chunks = []
+    for _ in range(count):
+        size = rng.randint(low, high)
+        start = rng.randint(0, max(0, len(text) - size))
+        chunks.append(text[start:start + size])
+    return [c for c in chunks if c.strip()]
+
+
+def _prose(rng: random.Random) -> List[str]:
+    import asyncio, collections, email, http.client, json as json_module, logging as logging_module  # noqa: E401
+    docs = []
+    for module in (asyncio, collections, email, http.client, json_module, logging_module,
+                   argparse, random, re, statistics):
+        for _, member in inspect.getmembers(module):
+            doc = inspect.getdoc(member)
+            if doc and len(doc) > 200 and doc.isascii():
+                docs.append(doc)
+    text = "\n\n".join(sorted(set(docs)))
+    text += "\n\n" + (ROOT / "README.md").read_text(encoding="utf-8")
+    return _chunks(text, rng, 70, 150, 2000)
+
+
+def _code(rng: random.Random) -> List[str]:
+    sources = [ROOT / "life_coach" / name for name in ("coach.py", "models.py", "cache.py", "helpers.py")]
+    sources += [_stdlib() / name for name in ("json/encoder.py", "http/client.py", "asyncio/tasks.py",
+                                               "logging/__init__.py", "argparse.py")]
+    text = "\n".join(path.read_text(encoding="utf-8") for path in sources)
+    return _chunks(text, rng, 70, 150, 2000)
+
+
+def _json(rng: random.Random) -> List[str]:
+    samples = []
+    for _ in range(55):
+        results = [{
+            "title": " ".join(rng.choice(WORDS).title() for _ in range(rng.randint(3, 8))),
+            "url": f"https://example.com/{rng.choice(WORDS)}/{rng.randint(1000, 99999)}",
+            "snippet": " ".join(rng.choice(WORDS) for _ in range(rng.randint(10, 40))) + ".",
+            "published": f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+            "score": round(rng.random(), 4),
+            "metrics": {rng.choice(WORDS): rng.randint(0, 100000) for _ in range(rng.randint(1, 4))},
+        } for _ in range(rng.randint(1, 8))]
+        payload = {"query": " ".join(rng.sample(WORDS, 3)), "results": results}
+        indent = rng.choice([None, None, 2, 4])
+        samples.append(json.dumps(payload, indent=indent))
+    return samples
+
+
+def _cjk(rng: random.Random) -> List[str]:
+    texts = list(CJK_PASSAGES)
+    codec_dir = _stdlib() / "test" / "cjkencodings"
+    seen = set()
+    for path in sorted(codec_dir.glob("*-utf8.txt")) if codec_dir.exists() else []:
+        text = path.read_text(encoding="utf-8", errors="ignore")
+        if text not in seen:
+            seen.add(text)
+            texts.append(text)
+    samples = list(texts)
+    joined = "\n".join(texts)
+    samples += _chunks(joined, rng, 30, 80, 1200)
+    return samples
+
+
+def _mixed(rng: random.Random) -> List[str]:
+    samples = []
+    for _ in range(35):
+        parts = [f"## {' '.join(rng.choice(WORDS).title() for _ in range(3))}", ""]
+        for _ in range(rng.randint(2, 6)):
+            parts.append(f"- {rng.choice(WORDS).title()} rose {rng.uniform(-20, 40):.1f}% to "
+                         f"${rng.randint(1, 999)},{rng.randint(100, 999)} ({rng.randint(2019, 2025)})")
+        if rng.random() < 0.5:
+            parts += ["", "```python", f"df = pd.read_csv('{rng.choice(WORDS)}.csv')",
+                      f"df.groupby('{rng.choice(WORDS)}').mean()", "```"]
+        if rng.random() < 0.4:
+            parts += ["", rng.choice(CJK_PASSAGES)[:rng.randint(20, 80)]]
+        parts += ["", f"Source: https://{rng.choice(WORDS)}.org/report?id={rng.randint(1, 10 ** 6)}"]
+        samples.append("\n".join(parts))
+    return samples
+
+
+def _two_byte_samples(rng: random.Random, passages: List[str], count: int) -> List[str]:
+    samples = list(passages)
+    joined = "\n".join(passages)
+    samples += _chunks(joined, rng, count, 80, 1500)
+    for _ in range(count // 3):
+        # Non-Latin prose mixed with English, figures and markdown
+        parts = [f"## {rng.choice(WORDS).title()} {rng.choice(WORDS)}", ""]
+        parts += [rng.choice(passages)[:rng.randint(40, 200)] for _ in range(rng.randint(1, 3))]
+        parts.append(f"- {rng.choice(WORDS)}: {rng.uniform(-20, 40):.1f}% ({rng.randint(2019, 2025)})")
+        samples.append("\n".join(parts))
+    return samples
+
+
+def _cyrillic(rng: random.Random) -> List[str]:
+    return _two_byte_samples(rng, CYRILLIC_PASSAGES, 24)
+
+
+def _two_byte(rng: random.Random) -> List[str]:
+    return _two_byte_samples(rng, TWO_BYTE_PASSAGES, 18)
+
+
+def _emoji(rng: random.Random) -> List[str]:
+    symbols = [c for c in EMOJI if c != "\ufe0f"] + EMOJI_SEQUENCES
+    samples = []
+    for _ in range(10):
+        # Emoji only, e.g. reactions or pasted decoration
+        samples.append("".join(rng.choice(symbols) for _ in range(rng.randint(20, 600))))
+    for _ in range(8):
+        samples.append(rng.choice(symbols) * rng.randint(10, 300))
+    for _ in range(20):
+        # Chat-style text with emoji sprinkled in
+        words = []
+        for _ in range(rng.randint(15, 150)):
+            words.append(rng.choice(WORDS))
+            if rng.random() < 0.3:
+                words.append(rng.choice(symbols))
+        samples.append(" ".join(words))
+    for _ in range(8):
+        lines = [f"{rng.choice(symbols)} {rng.choice(WORDS).title()}: "
+                 f"{rng.choice(CYRILLIC_PASSAGES + CJK_PASSAGES)[:rng.randint(10, 60)]}"
+                 for _ in range(rng.randint(3, 12))]
+        samples.append("\n".join(lines))
+    return samples
+
+
+KINDS = {"prose": _prose, "code": _code, "json": _json, "cjk": _cjk, "mixed": _mixed,
+         "cyrillic": _cyrillic, "two_byte": _two_byte, "emoji": _emoji}
+
+
+def reference_tokenizers() -> Dict[str, Callable[[str], int]]:
+    """Load the real tokenizer of each labelled family"""
+    import tiktoken
+    from tiktoken.load import load_tiktoken_bpe
+    from tokenizers import Tokenizer
+
+    def package_file(package: str, *parts: str) -> str:
+        spec = importlib.util.find_spec(package)
+        if spec is None:
+            raise SystemExit(f"Reference tokenizer package '{package}' is not installed (see --help)")
+        return os.path.join(list(spec.submodule_search_locations)[0], *parts)
+
+    def tiktoken_counter(name: str, ranks: Dict[bytes, int], pattern: str) -> Callable[[str], int]:
+        encoding = tiktoken.Encoding(name=name, pat_str=pattern, mergeable_ranks=ranks, special_tokens={})
+        return lambda text: len(encoding.encode_ordinary(text))
+
+    deepseek = Tokenizer.from_file(package_file("deepseek_tokenizer", "tokenizer.json"))
+    tekken = json.load(open(package_file("mistral_common", "data", "tekken_240911.json"), encoding="utf-8"))
+    size = tekken["config"]["default_vocab_size"] - tekken["config"]["default_num_special_tokens"]
+    return {
+        "deepseek": lambda text: len(deepseek.encode(text, add_special_tokens=False).ids),
+        "llama": tiktoken_counter("llama4", load_tiktoken_bpe(
+            package_file("llama_models", "llama4", "tokenizer.model")), LLAMA4_PATTERN),
+        "mistral": tiktoken_counter("tekken", {
+            base64.b64decode(entry["token_bytes"]): entry["rank"] for entry in tekken["vocab"][:size]
+        }, tekken["config"]["pattern"]),
+        "qwen": tiktoken_counter("qwen", load_tiktoken_bpe(
+            package_file("dashscope", "resources", "qwen.tiktoken")), QWEN_PATTERN),
+    }
+
+
+def load_corpus() -> List[Dict]:
+    with open(CORPUS, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def label(args: argparse.Namespace) -> int:
+    kinds = args.kinds or list(KINDS)
+    unknown = set(kinds) - set(KINDS)
+    if unknown:
+        raise SystemExit(f"Unknown kinds: {', '.join(sorted(unknown))} (choose from {', '.join(KINDS)})")
+    tokenizers = reference_tokenizers()
+    # Samples of the kinds not being rebuilt are kept as they are
+    kept = [sample for sample in load_corpus() if sample["kind"] not in kinds] if args.kinds else []
+
+    samples = []
+    for kind in KINDS:
+        if kind not in kinds:
+            continue
+        # Seeded per kind, so rebuilding one kind leaves the others reproducible
+        rng = random.Random(f"{args.seed}:{kind}")
+        for text in KINDS[kind](rng):
+            tokens = {family: count_tokens(text) for family, count_tokens in tokenizers.items()}
+            samples.append({"kind": kind, "text": text, "tokens": tokens})
+
+    CORPUS.parent.mkdir(parents=True, exist_ok=True)
+    with open(CORPUS, "w", encoding="utf-8") as f:
+        for sample in kept + samples:
+            f.write(json.dumps(sample, ensure_ascii=False) + "\n")
+    print(f"Wrote {len(samples)} labelled samples ({', '.join(kinds)}) to {CORPUS.relative_to(ROOT)}, "
+          f"{len(kept) + len(samples)} in total")
+    return 0
+
+
+def _solve_nonnegative(matrix: List[List[float]], vector: List[float],
+                       sweeps: int = 20000, tolerance: float = 1e-12) -> List[float]:
+    """
+    Minimize ½xᵀAx − bᵀx subject to x ≥ 0 by projected coordinate descent
+
+    A is the (positive definite, thanks to the ridge) normal matrix, so
+    each coordinate step is exact and the sweeps converge to the
+    non-negative least squares solution.
+    """
+    n = len(vector)
+    x = [0.0] * n
+    for _ in range(sweeps):
+        change = 0.0
+        for i in range(n):
+            gradient = sum(matrix[i][j] * x[j] for j in range(n)) - vector[i]
+            value = max(0.0, x[i] - gradient / matrix[i][i])
+            change = max(change, abs(value - x[i]))
+            x[i] = value
+        if change < tolerance:
+            break
+    return x
+
+
+def fit_family(samples: List[Tuple[List[float], int]], ridge: float = 1e-3) -> List[float]:
+    """
+    Weighted non-negative least squares fit minimizing relative error
+
+    Each sample is weighted by 1/tokens², so the fit minimizes the squared
+    relative error rather than being dominated by the longest samples.
+    Coefficients are kept non-negative: no character class can lower a
+    token count, and a negative weight that happens to fit the corpus
+    makes estimates collapse on text dominated by that class.
+    """
+    size = len(samples[0][0])
+    matrix = [[0.0] * size for _ in range(size)]
+    vector = [0.0] * size
+    for features, tokens in samples:
+        weight = 1.0 / max(tokens, 1) ** 2
+        for i in range(size):
+            vector[i] += weight * features[i] * tokens
+            for j in range(size):
+                matrix[i][j] += weight * features[i] * features[j]
+    for i in range(size):
+        matrix[i][i] += ridge
+    return _solve_nonnegative(matrix, vector)
+
+
+def fit(args: argparse.Namespace) -> int:
+    corpus = load_corpus()
+    features = [text_features(sample["text"]) for sample in corpus]
+    coefficients = {}
+    for family in FAMILIES:
+        coefficients[family] = fit_family([(f, s["tokens"][family]) for f, s in zip(features, corpus)])
+    coefficients["default"] = fit_family([(f, s["tokens"][family])
+                                          for f, s in zip(features, corpus) for family in FAMILIES])
+    print("FAMILY_COEFFICIENTS = {")
+    for family, values in coefficients.items():
+        numbers = [f"{v:.4f}" for v in values]
+        separator = ",\n" + " " * (len(family) + 9)
+        lines = [", ".join(numbers[start:start + 8]) for start in range(0, len(numbers), 8)]
+        print(f'    "{family}": ({separator.join(lines)}),')
+    print("}")
+    return 0
+
+
+def _errors(estimator: TokenEstimator, corpus: List[Dict], family: str,
+            reference: str) -> Dict[str, List[float]]:
+    model = {"deepseek": "deepseek/x", "llama": "meta-llama/x", "mistral": "mistralai/x",
+             "qwen": "qwen/x"}.get(family)
+    estimates = estimator.estimate_many([sample["text"] for sample in corpus], model)
+    by_kind: Dict[str, List[float]] = {}
+    for sample, estimate in zip(corpus, estimates):
+        actual = sample["tokens"][reference]
+        by_kind.setdefault(sample["kind"], []).append(abs(estimate - actual) / max(actual, 1))
+    return by_kind
+
+
+def _summary(errors: List[float]) -> str:
+    ordered = sorted(errors)
+    p95 = ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))]
+    return f"mean {statistics.mean(errors) * 100:5.1f}%  p95 {p95 * 100:5.1f}%  max {max(errors) * 100:5.1f}%"
+
+
+def accuracy(args: argparse.Namespace) -> int:
+    corpus = load_corpus()
+    estimator = TokenEstimator()
+    failed = False
+    print(f"Corpus: {len(corpus)} samples; bound: mean relative error <= {ERROR_BOUND * 100:.0f}% per family")
+    for family in FAMILIES:
+        by_kind = _errors(estimator, corpus, family, family)
+        overall = [e for errors in by_kind.values() for e in errors]
+        ok = statistics.mean(overall) <= ERROR_BOUND
+        failed |= not ok
+        print(f"\n{family:<9} {_summary(overall)}  {'OK' if ok else 'FAIL'}")
+        for kind, errors in sorted(by_kind.items()):
+            print(f"  {kind:<7} {_summary(errors)}")
+
+    baseline = [abs(len(s["text"]) // 4 - s["tokens"][family]) / max(s["tokens"][family], 1)
+                for s in corpus for family in FAMILIES]
+    print(f"\nlen(text) // 4 across families: {_summary(baseline)}")
+    return 1 if failed else 0
+
+
+def bench(args: argparse.Namespace) -> int:
+    texts = [sample["text"] for sample in load_corpus()] * args.repeat
+    total_chars = sum(map(len, texts))
+    estimator = TokenEstimator()
+
+    def timed(fn: Callable[[], object]) -> float:
+        best = float("inf")
+        for _ in range(3):
+            started = time.perf_counter()
+            fn()
+            best = min(best, time.perf_counter() - started)
+        return best
+
+    rows = [
+        ("len // 4", timed(lambda: [len(t) // 4 for t in texts])),
+        ("estimate_many", timed(lambda: estimator.estimate_many(texts, "deepseek/x"))),
+        ("estimate (loop)", timed(lambda: [estimator.estimate(t, "deepseek/x") for t in texts])),
+    ]
+    try:
+        tokenizers = reference_tokenizers()
+    except (ImportError, SystemExit) as e:
+        print(f"Reference tokenizers unavailable ({e}); timing the estimator only")
+        tokenizers = {}
+    for family, count_tokens in tokenizers.items():
+        rows.append((f"{family} tokenizer", timed(lambda: [count_tokens(t) for t in texts])))
+
+    print(f"{len(texts)} strings, {total_chars / 1e6:.2f}M characters (best of 3)")
+    estimate_seconds = rows[1][1]
+    for name, seconds in rows:
+        print(f"  {name:<20} {seconds * 1000:9.1f} ms  {total_chars / seconds / 1e6:7.1f} M chars/s"
+              f"  {seconds / estimate_seconds:6.1f}x estimate_many")
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", nargs="?", default="accuracy", choices=["label", "fit", "accuracy", "bench"])
+    parser.add_argument("--seed", type=int, default=7, help="corpus sampling seed (label)")
+    parser.add_argument("--kinds", nargs="+", metavar="KIND",
+                        help=f"rebuild only these kinds of samples, keeping the rest (label; "
+                             f"one of {', '.join(KINDS)})")
+    parser.add_argument("--repeat", type=int, default=20, help="corpus repetitions (bench)")
+    args = parser.parse_args()
+    return {"label": label, "fit": fit, "accuracy": accuracy, "bench": bench}[args.command](args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
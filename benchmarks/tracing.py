@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Overhead of the tracing hooks
+
+Drives `handle_request` in-process against an httpx.MockTransport that
+answers instantly (every other request with one tool round), so the
+measured time is the assistant's own work: OpenAI SDK request building and
+parsing, tool execution bookkeeping, metrics and tracing. Three modes are
+interleaved round by round so drift affects them equally:
+
+    off     no hooks registered (the default for every assistant)
+    hook    one hook whose callbacks do nothing
+    jsonl   the JsonlSpanExporter writing span trees to a temporary file
+
+It also times a disabled `tracer.span()` against an empty `with` block
+and multiplies the difference by the spans a request opens, giving the
+cost of the instrumentation itself when tracing is off. Exits with status
+1 if that exceeds --max-overhead-pct of the in-process request time.
+
+Usage:
+    python benchmarks/tracing.py [--requests N] [--rounds N] [--max-overhead-pct P]
+"""
+
+import argparse
+import contextlib
+import json
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+import timeit
+from pathlib import Path
+from typing import Any, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from life_coach.tracing import JsonlSpanExporter, SpanHook, Tracer  # noqa: E402
+from life_coach.transport import HttpPool, httpx  # noqa: E402
+
+
+MODES = ("off", "hook", "jsonl")
+
+
+def completion(body: Dict[str, Any]) -> Dict[str, Any]:
+    """Answer a chat completion request, asking for one tool on odd-numbered first turns"""
+    first_turn = not any(m.get("role") == "tool" for m in body["messages"])
+    wants_tool = first_turn and "(odd)" in body["messages"][-1]["content"]
+    message: Dict[str, Any] = {"role": "assistant", "content": None if wants_tool else "Findings " * 50}
+    if wants_tool:
+        message["tool_calls"] = [{"id": "call_1", "type": "function",
+                                  "function": {"name": "web_search", "arguments": '{"query": "x"}'}}]
+    return {
+        "id": "gen", "object": "chat.completion", "created": 0, "model": body["model"],
+        "choices": [{"index": 0, "message": message,
+                     "finish_reason": "tool_calls" if wants_tool else "stop"}],
+        "usage": {"prompt_tokens": 120, "completion_tokens": 60, "total_tokens": 180},
+    }
+
+
+class InstantToolhouse:
+    """Toolhouse stand-in that answers every tool call at once"""
+
+    def set_api_key(self, api_key):
+        pass
+
+    def set_provider(self, provider):
+        pass
+
+    def set_metadata(self, key, value):
+        pass
+
+    def get_tools(self, bundle="default"):
+        return [{"type": "function", "function": {"name": "web_search", "parameters": {"type": "object"}}}]
+
+    def run_tools(self, response, append=True):
+        return [{"role": "tool", "tool_call_id": call.id, "content": "Result text " * 40}
+                for call in response.choices[0].message.tool_calls]
+
+
+class CountingHook(SpanHook):
+    def __init__(self):
+        self.spans = 0
+
+    def on_end(self, span):
+        self.spans += 1
+
+
+def build_assistant(tracer: Tracer) -> Any:
+    from life_coach.coach import ResearchAnalysisAssistant
+
+    pool = HttpPool(transport=httpx.MockTransport(
+        lambda request: httpx.Response(200, json=completion(json.loads(request.content)))
+    ))
+    return ResearchAnalysisAssistant(http_pool=pool, tracer=tracer)
+
+
+def time_requests(assistant: Any, count: int) -> float:
+    """Seconds per request, averaged over `count` requests"""
+    started = time.perf_counter()
+    for index in range(count):
+        parity = "odd" if index % 2 else "even"
+        assistant.handle_request(f"Summarize item {index} ({parity})", "general")
+    return (time.perf_counter() - started) / count
+
+
+def disabled_span_cost(repeat: int = 200000) -> float:
+    """Extra seconds a disabled `tracer.span()` costs over an empty `with` block"""
+    tracer = Tracer()
+    null = contextlib.nullcontext()
+
+    def traced():
+        with tracer.span("completion", model="m", task_type="general"):
+            pass
+
+    def bare():
+        with null:
+            pass
+
+    traced_time = min(timeit.repeat(traced, number=repeat, repeat=5)) / repeat
+    bare_time = min(timeit.repeat(bare, number=repeat, repeat=5)) / repeat
+    return max(0.0, traced_time - bare_time)
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200, help="requests per mode per round (default 200)")
+    parser.add_argument("--rounds", type=int, default=5, help="interleaved rounds (default 5)")
+    parser.add_argument("--max-overhead-pct", type=float, default=1.0,
+                        help="fail if disabled tracing costs more than this share of a request (default 1)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    os.environ.setdefault("OPENROUTER_API_KEY", "offline-benchmark")
+    os.environ.setdefault("TOOLHOUSE_API_KEY", "offline-benchmark")
+
+    import life_coach.coach as coach
+    coach.Toolhouse = InstantToolhouse
+    # Keep the benchmark from writing markdown logs, and console logging out of the timings
+    coach.save_markdown_log = lambda **kwargs: None
+    logging.disable(logging.INFO)
+
+    with tempfile.TemporaryDirectory(prefix="research-tracing-") as workdir:
+        counter = CountingHook()
+        assistants = {
+            "off": build_assistant(Tracer()),
+            "hook": build_assistant(Tracer([SpanHook()])),
+            "jsonl": build_assistant(Tracer([JsonlSpanExporter(os.path.join(workdir, "spans.jsonl"))])),
+        }
+        counted = build_assistant(Tracer([counter]))
+        for assistant in list(assistants.values()) + [counted]:
+            time_requests(assistant, 10)  # warm up imports and the tool schema cache
+        counter.spans = 0
+        time_requests(counted, 100)
+        spans_per_request = counter.spans / 100
+
+        samples: Dict[str, List[float]] = {mode: [] for mode in MODES}
+        for _ in range(args.rounds):
+            for mode in MODES:
+                samples[mode].append(time_requests(assistants[mode], args.requests))
+
+    per_request = {mode: statistics.median(values) for mode, values in samples.items()}
+    span_cost = disabled_span_cost()
+    off_overhead = span_cost * spans_per_request
+    off_pct = off_overhead / per_request["off"] * 100
+
+    print(f"{'mode':<8}{'us/request':>12}{'vs off':>10}")
+    for mode in MODES:
+        delta = (per_request[mode] / per_request["off"] - 1) * 100
+        print(f"{mode:<8}{per_request[mode] * 1e6:>12.1f}{delta:>+9.1f}%")
+    print()
+    print(f"spans per request:            {spans_per_request:.1f}")
+    print(f"disabled span cost:           {span_cost * 1e9:.0f} ns")
+    print(f"tracing off, per request:     {off_overhead * 1e6:.2f} us ({off_pct:.3f}% of an instant request)")
+
+    if off_pct > args.max_overhead_pct:
+        print(f"FAIL: disabled tracing exceeds {args.max_overhead_pct}% of request time")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+First-request latency with and without the background warm-up
+
+Each run starts a fresh interpreter, builds an assistant, idles for a while
+(standing in for the user reading the menu) and then times its first
+request. Runs alternate between warm-up on and off so network conditions
+affect both equally. Needs real OPENROUTER_API_KEY and TOOLHOUSE_API_KEY
+values, since the point is to measure DNS, TLS and schema-fetch costs.
+
+Usage:
+    python benchmarks/warmup.py [--runs N] [--idle SECONDS] [--ping] [--task-type TYPE]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+
+ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_REQUEST = "Reply with the single word: ready"
+
+
+def first_request(warmup: bool, ping: bool, idle: float, request: str, task_type: str) -> Dict[str, float]:
+    """
+    Time the first request of a freshly built assistant (runs in the child process)
+
+    Args:
+        warmup: Enable the background warm-up
+        ping: Include the model ping in the warm-up
+        idle: Seconds to wait between construction and the request
+        request: Prompt to send
+        task_type: Task type of the request
+
+    Returns:
+        Dict with "first_request_seconds" and, with warm-up on, "warmup_seconds"
+    """
+    sys.path.insert(0, str(ROOT))
+    from life_coach import ResearchAnalysisAssistant
+    import life_coach.coach as coach
+
+    # Keep the benchmark from writing markdown logs
+    coach.save_markdown_log = lambda **kwargs: None
+
+    assistant = ResearchAnalysisAssistant(warmup=warmup, warmup_ping=ping)
+    time.sleep(idle)
+
+    started = time.perf_counter()
+    assistant.handle_request(request, task_type, bypass_cache=True)
+    result = {"first_request_seconds": time.perf_counter() - started}
+
+    if assistant.warmup is not None:
+        report = assistant.warmup.report()
+        result["warmup_seconds"] = report.get("total_seconds", float("nan"))
+    return result
+
+
+def run_child(warmup: bool, args: argparse.Namespace) -> Dict[str, float]:
+    command = [sys.executable, __file__, "--child", "--idle", str(args.idle),
+               "--task-type", args.task_type, "--request", args.request]
+    if warmup:
+        command.append("--warmup")
+    if args.ping:
+        command.append("--ping")
+    output = subprocess.run(command, cwd=ROOT, capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def summarize(label: str, samples: List[float]) -> str:
+    return (f"{label:<12} median {statistics.median(samples) * 1000:8.1f} ms   "
+            f"min {min(samples) * 1000:8.1f} ms   max {max(samples) * 1000:8.1f} ms")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3, help="runs per mode (default 3)")
+    parser.add_argument("--idle", type=float, default=5.0,
+                        help="seconds between start-up and the first request (default 5)")
+    parser.add_argument("--ping", action="store_true", help="include the model ping in the warm-up")
+    parser.add_argument("--task-type", default="general", help="task type of the request (default general)")
+    parser.add_argument("--request", default=DEFAULT_REQUEST, help="prompt to send")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--warmup", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(first_request(args.warmup, args.ping, args.idle, args.request, args.task_type)))
+        return 0
+
+    missing = [var for var in ("OPENROUTER_API_KEY", "TOOLHOUSE_API_KEY") if not os.getenv(var)]
+    if missing:
+        print(f"Set {', '.join(missing)} to run this benchmark against the real services.")
+        return 2
+
+    results: Dict[bool, List[Dict[str, float]]] = {False: [], True: []}
+    for run in range(args.runs):
+        for warmup in (False, True):
+            results[warmup].append(run_child(warmup, args))
+            print(f"run {run + 1}/{args.runs} warm-up {'on ' if warmup else 'off'}: "
+                  f"{results[warmup][-1]['first_request_seconds'] * 1000:.1f} ms")
+
+    print()
+    print(f"First-request latency after {args.idle:g}s idle ({args.runs} runs each):")
+    off = [r["first_request_seconds"] for r in results[False]]
+    on = [r["first_request_seconds"] for r in results[True]]
+    print(summarize("warm-up off", off))
+    print(summarize("warm-up on", on))
+    print(summarize("warm-up work", [r["warmup_seconds"] for r in results[True]]))
+    print(f"Saved per first request: {(statistics.median(off) - statistics.median(on)) * 1000:.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
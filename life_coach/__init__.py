@@ -2,11 +2,29 @@
 AI Research & Analysis Assistant - A personal AI researcher powered by Toolhouse and OpenRouter
 """
 
-from .coach import ResearchAnalysisAssistant
-from .models import ModelSelector, FREE_MODELS
+import importlib
 
 __version__ = "1.0.0"
 __author__ = "PowerUpSkills"
 __email__ = "contact@powerupskills.com"
 
 __all__ = ["ResearchAnalysisAssistant", "ModelSelector", "FREE_MODELS"]
+
+# Resolved on first access so `import life_coach` stays fast
+_EXPORTS = {
+    "ResearchAnalysisAssistant": ".coach",
+    "ModelSelector": ".models",
+    "FREE_MODELS": ".models",
+}
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,252 @@
+"""
+Thompson-sampling bandit for picking a model per task type
+"""
+
+import atexit
+import json
+import logging
+import math
+import random
+import threading
+import weakref
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+# Bandits with a state file, flushed when the interpreter exits
+_persistent: "weakref.WeakSet[ModelBandit]" = weakref.WeakSet()
+
+
+@atexit.register
+def _flush_on_exit() -> None:
+    for bandit in list(_persistent):
+        bandit.close()
+
+
+class ModelBandit:
+    """
+    Beta-Bernoulli Thompson sampling over the models in a task's preference list
+
+    Each (task_type, model) arm accumulates a fractional reward per call: 0
+    for a failure, and exp(-latency / latency_scale) for a success, so fast
+    answers count as more successful than slow ones. The configured
+    preference order acts as a prior whose strength is scaled by the task's
+    preference weight.
+    """
+
+    def __init__(self, latency_scale: float = 30.0, prior_strength: float = 2.0,
+                 decay: float = 0.995, state_path: Optional[str] = None,
+                 save_every: int = 10, rng: Optional[random.Random] = None):
+        """
+        Initialize the bandit
+
+        Args:
+            latency_scale: Seconds at which a success is worth ~0.37 of an instant one
+            prior_strength: Pseudo-observations behind the preference-order prior
+            decay: Per-update discount on an arm's history so the bandit tracks drift
+            state_path: Optional JSON file used to persist statistics between runs
+            save_every: Persist after this many updates (when state_path is set);
+                remaining updates are saved by `close()` or at interpreter exit
+            rng: Random generator (for reproducible sampling)
+        """
+        self.latency_scale = latency_scale
+        self.prior_strength = prior_strength
+        self.decay = decay
+        self.state_path = Path(state_path) if state_path else None
+        self.save_every = save_every
+        self.rng = rng or random.Random()
+        self.logger = logging.getLogger("ModelBandit")
+
+        self._arms: Dict[str, Dict[str, Dict[str, float]]] = {}
+        self._lock = threading.Lock()
+        self._pending_updates = 0
+
+        if self.state_path:
+            self._load()
+            _persistent.add(self)
+
+    @staticmethod
+    def prior_mean(rank: int) -> float:
+        """
+        Prior expected reward for a model at a given preference rank
+
+        Args:
+            rank: Position in the task's preference list (0 = first choice)
+
+        Returns:
+            Prior mean between 0.1 and 0.75
+        """
+        return max(0.1, 0.75 - 0.15 * rank)
+
+    def reward(self, success: bool, latency: Optional[float] = None) -> float:
+        """
+        Convert a call outcome into a reward in [0, 1]
+
+        Args:
+            success: Whether the call succeeded
+            latency: Call latency in seconds
+
+        Returns:
+            Reward value
+        """
+        if not success:
+            return 0.0
+        if latency is None:
+            return 1.0
+        return math.exp(-max(0.0, latency) / self.latency_scale)
+
+    def _arm(self, task_type: str, model: str) -> Dict[str, float]:
+        return self._arms.setdefault(task_type, {}).setdefault(
+            model, {"successes": 0.0, "failures": 0.0, "pulls": 0}
+        )
+
+    def _candidates(self, preferred_models: List[str], exclude: Iterable[str]) -> List[Tuple[int, str]]:
+        excluded = set(exclude)
+        return [(rank, model) for rank, model in enumerate(preferred_models)
+                if model not in excluded] or list(enumerate(preferred_models))
+
+    def _posterior(self, task_type: str, model: str, rank: int, strength: float) -> Tuple[float, float]:
+        arm = self._arm(task_type, model)
+        mean = self.prior_mean(rank)
+        return (1e-3 + mean * strength + arm["successes"],
+                1e-3 + (1 - mean) * strength + arm["failures"])
+
+    def choose(self, task_type: str, preferred_models: List[str], weight: float = 1.0,
+               exclude: Iterable[str] = ()) -> str:
+        """
+        Sample a model for a task
+
+        Args:
+            task_type: Type of task
+            preferred_models: The task's models in preference order
+            weight: Preference weight for the task (scales the prior)
+            exclude: Models that must not be chosen (e.g. open circuits)
+
+        Returns:
+            Chosen model identifier
+        """
+        candidates = self._candidates(preferred_models, exclude)
+        strength = self.prior_strength * max(weight, 0.0)
+
+        best_model, best_sample = candidates[0][1], -1.0
+        with self._lock:
+            for rank, model in candidates:
+                sample = self.rng.betavariate(*self._posterior(task_type, model, rank, strength))
+                if sample > best_sample:
+                    best_model, best_sample = model, sample
+        return best_model
+
+    def best(self, task_type: str, preferred_models: List[str], weight: float = 1.0,
+             exclude: Iterable[str] = ()) -> str:
+        """
+        Model with the highest expected reward, without sampling (for reporting)
+
+        Args:
+            task_type: Type of task
+            preferred_models: The task's models in preference order
+            weight: Preference weight for the task (scales the prior)
+            exclude: Models that must not be chosen (e.g. open circuits)
+
+        Returns:
+            Model identifier; ties go to the earlier preference
+        """
+        candidates = self._candidates(preferred_models, exclude)
+        strength = self.prior_strength * max(weight, 0.0)
+
+        best_model, best_mean = candidates[0][1], -1.0
+        with self._lock:
+            for rank, model in candidates:
+                alpha, beta = self._posterior(task_type, model, rank, strength)
+                mean = alpha / (alpha + beta)
+                if mean > best_mean:
+                    best_model, best_mean = model, mean
+        return best_model
+
+    def record(self, task_type: str, model: str, success: bool,
+               latency: Optional[float] = None) -> None:
+        """
+        Record the outcome of a call
+
+        Args:
+            task_type: Type of task the call served
+            model: Model identifier
+            success: Whether the call succeeded
+            latency: Call latency in seconds (successful calls)
+        """
+        reward = self.reward(success, latency)
+        with self._lock:
+            arm = self._arm(task_type, model)
+            arm["successes"] = arm["successes"] * self.decay + reward
+            arm["failures"] = arm["failures"] * self.decay + (1.0 - reward)
+            arm["pulls"] += 1
+            self._pending_updates += 1
+            should_save = bool(self.state_path) and self._pending_updates >= self.save_every
+
+        if should_save:
+            self.save()
+
+    def stats(self, task_type: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Get the per-arm statistics
+
+        Args:
+            task_type: Restrict to one task type
+
+        Returns:
+            Nested dict task_type -> model -> counters and mean reward
+        """
+        with self._lock:
+            tasks = {task_type: self._arms.get(task_type, {})} if task_type else self._arms
+            return {
+                task: {
+                    model: {
+                        **arm,
+                        "mean_reward": round(arm["successes"] / (arm["successes"] + arm["failures"]), 4)
+                        if arm["successes"] + arm["failures"] else None
+                    }
+                    for model, arm in arms.items()
+                }
+                for task, arms in tasks.items()
+            }
+
+    def save(self) -> None:
+        """Persist the statistics to `state_path`"""
+        if not self.state_path:
+            return
+        with self._lock:
+            data = json.loads(json.dumps(self._arms))
+            self._pending_updates = 0
+        try:
+            self.state_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.state_path.with_suffix(self.state_path.suffix + ".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=2)
+            tmp_path.replace(self.state_path)
+        except OSError as e:
+            self.logger.warning(f"Could not save bandit state: {e}")
+
+    def close(self) -> None:
+        """Save any updates recorded since the last save"""
+        with self._lock:
+            pending = self._pending_updates
+        if pending:
+            self.save()
+
+    def _load(self) -> None:
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"Ignoring unreadable bandit state: {e}")
+            return
+
+        with self._lock:
+            for task, arms in data.items():
+                for model, arm in arms.items():
+                    self._arm(task, model).update({
+                        "successes": float(arm.get("successes", 0.0)),
+                        "failures": float(arm.get("failures", 0.0)),
+                        "pulls": int(arm.get("pulls", 0))
+                    })
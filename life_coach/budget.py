@@ -0,0 +1,297 @@
+"""
+Context-window budgeting: keep each prompt inside the chosen model's window
+"""
+
+import json
+import logging
+import math
+import re
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from .models import ModelSelector, context_window
+from .tokens import TokenEstimator
+
+
+DEFAULT_RESERVE_OUTPUT = 4096
+DEFAULT_SAFETY_MARGIN = 0.05
+DEFAULT_STRATEGIES = ("compress", "reroute", "trim")
+MESSAGE_OVERHEAD_TOKENS = 4
+TRIM_MARKER = "\n[... {count} characters trimmed to fit the context window ...]\n"
+
+# Roles whose content may be rewritten; the system prompt and the model's
+# own turns are always sent as they are
+_ADJUSTABLE_ROLES = ("tool", "user")
+
+
+class PromptTooLargeError(ValueError):
+    """Raised when a prompt cannot be made to fit any available model"""
+
+
+def _field(message: Any, name: str) -> Any:
+    if isinstance(message, dict):
+        return message.get(name)
+    return getattr(message, name, None)
+
+
+def _message_text(message: Any) -> str:
+    content = _field(message, "content")
+    if content is None:
+        text = ""
+    elif isinstance(content, str):
+        text = content
+    else:
+        text = json.dumps(content, default=str)
+    for call in _field(message, "tool_calls") or []:
+        function = _field(call, "function")
+        text += f"{_field(function, 'name') or ''}{_field(function, 'arguments') or ''}"
+    return text
+
+
+def compress_text(text: str) -> str:
+    """
+    Shrink text without dropping information
+
+    JSON is re-serialized without indentation; other text has runs of
+    spaces and blank lines collapsed.
+
+    Args:
+        text: Text to compress
+
+    Returns:
+        Compressed text
+    """
+    stripped = text.strip()
+    if stripped[:1] in ("{", "["):
+        try:
+            return json.dumps(json.loads(stripped), separators=(",", ":"), ensure_ascii=False)
+        except ValueError:
+            pass
+    text = re.sub(r"[ \t]+", " ", stripped)
+    return re.sub(r"\n\s*\n+", "\n\n", text)
+
+
+def trim_text(text: str, keep: int) -> str:
+    """
+    Cut the middle out of text, keeping its head and tail
+
+    Args:
+        text: Text to trim
+        keep: Characters to keep
+
+    Returns:
+        Trimmed text with a marker where content was removed
+    """
+    if len(text) <= keep:
+        return text
+    head = keep * 2 // 3
+    tail = keep - head
+    return text[:head] + TRIM_MARKER.format(count=len(text) - keep) + (text[-tail:] if tail else "")
+
+
+class PromptBudgeter:
+    """
+    Measures prompts against the model's context window and makes them fit
+
+    The estimate covers the system prompt, user prompt, tool schema, tool
+    results and earlier assistant turns, plus `reserve_output` tokens for the
+    answer. When it overflows, the configured strategies are tried in order:
+
+    - "compress": re-serialize tool results and the user prompt compactly
+    - "reroute": switch to a model with a large enough window
+    - "trim": cut the middle out of tool results (oldest first), then the
+      user prompt
+
+    If none of them is enough, `PromptTooLargeError` is raised instead of
+    sending a request that would fail anyway.
+    """
+
+    def __init__(self, selector: Optional[ModelSelector] = None,
+                 reserve_output: int = DEFAULT_RESERVE_OUTPUT,
+                 safety_margin: float = DEFAULT_SAFETY_MARGIN,
+                 strategies: Sequence[str] = DEFAULT_STRATEGIES,
+                 min_keep_chars: int = 400,
+                 window_lookup: Callable[[str], Optional[int]] = context_window,
+                 estimator: Optional[TokenEstimator] = None):
+        """
+        Initialize the budgeter
+
+        Args:
+            selector: Model selector used to find a larger-context model
+            reserve_output: Tokens kept free for the completion
+            safety_margin: Fraction of the window left unused to absorb
+                estimation error
+            strategies: Overflow strategies, tried in order
+            min_keep_chars: Characters always kept of a trimmed message
+            window_lookup: Maps a model to its context size in tokens
+            estimator: Token estimator (defaults to the calibrated
+                per-family `TokenEstimator`)
+        """
+        unknown = set(strategies) - set(DEFAULT_STRATEGIES)
+        if unknown:
+            raise ValueError(f"Unknown strategies: {sorted(unknown)}")
+        self.selector = selector
+        self.reserve_output = reserve_output
+        self.safety_margin = safety_margin
+        self.strategies = tuple(strategies)
+        self.min_keep_chars = min_keep_chars
+        self.window_lookup = window_lookup
+        self.estimator = estimator or TokenEstimator()
+        self.logger = logging.getLogger("PromptBudgeter")
+
+    def limit(self, model: str) -> Optional[int]:
+        """
+        Prompt tokens a model accepts once the output reserve and margin are taken off
+
+        Args:
+            model: Model identifier
+
+        Returns:
+            Token limit for the prompt, or None when the window is unknown
+        """
+        window = self.window_lookup(model)
+        if window is None:
+            return None
+        return max(0, int(window * (1 - self.safety_margin)) - self.reserve_output)
+
+    def measure(self, messages: Sequence[Any],
+                tools: Optional[List[Dict[str, Any]]] = None,
+                model: Optional[str] = None) -> Dict[str, int]:
+        """
+        Estimate the tokens a request will use, by part
+
+        Args:
+            messages: Chat messages (dicts or SDK message objects)
+            tools: Tool schema sent with the request
+            model: Model the request is for; selects the tokenizer calibration
+
+        Returns:
+            Dict with "system", "user", "assistant", "tool_results", "tools"
+            and "total" token counts
+        """
+        texts = [_message_text(message) for message in messages]
+        if tools:
+            texts.append(json.dumps(tools, default=str))
+        counts = self.estimator.estimate_many(texts, model)
+
+        parts = {"system": 0, "user": 0, "assistant": 0, "tool_results": 0,
+                 "tools": counts.pop() if tools else 0}
+        for message, count in zip(messages, counts):
+            role = _field(message, "role")
+            part = "tool_results" if role == "tool" else role if role in parts else "assistant"
+            parts[part] += count + MESSAGE_OVERHEAD_TOKENS
+        parts["total"] = sum(parts.values())
+        return parts
+
+    def fits(self, model: str, messages: Sequence[Any],
+             tools: Optional[List[Dict[str, Any]]] = None) -> bool:
+        """
+        Check whether a request fits a model's window
+
+        Args:
+            model: Model identifier
+            messages: Chat messages
+            tools: Tool schema sent with the request
+
+        Returns:
+            True if it fits or the window is unknown
+        """
+        limit = self.limit(model)
+        return limit is None or self.measure(messages, tools, model)["total"] <= limit
+
+    def fit(self, model: str, messages: List[Any], tools: Optional[List[Dict[str, Any]]] = None,
+            task_type: Optional[str] = None) -> Tuple[str, Dict[str, Any]]:
+        """
+        Make a request fit, rewriting `messages` in place if needed
+
+        Args:
+            model: Model the request is meant for
+            messages: Chat messages; oversized contents are replaced in place
+            tools: Tool schema sent with the request
+            task_type: Task type, used to pick a reroute target
+
+        Returns:
+            Tuple of (model to use, report dict with the token breakdown,
+            the limit and the actions taken)
+        """
+        tokens = self.measure(messages, tools, model)
+        limit = self.limit(model)
+        report: Dict[str, Any] = {"model": model, "limit": limit, "tokens": tokens, "actions": []}
+        if limit is None or tokens["total"] <= limit:
+            return model, report
+
+        for strategy in self.strategies:
+            if strategy == "compress":
+                saved = self._compress(messages)
+                if saved:
+                    report["actions"].append({"action": "compress", "characters_saved": saved})
+            elif strategy == "reroute":
+                target = self._reroute(model, tokens["total"], task_type)
+                if target:
+                    report["actions"].append({"action": "reroute", "from": model, "to": target})
+                    model = report["model"] = target
+                    limit = report["limit"] = self.limit(target)
+            elif strategy == "trim":
+                saved = self._trim(messages, tools, model, limit)
+                if saved:
+                    report["actions"].append({"action": "trim", "characters_removed": saved})
+
+            tokens = report["tokens"] = self.measure(messages, tools, model)
+            if tokens["total"] <= limit:
+                self.logger.info(f"Prompt fitted to {model}: {report['actions']}")
+                return model, report
+
+        raise PromptTooLargeError(
+            f"Prompt needs about {tokens['total']} tokens but {model} accepts {limit}"
+        )
+
+    def _reroute(self, model: str, needed: int, task_type: Optional[str]) -> Optional[str]:
+        if self.selector is None:
+            return None
+        # A window of W accepts `limit` prompt tokens; invert that for the lookup
+        window = math.ceil((needed + self.reserve_output) / (1 - self.safety_margin))
+        return self.selector.get_larger_context_model(window, task_type, exclude=[model])
+
+    def _adjustable(self, messages: List[Any]) -> List[int]:
+        return [index for index, message in enumerate(messages)
+                if isinstance(message, dict) and message.get("role") in _ADJUSTABLE_ROLES
+                and isinstance(message.get("content"), str)]
+
+    def _compress(self, messages: List[Any]) -> int:
+        saved = 0
+        for index in self._adjustable(messages):
+            content = messages[index]["content"]
+            compressed = compress_text(content)
+            if len(compressed) < len(content):
+                messages[index] = {**messages[index], "content": compressed}
+                saved += len(content) - len(compressed)
+        return saved
+
+    def _trim(self, messages: List[Any], tools: Optional[List[Dict[str, Any]]],
+              model: str, limit: int) -> int:
+        # Oldest tool results go first, the user's own prompt last
+        indices = self._adjustable(messages)
+        order = ([i for i in indices if messages[i]["role"] == "tool"]
+                 + [i for i in indices if messages[i]["role"] == "user"])
+        removed = 0
+        for index in order:
+            original = messages[index]["content"]
+            keep = len(original)
+            # The estimate is not exactly linear in length, so a cut can fall
+            # a few tokens short; retry on the same message before moving on
+            for _ in range(3):
+                excess = self.measure(messages, tools, model)["total"] - limit
+                if excess <= 0:
+                    break
+                content = messages[index]["content"]
+                # Convert the excess at this content's own density, so CJK
+                # text or dense JSON is not under-trimmed
+                chars_per_token = len(content) / max(1, self.estimator.estimate(content, model))
+                marker = len(TRIM_MARKER.format(count=len(original)))
+                target = max(self.min_keep_chars,
+                             min(keep, len(content) - marker) - math.ceil(excess * chars_per_token))
+                if target >= keep or target + marker >= len(original):
+                    break
+                keep = target
+                messages[index] = {**messages[index], "content": trim_text(original, keep)}
+            removed += len(original) - keep
+        return removed
@@ -0,0 +1,583 @@
+"""
+Caching helpers for the research assistant
+"""
+
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .storage import SQLiteStore
+
+
+def content_hash(value: Any) -> str:
+    """
+    Stable SHA-256 hash of a JSON-serialisable value
+
+    Args:
+        value: Value to hash (dict keys are sorted before hashing)
+
+    Returns:
+        Hex digest string
+    """
+    payload = json.dumps(value, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ToolSchemaCache:
+    """TTL cache for Toolhouse bundle tool schemas with an optional on-disk snapshot"""
+
+    def __init__(self, fetch: Callable[[str], List[Dict[str, Any]]],
+                 ttl: float = 3600.0, snapshot_path: Optional[str] = None):
+        """
+        Initialize the tool schema cache
+
+        Args:
+            fetch: Callable that fetches the tool list for a bundle name
+            ttl: Seconds a fetched schema stays fresh
+            snapshot_path: Optional JSON file used to persist schemas across processes
+        """
+        self.fetch = fetch
+        self.ttl = ttl
+        self.snapshot_path = Path(snapshot_path) if snapshot_path else None
+        self.logger = logging.getLogger("ToolSchemaCache")
+
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._fetch_locks: Dict[str, threading.Lock] = {}
+
+        if self.snapshot_path:
+            self._load_snapshot()
+
+    def _is_fresh(self, entry: Dict[str, Any]) -> bool:
+        return time.time() - entry["fetched_at"] < self.ttl
+
+    def peek(self, bundle: str) -> Optional[List[Dict[str, Any]]]:
+        """
+        Return the cached tools for a bundle if they are still fresh
+
+        Args:
+            bundle: Toolhouse bundle name
+
+        Returns:
+            Cached tool list, or None when missing or expired
+        """
+        with self._lock:
+            entry = self._entries.get(bundle)
+        if entry and self._is_fresh(entry):
+            return entry["tools"]
+        return None
+
+    def get(self, bundle: str) -> List[Dict[str, Any]]:
+        """
+        Get the tools for a bundle, fetching them when missing or expired
+
+        Concurrent callers for the same bundle share a single fetch. If the
+        fetch fails and a stale copy exists, the stale copy is served.
+
+        Args:
+            bundle: Toolhouse bundle name
+
+        Returns:
+            Tool schema list
+        """
+        tools = self.peek(bundle)
+        if tools is not None:
+            return tools
+
+        with self._lock:
+            fetch_lock = self._fetch_locks.setdefault(bundle, threading.Lock())
+
+        with fetch_lock:
+            tools = self.peek(bundle)
+            if tools is not None:
+                return tools
+
+            try:
+                tools = self.fetch(bundle)
+            except Exception as e:
+                with self._lock:
+                    stale = self._entries.get(bundle)
+                if stale is None:
+                    raise
+                self.logger.warning(f"Tool fetch for {bundle} failed, serving stale schema: {e}")
+                return stale["tools"]
+
+            self._store(bundle, tools)
+            return tools
+
+    def _store(self, bundle: str, tools: List[Dict[str, Any]]) -> None:
+        with self._lock:
+            self._entries[bundle] = {
+                "tools": tools,
+                "hash": content_hash(tools),
+                "fetched_at": time.time()
+            }
+        if self.snapshot_path:
+            self.save_snapshot()
+
+    def schema_hash(self, bundle: str) -> Optional[str]:
+        """
+        Get the content hash of the cached schema for a bundle
+
+        Args:
+            bundle: Toolhouse bundle name
+
+        Returns:
+            Hex digest, or None if the bundle has not been fetched
+        """
+        with self._lock:
+            entry = self._entries.get(bundle)
+        return entry["hash"] if entry else None
+
+    def invalidate(self, bundle: Optional[str] = None) -> None:
+        """
+        Drop cached schemas so the next `get` refetches
+
+        Args:
+            bundle: Bundle to drop, or None to drop every bundle
+        """
+        with self._lock:
+            if bundle is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(bundle, None)
+
+    def save_snapshot(self) -> None:
+        """Write the cached schemas to the snapshot file"""
+        if not self.snapshot_path:
+            return
+        with self._lock:
+            data = dict(self._entries)
+        try:
+            self.snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.snapshot_path.with_suffix(self.snapshot_path.suffix + ".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, default=str)
+            tmp_path.replace(self.snapshot_path)
+        except OSError as e:
+            self.logger.warning(f"Could not write tool schema snapshot: {e}")
+
+    def _load_snapshot(self) -> None:
+        try:
+            with open(self.snapshot_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"Ignoring unreadable tool schema snapshot: {e}")
+            return
+
+        with self._lock:
+            for bundle, entry in data.items():
+                if {"tools", "hash", "fetched_at"} <= set(entry):
+                    self._entries[bundle] = entry
+
+
+def normalize_prompt(prompt: str) -> str:
+    """
+    Normalize a prompt for cache keying (trim and collapse whitespace)
+
+    Args:
+        prompt: Raw prompt text
+
+    Returns:
+        Normalized prompt
+    """
+    return " ".join(prompt.split())
+
+
+class _TwoTierCache:
+    """
+    In-process LRU in front of an optional SQLite table, with hit/miss counters
+
+    Subclasses name their table in `TABLE` (it must have a `key` column)
+    and describe themselves in `LABEL` for log messages.
+    """
+
+    TABLE = ""
+    LABEL = ""
+
+    def __init__(self, max_entries: int, db_path: Optional[str], schema: str, logger_name: str):
+        self.max_entries = max_entries
+        self.db_path = db_path
+        self.logger = logging.getLogger(logger_name)
+
+        self._memory: "OrderedDict[str, Tuple[Any, ...]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "writes": 0
+        }
+        self._store = SQLiteStore(db_path, schema) if db_path else None
+
+    def _connection(self) -> sqlite3.Connection:
+        return self._store.connection()
+
+    def _bump(self, counter: str) -> None:
+        with self._lock:
+            self._stats[counter] += 1
+
+    def _memory_get(self, key: str, ttl: float, now: float) -> Optional[Tuple[Any, ...]]:
+        """Fresh in-memory entry for `key` (its last item is the creation time), counting the hit"""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                return None
+            if now - entry[-1] < ttl:
+                self._memory.move_to_end(key)
+                self._stats["memory_hits"] += 1
+                return entry
+            del self._memory[key]
+            self._stats["expirations"] += 1
+            return None
+
+    def _memory_put(self, key: str, entry: Tuple[Any, ...]) -> None:
+        with self._lock:
+            self._memory[key] = entry
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def _disk_get(self, key: str) -> Optional[Tuple[str, float]]:
+        """Stored (value, created_at) row for `key`, or None on a miss or read error"""
+        try:
+            return self._connection().execute(
+                f"SELECT value, created_at FROM {self.TABLE} WHERE key = ?", (key,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            self.logger.warning(f"{self.LABEL} read failed: {e}")
+            return None
+
+    def _disk_put(self, columns: Tuple[str, ...], values: Tuple[Any, ...]) -> None:
+        try:
+            self._connection().execute(
+                f"INSERT OR REPLACE INTO {self.TABLE} ({', '.join(columns)}) "
+                f"VALUES ({', '.join('?' * len(columns))})",
+                values
+            )
+        except sqlite3.Error as e:
+            self.logger.warning(f"{self.LABEL} write failed: {e}")
+
+    def _delete(self, key: str) -> None:
+        try:
+            self._connection().execute(f"DELETE FROM {self.TABLE} WHERE key = ?", (key,))
+        except sqlite3.Error as e:
+            self.logger.warning(f"{self.LABEL} delete failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get cache counters
+
+        Returns:
+            Dict with hit/miss/eviction counters and the hit rate
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["memory_entries"] = len(self._memory)
+        hits = stats["memory_hits"] + stats["disk_hits"]
+        lookups = hits + stats["misses"]
+        stats["hits"] = hits
+        stats["hit_rate"] = round(hits / lookups, 4) if lookups else 0.0
+        return stats
+
+
+class ResponseCache(_TwoTierCache):
+    """Two-tier response cache: in-process LRU in front of a shared SQLite store"""
+
+    TABLE = "responses"
+    LABEL = "Response cache"
+
+    def __init__(self, max_entries: int = 256, ttl: float = 24 * 3600.0,
+                 db_path: Optional[str] = None):
+        """
+        Initialize the response cache
+
+        Args:
+            max_entries: Maximum entries kept in the in-memory LRU
+            ttl: Seconds an entry stays valid in either tier
+            db_path: Optional SQLite file shared between worker processes
+        """
+        super().__init__(
+            max_entries, db_path,
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL)",
+            "ResponseCache"
+        )
+        self.ttl = ttl
+
+    @staticmethod
+    def make_key(model: str, personality: str, prompt: str, schema_hash: Optional[str]) -> str:
+        """
+        Build a cache key from everything that determines a response
+
+        Args:
+            model: Model identifier
+            personality: System prompt
+            prompt: User prompt (normalized before hashing)
+            schema_hash: Hash of the tool schema offered to the model
+
+        Returns:
+            Cache key string
+        """
+        return content_hash([model, personality, normalize_prompt(prompt), schema_hash or ""])
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Look up a cached response
+
+        Args:
+            key: Cache key from `make_key`
+
+        Returns:
+            Cached response text, or None on a miss
+        """
+        now = time.time()
+        entry = self._memory_get(key, self.ttl, now)
+        if entry is not None:
+            return entry[0]
+
+        if self.db_path:
+            row = self._disk_get(key)
+            if row is not None:
+                value, created_at = row
+                if now - created_at < self.ttl:
+                    self._memory_put(key, (value, created_at))
+                    self._bump("disk_hits")
+                    return value
+                self._bump("expirations")
+                self._delete(key)
+
+        self._bump("misses")
+        return None
+
+    def set(self, key: str, value: str) -> None:
+        """
+        Store a response in both tiers
+
+        Args:
+            key: Cache key from `make_key`
+            value: Response text
+        """
+        created_at = time.time()
+        self._memory_put(key, (value, created_at))
+        self._bump("writes")
+
+        if self.db_path:
+            self._disk_put(("key", "value", "created_at"), (key, value, created_at))
+
+    def purge_expired(self) -> int:
+        """
+        Delete expired rows from the SQLite store
+
+        Returns:
+            Number of rows removed
+        """
+        if not self.db_path:
+            return 0
+        cursor = self._connection().execute(
+            "DELETE FROM responses WHERE created_at < ?", (time.time() - self.ttl,)
+        )
+        return cursor.rowcount
+
+    def clear(self) -> None:
+        """Drop every entry from both tiers"""
+        with self._lock:
+            self._memory.clear()
+        if self.db_path:
+            self._connection().execute("DELETE FROM responses")
+
+
+# Idempotent lookups whose answers change slowly; tools not listed are never cached
+DEFAULT_TOOL_TTLS = {
+    "web_search": 3600.0,
+    "exa_web_search": 3600.0,
+    "get_page_contents": 6 * 3600.0,
+}
+# Tools with side effects or per-user state, refused even when listed
+UNCACHEABLE_TOOL_MARKERS = ("memory", "store", "save", "write", "send", "email", "delete")
+
+
+def normalize_arguments(arguments: Any) -> Any:
+    """
+    Normalize tool-call arguments for cache keying
+
+    JSON arguments are parsed so key order and formatting do not matter, and
+    whitespace inside string values is collapsed.
+
+    Args:
+        arguments: Arguments as sent by the model (usually a JSON string)
+
+    Returns:
+        Normalized, JSON-serialisable arguments
+    """
+    if isinstance(arguments, str):
+        try:
+            arguments = json.loads(arguments) if arguments.strip() else {}
+        except ValueError:
+            return normalize_prompt(arguments)
+    if isinstance(arguments, dict):
+        return {key: normalize_arguments(value) for key, value in arguments.items()}
+    if isinstance(arguments, list):
+        return [normalize_arguments(value) for value in arguments]
+    return arguments
+
+
+class ToolResultCache(_TwoTierCache):
+    """
+    Cache for idempotent tool results, keyed on tool name and normalized arguments
+
+    Only tools in `tool_ttls` are cached, each with its own TTL; tools that
+    write memory or have other side effects are refused. Entries are kept
+    in an in-process LRU and, with `db_path`, in a SQLite file that
+    survives restarts and is shared between worker processes. Stored
+    messages have their `tool_call_id` removed; `get` puts the id of the
+    current call back, so a hit is indistinguishable from a fresh result.
+    """
+
+    TABLE = "tool_results"
+    LABEL = "Tool result cache"
+
+    def __init__(self, tool_ttls: Optional[Dict[str, float]] = None,
+                 max_entries: int = 1024, db_path: Optional[str] = None):
+        """
+        Initialize the tool result cache
+
+        Args:
+            tool_ttls: Cacheable tool names mapped to the seconds their
+                results stay valid (defaults to `DEFAULT_TOOL_TTLS`)
+            max_entries: Maximum entries kept in the in-memory LRU
+            db_path: Optional SQLite file for persistent, shared storage
+        """
+        self.tool_ttls = dict(DEFAULT_TOOL_TTLS if tool_ttls is None else tool_ttls)
+        refused = [tool for tool in self.tool_ttls if self._has_side_effects(tool)]
+        if refused:
+            raise ValueError(f"Tools with side effects cannot be cached: {sorted(refused)}")
+        super().__init__(
+            max_entries, db_path,
+            "CREATE TABLE IF NOT EXISTS tool_results ("
+            "key TEXT PRIMARY KEY, tool TEXT NOT NULL, value TEXT NOT NULL, created_at REAL NOT NULL)",
+            "ToolResultCache"
+        )
+
+    @staticmethod
+    def _has_side_effects(tool: str) -> bool:
+        name = tool.lower()
+        return any(marker in name for marker in UNCACHEABLE_TOOL_MARKERS)
+
+    def cacheable(self, tool: Optional[str]) -> bool:
+        """
+        Check whether a tool's results may be cached
+
+        Args:
+            tool: Tool name
+
+        Returns:
+            True if the tool is allow-listed
+        """
+        return isinstance(tool, str) and tool in self.tool_ttls
+
+    @staticmethod
+    def make_key(tool: str, arguments: Any) -> str:
+        """
+        Build a cache key from the tool name and its arguments
+
+        Args:
+            tool: Tool name
+            arguments: Tool-call arguments (normalized before hashing)
+
+        Returns:
+            Cache key string
+        """
+        return content_hash([tool, normalize_arguments(arguments)])
+
+    def get(self, tool: str, arguments: Any, tool_call_id: Any) -> Optional[Dict[str, Any]]:
+        """
+        Look up a cached result and shape it as the answer to a tool call
+
+        Args:
+            tool: Tool name
+            arguments: Tool-call arguments
+            tool_call_id: Id of the call being answered
+
+        Returns:
+            Tool message for `tool_call_id`, or None on a miss or for a
+            tool that is not cacheable
+        """
+        if not self.cacheable(tool):
+            return None
+        key = self.make_key(tool, arguments)
+        ttl = self.tool_ttls[tool]
+        now = time.time()
+        entry = self._memory_get(key, ttl, now)
+        message = entry[1] if entry is not None else None
+
+        if message is None and self.db_path:
+            row = self._disk_get(key)
+            if row is not None:
+                if now - row[1] < ttl:
+                    message = json.loads(row[0])
+                    self._memory_put(key, (tool, message, row[1]))
+                    self._bump("disk_hits")
+                else:
+                    self._bump("expirations")
+                    self._delete(key)
+
+        if message is None:
+            self._bump("misses")
+            return None
+        return {**message, "tool_call_id": tool_call_id}
+
+    def set(self, tool: str, arguments: Any, message: Dict[str, Any]) -> bool:
+        """
+        Store a tool result message
+
+        Args:
+            tool: Tool name
+            arguments: Tool-call arguments
+            message: Tool message returned for the call
+
+        Returns:
+            True if the result was stored (the tool is cacheable)
+        """
+        if not self.cacheable(tool) or not isinstance(message, dict):
+            return False
+        key = self.make_key(tool, arguments)
+        stored = {name: value for name, value in message.items() if name != "tool_call_id"}
+        created_at = time.time()
+        self._memory_put(key, (tool, stored, created_at))
+        self._bump("writes")
+
+        if self.db_path:
+            self._disk_put(("key", "tool", "value", "created_at"),
+                           (key, tool, json.dumps(stored, default=str, ensure_ascii=False), created_at))
+        return True
+
+    def clear(self, tool: Optional[str] = None) -> None:
+        """
+        Drop cached results
+
+        Args:
+            tool: Only drop this tool's results; None drops everything
+        """
+        with self._lock:
+            if tool is None:
+                self._memory.clear()
+            else:
+                for key in [key for key, entry in self._memory.items() if entry[0] == tool]:
+                    del self._memory[key]
+        if self.db_path:
+            if tool is None:
+                self._connection().execute("DELETE FROM tool_results")
+            else:
+                self._connection().execute("DELETE FROM tool_results WHERE tool = ?", (tool,))
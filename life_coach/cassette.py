@@ -0,0 +1,526 @@
+"""
+Record/replay cassettes for OpenRouter and Toolhouse traffic
+"""
+
+import asyncio
+import gzip
+import json
+import threading
+import time
+from collections import defaultdict, deque
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from .cache import content_hash
+from .transport import HttpPool, LoopLocalAsyncTransport, httpx
+
+
+CASSETTE_VERSION = 1
+# Response headers worth keeping; everything else (cookies, request ids,
+# rate-limit bookkeeping) only makes cassettes larger
+RECORDED_HEADERS = ("content-type", "retry-after", "retry-after-ms")
+
+
+class CassetteMismatchError(LookupError):
+    """Raised in replay mode when a request has no recorded interaction"""
+
+
+def _decode_body(content: bytes, content_type: str = "application/json") -> Any:
+    if not content:
+        return None
+    text = content.decode("utf-8", "replace")
+    if "json" in content_type:
+        try:
+            return json.loads(text)
+        except ValueError:
+            pass
+    return text
+
+
+def _encode_body(body: Any) -> bytes:
+    if body is None:
+        return b""
+    if isinstance(body, str):
+        return body.encode("utf-8")
+    return json.dumps(body, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def _jsonable(value: Any) -> Any:
+    if hasattr(value, "model_dump"):
+        return value.model_dump(exclude_none=True)
+    if isinstance(value, dict):
+        return {key: _jsonable(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(item) for item in value]
+    return value
+
+
+def _tool_calls(response: Any) -> List[Dict[str, Any]]:
+    calls = response.choices[0].message.tool_calls or []
+    return [{"id": call.id, "name": call.function.name, "arguments": call.function.arguments}
+            for call in calls]
+
+
+class Cassette:
+    """
+    Records every exchange with OpenRouter and Toolhouse, or replays them
+
+    In "record" mode the cassette wraps the real HTTP transport and the
+    Toolhouse session and keeps each request, its response and how long it
+    took; `save` writes them to a compact JSON file (gzipped when the path
+    ends in ".gz"). In "replay" mode nothing touches the network: each
+    request is answered with the recorded response that has the same
+    method, path and JSON body (so concurrent, hedged or fallback requests
+    still find theirs), optionally after its recorded delay. A request
+    without a match raises `CassetteMismatchError` and is listed in
+    `stats()["misses"]`.
+
+    Pass the cassette to `ResearchAnalysisAssistant(cassette=...)`.
+    """
+
+    def __init__(self, path: str, mode: str = "replay", realtime: bool = False, speed: float = 1.0):
+        """
+        Initialize the cassette
+
+        Args:
+            path: Cassette file
+            mode: "record" or "replay"
+            realtime: In replay mode, wait as long as the recorded call took
+            speed: Divides recorded delays when `realtime` is on
+        """
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        self.path = Path(path)
+        self.mode = mode
+        self.realtime = realtime
+        self.speed = speed
+
+        self.interactions: List[Dict[str, Any]] = []
+        self.requests: List[Dict[str, str]] = []
+        self.recorded_at: Optional[str] = None
+        self.misses: List[str] = []
+        self._played = 0
+        self._origin: Optional[float] = None
+        self._lock = threading.Lock()
+        self._queues: Dict[str, Deque[Dict[str, Any]]] = defaultdict(deque)
+        self._loose_queues: Dict[str, Deque[Dict[str, Any]]] = defaultdict(deque)
+
+        if mode == "replay":
+            self.load()
+
+    @classmethod
+    def record(cls, path: str) -> "Cassette":
+        """Create a cassette that records to `path`"""
+        return cls(path, mode="record")
+
+    @classmethod
+    def replay(cls, path: str, realtime: bool = False, speed: float = 1.0) -> "Cassette":
+        """Load a cassette from `path` for replay"""
+        return cls(path, mode="replay", realtime=realtime, speed=speed)
+
+    @property
+    def recording(self) -> bool:
+        return self.mode == "record"
+
+    # -- persistence -------------------------------------------------------
+
+    def load(self) -> None:
+        """Read the cassette file and index its interactions for replay"""
+        opener = gzip.open if self.path.suffix == ".gz" else open
+        with opener(self.path, "rt", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") != CASSETTE_VERSION:
+            raise ValueError(f"Unsupported cassette version: {data.get('version')}")
+        self.recorded_at = data.get("recorded_at")
+        self.requests = data.get("requests", [])
+        self.interactions = data.get("interactions", [])
+        with self._lock:
+            self._played = 0
+            self.misses = []
+            self._queues.clear()
+            self._loose_queues.clear()
+            for interaction in self.interactions:
+                key, loose_key = self._keys(interaction["service"], interaction["request"])
+                self._queues[key].append(interaction)
+                self._loose_queues[loose_key].append(interaction)
+
+    def rewind(self) -> None:
+        """Make every recorded interaction available again (replay mode)"""
+        self.load()
+
+    def save(self) -> None:
+        """Write the recorded interactions to the cassette file"""
+        with self._lock:
+            data = {
+                "version": CASSETTE_VERSION,
+                "recorded_at": self.recorded_at or datetime.now(timezone.utc).isoformat(),
+                "requests": list(self.requests),
+                "interactions": sorted(self.interactions, key=lambda i: i["started"]),
+            }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        opener = gzip.open if self.path.suffix == ".gz" else open
+        with opener(self.path, "wt", encoding="utf-8") as f:
+            json.dump(data, f, separators=(",", ":"), ensure_ascii=False)
+
+    def __enter__(self) -> "Cassette":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        if self.recording:
+            self.save()
+
+    # -- bookkeeping -------------------------------------------------------
+
+    def note_request(self, request: str, task_type: str) -> None:
+        """
+        Remember a top-level assistant request so the cassette can be re-driven
+
+        Args:
+            request: User request
+            task_type: Task type it was handled as
+        """
+        if self.recording:
+            with self._lock:
+                self.requests.append({"request": request, "task_type": task_type})
+
+    def _add(self, service: str, request: Dict[str, Any], response: Dict[str, Any],
+             started: float, elapsed: float) -> None:
+        with self._lock:
+            if self._origin is None:
+                self.recorded_at = datetime.now(timezone.utc).isoformat()
+                self._origin = started
+            self.interactions.append({
+                "service": service,
+                "started": round(started - self._origin, 6),
+                "elapsed": round(elapsed, 6),
+                "request": request,
+                "response": response,
+            })
+
+    @staticmethod
+    def _keys(service: str, request: Dict[str, Any]) -> Tuple[str, str]:
+        # The loose key ignores the model, so a replay whose model choice
+        # differs (e.g. bandit sampling) still finds the exchange
+        body = request.get("body")
+        loose_body = {k: v for k, v in body.items() if k != "model"} if isinstance(body, dict) else body
+        exact = content_hash([service, request.get("method"), request.get("path"), body])
+        loose = content_hash([service, request.get("method"), request.get("path"), loose_body])
+        return exact, loose
+
+    def _take(self, service: str, request: Dict[str, Any]) -> Dict[str, Any]:
+        key, loose_key = self._keys(service, request)
+        with self._lock:
+            for queue in (self._queues.get(key), self._loose_queues.get(loose_key)):
+                while queue:
+                    interaction = queue.popleft()
+                    if not interaction.get("_played"):
+                        interaction["_played"] = True
+                        self._played += 1
+                        return interaction
+            description = f"{service} {request.get('method', '')} {request.get('path', '')}".strip()
+            self.misses.append(description)
+        raise CassetteMismatchError(f"No recorded interaction for {description}")
+
+    def _delay(self, interaction: Dict[str, Any], key: str = "elapsed") -> float:
+        if not self.realtime:
+            return 0.0
+        return max(0.0, interaction.get(key) or 0.0) / (self.speed or 1.0)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get replay/record counters
+
+        Returns:
+            Dict with the mode, interaction count, replayed count and misses
+        """
+        with self._lock:
+            return {
+                "mode": self.mode,
+                "interactions": len(self.interactions),
+                "requests": len(self.requests),
+                "played": self._played,
+                "misses": list(self.misses),
+            }
+
+    # -- HTTP ----------------------------------------------------------------
+
+    @staticmethod
+    def _http_request(request: "httpx.Request") -> Dict[str, Any]:
+        content = request.read()
+        return {
+            "method": request.method,
+            "path": request.url.path,
+            "body": _decode_body(content, request.headers.get("content-type", "application/json")),
+        }
+
+    def _record_http(self, request: Dict[str, Any], response: "httpx.Response", started: float,
+                     headers_at: float, chunks: List[Tuple[float, bytes]]) -> None:
+        headers = {name: response.headers[name] for name in RECORDED_HEADERS if name in response.headers}
+        recorded: Dict[str, Any] = {"status": response.status_code, "headers": headers}
+        content_type = headers.get("content-type", "")
+        if "text/event-stream" in content_type:
+            recorded["chunks"] = [[round(at - headers_at, 6), chunk.decode("utf-8", "replace")]
+                                  for at, chunk in chunks]
+        else:
+            recorded["body"] = _decode_body(b"".join(chunk for _, chunk in chunks), content_type)
+        self._add("openrouter", request, recorded, started, headers_at - started)
+
+    def _http_response(self, request: "httpx.Request",
+                       asynchronous: bool = False) -> Tuple["httpx.Response", float]:
+        interaction = self._take("openrouter", self._http_request(request))
+        delay = self._delay(interaction)
+        recorded = interaction["response"]
+        headers = dict(recorded.get("headers", {}))
+        if recorded["status"] >= 400 and not self.realtime:
+            # Fast replay: let clients retry at once instead of backing off
+            headers.pop("retry-after", None)
+            headers["retry-after-ms"] = "1"
+        if "chunks" in recorded:
+            chunks = [(self._delay({"elapsed": at}), text.encode("utf-8")) for at, text in recorded["chunks"]]
+            stream = _AsyncReplayStream(chunks) if asynchronous else _ReplayStream(chunks)
+            return httpx.Response(recorded["status"], headers=headers, stream=stream, request=request), delay
+        response = httpx.Response(recorded["status"], headers=headers,
+                                  content=_encode_body(recorded.get("body")), request=request)
+        return response, delay
+
+    def http_pool(self, base: Optional[HttpPool] = None) -> HttpPool:
+        """
+        Build the HTTP pool an assistant uses with this cassette
+
+        Args:
+            base: Pool whose transports are recorded (record mode only);
+                defaults to a fresh pooled transport
+
+        Returns:
+            Pool whose clients record or replay through the cassette
+        """
+        if not self.recording:
+            return HttpPool(transport=ReplayTransport(self), async_transport=AsyncReplayTransport(self))
+        settings = base or HttpPool()
+        async_inner = LoopLocalAsyncTransport(settings._loop_transport)
+        return HttpPool(timeout=settings.timeout,
+                        transport=RecordingTransport(settings._sync_transport(), self),
+                        async_transport=AsyncRecordingTransport(async_inner, self))
+
+    # -- Toolhouse -----------------------------------------------------------
+
+    def toolhouse(self, factory: Callable[[], Any]) -> Any:
+        """
+        Wrap the Toolhouse session for recording, or replace it for replay
+
+        Args:
+            factory: Builds the real Toolhouse session (not called in replay mode)
+
+        Returns:
+            Object with the Toolhouse methods the assistant uses
+        """
+        if self.recording:
+            return RecordingToolhouse(factory(), self)
+        return ReplayToolhouse(self)
+
+
+class _RecordingStream(httpx.SyncByteStream):
+    def __init__(self, stream: Any, finish: Callable[[List[Tuple[float, bytes]]], None]):
+        self._stream = stream
+        self._finish = finish
+        self._chunks: List[Tuple[float, bytes]] = []
+        self._done = False
+
+    def __iter__(self):
+        for chunk in self._stream:
+            self._chunks.append((time.perf_counter(), chunk))
+            yield chunk
+
+    def close(self) -> None:
+        try:
+            self._stream.close()
+        finally:
+            if not self._done:
+                self._done = True
+                self._finish(self._chunks)
+
+
+class _AsyncRecordingStream(httpx.AsyncByteStream):
+    def __init__(self, stream: Any, finish: Callable[[List[Tuple[float, bytes]]], None]):
+        self._stream = stream
+        self._finish = finish
+        self._chunks: List[Tuple[float, bytes]] = []
+        self._done = False
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            self._chunks.append((time.perf_counter(), chunk))
+            yield chunk
+
+    async def aclose(self) -> None:
+        try:
+            await self._stream.aclose()
+        finally:
+            if not self._done:
+                self._done = True
+                self._finish(self._chunks)
+
+
+class _ReplayStream(httpx.SyncByteStream):
+    def __init__(self, chunks: List[Tuple[float, bytes]]):
+        self._chunks = chunks
+
+    def __iter__(self):
+        waited = 0.0
+        for at, chunk in self._chunks:
+            if at > waited:
+                time.sleep(at - waited)
+                waited = at
+            yield chunk
+
+
+class _AsyncReplayStream(httpx.AsyncByteStream):
+    def __init__(self, chunks: List[Tuple[float, bytes]]):
+        self._chunks = chunks
+
+    async def __aiter__(self):
+        waited = 0.0
+        for at, chunk in self._chunks:
+            if at > waited:
+                await asyncio.sleep(at - waited)
+                waited = at
+            yield chunk
+
+
+class RecordingTransport(httpx.BaseTransport):
+    """Sends requests through `inner` and records each exchange on the cassette"""
+
+    def __init__(self, inner: httpx.BaseTransport, cassette: Cassette):
+        self.inner = inner
+        self.cassette = cassette
+
+    def handle_request(self, request: "httpx.Request") -> "httpx.Response":
+        recorded = self.cassette._http_request(request)
+        started = time.perf_counter()
+        response = self.inner.handle_request(request)
+        headers_at = time.perf_counter()
+        if hasattr(response, "_content"):
+            # Already in memory (e.g. httpx.MockTransport); the stream is never read
+            self.cassette._record_http(recorded, response, started, headers_at,
+                                       [(headers_at, response.content)])
+            return response
+        response.stream = _RecordingStream(
+            response.stream,
+            lambda chunks: self.cassette._record_http(recorded, response, started, headers_at, chunks)
+        )
+        return response
+
+    def close(self) -> None:
+        self.inner.close()
+
+
+class AsyncRecordingTransport(httpx.AsyncBaseTransport):
+    """Async version of `RecordingTransport`"""
+
+    def __init__(self, inner: httpx.AsyncBaseTransport, cassette: Cassette):
+        self.inner = inner
+        self.cassette = cassette
+
+    async def handle_async_request(self, request: "httpx.Request") -> "httpx.Response":
+        recorded = self.cassette._http_request(request)
+        started = time.perf_counter()
+        response = await self.inner.handle_async_request(request)
+        headers_at = time.perf_counter()
+        if hasattr(response, "_content"):
+            # Already in memory (e.g. httpx.MockTransport); the stream is never read
+            self.cassette._record_http(recorded, response, started, headers_at,
+                                       [(headers_at, response.content)])
+            return response
+        response.stream = _AsyncRecordingStream(
+            response.stream,
+            lambda chunks: self.cassette._record_http(recorded, response, started, headers_at, chunks)
+        )
+        return response
+
+    async def aclose(self) -> None:
+        await self.inner.aclose()
+
+
+class ReplayTransport(httpx.BaseTransport):
+    """Answers requests from the cassette without touching the network"""
+
+    def __init__(self, cassette: Cassette):
+        self.cassette = cassette
+
+    def handle_request(self, request: "httpx.Request") -> "httpx.Response":
+        response, delay = self.cassette._http_response(request)
+        if delay:
+            time.sleep(delay)
+        return response
+
+
+class AsyncReplayTransport(httpx.AsyncBaseTransport):
+    """Async version of `ReplayTransport`"""
+
+    def __init__(self, cassette: Cassette):
+        self.cassette = cassette
+
+    async def handle_async_request(self, request: "httpx.Request") -> "httpx.Response":
+        response, delay = self.cassette._http_response(request, asynchronous=True)
+        if delay:
+            await asyncio.sleep(delay)
+        return response
+
+
+class RecordingToolhouse:
+    """Proxy for a Toolhouse session that records `get_tools` and `run_tools`"""
+
+    def __init__(self, th: Any, cassette: Cassette):
+        self._th = th
+        self._cassette = cassette
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._th, name)
+
+    def _recorded(self, request: Dict[str, Any], call: Callable[[], Any]) -> Any:
+        started = time.perf_counter()
+        result = call()
+        self._cassette._add("toolhouse", request, {"body": _jsonable(result)},
+                            started, time.perf_counter() - started)
+        return result
+
+    def get_tools(self, bundle: str = "default") -> Any:
+        return self._recorded({"method": "get_tools", "body": {"bundle": bundle}},
+                              lambda: self._th.get_tools(bundle=bundle))
+
+    def run_tools(self, response: Any, append: bool = True) -> Any:
+        return self._recorded({"method": "run_tools",
+                               "body": {"tool_calls": _tool_calls(response), "append": append}},
+                              lambda: self._th.run_tools(response, append=append))
+
+
+class ReplayToolhouse:
+    """Stands in for the Toolhouse session, answering from the cassette"""
+
+    def __init__(self, cassette: Cassette):
+        self._cassette = cassette
+        self.metadata: Dict[str, Any] = {}
+
+    def set_api_key(self, api_key: Optional[str]) -> None:
+        pass
+
+    def set_provider(self, provider: str) -> None:
+        pass
+
+    def set_metadata(self, key: str, value: Any) -> None:
+        self.metadata[key] = value
+
+    def _replayed(self, request: Dict[str, Any]) -> Any:
+        interaction = self._cassette._take("toolhouse", request)
+        delay = self._cassette._delay(interaction)
+        if delay:
+            time.sleep(delay)
+        return interaction["response"]["body"]
+
+    def get_tools(self, bundle: str = "default") -> Any:
+        return self._replayed({"method": "get_tools", "body": {"bundle": bundle}})
+
+    def run_tools(self, response: Any, append: bool = True) -> Any:
+        return self._replayed({"method": "run_tools",
+                               "body": {"tool_calls": _tool_calls(response), "append": append}})
@@ -1,55 +1,263 @@
 import os
+import asyncio
+import contextlib
+import importlib
+import itertools
 import logging
 import random
-from typing import Any, Dict
-from openai import OpenAI
-from toolhouse import Toolhouse
-from dotenv import load_dotenv
-from .helpers import format_response, format_error_message, get_timezone_offset, save_markdown_log
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import time
+from typing import (
+    TYPE_CHECKING, Any, AsyncIterable, AsyncIterator, Awaitable, Callable, Dict, Generator, Iterable,
+    Iterator, List, Optional, Sequence, Tuple
+)
+from .bandit import ModelBandit
+from .budget import PromptBudgeter
+from .cache import ResponseCache, ToolResultCache, ToolSchemaCache
+from .compaction import SUMMARY_MAX_TOKENS, ToolResultCompactor, summary_messages
+from .concurrency import AdaptiveConcurrencyLimiter
+from .health import CircuitOpenError
+from .hedging import HedgePolicy
+from .metrics import RequestMetrics
+from .models import ModelSelector
+from .rate_limit import DEFAULT_KEY_LIMIT, RateLimiter, key_id
+from .retry import RetryPolicy
+from .tool_loop import DEFAULT_MAX_TOOL_ROUNDS, DeadlineExceededError, ToolLoop
+from .tool_runner import DEFAULT_TOOL_TIMEOUT, DEFAULT_TOOL_WORKERS, ParallelToolRunner
+from .tracing import NOOP_SPAN, Tracer, completion_attributes
+from .utils import calculate_usage_stats
+from .warmup import Warmup, WarmupStep, resolve_host
+from .helpers import (
+    MarkdownLogWriter, format_response, format_error_message, get_timezone_offset,
+    load_environment, save_markdown_log
+)
+
+if TYPE_CHECKING:
+    from .cassette import Cassette
+    from .profiling import RequestProfiler
+    from .transport import HttpPool
+
+OPENROUTER_BASE_URL = "https://openrouter.ai/api/v1"
+TOOLHOUSE_BASE_URL = "https://api.toolhouse.ai/v1"
+EXTRA_HEADERS = {
+    "HTTP-Referer": "https://ai-life-coach.com",
+    "X-Title": "AI Life Coach"
+}
+DEFAULT_BATCH_WORKERS = 4
+DEFAULT_TOOL_SCHEMA_TTL = 3600.0
+PRECONNECT_TIMEOUT = 10.0
+_NOT_PROFILED = contextlib.nullcontext()
+
+# The SDKs take most of the package's import time, so they are imported on
+# first use; they stay module attributes so they can still be patched.
+_LAZY_IMPORTS = {
+    "OpenAI": ("openai", "OpenAI"),
+    "AsyncOpenAI": ("openai", "AsyncOpenAI"),
+    "ChatCompletion": ("openai.types.chat", "ChatCompletion"),
+    "Toolhouse": ("toolhouse", "Toolhouse"),
+}
+
+
+def __getattr__(name: str) -> Any:
+    if name not in _LAZY_IMPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module, attribute = _LAZY_IMPORTS[name]
+    value = globals()[name] = getattr(importlib.import_module(module), attribute)
+    return value
+
+
+def _sdk(name: str) -> Any:
+    return globals()[name] if name in globals() else __getattr__(name)
 
-load_dotenv()
 
 class ResearchAnalysisAssistant:
-    def __init__(self):
-        self.client = OpenAI(
-            base_url="https://openrouter.ai/api/v1",
-            api_key=os.getenv("OPENROUTER_API_KEY"),
-        )
+    def __init__(self, tool_schema_ttl: float = DEFAULT_TOOL_SCHEMA_TTL,
+                 tool_schema_snapshot: Optional[str] = None,
+                 response_cache: Optional[ResponseCache] = None,
+                 tool_result_cache: Optional[ToolResultCache] = None,
+                 max_tool_rounds: int = DEFAULT_MAX_TOOL_ROUNDS,
+                 token_budget: Optional[int] = None,
+                 request_deadline: Optional[float] = None,
+                 tool_workers: int = DEFAULT_TOOL_WORKERS,
+                 tool_timeout: float = DEFAULT_TOOL_TIMEOUT,
+                 hedge_policy: Optional[HedgePolicy] = None,
+                 preference_weights: Optional[Dict[str, float]] = None,
+                 bandit_state: Optional[str] = None,
+                 rate_limiter: Optional[RateLimiter] = None,
+                 concurrency_limiter: Optional[AdaptiveConcurrencyLimiter] = None,
+                 retry_policy: Optional[RetryPolicy] = None,
+                 http_pool: Optional["HttpPool"] = None,
+                 warmup: bool = False,
+                 warmup_ping: bool = False,
+                 prompt_budgeter: Optional[PromptBudgeter] = None,
+                 tool_compactor: Optional[ToolResultCompactor] = None,
+                 base_url: str = OPENROUTER_BASE_URL,
+                 cassette: Optional["Cassette"] = None,
+                 metrics: Optional[RequestMetrics] = None,
+                 tracer: Optional[Tracer] = None,
+                 profiler: Optional["RequestProfiler"] = None):
+        load_environment()
+
+        # Clients and the Toolhouse session are built on first use (see the
+        # properties below), so constructing an assistant makes no network
+        # calls and imports no SDKs.
+        self.http_pool = http_pool
+        self.base_url = base_url
+        self.cassette = cassette
+        self._client = None
+        self._async_client = None
+        self._th = None
+        self._cassette_pool: Optional["HttpPool"] = None
+        self._tool_runner: Optional[ParallelToolRunner] = None
+        self._init_lock = threading.RLock()
+        self.tool_workers = tool_workers
+        self.tool_timeout = tool_timeout
 
-        self.th = Toolhouse()
-        self.th.set_api_key(os.getenv("TOOLHOUSE_API_KEY"))
-        self.th.set_provider("openai")
+        self.rate_limiter = rate_limiter
+        self.concurrency_limiter = concurrency_limiter
+        self.api_key_id = key_id(os.getenv("OPENROUTER_API_KEY"))
 
         self.bundle_name = "research_assistant_tools"
+        self.tool_cache = ToolSchemaCache(
+            lambda bundle: self.th.get_tools(bundle=bundle),
+            ttl=tool_schema_ttl,
+            snapshot_path=tool_schema_snapshot
+        )
+        self.response_cache = response_cache
+        self.tool_result_cache = tool_result_cache
+        self.hedge_policy = hedge_policy
+        self._retry_policy = retry_policy
+        self.preference_weights = preference_weights
+        self.bandit_state = bandit_state
+        self.tool_loop_limits = {
+            "max_rounds": max_tool_rounds,
+            "token_budget": token_budget,
+            "deadline": request_deadline
+        }
         self.request_count = 0
+        self._count_lock = threading.Lock()
+        self.metrics = metrics or RequestMetrics()
+        self.tracer = tracer or Tracer()
+        self.profiler = profiler
         self.logger = logging.getLogger("ResearchAssistant")
 
         self.model_selector = self._init_model_selector()
+        self.prompt_budgeter = prompt_budgeter or PromptBudgeter(self.model_selector)
+        self.tool_compactor = tool_compactor or ToolResultCompactor()
         self.personality = self._default_personality()
 
-        self.th.set_metadata("timezone", get_timezone_offset())
-        self.th.set_metadata("id", os.getenv("USER_ID", "research_assistant"))
-
-    def _init_model_selector(self):
-        return type("ModelSelector", (), {
-            "select_model": lambda _, task: {
-                "planning": "meta-llama/llama-4-scout:free",
-                "reasoning": "deepseek/deepseek-r1:free",
-                "creative": "google/gemini-2.0-flash-exp:free",
-                "fast": "mistralai/mistral-small-3.1-24b-instruct:free",
-                "general": "deepseek/deepseek-chat-v3-0324:free",
-                "coding": "qwen/qwq-32b:free"
-            }.get(task, "meta-llama/llama-4-scout:free"),
-            "get_all_models": lambda _: {
-                "planning": "meta-llama/llama-4-scout:free",
-                "reasoning": "deepseek/deepseek-r1:free",
-                "creative": "google/gemini-2.0-flash-exp:free",
-                "fast": "mistralai/mistral-small-3.1-24b-instruct:free",
-                "general": "deepseek/deepseek-chat-v3-0324:free",
-                "coding": "qwen/qwq-32b:free"
-            },
-            "get_fallback_model": lambda _, model: "mistralai/mistral-small-3.1-24b-instruct:free"
-        })()
+        # Opt-in: connect and fetch the tool schema while the user is still typing
+        self.warmup: Optional[Warmup] = None
+        if warmup:
+            self.warmup = Warmup(self._warmup_steps(warmup_ping)).start()
+
+    def _http_pool(self) -> "HttpPool":
+        if self.http_pool is None:
+            # Every instance shares the process-wide keep-alive pool unless given its own
+            from .transport import get_http_pool
+            self.http_pool = get_http_pool()
+        if self.cassette is not None:
+            # Record through (or replay instead of) the pool; built once per assistant
+            with self._init_lock:
+                if self._cassette_pool is None:
+                    self._cassette_pool = self.cassette.http_pool(self.http_pool)
+            return self._cassette_pool
+        return self.http_pool
+
+    @property
+    def retry_policy(self) -> Optional[RetryPolicy]:
+        return self._retry_policy
+
+    @retry_policy.setter
+    def retry_policy(self, policy: Optional[RetryPolicy]) -> None:
+        # The clients' own retries depend on the policy, so rebuild them on next use
+        with self._init_lock:
+            self._retry_policy = policy
+            self._client = None
+            self._async_client = None
+
+    def _client_options(self) -> Dict[str, Any]:
+        options: Dict[str, Any] = {"base_url": self.base_url, "api_key": os.getenv("OPENROUTER_API_KEY")}
+        if self._retry_policy is not None:
+            # The policy does the retrying; SDK retries would multiply its attempts
+            # and bypass its backoff, deadline, breaker and concurrency accounting
+            options["max_retries"] = 0
+        return options
+
+    @property
+    def client(self) -> Any:
+        if self._client is None:
+            with self._init_lock:
+                if self._client is None:
+                    self._client = _sdk("OpenAI")(
+                        http_client=self._http_pool().client(),
+                        **self._client_options()
+                    )
+        return self._client
+
+    @property
+    def async_client(self) -> Any:
+        if self._async_client is None:
+            with self._init_lock:
+                if self._async_client is None:
+                    self._async_client = _sdk("AsyncOpenAI")(
+                        http_client=self._http_pool().async_client(),
+                        **self._client_options()
+                    )
+        return self._async_client
+
+    @property
+    def th(self) -> Any:
+        """
+        Toolhouse session, set up (including metadata) on first use.
+        """
+        if self._th is None:
+            with self._init_lock:
+                if self._th is None:
+                    th = (self.cassette.toolhouse(_sdk("Toolhouse")) if self.cassette is not None
+                          else _sdk("Toolhouse")())
+                    th.set_api_key(os.getenv("TOOLHOUSE_API_KEY"))
+                    th.set_provider("openai")
+                    th.set_metadata("timezone", get_timezone_offset())
+                    th.set_metadata("id", os.getenv("USER_ID", "research_assistant"))
+                    self._th = th
+        return self._th
+
+    @property
+    def tool_runner(self) -> ParallelToolRunner:
+        if self._tool_runner is None:
+            with self._init_lock:
+                if self._tool_runner is None:
+                    self._tool_runner = ParallelToolRunner(self.th, max_workers=self.tool_workers,
+                                                           tool_timeout=self.tool_timeout,
+                                                           result_cache=self.tool_result_cache)
+        return self._tool_runner
+
+    def _warmup_steps(self, ping: bool) -> List[WarmupStep]:
+        steps: List[WarmupStep] = [
+            ("resolve", lambda: [resolve_host(url) for url in (self.base_url, TOOLHOUSE_BASE_URL)]),
+            ("openrouter", self._preconnect),
+            ("tools", self._get_tools),
+        ]
+        if ping:
+            steps.append(("ping", self._ping))
+        return steps
+
+    def _preconnect(self) -> None:
+        # Whatever the status, the TLS connection stays in the shared keep-alive pool
+        self.client
+        self._http_pool().client().head(self.base_url, timeout=PRECONNECT_TIMEOUT)
+
+    def _ping(self) -> None:
+        model = self.model_selector.preferred_model("general")
+        self._complete(model, messages=[{"role": "user", "content": "ping"}], max_tokens=1)
+
+    def _init_model_selector(self) -> ModelSelector:
+        return ModelSelector(
+            preference_weights=self.preference_weights,
+            bandit=ModelBandit(state_path=self.bandit_state)
+        )
 
     def _default_personality(self):
         return (
@@ -58,91 +266,1026 @@ class ResearchAnalysisAssistant:
             "You always try to provide useful, fact-based, and actionable insights."
         )
 
-    def _get_coach_response(self, prompt: str, task_type: str) -> str:
-        model = self.model_selector.select_model(task_type)
-
-        messages = [
+    def _build_messages(self, prompt: str) -> List[Dict[str, Any]]:
+        return [
             {"role": "system", "content": self.personality},
             {"role": "user", "content": prompt}
         ]
 
+    def _build_metadata(self, task_type: str, run_info: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        metadata = {
+            "type": "custom_request",
+            "task_type": task_type,
+            "model_used": None
+        }
+        metadata.update(run_info or {})
+        return metadata
+
+    def _get_tools(self) -> List[Dict[str, Any]]:
+        return self.tool_cache.get(self.bundle_name)
+
+    async def _aget_tools(self) -> List[Dict[str, Any]]:
+        tools = self.tool_cache.peek(self.bundle_name)
+        if tools is None:
+            tools = await asyncio.to_thread(self._get_tools)
+        return tools
+
+    def invalidate_tool_cache(self) -> None:
+        """
+        Force the next request to refetch the bundle's tool schema.
+        """
+        self.tool_cache.invalidate(self.bundle_name)
+
+    def _response_cache_key(self, request: str, model: str, bypass_cache: bool) -> Optional[str]:
+        if self.response_cache is None or bypass_cache:
+            return None
+        self._get_tools()
+        return ResponseCache.make_key(
+            model,
+            self.personality,
+            request,
+            self.tool_cache.schema_hash(self.bundle_name)
+        )
+
+    def _store_key(self, request: str, model: str, cache_key: Optional[str],
+                   run_info: Dict[str, Any]) -> Optional[str]:
+        # Only complete answers are cached, and under the model that gave
+        # them: a hedge backup or fallback answer must not be served as the
+        # primary model's, and a budget- or deadline-cut draft not at all
+        if cache_key is None or "error" in run_info:
+            return None
+        if (run_info.get("tool_loop") or {}).get("stop_reason") != "complete":
+            return None
+        answered_by = run_info.get("fallback_model") or run_info["model_used"]
+        if answered_by == model:
+            return cache_key
+        return self._response_cache_key(request, answered_by, bypass_cache=False)
+
+    def _new_tool_loop(self, limits: Optional[Dict[str, Any]] = None) -> ToolLoop:
+        settings = dict(self.tool_loop_limits)
+        settings.update(limits or {})
+        return ToolLoop(**settings)
+
+    def _fit_prompt(self, model: str, task_type: str, messages: List[Any],
+                    tools: List[Dict[str, Any]], run_info: Dict[str, Any]) -> str:
+        """
+        Keep the next completion inside the model's context window, trimming
+        or compressing `messages` in place or switching to a model with a
+        larger window; what was done accumulates in `run_info["prompt_budget"]`.
+        """
+        fitted, report = self.prompt_budgeter.fit(model, messages, tools, task_type)
+        budget = run_info.setdefault("prompt_budget", {"actions": []})
+        budget["actions"].extend(report.pop("actions"))
+        budget.update(report)
+        if fitted != model:
+            run_info["model_used"] = fitted
+        return fitted
+
+    def _compact_tool_results(self, message: Any, tool_results: List[Any], model: str,
+                              run_info: Dict[str, Any]) -> List[Any]:
+        """
+        Shrink this round's tool output before the follow-up completion; the
+        before/after sizes accumulate in `run_info["tool_compaction"]`.
+        """
+        return self.tool_compactor.compact(message.tool_calls, tool_results, model,
+                                           self._summarize_tool_result,
+                                           run_info.setdefault("tool_compaction", {}))
+
+    async def _acompact_tool_results(self, message: Any, tool_results: List[Any], model: str,
+                                     run_info: Dict[str, Any]) -> List[Any]:
+        return await self.tool_compactor.acompact(message.tool_calls, tool_results, model,
+                                                  self._asummarize_tool_result,
+                                                  run_info.setdefault("tool_compaction", {}))
+
+    def _summarize_tool_result(self, tool: str, text: str) -> str:
+        model = self.model_selector.select_model("fast")
+        response = self._complete(model, "fast", messages=summary_messages(tool, text),
+                                  max_tokens=SUMMARY_MAX_TOKENS, extra_headers=EXTRA_HEADERS)
+        return response.choices[0].message.content
+
+    async def _asummarize_tool_result(self, tool: str, text: str) -> str:
+        model = self.model_selector.select_model("fast")
+        response = await self._acomplete(model, "fast", messages=summary_messages(tool, text),
+                                         max_tokens=SUMMARY_MAX_TOKENS, extra_headers=EXTRA_HEADERS)
+        return response.choices[0].message.content
+
+    def _complete(self, model: str, task_type: Optional[str] = None,
+                  max_wait: Optional[float] = None, **request: Any) -> Any:
+        """
+        Send one chat completion, feeding its outcome into the model's health
+        and, for weighted task types, the selection bandit. With a rate
+        limiter configured, the call first waits for its quota; with a
+        concurrency limiter, for a free in-flight slot on the model. Neither
+        wait outlasts `max_wait` (the request's remaining deadline).
+        A streamed call holds its slot, and its outcome is only recorded,
+        once the stream has been read to the end or has failed.
+        """
+        with self._completion_span(model, task_type, request) as span:
+            started = time.monotonic()
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire(model, self.api_key_id, max_wait=max_wait)
+            if self.concurrency_limiter is not None:
+                self.concurrency_limiter.acquire(model, max_wait=self._wait_left(max_wait, started))
+            self._claim_model(model)
+            started = time.perf_counter()
+            try:
+                response = self.client.chat.completions.create(model=model, **request)
+            except Exception as e:
+                self._finish_call(model, task_type, error=e)
+                raise
+            except BaseException:
+                self._abandon_call(model)
+                raise
+            self._end_completion_span(span, response, started)
+            if request.get("stream"):
+                return self._settle_stream(response, model, task_type, started)
+            self._finish_call(model, task_type, latency=time.perf_counter() - started)
+            return response
+
+    async def _acomplete(self, model: str, task_type: Optional[str] = None,
+                         max_wait: Optional[float] = None, **request: Any) -> Any:
+        with self._completion_span(model, task_type, request) as span:
+            started = time.monotonic()
+            if self.rate_limiter is not None:
+                await self.rate_limiter.aacquire(model, self.api_key_id, max_wait=max_wait)
+            if self.concurrency_limiter is not None:
+                await self.concurrency_limiter.aacquire(model, max_wait=self._wait_left(max_wait, started))
+            self._claim_model(model)
+            started = time.perf_counter()
+            try:
+                response = await self.async_client.chat.completions.create(model=model, **request)
+            except Exception as e:
+                self._finish_call(model, task_type, error=e)
+                raise
+            except BaseException:
+                self._abandon_call(model)
+                raise
+            self._end_completion_span(span, response, started)
+            if request.get("stream"):
+                return self._asettle_stream(response, model, task_type, started)
+            self._finish_call(model, task_type, latency=time.perf_counter() - started)
+            return response
+
+    def _claim_model(self, model: str) -> None:
+        # Only one request may probe a half-open circuit; the others fail over
+        if not self.model_selector.try_acquire(model):
+            if self.concurrency_limiter is not None:
+                self.concurrency_limiter.release(model)
+            raise CircuitOpenError(f"Circuit for {model} is half-open and already being probed")
+
+    @staticmethod
+    def _wait_left(max_wait: Optional[float], started: float) -> Optional[float]:
+        return None if max_wait is None else max(0.0, max_wait - (time.monotonic() - started))
+
+    def _settle_stream(self, stream: Iterable[Any], model: str, task_type: Optional[str],
+                       started: float) -> Iterator[Any]:
+        # Relays the chunks; the call counts as finished when the stream is
+        # exhausted, failed when reading it raises, and abandoned when the
+        # consumer stops early
         try:
-            self.request_count += 1
+            for chunk in stream:
+                yield chunk
+        except Exception as e:
+            self._finish_call(model, task_type, error=e)
+            raise
+        except BaseException:
+            self._abandon_call(model)
+            close = getattr(stream, "close", None)
+            if close is not None:
+                close()
+            raise
+        self._finish_call(model, task_type, latency=time.perf_counter() - started)
 
-            response = self.client.chat.completions.create(
-                model=model,
-                messages=messages,
-                tools=self.th.get_tools(bundle=self.bundle_name),
-                tool_choice="auto",
-                extra_headers={
-                    "HTTP-Referer": "https://ai-life-coach.com",
-                    "X-Title": "AI Life Coach"
-                }
+    async def _asettle_stream(self, stream: AsyncIterable[Any], model: str, task_type: Optional[str],
+                              started: float) -> AsyncIterator[Any]:
+        try:
+            async for chunk in stream:
+                yield chunk
+        except Exception as e:
+            self._finish_call(model, task_type, error=e)
+            raise
+        except BaseException:
+            self._abandon_call(model)
+            close = getattr(stream, "close", None)
+            if close is not None:
+                await close()
+            raise
+        self._finish_call(model, task_type, latency=time.perf_counter() - started)
+
+    def _completion_span(self, model: str, task_type: Optional[str], request: Dict[str, Any]) -> Any:
+        if not self.tracer.enabled:
+            return NOOP_SPAN
+        attributes: Dict[str, Any] = {"model": model, "task_type": task_type,
+                                      "messages": len(request.get("messages") or ())}
+        parent = self.tracer.current()
+        if parent is not None and parent.name == "attempt":
+            attributes["attempt"] = parent.attributes["attempt"]
+        if request.get("stream"):
+            attributes["stream"] = True
+        return self.tracer.span("completion", **attributes)
+
+    def _end_completion_span(self, span: Any, response: Any, started: float) -> None:
+        # Time spent waiting on the rate and concurrency limiters is the span's
+        # duration minus `call_seconds`
+        if span is not NOOP_SPAN:
+            span.set(call_seconds=round(time.perf_counter() - started, 6))
+            if not span.attributes.get("stream"):
+                span.set(**completion_attributes(response))
+
+    def _finish_call(self, model: str, task_type: Optional[str],
+                     latency: Optional[float] = None, error: Optional[Exception] = None) -> None:
+        if self.concurrency_limiter is not None:
+            self.concurrency_limiter.release(model, latency=latency, error=error)
+        if error is not None:
+            self.metrics.increment("completion_errors", model, task_type)
+            self.model_selector.record_failure(model, error, task_type)
+        else:
+            self.model_selector.record_success(model, latency, task_type)
+
+    def _abandon_call(self, model: str) -> None:
+        # Cancelled (e.g. a lost hedge race): says nothing about the model
+        if self.concurrency_limiter is not None:
+            self.concurrency_limiter.release(model)
+        self.model_selector.record_abandoned(model)
+
+    def _hedge_model(self, task_type: str, model: str, messages: List[Any],
+                     tools: List[Dict[str, Any]]) -> Optional[str]:
+        backup_model = self.model_selector.get_hedge_model(task_type, model)
+        if backup_model and not self.prompt_budgeter.fits(backup_model, messages, tools):
+            return None
+        return backup_model
+
+    def _hedged_completion(self, model: str, task_type: str, messages: List[Any],
+                           tools: List[Dict[str, Any]], options: Dict[str, Any]) -> Tuple[Any, Dict[str, Any]]:
+        backup_model = self._hedge_model(task_type, model, messages, tools)
+
+        def call(candidate: str):
+            # Each racer gets its own copy: the loser may still be sending
+            # while the winner's caller appends tool results.
+            return self.tracer.bind(lambda: self._complete(
+                candidate, task_type, messages=list(messages), tools=tools, **options
+            ))
+
+        return self.hedge_policy.run(call(model), call(backup_model) if backup_model else None,
+                                     model, backup_model)
+
+    async def _ahedged_completion(self, model: str, task_type: str, messages: List[Any],
+                                  tools: List[Dict[str, Any]], options: Dict[str, Any]) -> Tuple[Any, Dict[str, Any]]:
+        backup_model = self._hedge_model(task_type, model, messages, tools)
+
+        def call(candidate: str):
+            return lambda: self._acomplete(
+                candidate, task_type, messages=list(messages), tools=tools, **options
             )
 
-            messages.append(response.choices[0].message)
+        return await self.hedge_policy.arun(call(model), call(backup_model) if backup_model else None,
+                                            model, backup_model)
+
+    def _record_latency(self, model: str, seconds: float) -> None:
+        if self.hedge_policy is not None:
+            self.hedge_policy.record(model, seconds)
+
+    def _count_request(self) -> None:
+        with self._count_lock:
+            self.request_count += 1
 
-            if response.choices[0].message.tool_calls:
-                tool_results = self.th.run_tools(response)
-                messages.extend(tool_results)
+    def _observe_completion(self, loop: ToolLoop, started: float, model: str, task_type: str) -> None:
+        # Called before the completion is added to `loop`, so no rounds means the first one
+        stage = "follow_up" if loop.rounds else "first_completion"
+        self.metrics.observe(stage, time.perf_counter() - started, model, task_type)
 
-                final_response = self.client.chat.completions.create(
-                    model=model,
+    def _observe_tools(self, started: float, tool_report: Dict[str, Any], model: str, task_type: str) -> None:
+        self.metrics.observe("tool_execution", time.perf_counter() - started, model, task_type)
+        cached = sum(1 for tool in tool_report.get("tools") or [] if tool.get("status") == "cached")
+        if cached:
+            self.metrics.increment("tool_cache_hits", model, task_type, cached)
+
+    def _select_model(self, task_type: str) -> str:
+        started = time.perf_counter()
+        model = self.model_selector.select_model(task_type)
+        self.metrics.observe("model_selection", time.perf_counter() - started, model, task_type)
+        return model
+
+    def _count_outcome(self, task_type: str, run_info: Dict[str, Any]) -> None:
+        model = run_info.get("model_used")
+        self.metrics.increment("requests", model, task_type)
+        if run_info.get("cached"):
+            self.metrics.increment("cache_hits", model, task_type)
+        if "error" in run_info:
+            self.metrics.increment("errors", model, task_type)
+
+    def _traced_attempts(self, fn: Callable[[], Any]) -> Callable[[], Any]:
+        # One "attempt" span per try, so retries and their backoff show in the trace
+        if not self.tracer.enabled:
+            return fn
+        attempts = itertools.count(1)
+
+        def attempt() -> Any:
+            with self.tracer.span("attempt", attempt=next(attempts)):
+                return fn()
+        return attempt
+
+    def _atraced_attempts(self, fn: Callable[[], Awaitable[Any]]) -> Callable[[], Awaitable[Any]]:
+        if not self.tracer.enabled:
+            return fn
+        attempts = itertools.count(1)
+
+        async def attempt() -> Any:
+            with self.tracer.span("attempt", attempt=next(attempts)):
+                return await fn()
+        return attempt
+
+    def _attempt_options(self, loop: Optional[ToolLoop]) -> Dict[str, Any]:
+        """
+        Request options for one attempt: with a request deadline, a timeout
+        no longer than the time left, so a hung call cannot outlive it, and
+        the same bound on waiting for the rate and concurrency limiters.
+        """
+        remaining = loop.start_attempt() if loop is not None else None
+        if remaining is None:
+            return {}
+        if remaining <= 0:
+            return {"max_wait": 0.0}
+        pool_timeout = self._http_pool().timeout
+        return {"max_wait": remaining, "timeout": type(pool_timeout)(**{
+            phase: remaining if limit is None else min(limit, remaining)
+            for phase, limit in pool_timeout.as_dict().items()
+        })}
+
+    def _deadline_answer(self, loop: ToolLoop, run_info: Dict[str, Any]) -> str:
+        self.logger.warning("Request deadline exceeded before the next model call")
+        run_info["tool_loop"] = loop.summary("deadline")
+        return loop.partial_answer("deadline")
+
+    def _call(self, run_info: Dict[str, Any], fn: Callable[[Dict[str, Any]], Any],
+              loop: Optional[ToolLoop] = None) -> Any:
+        # `fn` receives the attempt's options; the deadline is re-read on every retry
+        attempt = self._traced_attempts(lambda: fn(self._attempt_options(loop)))
+        if self.retry_policy is None:
+            run_info["attempts"] = run_info.get("attempts", 0) + 1
+            return attempt()
+        return self.retry_policy.call(attempt, run_info)
+
+    async def _acall(self, run_info: Dict[str, Any], fn: Callable[[Dict[str, Any]], Awaitable[Any]],
+                     loop: Optional[ToolLoop] = None) -> Any:
+        attempt = self._atraced_attempts(lambda: fn(self._attempt_options(loop)))
+        if self.retry_policy is None:
+            run_info["attempts"] = run_info.get("attempts", 0) + 1
+            return await attempt()
+        return await self.retry_policy.acall(attempt, run_info)
+
+    def _run_tool_loop(self, model: str, task_type: str, messages: List[Any],
+                       loop: ToolLoop, run_info: Dict[str, Any], hedge: bool = False) -> str:
+        """
+        Complete and execute tool calls round after round until the model
+        answers or a budget of `loop` runs out.
+        """
+        request_options = {"tool_choice": "auto", "extra_headers": EXTRA_HEADERS}
+        while True:
+            tools = self._get_tools()
+            model = self._fit_prompt(model, task_type, messages, tools, run_info)
+            started = time.perf_counter()
+            if hedge and self.hedge_policy is not None and not loop.rounds:
+                response, hedge_info = self._call(run_info, lambda attempt: self._hedged_completion(
+                    model, task_type, messages, tools, {**request_options, **attempt}
+                ), loop)
+                run_info["hedge"] = hedge_info
+                if hedge_info["winner"] != model:
+                    model = run_info["model_used"] = hedge_info["winner"]
+            else:
+                response = self._call(run_info, lambda attempt: self._complete(
+                    model,
+                    task_type,
+                    messages=messages,
+                    tools=tools,
+                    **request_options,
+                    **attempt
+                ), loop)
+                self._record_latency(model, time.perf_counter() - started)
+            self._observe_completion(loop, started, model, task_type)
+            loop.record_completion(response, time.perf_counter() - started)
+            request_options = {}
+
+            message = response.choices[0].message
+            if not message.tool_calls:
+                run_info["tool_loop"] = loop.summary("complete")
+                return message.content
+
+            stop_reason = loop.stop_reason()
+            if stop_reason:
+                run_info["tool_loop"] = loop.summary(stop_reason)
+                return loop.partial_answer(stop_reason)
+
+            messages.append(message)
+            started = time.perf_counter()
+            tool_report: Dict[str, Any] = {}
+            with self.tracer.span("tools", model=model, task_type=task_type, round=len(loop.rounds)) as span:
+                tool_results = self.tool_runner.run(response, tool_report)
+                tool_results = self._compact_tool_results(message, tool_results, model, run_info)
+                span.set(tools=tool_report.get("tools"))
+            loop.record_tools(time.perf_counter() - started, tool_report.get("tools"))
+            self._observe_tools(started, tool_report, model, task_type)
+            messages.extend(tool_results)
+
+    async def _arun_tool_loop(self, model: str, task_type: str, messages: List[Any],
+                              loop: ToolLoop, run_info: Dict[str, Any], hedge: bool = False) -> str:
+        request_options = {"tool_choice": "auto", "extra_headers": EXTRA_HEADERS}
+        while True:
+            tools = await self._aget_tools()
+            model = self._fit_prompt(model, task_type, messages, tools, run_info)
+            started = time.perf_counter()
+            if hedge and self.hedge_policy is not None and not loop.rounds:
+                response, hedge_info = await self._acall(run_info, lambda attempt: self._ahedged_completion(
+                    model, task_type, messages, tools, {**request_options, **attempt}
+                ), loop)
+                run_info["hedge"] = hedge_info
+                if hedge_info["winner"] != model:
+                    model = run_info["model_used"] = hedge_info["winner"]
+            else:
+                response = await self._acall(run_info, lambda attempt: self._acomplete(
+                    model,
+                    task_type,
                     messages=messages,
-                    tools=self.th.get_tools(bundle=self.bundle_name)
-                )
+                    tools=tools,
+                    **request_options,
+                    **attempt
+                ), loop)
+                self._record_latency(model, time.perf_counter() - started)
+            self._observe_completion(loop, started, model, task_type)
+            loop.record_completion(response, time.perf_counter() - started)
+            request_options = {}
+
+            message = response.choices[0].message
+            if not message.tool_calls:
+                run_info["tool_loop"] = loop.summary("complete")
+                return message.content
 
-                return final_response.choices[0].message.content
+            stop_reason = loop.stop_reason()
+            if stop_reason:
+                run_info["tool_loop"] = loop.summary(stop_reason)
+                return loop.partial_answer(stop_reason)
+
+            messages.append(message)
+            started = time.perf_counter()
+            tool_report: Dict[str, Any] = {}
+            with self.tracer.span("tools", model=model, task_type=task_type, round=len(loop.rounds)) as span:
+                tool_results = await self.tool_runner.arun(response, tool_report)
+                tool_results = await self._acompact_tool_results(message, tool_results, model, run_info)
+                span.set(tools=tool_report.get("tools"))
+            loop.record_tools(time.perf_counter() - started, tool_report.get("tools"))
+            self._observe_tools(started, tool_report, model, task_type)
+            messages.extend(tool_results)
+
+    def _get_coach_response(self, prompt: str, task_type: str,
+                            run_info: Optional[Dict[str, Any]] = None,
+                            limits: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Run one request against the selected model, executing tool calls
+        round after round until the model answers or a budget runs out.
 
-            return response.choices[0].message.content
+        Transient errors are retried per `retry_policy`; if the model still
+        fails, the tool loop continues on a fallback model from the same
+        conversation state and budgets.
 
+        `run_info`, when given, is filled with per-request details (errors,
+        timings, attempts, ...) that `handle_request` merges into the
+        response metadata. `limits` overrides `max_rounds`, `token_budget`
+        and `deadline` for this request only.
+        """
+        run_info = {} if run_info is None else run_info
+        model = run_info["model_used"] = run_info.get("model_used") or self._select_model(task_type)
+        messages = self._build_messages(prompt)
+        loop = self._new_tool_loop(limits)
+        self._count_request()
+
+        try:
+            return self._run_tool_loop(model, task_type, messages, loop, run_info, hedge=True)
+        except DeadlineExceededError:
+            return self._deadline_answer(loop, run_info)
         except Exception as e:
             self.logger.error(f"Error with model {model}: {e}")
-            fallback_model = self.model_selector.get_fallback_model(model)
+            fallback_model = run_info["fallback_model"] = self.model_selector.get_fallback_model(model, task_type)
             self.logger.info(f"Trying fallback model: {fallback_model}")
-            try:
-                response = self.client.chat.completions.create(
-                    model=fallback_model,
-                    messages=messages,
-                    tools=self.th.get_tools(bundle=self.bundle_name)
-                )
-                return response.choices[0].message.content
-            except Exception as fallback_error:
-                self.logger.error(f"Fallback model also failed: {fallback_error}")
-                return format_error_message(fallback_error, "getting your coach response")
+            self.metrics.increment("fallbacks", fallback_model, task_type)
+            started = time.perf_counter()
+            with self.tracer.span("fallback", model=fallback_model, task_type=task_type,
+                                  reason=f"{type(e).__name__}: {e}") as span:
+                try:
+                    return self._run_tool_loop(fallback_model, task_type, messages, loop, run_info)
+                except DeadlineExceededError:
+                    return self._deadline_answer(loop, run_info)
+                except Exception as fallback_error:
+                    self.logger.error(f"Fallback model also failed: {fallback_error}")
+                    span.record_error(fallback_error)
+                    run_info["error"] = f"{type(fallback_error).__name__}: {fallback_error}"
+                    return format_error_message(fallback_error, "getting your coach response")
+                finally:
+                    self.metrics.observe("fallback", time.perf_counter() - started, fallback_model, task_type)
+
+    async def _aget_coach_response(self, prompt: str, task_type: str,
+                                   run_info: Optional[Dict[str, Any]] = None,
+                                   limits: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Async counterpart of `_get_coach_response`.
+
+        Completions go through the AsyncOpenAI client; the Toolhouse SDK is
+        synchronous, so its calls run in the default executor instead of
+        blocking the event loop.
+        """
+        run_info = {} if run_info is None else run_info
+        model = run_info["model_used"] = run_info.get("model_used") or self._select_model(task_type)
+        messages = self._build_messages(prompt)
+        loop = self._new_tool_loop(limits)
+        self._count_request()
+
+        try:
+            return await self._arun_tool_loop(model, task_type, messages, loop, run_info, hedge=True)
+        except DeadlineExceededError:
+            return self._deadline_answer(loop, run_info)
+        except Exception as e:
+            self.logger.error(f"Error with model {model}: {e}")
+            fallback_model = run_info["fallback_model"] = self.model_selector.get_fallback_model(model, task_type)
+            self.logger.info(f"Trying fallback model: {fallback_model}")
+            self.metrics.increment("fallbacks", fallback_model, task_type)
+            started = time.perf_counter()
+            with self.tracer.span("fallback", model=fallback_model, task_type=task_type,
+                                  reason=f"{type(e).__name__}: {e}") as span:
+                try:
+                    return await self._arun_tool_loop(fallback_model, task_type, messages, loop, run_info)
+                except DeadlineExceededError:
+                    return self._deadline_answer(loop, run_info)
+                except Exception as fallback_error:
+                    self.logger.error(f"Fallback model also failed: {fallback_error}")
+                    span.record_error(fallback_error)
+                    run_info["error"] = f"{type(fallback_error).__name__}: {fallback_error}"
+                    return format_error_message(fallback_error, "getting your coach response")
+                finally:
+                    self.metrics.observe("fallback", time.perf_counter() - started, fallback_model, task_type)
+
+    def _relay_stream(self, stream: Iterable[Any], model: str,
+                      state: Dict[str, Any]) -> Generator[str, None, Any]:
+        """
+        Yield content deltas from a streamed completion.
+
+        Returns a ChatCompletion assembled from the streamed tool-call deltas
+        so it can be handed to `th.run_tools`. Content is only kept on it when
+        the model requested tools; otherwise it has already been yielded.
+        """
+        content_parts: List[str] = []
+        tool_calls: Dict[int, Dict[str, Any]] = {}
+
+        for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta
+            if delta.content:
+                state["emitted"] = True
+                content_parts.append(delta.content)
+                yield delta.content
+            for call in delta.tool_calls or []:
+                entry = tool_calls.setdefault(call.index, {
+                    "id": None,
+                    "type": "function",
+                    "function": {"name": "", "arguments": ""}
+                })
+                if call.id:
+                    entry["id"] = call.id
+                if call.function:
+                    entry["function"]["name"] += call.function.name or ""
+                    entry["function"]["arguments"] += call.function.arguments or ""
+
+        return _sdk("ChatCompletion").model_validate({
+            "id": f"stream-{int(time.time() * 1000)}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "finish_reason": "tool_calls" if tool_calls else "stop",
+                "message": {
+                    "role": "assistant",
+                    "content": ("".join(content_parts) or None) if tool_calls else None,
+                    "tool_calls": [tool_calls[index] for index in sorted(tool_calls)] or None
+                }
+            }]
+        })
+
+    def _stream_tool_loop(self, model: str, task_type: str, messages: List[Any], loop: ToolLoop,
+                          run_info: Dict[str, Any], state: Dict[str, Any]) -> Generator[str, None, None]:
+        request_options = {"tool_choice": "auto", "extra_headers": EXTRA_HEADERS}
+        while True:
+            tools = self._get_tools()
+            model = self._fit_prompt(model, task_type, messages, tools, run_info)
+            started = time.perf_counter()
+            # Only opening the stream is retried; nothing has been emitted yet
+            stream = self._call(run_info, lambda attempt: self._complete(
+                model,
+                task_type,
+                messages=messages,
+                tools=tools,
+                stream=True,
+                **request_options,
+                **attempt
+            ), loop)
+            with self.tracer.span("stream", model=model, task_type=task_type) as span:
+                response = yield from self._relay_stream(stream, model, state)
+                span.set(tool_calls=[call.function.name for call in response.choices[0].message.tool_calls or []])
+            self._observe_completion(loop, started, model, task_type)
+            loop.record_completion(response, time.perf_counter() - started)
+            request_options = {}
+
+            message = response.choices[0].message
+            if not message.tool_calls:
+                run_info["tool_loop"] = loop.summary("complete")
+                return
+
+            stop_reason = loop.stop_reason()
+            if stop_reason:
+                run_info["tool_loop"] = loop.summary(stop_reason)
+                if not state["emitted"]:
+                    yield loop.partial_answer(stop_reason)
+                return
+
+            messages.append(message)
+            started = time.perf_counter()
+            tool_report: Dict[str, Any] = {}
+            with self.tracer.span("tools", model=model, task_type=task_type, round=len(loop.rounds)) as span:
+                tool_results = self.tool_runner.run(response, tool_report)
+                tool_results = self._compact_tool_results(message, tool_results, model, run_info)
+                span.set(tools=tool_report.get("tools"))
+            loop.record_tools(time.perf_counter() - started, tool_report.get("tools"))
+            self._observe_tools(started, tool_report, model, task_type)
+            messages.extend(tool_results)
 
-    def handle_request(self, request: str, task_type: str = "general") -> Dict[str, Any]:
+    def _stream_coach_response(self, prompt: str, task_type: str, run_info: Dict[str, Any],
+                               limits: Optional[Dict[str, Any]] = None) -> Generator[str, None, None]:
+        """
+        Streaming counterpart of `_get_coach_response`.
+
+        The fallback model is only tried if the primary failed before
+        emitting any content, so a partial answer is never followed by a
+        second, unrelated one.
+        """
+        model = run_info["model_used"] = run_info.get("model_used") or self._select_model(task_type)
+        messages = self._build_messages(prompt)
+        loop = self._new_tool_loop(limits)
+        state = {"emitted": False}
+        self._count_request()
+
+        try:
+            yield from self._stream_tool_loop(model, task_type, messages, loop, run_info, state)
+        except DeadlineExceededError:
+            answer = self._deadline_answer(loop, run_info)
+            if not state["emitted"]:
+                yield answer
+        except Exception as e:
+            self.logger.error(f"Error with model {model}: {e}")
+            if state["emitted"]:
+                run_info["error"] = f"{type(e).__name__}: {e}"
+                yield "\n\n" + format_error_message(e, "streaming your response")
+                return
+
+            fallback_model = run_info["fallback_model"] = self.model_selector.get_fallback_model(model, task_type)
+            self.logger.info(f"Trying fallback model: {fallback_model}")
+            self.metrics.increment("fallbacks", fallback_model, task_type)
+            started = time.perf_counter()
+            with self.tracer.span("fallback", model=fallback_model, task_type=task_type,
+                                  reason=f"{type(e).__name__}: {e}") as span:
+                try:
+                    yield from self._stream_tool_loop(fallback_model, task_type, messages, loop, run_info, state)
+                except DeadlineExceededError:
+                    answer = self._deadline_answer(loop, run_info)
+                    if not state["emitted"]:
+                        yield answer
+                except Exception as fallback_error:
+                    self.logger.error(f"Fallback model also failed: {fallback_error}")
+                    span.record_error(fallback_error)
+                    run_info["error"] = f"{type(fallback_error).__name__}: {fallback_error}"
+                    separator = "\n\n" if state["emitted"] else ""
+                    yield separator + format_error_message(fallback_error, "getting your coach response")
+                finally:
+                    self.metrics.observe("fallback", time.perf_counter() - started, fallback_model, task_type)
+
+    def handle_request(self, request: str, task_type: str = "general",
+                       bypass_cache: bool = False,
+                       limits: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """
         Handle a user request and save the response as markdown.
+
+        When a response cache is configured, a cached answer is returned
+        without calling the model unless `bypass_cache` is set;
+        `metadata["cached"]` says which happened. `limits` overrides the
+        tool-loop budgets (`max_rounds`, `token_budget`, `deadline`) for this
+        request; per-round timings end up in `metadata["tool_loop"]`.
         """
+        with self._profiled(task_type), self.tracer.span("request", task_type=task_type) as span:
+            result = self._handle_request(request, task_type, bypass_cache, limits)
+            self._end_request_span(span, result["metadata"])
+            return result
+
+    def _handle_request(self, request: str, task_type: str, bypass_cache: bool,
+                        limits: Optional[Dict[str, Any]]) -> Dict[str, Any]:
         self.logger.info(f"Handling {task_type} request...")
+        if self.cassette is not None:
+            self.cassette.note_request(request, task_type)
+
+        # Chosen once so the cache key and the call agree on the model
+        model = self._select_model(task_type)
+        run_info: Dict[str, Any] = {"cached": False, "model_used": model}
+        cache_key = self._response_cache_key(request, model, bypass_cache)
+        response_content = self.response_cache.get(cache_key) if cache_key else None
 
-        response_content = self._get_coach_response(request, task_type)
+        if response_content is not None:
+            run_info["cached"] = True
+        else:
+            response_content = self._get_coach_response(request, task_type, run_info, limits)
+            store_key = self._store_key(request, model, cache_key, run_info)
+            if store_key:
+                self.response_cache.set(store_key, response_content)
 
         formatted = format_response(
             response_content,
-            metadata={
-                "type": "custom_request",
-                "task_type": task_type,
-                "model_used": self.model_selector.select_model(task_type)
-            }
+            metadata=self._build_metadata(task_type, run_info)
         )
 
-        save_markdown_log(
-            title=request[:40] or "ai_response",
-            content=formatted["response"],
-            metadata=formatted["metadata"]
+        started = time.perf_counter()
+        with self.tracer.span("log_write"):
+            save_markdown_log(
+                title=request[:40] or "ai_response",
+                content=formatted["response"],
+                metadata=formatted["metadata"]
+            )
+        self.metrics.observe("log_write", time.perf_counter() - started, run_info["model_used"], task_type)
+        self._count_outcome(task_type, run_info)
+
+        return formatted
+
+    def handle_request_stream(self, request: str, task_type: str = "general",
+                              bypass_cache: bool = False,
+                              limits: Optional[Dict[str, Any]] = None) -> Generator[str, None, Dict[str, Any]]:
+        """
+        Handle a user request, yielding response text as it arrives.
+
+        Each delta is appended to the markdown log as soon as it is yielded.
+        The generator's return value (``StopIteration.value``) is the same
+        dict `handle_request` returns. When profiling, the profile includes
+        whatever the caller does between deltas.
+        """
+        with self._profiled(task_type), \
+                self.tracer.span("request", task_type=task_type, streamed=True) as span:
+            result = yield from self._handle_request_stream(request, task_type, bypass_cache, limits)
+            self._end_request_span(span, result["metadata"])
+            return result
+
+    def _handle_request_stream(self, request: str, task_type: str, bypass_cache: bool,
+                               limits: Optional[Dict[str, Any]]) -> Generator[str, None, Dict[str, Any]]:
+        self.logger.info(f"Streaming {task_type} request...")
+        if self.cassette is not None:
+            self.cassette.note_request(request, task_type)
+
+        model = self._select_model(task_type)
+        run_info: Dict[str, Any] = {"cached": False, "streamed": True, "model_used": model}
+        cache_key = self._response_cache_key(request, model, bypass_cache)
+        cached = self.response_cache.get(cache_key) if cache_key else None
+
+        if cached is not None:
+            run_info["cached"] = True
+            deltas: Iterable[str] = [cached]
+        else:
+            deltas = self._stream_coach_response(request, task_type, run_info, limits)
+
+        parts: List[str] = []
+        # Log time is the sum of opening, each append and closing, not the time between them
+        started = time.perf_counter()
+        with MarkdownLogWriter(request[:40] or "ai_response",
+                               self._build_metadata(task_type, run_info)) as log:
+            log_seconds = time.perf_counter() - started
+            for delta in deltas:
+                parts.append(delta)
+                started = time.perf_counter()
+                log.write(delta)
+                log_seconds += time.perf_counter() - started
+                yield delta
+            started = time.perf_counter()
+        log_seconds += time.perf_counter() - started
+        self.metrics.observe("log_write", log_seconds, run_info["model_used"], task_type)
+        self._count_outcome(task_type, run_info)
+
+        response_content = "".join(parts)
+        store_key = self._store_key(request, model, cache_key, run_info) if cached is None else None
+        if store_key:
+            self.response_cache.set(store_key, response_content)
+
+        return format_response(
+            response_content,
+            metadata=self._build_metadata(task_type, run_info)
+        )
+
+    async def ahandle_request(self, request: str, task_type: str = "general",
+                              bypass_cache: bool = False,
+                              limits: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Async version of `handle_request`; returns the same dict shape.
+
+        Profiling is per thread, and requests awaited concurrently on one
+        event loop share its thread: only the first of them to start is
+        profiled, and its profile includes the others' interleaved work.
+        Inside `ahandle_requests` the batch profile covers them all instead.
+        """
+        with self._profiled(task_type), self.tracer.span("request", task_type=task_type) as span:
+            result = await self._ahandle_request(request, task_type, bypass_cache, limits)
+            self._end_request_span(span, result["metadata"])
+            return result
+
+    async def _ahandle_request(self, request: str, task_type: str, bypass_cache: bool,
+                               limits: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        self.logger.info(f"Handling {task_type} request (async)...")
+        if self.cassette is not None:
+            self.cassette.note_request(request, task_type)
+
+        model = self._select_model(task_type)
+        run_info: Dict[str, Any] = {"cached": False, "model_used": model}
+        cache_key = None
+        response_content = None
+        if self.response_cache is not None and not bypass_cache:
+            await self._aget_tools()
+            cache_key = self._response_cache_key(request, model, bypass_cache)
+            response_content = await asyncio.to_thread(self.response_cache.get, cache_key)
+
+        if response_content is not None:
+            run_info["cached"] = True
+        else:
+            response_content = await self._aget_coach_response(request, task_type, run_info, limits)
+            store_key = self._store_key(request, model, cache_key, run_info)
+            if store_key:
+                await asyncio.to_thread(self.response_cache.set, store_key, response_content)
+
+        formatted = format_response(
+            response_content,
+            metadata=self._build_metadata(task_type, run_info)
         )
 
+        started = time.perf_counter()
+        with self.tracer.span("log_write"):
+            await asyncio.to_thread(
+                save_markdown_log,
+                title=request[:40] or "ai_response",
+                content=formatted["response"],
+                metadata=formatted["metadata"]
+            )
+        self.metrics.observe("log_write", time.perf_counter() - started, run_info["model_used"], task_type)
+        self._count_outcome(task_type, run_info)
+
         return formatted
 
+    def _profiled(self, scope: str, profiler: Optional["RequestProfiler"] = None) -> Any:
+        profiler = profiler or self.profiler
+        return profiler.profile(scope) if profiler is not None else _NOT_PROFILED
+
+    def _end_request_span(self, span: Any, metadata: Dict[str, Any]) -> None:
+        if span is NOOP_SPAN:
+            return
+        tool_loop = metadata.get("tool_loop") or {}
+        span.set(model=metadata.get("model_used"), cached=metadata.get("cached"),
+                 fallback_model=metadata.get("fallback_model"), attempts=metadata.get("attempts"),
+                 tool_rounds=tool_loop.get("tool_rounds"), total_tokens=tool_loop.get("tokens_used"))
+        if "error" in metadata:
+            span.status = "error"
+            span.error = metadata["error"]
+
+    def _format_batch_error(self, error: Exception, task_type: str) -> Dict[str, Any]:
+        self.metrics.increment("requests", task_type=task_type)
+        self.metrics.increment("errors", task_type=task_type)
+        return format_response(
+            format_error_message(error, "handling a batch request"),
+            metadata=self._build_metadata(task_type, {
+                "error": f"{type(error).__name__}: {error}"
+            })
+        )
+
+    def handle_requests(self, requests: Sequence[Tuple[str, str]],
+                        max_workers: int = DEFAULT_BATCH_WORKERS,
+                        max_in_flight: Optional[int] = None,
+                        profiler: Optional["RequestProfiler"] = None) -> List[Dict[str, Any]]:
+        """
+        Handle a batch of (request, task_type) pairs concurrently.
+
+        Requests run on a thread pool of `max_workers`; at most `max_in_flight`
+        requests (default: `max_workers`) are submitted and not yet finished at
+        any time. Results come back in input order, in the same shape as
+        `handle_request`. A failing item gets an error response with
+        `metadata["error"]` set instead of aborting the batch. With a
+        `concurrency_limiter`, calls to each model are further held to that
+        model's adaptive limit, so `max_workers` is only an upper bound.
+        Each item is profiled under its task type by `profiler` (default:
+        the assistant's own profiler, if any).
+        """
+        results: List[Optional[Dict[str, Any]]] = [None] * len(requests)
+        in_flight = threading.BoundedSemaphore(max_in_flight or max_workers)
+
+        def run(index: int, request: str, task_type: str) -> None:
+            try:
+                with self._profiled(task_type, profiler):
+                    results[index] = self.handle_request(request, task_type)
+            except Exception as e:
+                self.logger.error(f"Batch item {index} failed: {e}")
+                results[index] = self._format_batch_error(e, task_type)
+            finally:
+                in_flight.release()
+
+        with ThreadPoolExecutor(max_workers=max_workers,
+                                thread_name_prefix="research-batch") as pool:
+            for index, (request, task_type) in enumerate(requests):
+                in_flight.acquire()
+                pool.submit(run, index, request, task_type)
+
+        return results
+
+    async def ahandle_requests(self, requests: Sequence[Tuple[str, str]],
+                               max_in_flight: int = DEFAULT_BATCH_WORKERS,
+                               profiler: Optional["RequestProfiler"] = None) -> List[Dict[str, Any]]:
+        """
+        Async version of `handle_requests`, bounded by an asyncio semaphore.
+
+        The requests interleave on one event loop, so with a profiler the
+        whole batch is a single profile, scoped to the task type the items
+        share, or "mixed".
+        """
+        in_flight = asyncio.Semaphore(max_in_flight)
+
+        async def run(request: str, task_type: str) -> Dict[str, Any]:
+            async with in_flight:
+                try:
+                    return await self.ahandle_request(request, task_type)
+                except Exception as e:
+                    self.logger.error(f"Batch request failed: {e}")
+                    return self._format_batch_error(e, task_type)
+
+        task_types = {task_type for _, task_type in requests}
+        scope = task_types.pop() if len(task_types) == 1 else "mixed"
+        with self._profiled(scope, profiler):
+            return list(await asyncio.gather(
+                *(run(request, task_type) for request, task_type in requests)
+            ))
+
+    def get_usage_stats(self) -> Dict[str, Any]:
+        """
+        Session counters and per-stage latency percentiles.
+
+        `metrics` holds p50/p95/p99 (ms) for each request stage overall, per
+        model and per task type, plus error, fallback and cache-hit counts;
+        `prometheus_metrics()` renders the same data as exposition text.
+        With a rate limiter, `rate_limit` reports the calls made against the
+        key's daily quota and how long calls queued for a token.
+        """
+        return {
+            "requests_made_this_session": self.request_count,
+            "bundle_name": self.bundle_name,
+            "timezone_offset": get_timezone_offset(),
+            "current_model_preferences": {
+                task: self.model_selector.preferred_model(task)
+                for task in ["planning", "reasoning", "creative", "fast", "general", "coding"]
+            },
+            "available_models": self.model_selector.get_all_models(),
+            "metrics": self.metrics.snapshot(),
+            "rate_limit": self._rate_limit_usage()
+        }
+
+    def _rate_limit_usage(self) -> Optional[Dict[str, Any]]:
+        if self.rate_limiter is None:
+            return None
+        scheduler_stats = self.rate_limiter.stats()
+        # Without a local daily bucket, OpenRouter's own per-key quota still applies
+        daily_limit = self.rate_limiter.key_limit.per_day or DEFAULT_KEY_LIMIT.per_day
+        return calculate_usage_stats(scheduler_stats["acquired"], daily_limit, scheduler_stats=scheduler_stats)
+
+    def prometheus_metrics(self) -> str:
+        """
+        Request metrics in the Prometheus text exposition format.
+        """
+        return self.metrics.prometheus()
+
     def get_model_info(self) -> Dict[str, Any]:
         return {
             "available_models": self.model_selector.get_all_models(),
             "current_preferences": {
-                task: self.model_selector.select_model(task)
+                task: self.model_selector.preferred_model(task)
                 for task in ["planning", "reasoning", "creative", "fast", "general", "coding"]
-            }
+            },
+            "model_health": self.model_selector.get_health(),
+            "model_bandit": self.model_selector.bandit.stats(),
+            "concurrency": self._concurrency_info(),
+            "warmup": self.warmup.report() if self.warmup else None,
+            "tool_result_cache": self.tool_result_cache.stats() if self.tool_result_cache else None,
+            "cassette": self.cassette.stats() if self.cassette else None
+        }
+
+    def _concurrency_info(self) -> Optional[Dict[str, Any]]:
+        if self.concurrency_limiter is None:
+            return None
+        return {
+            "limits": self.concurrency_limiter.snapshot(),
+            "history": self.concurrency_limiter.history()
         }
 
     def __repr__(self) -> str:
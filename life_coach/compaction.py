@@ -0,0 +1,336 @@
+"""
+Tool-result compaction: shrink tool output before it is sent back to the model
+"""
+
+import asyncio
+import html
+import json
+import logging
+import re
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional, Sequence, Set
+
+from .tokens import estimate_tokens
+
+
+class CompactionRule(NamedTuple):
+    """How one tool's results are compacted; None disables a cap"""
+
+    strip_markup: bool = True
+    dedupe: bool = True
+    max_items: Optional[int] = None
+    max_chars: Optional[int] = None
+    summarize_over: Optional[int] = None
+
+
+# Drops only markup and repeats, never content
+DEFAULT_RULE = CompactionRule()
+# Caps for tools whose long output is safe to cut, such as web search;
+# lossy, so tools opt in through the compactor's per-tool rules
+CAPPED_RULE = CompactionRule(max_items=10, max_chars=12000)
+# Leaves results exactly as the tool returned them
+RAW_RULE = CompactionRule(strip_markup=False, dedupe=False, max_items=None, max_chars=None)
+
+SUMMARY_MAX_TOKENS = 600
+SUMMARY_PROMPT = (
+    "Condense the output of the '{tool}' tool for another assistant. Keep every fact, "
+    "number, date, name and source URL that could help answer the user; drop navigation, "
+    "boilerplate and repetition. Reply with the condensed text only."
+)
+OMITTED_MARKER = "\n[... {count} characters omitted ...]"
+
+# Keys that identify a search hit, used to spot the same page listed twice
+_IDENTITY_KEYS = ("url", "link", "href", "id")
+# Only real HTML tags are stripped, so generics such as List<str> survive
+_BLOCK_TAGS = r"(?:p|div|br|hr|li|ul|ol|tr|table|section|article|header|footer|h[1-6]|pre|blockquote)"
+_INLINE_TAGS = (r"(?:a|abbr|b|body|button|code|em|form|html|i|iframe|img|input|label|link|main|meta|nav|"
+                r"option|select|small|span|strong|sub|sup|svg|tbody|td|th|thead|title|u)")
+_DROPPED_ELEMENTS = re.compile(r"<(script|style|noscript|head|template)\b.*?</\1\s*>", re.I | re.S)
+_COMMENTS = re.compile(r"<!--.*?-->", re.S)
+_BLOCK_TAG = re.compile(rf"</?{_BLOCK_TAGS}\b[^>]*>", re.I)
+_INLINE_TAG = re.compile(rf"</?{_INLINE_TAGS}\b[^>]*>", re.I)
+_MARKDOWN_IMAGE = re.compile(r"!\[([^\]]*)\]\([^)]*\)")
+_SPACES = re.compile(r"[ \t\r\f\v\xa0]+")
+_BLANK_LINES = re.compile(r"\n\s*\n\s*")
+
+Summarizer = Callable[[str, str], str]
+AsyncSummarizer = Callable[[str, str], Awaitable[str]]
+
+
+def strip_markup(text: str) -> str:
+    """
+    Remove HTML and image markup, keeping the readable text
+
+    Args:
+        text: Text that may contain HTML or markdown images
+
+    Returns:
+        Text with tags, scripts, styles and comments removed and
+        whitespace collapsed
+    """
+    if "<" in text:
+        text = _DROPPED_ELEMENTS.sub(" ", text)
+        text = _COMMENTS.sub(" ", text)
+        text = _BLOCK_TAG.sub("\n", text)
+        text = _INLINE_TAG.sub("", text)
+    if "&" in text:
+        text = html.unescape(text)
+    text = _MARKDOWN_IMAGE.sub(r"\1", text)
+    text = _SPACES.sub(" ", text)
+    return _BLANK_LINES.sub("\n\n", text).strip()
+
+
+def summary_messages(tool: str, text: str) -> List[Dict[str, str]]:
+    """
+    Build the prompt that asks a fast model to condense a tool result
+
+    Args:
+        tool: Tool name
+        text: Compacted tool output
+
+    Returns:
+        Chat messages for the summary completion
+    """
+    return [
+        {"role": "system", "content": SUMMARY_PROMPT.format(tool=tool)},
+        {"role": "user", "content": text}
+    ]
+
+
+def _normalized(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+class ToolResultCompactor:
+    """
+    Shrinks tool results between tool execution and the follow-up completion
+
+    Each result goes through the rule for its tool, in order:
+
+    - strip HTML markup (scripts, styles, tags, entities, markdown images)
+    - drop duplicates within the result: records of its top-level lists
+      that repeat a URL or id (the same search hit listed twice) and
+      repeated paragraphs
+    - keep at most `max_items` entries of each JSON result list
+    - cut the result to `max_chars`
+    - above `summarize_over` characters, ask the summarizer (normally the
+      "fast" task model) to condense it; a failed summary keeps the text
+
+    JSON results stay valid JSON. Every result keeps its `tool_call_id`, so
+    the follow-up completion still answers each call.
+    """
+
+    def __init__(self, rules: Optional[Dict[str, CompactionRule]] = None,
+                 default_rule: CompactionRule = DEFAULT_RULE):
+        """
+        Initialize the compactor
+
+        Args:
+            rules: Per-tool overrides of `default_rule`, keyed by tool name
+            default_rule: Rule for tools without an override
+        """
+        self.rules = rules or {}
+        self.default_rule = default_rule
+        self.logger = logging.getLogger("ToolResultCompactor")
+
+    def rule_for(self, tool: Optional[str]) -> CompactionRule:
+        """
+        Get the rule that applies to a tool
+
+        Args:
+            tool: Tool name (None when unknown)
+
+        Returns:
+            The tool's rule, or the default rule
+        """
+        return self.rules.get(tool, self.default_rule) if tool else self.default_rule
+
+    def compact(self, tool_calls: Optional[Sequence[Any]], results: List[Any],
+                model: Optional[str] = None, summarize: Optional[Summarizer] = None,
+                report: Optional[Dict[str, Any]] = None) -> List[Any]:
+        """
+        Compact the tool results of one model turn
+
+        Args:
+            tool_calls: Tool calls of the assistant message, used to find
+                each result's tool name
+            results: Tool result messages
+            model: Model that will read the results (for token estimates)
+            summarize: Called as summarize(tool_name, text) for results over
+                their rule's `summarize_over`
+            report: Optional dict that accumulates byte and token counts
+                before and after, and what was removed
+
+        Returns:
+            Compacted tool result messages, in the same order
+        """
+        compacted, pending, stats = self._prepare(tool_calls, results)
+        for index, tool in pending:
+            if summarize is None:
+                break
+            try:
+                summary = summarize(tool, compacted[index]["content"])
+            except Exception as e:
+                self.logger.warning(f"Could not summarize {tool} output: {e}")
+                continue
+            self._apply_summary(compacted, index, summary, stats)
+        self._report(report, results, compacted, model, stats)
+        return compacted
+
+    async def acompact(self, tool_calls: Optional[Sequence[Any]], results: List[Any],
+                       model: Optional[str] = None, summarize: Optional[AsyncSummarizer] = None,
+                       report: Optional[Dict[str, Any]] = None) -> List[Any]:
+        """
+        Async version of `compact`; summaries are requested concurrently
+
+        Args:
+            tool_calls: Tool calls of the assistant message
+            results: Tool result messages
+            model: Model that will read the results (for token estimates)
+            summarize: Coroutine function called as summarize(tool_name, text)
+            report: Optional dict that accumulates the compaction counts
+
+        Returns:
+            Compacted tool result messages, in the same order
+        """
+        compacted, pending, stats = self._prepare(tool_calls, results)
+        if summarize is not None and pending:
+            summaries = await asyncio.gather(
+                *(summarize(tool, compacted[index]["content"]) for index, tool in pending),
+                return_exceptions=True
+            )
+            for (index, tool), summary in zip(pending, summaries):
+                if isinstance(summary, Exception):
+                    self.logger.warning(f"Could not summarize {tool} output: {summary}")
+                    continue
+                self._apply_summary(compacted, index, summary, stats)
+        self._report(report, results, compacted, model, stats)
+        return compacted
+
+    def _prepare(self, tool_calls: Optional[Sequence[Any]], results: List[Any]):
+        names: Dict[Any, Optional[str]] = {}
+        for call in tool_calls or []:
+            name = getattr(getattr(call, "function", None), "name", None)
+            names[getattr(call, "id", None)] = name if isinstance(name, str) else None
+
+        stats = {"duplicates_removed": 0, "items_dropped": 0, "truncated": 0, "summarized": 0}
+        compacted: List[Any] = []
+        pending = []
+        for result in results:
+            if not (isinstance(result, dict) and isinstance(result.get("content"), str)):
+                compacted.append(result)
+                continue
+            tool = names.get(result.get("tool_call_id"))
+            rule = self.rule_for(tool)
+            content = self._compact_content(result["content"], rule, stats)
+            if rule.summarize_over is not None and len(content) > rule.summarize_over:
+                pending.append((len(compacted), tool or "tool"))
+            compacted.append({**result, "content": content} if content != result["content"] else result)
+        return compacted, pending, stats
+
+    def _compact_content(self, content: str, rule: CompactionRule, stats: Dict[str, int]) -> str:
+        data = None
+        stripped = content.strip()
+        reshapes_json = rule.strip_markup or rule.dedupe or rule.max_items is not None
+        if reshapes_json and stripped[:1] in ("{", "["):
+            try:
+                data = json.loads(stripped)
+            except ValueError:
+                pass
+
+        if data is not None:
+            if rule.dedupe:
+                data = self._dedupe_records(data, stats)
+            data = self._compact_json(data, rule, stats)
+            content = json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+        else:
+            if rule.strip_markup:
+                content = strip_markup(content)
+            if rule.dedupe:
+                content = self._dedupe_paragraphs(content, stats)
+
+        if rule.max_chars is not None and len(content) > rule.max_chars:
+            omitted = len(content) - rule.max_chars
+            content = content[:rule.max_chars] + OMITTED_MARKER.format(count=omitted)
+            stats["truncated"] += 1
+        return content
+
+    def _compact_json(self, data: Any, rule: CompactionRule, stats: Dict[str, int]) -> Any:
+        if isinstance(data, str):
+            return strip_markup(data) if rule.strip_markup else data
+        if isinstance(data, dict):
+            return {key: self._compact_json(value, rule, stats) for key, value in data.items()}
+        if not isinstance(data, list):
+            return data
+
+        items = [self._compact_json(item, rule, stats) for item in data]
+        if rule.max_items is not None and len(items) > rule.max_items:
+            stats["items_dropped"] += len(items) - rule.max_items
+            items = items[:rule.max_items]
+        return items
+
+    @staticmethod
+    def _dedupe_records(data: Any, stats: Dict[str, int]) -> Any:
+        # Only the result's own record lists (a bare list, or the lists of
+        # its top-level object) are searched, and only records with a URL or
+        # id count as repeats: equal nested values may well be meaningful
+        def dedupe(items: List[Any]) -> List[Any]:
+            seen: Set[str] = set()
+            kept = []
+            for item in items:
+                identity = None
+                if isinstance(item, dict):
+                    identity = next((str(item[key]) for key in _IDENTITY_KEYS if item.get(key)), None)
+                if identity is not None:
+                    if identity in seen:
+                        stats["duplicates_removed"] += 1
+                        continue
+                    seen.add(identity)
+                kept.append(item)
+            return kept
+
+        if isinstance(data, list):
+            return dedupe(data)
+        if isinstance(data, dict):
+            return {key: dedupe(value) if isinstance(value, list) else value
+                    for key, value in data.items()}
+        return data
+
+    @staticmethod
+    def _dedupe_paragraphs(text: str, stats: Dict[str, int]) -> str:
+        seen: Set[str] = set()
+        kept = []
+        for paragraph in text.split("\n\n"):
+            key = _normalized(paragraph)
+            # Short lines ("Yes", "---") repeat legitimately
+            if len(key) >= 40:
+                if key in seen:
+                    stats["duplicates_removed"] += 1
+                    continue
+                seen.add(key)
+            kept.append(paragraph)
+        return "\n\n".join(kept)
+
+    @staticmethod
+    def _apply_summary(compacted: List[Any], index: int, summary: Optional[str],
+                       stats: Dict[str, int]) -> None:
+        if summary and len(summary) < len(compacted[index]["content"]):
+            compacted[index] = {**compacted[index], "content": summary.strip()}
+            stats["summarized"] += 1
+
+    @staticmethod
+    def _report(report: Optional[Dict[str, Any]], before: List[Any], after: List[Any],
+                model: Optional[str], stats: Dict[str, int]) -> None:
+        if report is None:
+            return
+        texts_before = [r["content"] for r in before if isinstance(r, dict) and isinstance(r.get("content"), str)]
+        texts_after = [r["content"] for r in after if isinstance(r, dict) and isinstance(r.get("content"), str)]
+        counts = {
+            "results": len(before),
+            "bytes_before": sum(len(text.encode("utf-8")) for text in texts_before),
+            "bytes_after": sum(len(text.encode("utf-8")) for text in texts_after),
+            "tokens_before": sum(estimate_tokens(text, model) for text in texts_before),
+            "tokens_after": sum(estimate_tokens(text, model) for text in texts_after),
+            **stats
+        }
+        for key, value in counts.items():
+            report[key] = report.get(key, 0) + value
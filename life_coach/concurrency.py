@@ -0,0 +1,248 @@
+"""
+Adaptive (AIMD) per-model concurrency limits driven by upstream overload signals
+"""
+
+import asyncio
+import logging
+import math
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Any, Deque, Dict, List, Optional
+
+from .retry import is_timeout, status_code
+from .tool_loop import DeadlineExceededError
+
+
+OVERLOAD_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+def overload_reason(error: BaseException) -> Optional[str]:
+    """
+    Classify an error as an upstream overload signal
+
+    Uses the same status and exception-type checks as `RetryPolicy`, so a
+    number that merely appears in an error message is never an overload.
+
+    Args:
+        error: Exception raised by a model call
+
+    Returns:
+        "rate_limited", "timeout" or "server_error" for overload signals,
+        otherwise None (e.g. bad requests, which say nothing about capacity)
+    """
+    status = status_code(error)
+    if status is not None:
+        if status == 429:
+            return "rate_limited"
+        if status in OVERLOAD_STATUS_CODES:
+            return "server_error"
+        return None
+
+    return "timeout" if is_timeout(error) else None
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    Additive-increase/multiplicative-decrease in-flight limit for each model
+
+    A successful call made while more than half the model's limit was in
+    use, and whose latency stayed within `latency_tolerance` of the model's
+    smoothed latency, grows the limit by `increase / limit`, so a model kept
+    busy gains a slot every window or two of calls. A 429, timeout or 5xx multiplies it by `decrease`, at most once
+    per `cooldown` seconds so a burst of failures from one window only counts
+    once. Every change of the effective (whole-number) limit is kept in
+    `history()`.
+    """
+
+    def __init__(self, initial_limit: int = 4, min_limit: int = 1, max_limit: int = 32,
+                 increase: float = 1.0, decrease: float = 0.5,
+                 latency_tolerance: float = 2.0, cooldown: float = 5.0,
+                 alpha: float = 0.2, history_size: int = 200):
+        """
+        Initialize the limiter
+
+        Args:
+            initial_limit: Starting in-flight limit for a model
+            min_limit: Lowest limit a model can be cut to
+            max_limit: Highest limit a model can grow to
+            increase: Additive increase per window of healthy calls
+            decrease: Multiplicative factor applied on an overload signal
+            latency_tolerance: Latency above this multiple of the EWMA holds the limit
+            cooldown: Minimum seconds between two decreases for the same model
+            alpha: EWMA smoothing factor for latency
+            history_size: Number of limit changes kept per limiter
+        """
+        self.initial_limit = initial_limit
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_tolerance = latency_tolerance
+        self.cooldown = cooldown
+        self.alpha = alpha
+        self.logger = logging.getLogger("AdaptiveConcurrencyLimiter")
+
+        self._limits: Dict[str, float] = {}
+        self._in_flight: Dict[str, int] = defaultdict(int)
+        self._latency: Dict[str, float] = {}
+        self._last_decrease: Dict[str, float] = {}
+        self._history: Deque[Dict[str, Any]] = deque(maxlen=history_size)
+        self._lock = threading.Lock()
+        self._room = threading.Condition(self._lock)
+        self._async_waiters: Dict[str, List[Any]] = defaultdict(list)
+
+    def _limit(self, model: str) -> float:
+        return self._limits.setdefault(model, float(self.initial_limit))
+
+    def _has_room(self, model: str) -> bool:
+        return self._in_flight[model] < max(self.min_limit, math.floor(self._limit(model)))
+
+    def _wake(self, model: str) -> None:
+        self._room.notify_all()
+        waiters, self._async_waiters[model] = self._async_waiters[model], []
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(lambda f=future: f.done() or f.set_result(None))
+
+    def _set_limit(self, model: str, new_limit: float, reason: str) -> None:
+        old_limit = self._limit(model)
+        new_limit = min(float(self.max_limit), max(float(self.min_limit), new_limit))
+        self._limits[model] = new_limit
+        if math.floor(new_limit) != math.floor(old_limit):
+            self._history.append({
+                "time": time.time(),
+                "model": model,
+                "from": math.floor(old_limit),
+                "to": math.floor(new_limit),
+                "reason": reason
+            })
+            if new_limit > old_limit:
+                self._wake(model)
+
+    @staticmethod
+    def _time_left(deadline: Optional[float]) -> Optional[float]:
+        if deadline is None:
+            return None
+        left = deadline - time.monotonic()
+        if left <= 0:
+            raise DeadlineExceededError("No concurrency slot freed before the request deadline")
+        return left
+
+    def acquire(self, model: str, max_wait: Optional[float] = None) -> None:
+        """
+        Block until the model has room for another in-flight call
+
+        Args:
+            model: Model identifier
+            max_wait: Longest to wait for a slot, in seconds (None: no limit)
+
+        Raises:
+            DeadlineExceededError: No slot freed up within `max_wait`
+        """
+        deadline = None if max_wait is None else time.monotonic() + max_wait
+        with self._room:
+            while not self._has_room(model):
+                self._room.wait(self._time_left(deadline))
+            self._in_flight[model] += 1
+
+    async def aacquire(self, model: str, max_wait: Optional[float] = None) -> None:
+        """
+        Async version of `acquire`
+
+        Args:
+            model: Model identifier
+            max_wait: Longest to wait for a slot, in seconds (None: no limit)
+
+        Raises:
+            DeadlineExceededError: No slot freed up within `max_wait`
+        """
+        deadline = None if max_wait is None else time.monotonic() + max_wait
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._lock:
+                if self._has_room(model):
+                    self._in_flight[model] += 1
+                    return
+                future = loop.create_future()
+                self._async_waiters[model].append((loop, future))
+            try:
+                await asyncio.wait_for(future, self._time_left(deadline))
+            except asyncio.TimeoutError:
+                pass
+
+    def release(self, model: str, latency: Optional[float] = None,
+                error: Optional[BaseException] = None) -> None:
+        """
+        Finish a call, adjusting the model's limit from its outcome
+
+        Args:
+            model: Model identifier
+            latency: Call latency in seconds (successful calls)
+            error: The exception raised, if the call failed
+        """
+        with self._lock:
+            # At half the limit or less the caller, not the model, is the bottleneck
+            saturated = self._in_flight[model] * 2 > math.floor(self._limit(model))
+            self._in_flight[model] = max(0, self._in_flight[model] - 1)
+
+            if error is not None:
+                reason = overload_reason(error)
+                now = time.monotonic()
+                if reason and now - self._last_decrease.get(model, -math.inf) >= self.cooldown:
+                    self._last_decrease[model] = now
+                    self._set_limit(model, self._limit(model) * self.decrease, reason)
+                    self.logger.info(f"{model} {reason}: concurrency limit cut to "
+                                     f"{math.floor(self._limit(model))}")
+            elif latency is not None:
+                average = self._latency.get(model)
+                healthy = average is None or latency <= self.latency_tolerance * average
+                self._latency[model] = latency if average is None else average + self.alpha * (latency - average)
+                if healthy and saturated:
+                    limit = self._limit(model)
+                    self._set_limit(model, limit + self.increase / limit, "healthy")
+
+            self._wake(model)
+
+    def limit(self, model: str) -> int:
+        """
+        Get a model's current in-flight limit
+
+        Args:
+            model: Model identifier
+
+        Returns:
+            Effective (whole-number) limit
+        """
+        with self._lock:
+            return max(self.min_limit, math.floor(self._limit(model)))
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Get the current state of every model seen so far
+
+        Returns:
+            Dict mapping model id to limit, in-flight calls and latency EWMA
+        """
+        with self._lock:
+            return {
+                model: {
+                    "limit": max(self.min_limit, math.floor(limit)),
+                    "in_flight": self._in_flight[model],
+                    "latency_ewma": self._latency.get(model)
+                }
+                for model, limit in self._limits.items()
+            }
+
+    def history(self, model: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Get the recorded limit changes, oldest first
+
+        Args:
+            model: Restrict to one model
+
+        Returns:
+            List of {time, model, from, to, reason} dicts
+        """
+        with self._lock:
+            return [dict(entry) for entry in self._history
+                    if model is None or entry["model"] == model]
@@ -0,0 +1,278 @@
+"""
+Per-model health tracking: latency EWMA, error rate and circuit breakers
+"""
+
+import threading
+import time
+from typing import Any, Dict, Optional
+
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling a model whose half-open circuit is already being probed"""
+
+
+class CircuitBreaker:
+    """Classic closed/open/half-open breaker; not thread-safe on its own"""
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 30.0):
+        """
+        Initialize the circuit breaker
+
+        Args:
+            failure_threshold: Consecutive failures that open the circuit
+            reset_timeout: Seconds an open circuit waits before allowing a probe
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.probe_started_at: Optional[float] = None
+
+    def _refresh(self, now: float) -> None:
+        if self.state == OPEN and now - self.opened_at >= self.reset_timeout:
+            self.state = HALF_OPEN
+            self.probe_started_at = None
+
+    def is_available(self, now: Optional[float] = None) -> bool:
+        """
+        Check whether a request may be routed to this model
+
+        A half-open circuit admits one probe at a time; a probe that never
+        reports back is forgotten after `reset_timeout`.
+
+        Args:
+            now: Current monotonic time (defaults to time.monotonic())
+
+        Returns:
+            True when the model may be used
+        """
+        now = time.monotonic() if now is None else now
+        self._refresh(now)
+        if self.state == CLOSED:
+            return True
+        if self.state == HALF_OPEN:
+            return (self.probe_started_at is None
+                    or now - self.probe_started_at >= self.reset_timeout)
+        return False
+
+    def try_acquire(self, now: Optional[float] = None) -> bool:
+        """
+        Check and mark a request as sent in one step
+
+        In half-open state only the caller that claims the probe gets True,
+        so concurrent requests cannot all pass `is_available` and then all
+        be sent. Open circuits are let through: they are only called when
+        selection had nothing better.
+
+        Args:
+            now: Current monotonic time (defaults to time.monotonic())
+
+        Returns:
+            False when a half-open circuit's probe is already in flight
+        """
+        now = time.monotonic() if now is None else now
+        self._refresh(now)
+        if self.state == HALF_OPEN:
+            if not self.is_available(now):
+                return False
+            self.probe_started_at = now
+        return True
+
+    def on_attempt(self, now: Optional[float] = None) -> None:
+        """Mark a request as sent; in half-open state it becomes the probe"""
+        now = time.monotonic() if now is None else now
+        self._refresh(now)
+        if self.state == HALF_OPEN:
+            self.probe_started_at = now
+
+    def on_success(self) -> None:
+        """Close the circuit after a successful call"""
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.probe_started_at = None
+
+    def on_failure(self, now: Optional[float] = None) -> None:
+        """Count a failure, opening the circuit at the threshold or on a failed probe"""
+        now = time.monotonic() if now is None else now
+        self.consecutive_failures += 1
+        if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            self.state = OPEN
+            self.opened_at = now
+            self.probe_started_at = None
+
+    def on_abandoned(self) -> None:
+        """Release a probe whose call was cancelled before it finished"""
+        self.probe_started_at = None
+
+
+class HealthTracker:
+    """Thread-safe health state for every model the assistant calls"""
+
+    def __init__(self, alpha: float = 0.2, failure_threshold: int = 3,
+                 reset_timeout: float = 30.0):
+        """
+        Initialize the health tracker
+
+        Args:
+            alpha: EWMA smoothing factor for latency and error rate
+            failure_threshold: Consecutive failures that open a model's circuit
+            reset_timeout: Seconds before an open circuit allows a probe
+        """
+        self.alpha = alpha
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+        self._models: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def _entry(self, model: str) -> Dict[str, Any]:
+        entry = self._models.get(model)
+        if entry is None:
+            entry = self._models[model] = {
+                "latency_ewma": None,
+                "error_rate": 0.0,
+                "successes": 0,
+                "failures": 0,
+                "last_error": None,
+                "breaker": CircuitBreaker(self.failure_threshold, self.reset_timeout)
+            }
+        return entry
+
+    def _update_error_rate(self, entry: Dict[str, Any], failed: bool) -> None:
+        entry["error_rate"] += self.alpha * ((1.0 if failed else 0.0) - entry["error_rate"])
+
+    def is_available(self, model: str) -> bool:
+        """
+        Check whether a model's circuit admits requests
+
+        Args:
+            model: Model identifier
+
+        Returns:
+            True unless the circuit is open (or half-open with a probe in flight)
+        """
+        with self._lock:
+            entry = self._models.get(model)
+            return entry is None or entry["breaker"].is_available()
+
+    def try_acquire(self, model: str) -> bool:
+        """
+        Note that a request is about to be sent, claiming the probe of a
+        half-open circuit atomically
+
+        Args:
+            model: Model identifier
+
+        Returns:
+            False when the model's half-open circuit is already being probed
+        """
+        with self._lock:
+            return self._entry(model)["breaker"].try_acquire()
+
+    def record_attempt(self, model: str) -> None:
+        """
+        Note that a request is being sent to a model
+
+        Args:
+            model: Model identifier
+        """
+        with self._lock:
+            self._entry(model)["breaker"].on_attempt()
+
+    def record_success(self, model: str, latency: float) -> None:
+        """
+        Record a successful call
+
+        Args:
+            model: Model identifier
+            latency: Call latency in seconds
+        """
+        with self._lock:
+            entry = self._entry(model)
+            previous = entry["latency_ewma"]
+            entry["latency_ewma"] = latency if previous is None else previous + self.alpha * (latency - previous)
+            entry["successes"] += 1
+            self._update_error_rate(entry, failed=False)
+            entry["breaker"].on_success()
+
+    def record_failure(self, model: str, error: Optional[BaseException] = None) -> None:
+        """
+        Record a failed call
+
+        Args:
+            model: Model identifier
+            error: The exception raised, if any
+        """
+        with self._lock:
+            entry = self._entry(model)
+            entry["failures"] += 1
+            entry["last_error"] = f"{type(error).__name__}: {error}" if error else None
+            self._update_error_rate(entry, failed=True)
+            entry["breaker"].on_failure()
+
+    def record_abandoned(self, model: str) -> None:
+        """
+        Record a call that was cancelled before finishing (e.g. a lost hedge race)
+
+        Args:
+            model: Model identifier
+        """
+        with self._lock:
+            self._entry(model)["breaker"].on_abandoned()
+
+    def latency(self, model: str) -> Optional[float]:
+        """
+        Get a model's latency EWMA
+
+        Args:
+            model: Model identifier
+
+        Returns:
+            Smoothed latency in seconds, or None before the first success
+        """
+        with self._lock:
+            entry = self._models.get(model)
+            return entry["latency_ewma"] if entry else None
+
+    def error_rate(self, model: str) -> float:
+        """
+        Get a model's smoothed error rate
+
+        Args:
+            model: Model identifier
+
+        Returns:
+            Error rate between 0 and 1
+        """
+        with self._lock:
+            entry = self._models.get(model)
+            return entry["error_rate"] if entry else 0.0
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Get a copy of every model's health state
+
+        Returns:
+            Dict mapping model id to latency, error rate, counters and circuit state
+        """
+        with self._lock:
+            snapshot = {}
+            for model, entry in self._models.items():
+                breaker = entry["breaker"]
+                breaker.is_available()
+                snapshot[model] = {
+                    "latency_ewma": entry["latency_ewma"],
+                    "error_rate": round(entry["error_rate"], 4),
+                    "successes": entry["successes"],
+                    "failures": entry["failures"],
+                    "last_error": entry["last_error"],
+                    "circuit": breaker.state
+                }
+            return snapshot
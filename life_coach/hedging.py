@@ -0,0 +1,240 @@
+"""
+Hedged requests: race a backup model when the primary is slower than usual
+"""
+
+import asyncio
+import logging
+import math
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Tuple
+
+
+class HedgePolicy:
+    """Decides when to hedge and runs the primary/backup race"""
+
+    def __init__(self, percentile: float = 0.95, default_delay: float = 10.0,
+                 min_delay: float = 0.5, max_delay: float = 60.0,
+                 min_samples: int = 10, window: int = 200, max_workers: int = 16):
+        """
+        Initialize the hedging policy
+
+        Args:
+            percentile: Latency percentile of the primary that triggers the hedge
+            default_delay: Hedge delay used until a model has `min_samples` latencies
+            min_delay: Lower bound for the hedge delay
+            max_delay: Upper bound for the hedge delay
+            min_samples: Samples needed before the percentile is trusted
+            window: Number of recent latencies kept per model
+            max_workers: Thread pool size for synchronous races
+        """
+        self.percentile = percentile
+        self.default_delay = default_delay
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.min_samples = min_samples
+        self.max_workers = max_workers
+        self.logger = logging.getLogger("HedgePolicy")
+
+        self._latencies: Dict[str, Deque[float]] = defaultdict(lambda: deque(maxlen=window))
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def record(self, model: str, seconds: float) -> None:
+        """
+        Record a successful completion latency
+
+        Args:
+            model: Model identifier
+            seconds: Completion latency
+        """
+        with self._lock:
+            self._latencies[model].append(seconds)
+
+    def _samples(self, model: str) -> list:
+        with self._lock:
+            return sorted(self._latencies.get(model, ()))
+
+    def delay_for(self, model: str) -> float:
+        """
+        Get how long to wait for the primary before sending the backup
+
+        Args:
+            model: Primary model identifier
+
+        Returns:
+            Hedge delay in seconds
+        """
+        samples = self._samples(model)
+        if len(samples) < self.min_samples:
+            delay = self.default_delay
+        else:
+            index = min(len(samples) - 1, math.ceil(self.percentile * len(samples)) - 1)
+            delay = samples[index]
+        return min(self.max_delay, max(self.min_delay, delay))
+
+    def expected_remaining(self, model: str, elapsed: float) -> Optional[float]:
+        """
+        Estimate how much longer a call that has already run `elapsed` seconds would take
+
+        Uses the recorded latencies longer than `elapsed`, i.e. E[L - elapsed | L > elapsed].
+
+        Args:
+            model: Model identifier
+            elapsed: Seconds the call has been running
+
+        Returns:
+            Estimated remaining seconds, or None without enough history
+        """
+        tail = [s for s in self._samples(model) if s > elapsed]
+        if not tail:
+            return None
+        return sum(tail) / len(tail) - elapsed
+
+    def _pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                    thread_name_prefix="research-hedge")
+            return self._executor
+
+    def _timed(self, fn: Callable[[], Any], model: str) -> Callable[[], Any]:
+        def run() -> Any:
+            started = time.perf_counter()
+            result = fn()
+            self.record(model, time.perf_counter() - started)
+            return result
+        return run
+
+    def _result_info(self, primary_model: str, backup_model: Optional[str], delay: float,
+                     hedged: bool, winner: str, elapsed: float) -> Dict[str, Any]:
+        info = {
+            "primary": primary_model,
+            "backup": backup_model,
+            "delay_seconds": round(delay, 4),
+            "hedged": hedged,
+            "winner": winner,
+            "elapsed_seconds": round(elapsed, 4),
+            "time_saved_seconds": None
+        }
+        if winner != primary_model:
+            remaining = self.expected_remaining(primary_model, elapsed)
+            if remaining is not None:
+                info["time_saved_seconds"] = round(remaining, 4)
+        return info
+
+    def run(self, primary: Callable[[], Any], backup: Optional[Callable[[], Any]],
+            primary_model: str, backup_model: Optional[str]) -> Tuple[Any, Dict[str, Any]]:
+        """
+        Call `primary`, racing `backup` against it if it is slower than the hedge delay
+
+        The first successful result wins. A losing call that has not started
+        is cancelled; one already in flight is left to finish in the
+        background, where its latency is still recorded. If both calls fail,
+        the primary's error is raised.
+
+        Args:
+            primary: Zero-argument callable for the primary model
+            backup: Zero-argument callable for the backup model, or None
+            primary_model: Primary model identifier
+            backup_model: Backup model identifier, or None
+
+        Returns:
+            Tuple of (winning result, hedge info dict)
+        """
+        delay = self.delay_for(primary_model)
+        started = time.monotonic()
+        pool = self._pool()
+
+        primary_future = pool.submit(self._timed(primary, primary_model))
+        try:
+            result = primary_future.result(timeout=delay if backup else None)
+            return result, self._result_info(primary_model, backup_model, delay,
+                                             False, primary_model, time.monotonic() - started)
+        except FutureTimeoutError:
+            pass
+
+        self.logger.info(f"{primary_model} slower than {delay:.2f}s, hedging with {backup_model}")
+        backup_future = pool.submit(self._timed(backup, backup_model))
+        models = {primary_future: primary_model, backup_future: backup_model}
+        pending = set(models)
+        errors = {}
+
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    for other in pending:
+                        other.cancel()
+                    return future.result(), self._result_info(
+                        primary_model, backup_model, delay, True, models[future],
+                        time.monotonic() - started
+                    )
+                errors[models[future]] = future.exception()
+
+        raise errors.get(primary_model) or errors[backup_model]
+
+    async def arun(self, primary: Callable[[], Awaitable[Any]],
+                   backup: Optional[Callable[[], Awaitable[Any]]],
+                   primary_model: str, backup_model: Optional[str]) -> Tuple[Any, Dict[str, Any]]:
+        """
+        Async version of `run`; the losing call is cancelled
+
+        Args:
+            primary: Zero-argument coroutine function for the primary model
+            backup: Zero-argument coroutine function for the backup model, or None
+            primary_model: Primary model identifier
+            backup_model: Backup model identifier, or None
+
+        Returns:
+            Tuple of (winning result, hedge info dict)
+        """
+        async def timed(fn: Callable[[], Awaitable[Any]], model: str) -> Any:
+            call_started = time.perf_counter()
+            result = await fn()
+            self.record(model, time.perf_counter() - call_started)
+            return result
+
+        delay = self.delay_for(primary_model)
+        started = time.monotonic()
+        primary_task = asyncio.ensure_future(timed(primary, primary_model))
+        tasks = {primary_task: primary_model}
+
+        try:
+            done, _ = await asyncio.wait({primary_task}, timeout=delay if backup else None)
+            if done:
+                return primary_task.result(), self._result_info(
+                    primary_model, backup_model, delay, False, primary_model,
+                    time.monotonic() - started
+                )
+
+            self.logger.info(f"{primary_model} slower than {delay:.2f}s, hedging with {backup_model}")
+            tasks[asyncio.ensure_future(timed(backup, backup_model))] = backup_model
+            pending = set(tasks)
+            errors = {}
+
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result(), self._result_info(
+                            primary_model, backup_model, delay, True, tasks[task],
+                            time.monotonic() - started
+                        )
+                    errors[tasks[task]] = task.exception()
+
+            raise errors.get(primary_model) or errors[backup_model]
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    def close(self) -> None:
+        """Release the race worker threads"""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
@@ -1,9 +1,10 @@
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict
-import pytz
+from typing import Any, Dict, TextIO, Tuple
 import os
 
+_env_loaded = False
+
 
 def format_response(content: str, metadata: Dict[str, Any]) -> Dict[str, Any]:
     return {
@@ -20,6 +21,21 @@ def format_error_message(error: Exception, context: str = "") -> str:
     )
 
 
+def load_environment() -> None:
+    """
+    Load variables from .env once per process.
+
+    Called on first use rather than at import so importing the package stays
+    cheap; variables already set in the environment win.
+    """
+    global _env_loaded
+    if _env_loaded:
+        return
+    from dotenv import load_dotenv
+    load_dotenv()
+    _env_loaded = True
+
+
 def get_timezone_offset() -> str:
     try:
         tz = datetime.now().astimezone().tzinfo
@@ -29,16 +45,52 @@ def get_timezone_offset() -> str:
         return "0"
 
 
-def save_markdown_log(title: str, content: str, metadata: Dict[str, Any]) -> None:
+def _markdown_log_path(title: str) -> Tuple[Path, str]:
     log_dir = Path("logs")
     log_dir.mkdir(exist_ok=True)
 
     timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
     filename = f"{title.replace(' ', '_').lower()}_{timestamp}.md"
-    filepath = log_dir / filename
+    return log_dir / filename, timestamp
+
+
+def _write_markdown_header(f: TextIO, title: str, timestamp: str, metadata: Dict[str, Any]) -> None:
+    f.write(f"# {title}\n\n")
+    f.write(f"**Timestamp:** {timestamp}\n\n")
+    for key, value in metadata.items():
+        f.write(f"**{key}:** {value}\n\n")
+
+
+def save_markdown_log(title: str, content: str, metadata: Dict[str, Any]) -> None:
+    filepath, timestamp = _markdown_log_path(title)
 
     with open(filepath, "w", encoding="utf-8") as f:
-        f.write(f"# {title}\n\n")
-        f.write(f"**Timestamp:** {timestamp}\n\n")
-        for key, value in metadata.items():
-            f.write(f"**{key}:** {value}\n\n")
+        _write_markdown_header(f, title, timestamp, metadata)
+
+
+class MarkdownLogWriter:
+    """
+    Markdown log that is written as content arrives instead of all at once.
+    """
+
+    def __init__(self, title: str, metadata: Dict[str, Any]):
+        self.path, timestamp = _markdown_log_path(title)
+        self._file = open(self.path, "w", encoding="utf-8")
+        _write_markdown_header(self._file, title, timestamp, metadata)
+        self._file.write("---\n\n")
+        self._file.flush()
+
+    def write(self, text: str) -> None:
+        self._file.write(text)
+        self._file.flush()
+
+    def close(self) -> None:
+        if not self._file.closed:
+            self._file.write("\n")
+            self._file.close()
+
+    def __enter__(self) -> "MarkdownLogWriter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -0,0 +1,293 @@
+"""
+Per-stage latency histograms and counters for assistant requests
+"""
+
+import math
+import threading
+from collections import defaultdict, deque
+from pathlib import Path
+from typing import Any, Deque, Dict, Iterable, List, Optional, Sequence, Tuple
+
+
+# Stages of one request, in the order they happen
+STAGES = ("model_selection", "first_completion", "tool_execution", "follow_up", "fallback", "log_write")
+COUNTERS = ("requests", "errors", "completion_errors", "fallbacks", "cache_hits", "tool_cache_hits")
+
+# Upper bounds (seconds) of the Prometheus histogram buckets: 1ms to ~5 minutes
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+    1.0, 2.5, 5.0, 10.0, 25.0, 60.0, 120.0, 300.0
+)
+PERCENTILES = (0.50, 0.95, 0.99)
+METRIC_PREFIX = "research_assistant"
+
+Labels = Tuple[str, str, str]
+# A histogram's (count, sum, recent samples), copied while holding the lock
+HistogramData = Tuple[int, float, List[float]]
+
+
+def percentile(samples: Sequence[float], fraction: float) -> Optional[float]:
+    """
+    Nearest-rank percentile
+
+    Args:
+        samples: Sorted values
+        fraction: Percentile as a fraction, e.g. 0.95
+
+    Returns:
+        The percentile, or None for no samples
+    """
+    if not samples:
+        return None
+    return samples[max(0, math.ceil(fraction * len(samples)) - 1)]
+
+
+class LatencyHistogram:
+    """Cumulative bucket counts plus a window of recent samples for percentiles"""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS, window: int = 1000):
+        """
+        Initialize the histogram
+
+        Args:
+            buckets: Ascending bucket upper bounds in seconds
+            window: Number of recent samples kept for percentiles
+        """
+        self.buckets = tuple(buckets)
+        self.bucket_counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.samples: Deque[float] = deque(maxlen=window)
+
+    def observe(self, seconds: float) -> None:
+        """
+        Add one observation
+
+        Args:
+            seconds: Observed duration
+        """
+        self.count += 1
+        self.sum += seconds
+        self.samples.append(seconds)
+        for index, bound in enumerate(self.buckets):
+            if seconds <= bound:
+                self.bucket_counts[index] += 1
+                break
+
+    def cumulative(self) -> List[int]:
+        """Bucket counts as Prometheus expects them: observations <= each bound"""
+        total, counts = 0, []
+        for count in self.bucket_counts:
+            total += count
+            counts.append(total)
+        return counts
+
+
+def summarize(histograms: Iterable[HistogramData]) -> Dict[str, Any]:
+    """
+    Merge histograms into count, total and p50/p95/p99
+
+    Args:
+        histograms: (count, sum, samples) of the histograms to merge
+            (e.g. one stage across models)
+
+    Returns:
+        Dict with count, total seconds, mean and percentiles in milliseconds
+    """
+    count, total, samples = 0, 0.0, []
+    for histogram_count, histogram_sum, histogram_samples in histograms:
+        count += histogram_count
+        total += histogram_sum
+        samples.extend(histogram_samples)
+    samples.sort()
+    summary: Dict[str, Any] = {
+        "count": count,
+        "total_seconds": round(total, 4),
+        "mean_ms": round(total / count * 1000, 2) if count else None,
+    }
+    for fraction in PERCENTILES:
+        value = percentile(samples, fraction)
+        summary[f"p{round(fraction * 100)}_ms"] = round(value * 1000, 2) if value is not None else None
+    return summary
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(**labels: Any) -> str:
+    pairs = ",".join(f'{name}="{_escape(str(value))}"' for name, value in labels.items() if value != "")
+    return "{" + pairs + "}" if pairs else ""
+
+
+class RequestMetrics:
+    """
+    Thread-safe timings and counters for an assistant
+
+    Each observation is labelled with its stage, model and task type.
+    `snapshot` reports p50/p95/p99 per stage, per model and per task type;
+    `prometheus` renders the same data in the Prometheus text exposition
+    format, so it can be scraped from a file or served by any web handler
+    without a metrics library.
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS, window: int = 1000):
+        """
+        Initialize the metrics
+
+        Args:
+            buckets: Histogram bucket upper bounds in seconds
+            window: Recent samples kept per (stage, model, task type) for percentiles
+        """
+        self.buckets = tuple(buckets)
+        self.window = window
+        self._histograms: Dict[Labels, LatencyHistogram] = {}
+        self._counters: Dict[Labels, int] = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def observe(self, stage: str, seconds: float, model: Optional[str] = None,
+                task_type: Optional[str] = None) -> None:
+        """
+        Record how long a stage took
+
+        Args:
+            stage: One of `STAGES`
+            seconds: Duration
+            model: Model the stage ran against, if any
+            task_type: Task type of the request
+        """
+        key = (stage, model or "", task_type or "")
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = LatencyHistogram(self.buckets, self.window)
+            histogram.observe(seconds)
+
+    def increment(self, counter: str, model: Optional[str] = None,
+                  task_type: Optional[str] = None, amount: int = 1) -> None:
+        """
+        Add to a counter
+
+        Args:
+            counter: Counter name, normally one of `COUNTERS`
+            model: Model the event concerns, if any
+            task_type: Task type of the request
+            amount: Increment
+        """
+        with self._lock:
+            self._counters[(counter, model or "", task_type or "")] += amount
+
+    def count(self, counter: str) -> int:
+        """Total of a counter across models and task types"""
+        with self._lock:
+            return sum(value for (name, _, _), value in self._counters.items() if name == counter)
+
+    def reset(self) -> None:
+        """Forget every observation and counter"""
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Summarize everything recorded so far
+
+        Returns:
+            Dict with "stages" (each with overall, "by_model" and "by_task"
+            summaries) and "counters" (totals plus per-model and per-task splits)
+        """
+        with self._lock:
+            # Copy the data, not the histogram objects, so concurrent
+            # observations cannot change a histogram while it is summarized
+            histograms: Dict[Labels, HistogramData] = {
+                key: (histogram.count, histogram.sum, list(histogram.samples))
+                for key, histogram in self._histograms.items()
+            }
+            counters = dict(self._counters)
+
+        stages: Dict[str, Any] = {}
+        for stage in STAGES + tuple(sorted({key[0] for key in histograms} - set(STAGES))):
+            series = {key: histogram for key, histogram in histograms.items() if key[0] == stage}
+            if not series:
+                continue
+            by_model: Dict[str, List[HistogramData]] = defaultdict(list)
+            by_task: Dict[str, List[HistogramData]] = defaultdict(list)
+            for (_, model, task_type), histogram in series.items():
+                if model:
+                    by_model[model].append(histogram)
+                if task_type:
+                    by_task[task_type].append(histogram)
+            stages[stage] = {
+                **summarize(series.values()),
+                "by_model": {model: summarize(group) for model, group in sorted(by_model.items())},
+                "by_task": {task: summarize(group) for task, group in sorted(by_task.items())},
+            }
+
+        totals: Dict[str, Any] = {name: 0 for name in COUNTERS}
+        by_model_counts: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        by_task_counts: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        for (name, model, task_type), value in counters.items():
+            totals[name] = totals.get(name, 0) + value
+            if model:
+                by_model_counts[name][model] += value
+            if task_type:
+                by_task_counts[name][task_type] += value
+        return {
+            "stages": stages,
+            "counters": {
+                **totals,
+                "by_model": {name: dict(values) for name, values in by_model_counts.items()},
+                "by_task": {name: dict(values) for name, values in by_task_counts.items()},
+            },
+        }
+
+    def prometheus(self, prefix: str = METRIC_PREFIX) -> str:
+        """
+        Render the metrics in the Prometheus text exposition format
+
+        Args:
+            prefix: Metric name prefix
+
+        Returns:
+            Exposition text: one histogram for stage durations, one counter
+            per counter name
+        """
+        with self._lock:
+            histograms = sorted((key, histogram.buckets, histogram.cumulative(), histogram.count, histogram.sum)
+                                for key, histogram in self._histograms.items())
+            counters = sorted(self._counters.items())
+
+        name = f"{prefix}_stage_duration_seconds"
+        lines = [f"# HELP {name} Time spent in each stage of a request.", f"# TYPE {name} histogram"]
+        for (stage, model, task_type), buckets, cumulative, count, total in histograms:
+            labels = {"stage": stage, "model": model, "task_type": task_type}
+            for bound, value in zip(buckets, cumulative):
+                lines.append(f"{name}_bucket{_labels(**labels, le=repr(float(bound)))} {value}")
+            lines.append(f'{name}_bucket{_labels(**labels, le="+Inf")} {count}')
+            lines.append(f"{name}_sum{_labels(**labels)} {total!r}")
+            lines.append(f"{name}_count{_labels(**labels)} {count}")
+
+        for counter in sorted({key[0] for key, _ in counters}):
+            metric = f"{prefix}_{counter}_total"
+            lines.append(f"# HELP {metric} Number of {counter.replace('_', ' ')}.")
+            lines.append(f"# TYPE {metric} counter")
+            for (name, model, task_type), value in counters:
+                if name == counter:
+                    lines.append(f"{metric}{_labels(model=model, task_type=task_type)} {value}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str, prefix: str = METRIC_PREFIX) -> None:
+        """
+        Write the exposition text to a file, e.g. for node_exporter's textfile collector
+
+        The file is replaced atomically so a scraper never reads half of it.
+
+        Args:
+            path: Output file
+            prefix: Metric name prefix
+        """
+        target = Path(path)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        temporary = target.with_name(target.name + ".tmp")
+        temporary.write_text(self.prometheus(prefix), encoding="utf-8")
+        temporary.replace(target)
@@ -3,7 +3,11 @@ Free model configurations and selection logic for OpenRouter
 """
 
 import random
-from typing import Dict, List
+import re
+from typing import Dict, Iterable, List, Optional
+
+from .bandit import ModelBandit
+from .health import HealthTracker
 
 
 # Free models available on OpenRouter (as of 2025)
@@ -52,18 +56,73 @@ FREE_MODELS = {
     }
 }
 
+_SIZE_UNITS = {"": 1, "K": 1_000, "M": 1_000_000, "B": 1_000_000_000}
+
+
+def parse_context_size(text: str) -> int:
+    """
+    Parse a context size such as "131K tokens" or "10M tokens"
+
+    Args:
+        text: Human-readable context size
+
+    Returns:
+        Number of tokens
+    """
+    match = re.match(r"\s*([\d.,]+)\s*([KMB]?)", text, re.IGNORECASE)
+    if not match:
+        raise ValueError(f"Unrecognised context size: {text!r}")
+    number = float(match.group(1).replace(",", ""))
+    return int(number * _SIZE_UNITS[match.group(2).upper()])
+
+
+# FREE_MODELS with the context size as a number of tokens
+MODEL_CATALOG = {
+    model_id: {**info, "context_tokens": parse_context_size(info["context"])}
+    for model_id, info in FREE_MODELS.items()
+}
+
+
+def context_window(model_id: str) -> Optional[int]:
+    """
+    Get a model's context window
+
+    Args:
+        model_id: Model identifier
+
+    Returns:
+        Context size in tokens, or None for models outside the catalog
+    """
+    info = MODEL_CATALOG.get(model_id)
+    return info["context_tokens"] if info else None
+
 
 class ModelSelector:
     """Smart model selection based on task types and preferences"""
     
-    def __init__(self, preference_weights: Dict[str, float] = None):
+    # Score multipliers: each step down the preference list costs 50%,
+    # and a 100% error rate costs 400%, relative to latency
+    RANK_PENALTY = 0.5
+    ERROR_PENALTY = 4.0
+    
+    def __init__(self, preference_weights: Dict[str, float] = None,
+                 health: Optional[HealthTracker] = None,
+                 bandit: Optional[ModelBandit] = None):
         """
         Initialize model selector with optional preference weights
         
+        Task types listed in `preference_weights` are routed by a Thompson
+        sampling bandit; the weight scales how strongly the configured
+        preference order is trusted before observed outcomes take over.
+        
         Args:
             preference_weights: Dict mapping task types to preference multipliers
+            health: Shared health tracker (a new one is created if omitted)
+            bandit: Bandit for weighted task types (an in-memory one is created if omitted)
         """
         self.preference_weights = preference_weights or {}
+        self.health = health or HealthTracker()
+        self.bandit = bandit or ModelBandit()
         
         # Default task-to-model mappings based on model strengths
         self.task_preferences = {
@@ -104,6 +163,38 @@ class ModelSelector:
             ]
         }
     
+    def rank_models(self, models: List[str]) -> List[str]:
+        """
+        Order models by health, dropping those with an open circuit
+        
+        Each model is scored by its latency EWMA, penalised by its position
+        in `models` and its error rate. Models without latency history are
+        scored as if they were as fast as the fastest known one, so
+        preference order decides until there is data.
+        
+        Args:
+            models: Candidate model identifiers in preference order
+            
+        Returns:
+            Available models, best first
+        """
+        available = [model for model in models if self.health.is_available(model)]
+        latencies = {model: self.health.latency(model) for model in available}
+        known = [latency for latency in latencies.values() if latency is not None]
+        if not known:
+            return available
+        
+        baseline = min(known)
+        
+        def score(item):
+            rank, model = item
+            latency = latencies[model] if latencies[model] is not None else baseline
+            return (latency
+                    * (1 + self.RANK_PENALTY * rank)
+                    * (1 + self.ERROR_PENALTY * self.health.error_rate(model)))
+        
+        return [model for _, model in sorted(enumerate(available), key=score)]
+    
     def select_model(self, task_type: str = "general") -> str:
         """
         Select the best free model for a given task type
@@ -118,27 +209,144 @@ class ModelSelector:
         preferred_models = self.task_preferences.get(task_type, 
                                                    self.task_preferences["general"])
         
-        # Apply preference weights if configured
+        # Weighted task types learn from outcomes, never sampling an open circuit
         if task_type in self.preference_weights:
-            # Weighted selection (simplified - just return first choice)
-            return preferred_models[0]
+            unavailable = [model for model in preferred_models
+                           if not self.health.is_available(model)]
+            return self.bandit.choose(task_type, preferred_models,
+                                      self.preference_weights[task_type], exclude=unavailable)
         
-        # Default: return the top choice for this task type
-        return preferred_models[0]
+        # Skip open circuits and prefer fast, healthy models; if every
+        # circuit is open, the top choice is still better than nothing
+        ranked = self.rank_models(preferred_models)
+        return ranked[0] if ranked else preferred_models[0]
+    
+    def preferred_model(self, task_type: str = "general") -> str:
+        """
+        The model `select_model` currently favours, without sampling
+        
+        For weighted task types `select_model` is a random draw; this
+        reports the bandit's best posterior mean instead, so status screens
+        are stable and do not disturb the bandit's random stream.
+        
+        Args:
+            task_type: Type of task
+            
+        Returns:
+            Model identifier string for OpenRouter
+        """
+        preferred_models = self.task_preferences.get(task_type,
+                                                   self.task_preferences["general"])
+        if task_type in self.preference_weights:
+            unavailable = [model for model in preferred_models
+                           if not self.health.is_available(model)]
+            return self.bandit.best(task_type, preferred_models,
+                                    self.preference_weights[task_type], exclude=unavailable)
+        ranked = self.rank_models(preferred_models)
+        return ranked[0] if ranked else preferred_models[0]
     
-    def get_fallback_model(self, failed_model: str) -> str:
+    def get_fallback_model(self, failed_model: str, task_type: Optional[str] = None) -> str:
         """
         Get a fallback model when the primary model fails
         
         Args:
             failed_model: The model that failed
+            task_type: Optional task type whose preference list is tried first
             
         Returns:
             Alternative model identifier
         """
+        if task_type is not None:
+            preferred_models = self.task_preferences.get(task_type,
+                                                       self.task_preferences["general"])
+            ranked = self.rank_models([model for model in preferred_models
+                                       if model != failed_model])
+            if ranked:
+                return ranked[0]
+        
         available_models = [model for model in FREE_MODELS.keys() 
                           if model != failed_model]
-        return random.choice(available_models)
+        healthy_models = [model for model in available_models
+                          if self.health.is_available(model)]
+        if any(self.health.latency(model) is not None for model in healthy_models):
+            return self.rank_models(healthy_models)[0]
+        return random.choice(healthy_models or available_models)
+    
+    def get_hedge_model(self, task_type: str, primary_model: str) -> Optional[str]:
+        """
+        Get the backup model to race against a slow primary
+        
+        Args:
+            task_type: Type of task the request belongs to
+            primary_model: The model already handling the request
+            
+        Returns:
+            The next model in the task's preference list, or None
+        """
+        preferred_models = self.task_preferences.get(task_type,
+                                                   self.task_preferences["general"])
+        if primary_model in preferred_models:
+            start = preferred_models.index(primary_model) + 1
+            preferred_models = preferred_models[start:] + preferred_models[:start]
+        candidates = [model for model in preferred_models
+                      if model != primary_model and self.health.is_available(model)]
+        return candidates[0] if candidates else None
+    
+    def get_larger_context_model(self, min_tokens: int, task_type: Optional[str] = None,
+                                 exclude: Iterable[str] = ()) -> Optional[str]:
+        """
+        Get a healthy model whose context window holds `min_tokens`
+        
+        The task's own preference list is tried first, then the rest of the
+        catalog from the smallest sufficient window up.
+        
+        Args:
+            min_tokens: Tokens the context window must hold
+            task_type: Optional task type whose preference list is tried first
+            exclude: Models not to return
+            
+        Returns:
+            Model identifier, or None if no model is large enough
+        """
+        excluded = set(exclude)
+        preferred = self.task_preferences.get(task_type, []) if task_type else []
+        others = sorted((model for model in MODEL_CATALOG if model not in preferred),
+                        key=lambda model: MODEL_CATALOG[model]["context_tokens"])
+        others = [model for model in others if self.health.is_available(model)]
+        for model in self.rank_models(list(preferred)) + others:
+            window = context_window(model)
+            if model not in excluded and window is not None and window >= min_tokens:
+                return model
+        return None
+    
+    def record_attempt(self, model: str) -> None:
+        """Note that a request is being sent to a model"""
+        self.health.record_attempt(model)
+    
+    def try_acquire(self, model: str) -> bool:
+        """Note that a request is about to be sent, unless a half-open circuit's probe is taken"""
+        return self.health.try_acquire(model)
+    
+    def record_success(self, model: str, latency: float, task_type: Optional[str] = None) -> None:
+        """Feed a successful call's latency into the model's health and bandit"""
+        self.health.record_success(model, latency)
+        if task_type in self.preference_weights:
+            self.bandit.record(task_type, model, True, latency)
+    
+    def record_failure(self, model: str, error: Optional[BaseException] = None,
+                       task_type: Optional[str] = None) -> None:
+        """Feed a failed call into the model's health and bandit"""
+        self.health.record_failure(model, error)
+        if task_type in self.preference_weights:
+            self.bandit.record(task_type, model, False)
+    
+    def record_abandoned(self, model: str) -> None:
+        """Note that a call was cancelled before it finished"""
+        self.health.record_abandoned(model)
+    
+    def get_health(self) -> Dict[str, Dict]:
+        """Get latency, error rate and circuit state for every model seen so far"""
+        return self.health.snapshot()
     
     def list_models_by_strength(self, strength: str) -> List[str]:
         """
@@ -0,0 +1,338 @@
+"""
+Request profiling: cProfile and stack sampling, aggregated per task type
+"""
+
+import contextlib
+import cProfile
+import io
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+
+DEFAULT_SAMPLE_INTERVAL = 0.005
+TOP_FUNCTIONS = 25
+
+# Where a sampled stack spent its time, decided by the innermost frame that
+# matches; the first matching rule for that frame wins
+CATEGORY_RULES: Tuple[Tuple[str, Tuple[str, ...]], ...] = (
+    ("network", ("/socket.py", "/ssl.py", "/selectors.py", "/httpcore/", "/h11/", "/h2/",
+                 "/httpx/_transports/", "/httpx2/_transports/")),
+    ("sdk_parsing", ("/json/", "/pydantic/", "/pydantic_core/", "/openai/_models.py",
+                     "/openai/_response.py", "/openai/_legacy_response.py")),
+    ("sdk", ("/openai/", "/httpx/", "/httpx2/", "/anyio/")),
+    ("tools", ("/toolhouse/",)),
+    ("waiting", ("/threading.py", "/concurrent/futures/", "/queue.py")),
+    ("assistant", ("/life_coach/",)),
+)
+LOG_WRITE_FUNCTIONS = ("save_markdown_log", "MarkdownLogWriter.")
+
+_active = threading.local()
+
+
+def _frame_label(code: Any) -> str:
+    name = getattr(code, "co_qualname", code.co_name)
+    return f"{name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def categorize(codes: List[Any]) -> str:
+    """
+    Attribute one sampled stack to a category
+
+    Args:
+        codes: Code objects of the stack, innermost first
+
+    Returns:
+        One of the `CATEGORY_RULES` names, "log_write" or "other"
+    """
+    for code in codes:
+        name = getattr(code, "co_qualname", code.co_name)
+        if name.startswith(LOG_WRITE_FUNCTIONS):
+            return "log_write"
+        filename = code.co_filename.replace("\\", "/")
+        for category, patterns in CATEGORY_RULES:
+            if any(pattern in filename for pattern in patterns):
+                return category
+    return "other"
+
+
+def _safe_name(scope: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]+", "_", scope) or "scope"
+
+
+class _Scope:
+    def __init__(self):
+        self.requests = 0
+        self.wall_seconds = 0.0
+        self.stats: Optional[pstats.Stats] = None
+        self.stacks: Counter = Counter()
+        self.categories: Counter = Counter()
+
+
+class RequestProfiler:
+    """
+    Profiles requests and aggregates the results per scope (normally the task type)
+
+    Each `profile(scope)` block runs under its own cProfile session on the
+    calling thread; the sessions of a scope are merged into one pstats
+    table. Meanwhile a background thread samples the stacks of every thread
+    inside a `profile` block every `sample_interval` seconds, which gives
+    the collapsed stacks flamegraph tools read and a breakdown of where the
+    time went (network, SDK parsing, log writing, waiting on tool threads,
+    the assistant's own code). `write` saves both per scope and combined.
+
+    Only the thread that runs the request is profiled; tool calls and
+    hedge racers on worker threads show up as "waiting". A `profile` block
+    opened inside another one on the same thread is not profiled separately.
+    """
+
+    def __init__(self, deterministic: bool = True, sample_interval: Optional[float] = DEFAULT_SAMPLE_INTERVAL):
+        """
+        Initialize the profiler
+
+        Args:
+            deterministic: Run cProfile (about 2x slower than unprofiled runs)
+            sample_interval: Seconds between stack samples; None disables sampling
+        """
+        self.deterministic = deterministic
+        self.sample_interval = sample_interval
+        self.skipped_deterministic = 0
+
+        self._scopes: Dict[str, _Scope] = defaultdict(_Scope)
+        self._threads: Dict[int, str] = {}
+        self._lock = threading.Lock()
+        self._sampler: Optional[threading.Thread] = None
+        self._wake = threading.Condition(self._lock)
+
+    @contextlib.contextmanager
+    def profile(self, scope: str) -> Iterator[None]:
+        """
+        Profile the enclosed block under `scope`
+
+        Args:
+            scope: Aggregation key, e.g. the request's task type
+        """
+        if getattr(_active, "profiling", False):
+            yield
+            return
+
+        _active.profiling = True
+        thread_id = threading.get_ident()
+        self._start_sampling(thread_id, scope)
+        profile = cProfile.Profile() if self.deterministic else None
+        if profile is not None:
+            try:
+                profile.enable()
+            except ValueError:
+                # Another profiler is active (Python 3.12+ allows one per process)
+                profile = None
+                with self._lock:
+                    self.skipped_deterministic += 1
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - started
+            if profile is not None:
+                profile.disable()
+            _active.profiling = False
+            with self._lock:
+                self._threads.pop(thread_id, None)
+                entry = self._scopes[scope]
+                entry.requests += 1
+                entry.wall_seconds += wall
+                if profile is not None:
+                    if entry.stats is None:
+                        entry.stats = pstats.Stats(profile)
+                    else:
+                        entry.stats.add(profile)
+
+    def _start_sampling(self, thread_id: int, scope: str) -> None:
+        with self._lock:
+            self._threads[thread_id] = scope
+            if self.sample_interval is None:
+                return
+            if self._sampler is None or not self._sampler.is_alive():
+                self._sampler = threading.Thread(target=self._sample_loop, name="request-profiler",
+                                                 daemon=True)
+                self._sampler.start()
+            self._wake.notify()
+
+    def _sample_loop(self) -> None:
+        while True:
+            with self._lock:
+                # Park while no request is being profiled
+                while not self._threads:
+                    if not self._wake.wait(timeout=1.0) and not self._threads:
+                        self._sampler = None
+                        return
+                threads = dict(self._threads)
+            frames = sys._current_frames()
+            samples = []
+            for thread_id, scope in threads.items():
+                frame = frames.get(thread_id)
+                codes = []
+                while frame is not None:
+                    codes.append(frame.f_code)
+                    frame = frame.f_back
+                if codes:
+                    samples.append((scope, codes))
+            del frames
+            with self._lock:
+                for scope, codes in samples:
+                    entry = self._scopes[scope]
+                    entry.stacks[";".join(_frame_label(code) for code in reversed(codes))] += 1
+                    entry.categories[categorize(codes)] += 1
+            time.sleep(self.sample_interval)
+
+    def scopes(self) -> List[str]:
+        """Scopes profiled so far"""
+        with self._lock:
+            return sorted(self._scopes)
+
+    def stats(self, scope: Optional[str] = None) -> Optional[pstats.Stats]:
+        """
+        Merged cProfile statistics
+
+        Args:
+            scope: One scope, or None for all scopes combined
+
+        Returns:
+            pstats.Stats, or None if nothing was profiled deterministically
+        """
+        with self._lock:
+            entries = [self._scopes[scope]] if scope is not None else list(self._scopes.values())
+            profiled = [entry.stats for entry in entries if entry.stats is not None]
+            if not profiled:
+                return None
+            merged = pstats.Stats(stream=io.StringIO())
+            merged.add(*profiled)
+            return merged
+
+    def collapsed(self, scope: Optional[str] = None) -> Dict[str, int]:
+        """
+        Sampled stacks in collapsed form ("outer;inner" -> sample count)
+
+        Args:
+            scope: One scope, or None for all scopes combined
+
+        Returns:
+            Dict of stack to sample count
+        """
+        with self._lock:
+            entries = [self._scopes[scope]] if scope is not None else list(self._scopes.values())
+            total: Counter = Counter()
+            for entry in entries:
+                total.update(entry.stacks)
+            return dict(total)
+
+    def summary(self, top: int = 10) -> Dict[str, Any]:
+        """
+        Per-scope comparison
+
+        Args:
+            top: Functions to list per scope, by cumulative time
+
+        Returns:
+            Dict keyed by scope with request count, wall time, sample count,
+            the share of samples per category and the top functions
+        """
+        report: Dict[str, Any] = {}
+        for scope in self.scopes():
+            with self._lock:
+                entry = self._scopes[scope]
+                requests, wall = entry.requests, entry.wall_seconds
+                categories = dict(entry.categories)
+            samples = sum(categories.values())
+            report[scope] = {
+                "requests": requests,
+                "wall_seconds": round(wall, 4),
+                "mean_seconds": round(wall / requests, 4) if requests else None,
+                "samples": samples,
+                "categories": {name: round(count / samples, 3)
+                               for name, count in sorted(categories.items(), key=lambda item: -item[1])},
+                "top_functions": self._top_functions(scope, top),
+            }
+        return report
+
+    def _top_functions(self, scope: str, top: int) -> List[Dict[str, Any]]:
+        stats = self.stats(scope)
+        if stats is None:
+            return []
+        rows = sorted(stats.stats.items(), key=lambda item: -item[1][3])[:top]
+        return [{"function": f"{name} ({os.path.basename(filename)}:{line})",
+                 "calls": calls, "cumulative_seconds": round(cumulative, 4)}
+                for (filename, line, name), (_, calls, _, cumulative, _) in rows]
+
+    def write(self, output_dir: str) -> List[Path]:
+        """
+        Save the profiles
+
+        Writes, per scope and for "all" scopes combined, `<scope>.pstats`
+        (open with `python -m pstats` or snakeviz) and `<scope>.collapsed`
+        (for flamegraph.pl, speedscope or inferno), plus `summary.txt`.
+
+        Args:
+            output_dir: Directory to write to (created if needed)
+
+        Returns:
+            Paths written
+        """
+        directory = Path(output_dir)
+        directory.mkdir(parents=True, exist_ok=True)
+        written: List[Path] = []
+        for scope in self.scopes() + [None]:
+            name = _safe_name(scope) if scope is not None else "all"
+            stats = self.stats(scope)
+            if stats is not None:
+                path = directory / f"{name}.pstats"
+                stats.dump_stats(str(path))
+                written.append(path)
+            stacks = self.collapsed(scope)
+            if stacks:
+                path = directory / f"{name}.collapsed"
+                path.write_text("".join(f"{stack} {count}\n" for stack, count in sorted(stacks.items())),
+                                encoding="utf-8")
+                written.append(path)
+
+        path = directory / "summary.txt"
+        path.write_text(self.render_summary(), encoding="utf-8")
+        written.append(path)
+        return written
+
+    def render_summary(self, top: int = TOP_FUNCTIONS) -> str:
+        """
+        Human-readable comparison of the scopes, with the top pstats rows of each
+
+        Args:
+            top: pstats rows per scope
+
+        Returns:
+            Report text
+        """
+        summary = self.summary(top=0)
+        categories = sorted({name for scope in summary.values() for name in scope["categories"]})
+        out = io.StringIO()
+        out.write(f"{'scope':<16}{'requests':>9}{'mean s':>9}{'samples':>9}")
+        out.write("".join(f"{name:>13}" for name in categories) + "\n")
+        for scope, data in summary.items():
+            out.write(f"{scope:<16}{data['requests']:>9}{data['mean_seconds'] or 0:>9.3f}{data['samples']:>9}")
+            out.write("".join(f"{data['categories'].get(name, 0.0):>13.1%}" for name in categories) + "\n")
+        if self.skipped_deterministic:
+            out.write(f"\n{self.skipped_deterministic} request(s) were only sampled: "
+                      "another profiler was active\n")
+
+        for scope in summary:
+            stats = self.stats(scope)
+            if stats is None:
+                continue
+            out.write(f"\n=== {scope} ===\n")
+            stats.stream = out
+            stats.sort_stats("cumulative").print_stats(top)
+        return out.getvalue()
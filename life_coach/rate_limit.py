@@ -0,0 +1,318 @@
+"""
+Token-bucket rate limiting for model calls, shared across worker processes
+"""
+
+import asyncio
+import hashlib
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Any, Callable, Deque, Dict, List, NamedTuple, Optional, Tuple
+
+from .storage import SQLiteStore
+from .tool_loop import DeadlineExceededError
+
+
+class RateLimit(NamedTuple):
+    """Request quota; None means unlimited for that window"""
+
+    per_minute: Optional[int] = None
+    per_day: Optional[int] = None
+
+
+# OpenRouter's free tier: 20 requests/minute per model, 50 requests/day per key
+DEFAULT_MODEL_LIMIT = RateLimit(per_minute=20)
+DEFAULT_KEY_LIMIT = RateLimit(per_minute=20, per_day=50)
+
+WINDOWS = (("minute", 60.0), ("day", 86400.0))
+
+# (bucket name, capacity, refill rate in tokens per second)
+BucketSpec = Tuple[str, float, float]
+
+
+def key_id(api_key: Optional[str]) -> str:
+    """
+    Get a short, non-reversible identifier for an API key
+
+    Args:
+        api_key: API key (may be None)
+
+    Returns:
+        12-character hash, or "anonymous"
+    """
+    if not api_key:
+        return "anonymous"
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:12]
+
+
+class RateLimiter:
+    """
+    Per-model and per-API-key token buckets for requests/minute and requests/day
+
+    A call takes one token from every bucket that applies to it. When any
+    bucket is empty the call waits (it is queued, not failed) until all of
+    them have refilled. Calls for the same model and key, sync or async,
+    wait in turn, so a burst drains in arrival order instead of racing for
+    each token. A call given a `max_wait` (its request's remaining deadline)
+    raises DeadlineExceededError rather than wait past it.
+
+    Without `db_path` the buckets live in memory; with it they live in a
+    SQLite file so every worker process draws from the same quota.
+    """
+
+    def __init__(self, model_limits: Optional[Dict[str, RateLimit]] = None,
+                 default_model_limit: RateLimit = DEFAULT_MODEL_LIMIT,
+                 key_limit: RateLimit = DEFAULT_KEY_LIMIT,
+                 db_path: Optional[str] = None, max_poll: float = 1.0,
+                 clock: Callable[[], float] = time.time,
+                 sleep: Callable[[float], None] = time.sleep):
+        """
+        Initialize the rate limiter
+
+        Args:
+            model_limits: Per-model overrides of `default_model_limit`
+            default_model_limit: Quota applied to each model
+            key_limit: Quota applied to each API key across all models
+            db_path: Optional SQLite file shared between worker processes
+            max_poll: Longest single sleep while queued, so other processes'
+                refunds and config changes are noticed
+            clock: Wall-clock time source (shared between processes)
+            sleep: Sleep function used while queued
+        """
+        self.model_limits = model_limits or {}
+        self.default_model_limit = default_model_limit
+        self.key_limit = key_limit
+        self.db_path = db_path
+        self.max_poll = max_poll
+        self.clock = clock
+        self.sleep = sleep
+        self.logger = logging.getLogger("RateLimiter")
+
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+        self._lock = threading.Lock()
+        self._turn_taken = threading.Condition(self._lock)
+        # Queued calls per (model, key) in arrival order; only the head takes tokens
+        self._turns: Dict[Tuple[str, str], Deque[object]] = defaultdict(deque)
+        self._async_waiters: Dict[Tuple[str, str], List[Any]] = defaultdict(list)
+        self._stats = {
+            "acquired": 0,
+            "queued": 0,
+            "queue_depth": 0,
+            "max_queue_depth": 0,
+            "total_wait_seconds": 0.0,
+            "max_wait_seconds": 0.0
+        }
+
+        self._store = SQLiteStore(
+            db_path,
+            "CREATE TABLE IF NOT EXISTS buckets ("
+            "name TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL)"
+        ) if db_path else None
+
+    def _specs(self, model: str, api_key_id: str) -> List[BucketSpec]:
+        specs = []
+        for scope, limit in ((f"model:{model}", self.model_limits.get(model, self.default_model_limit)),
+                             (f"key:{api_key_id}", self.key_limit)):
+            for (window, seconds), quota in zip(WINDOWS, limit):
+                if quota:
+                    specs.append((f"{scope}:{window}", float(quota), quota / seconds))
+        return specs
+
+    @staticmethod
+    def _refill(state: Optional[Tuple[float, float]], capacity: float, rate: float,
+                now: float) -> float:
+        if state is None:
+            return capacity
+        tokens, updated_at = state
+        return min(capacity, tokens + max(0.0, now - updated_at) * rate)
+
+    @staticmethod
+    def _shortfall(levels: List[float], specs: List[BucketSpec]) -> float:
+        return max((1.0 - tokens) / rate for tokens, (_, _, rate) in zip(levels, specs))
+
+    def _try_take(self, specs: List[BucketSpec]) -> float:
+        """Take a token from every bucket, or return the seconds until that is possible"""
+        if not specs:
+            return 0.0
+        now = self.clock()
+        if not self.db_path:
+            with self._lock:
+                levels = [self._refill(self._buckets.get(name), capacity, rate, now)
+                          for name, capacity, rate in specs]
+                if min(levels) < 1.0:
+                    return self._shortfall(levels, specs)
+                for (name, _, _), tokens in zip(specs, levels):
+                    self._buckets[name] = (tokens - 1.0, now)
+                return 0.0
+
+        conn = self._store.connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            levels = []
+            for name, capacity, rate in specs:
+                row = conn.execute("SELECT tokens, updated_at FROM buckets WHERE name = ?",
+                                   (name,)).fetchone()
+                levels.append(self._refill(row, capacity, rate, now))
+            if min(levels) < 1.0:
+                conn.execute("COMMIT")
+                return self._shortfall(levels, specs)
+            conn.executemany(
+                "INSERT OR REPLACE INTO buckets (name, tokens, updated_at) VALUES (?, ?, ?)",
+                [(name, tokens - 1.0, now) for (name, _, _), tokens in zip(specs, levels)]
+            )
+            conn.execute("COMMIT")
+            return 0.0
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _has_queue(self, turn: Tuple[str, str]) -> bool:
+        with self._lock:
+            return bool(self._turns.get(turn))
+
+    def _enter_queue(self, turn: Tuple[str, str]) -> object:
+        ticket = object()
+        with self._lock:
+            self._turns[turn].append(ticket)
+            self._stats["queued"] += 1
+            self._stats["queue_depth"] += 1
+            self._stats["max_queue_depth"] = max(self._stats["max_queue_depth"],
+                                                 self._stats["queue_depth"])
+        return ticket
+
+    def _leave_queue(self, turn: Tuple[str, str], ticket: object, waited: float) -> None:
+        with self._lock:
+            queue = self._turns[turn]
+            queue.remove(ticket)
+            if not queue:
+                del self._turns[turn]
+            self._stats["queue_depth"] -= 1
+            self._stats["total_wait_seconds"] += waited
+            self._stats["max_wait_seconds"] = max(self._stats["max_wait_seconds"], waited)
+            # Wake the next in line, whether it waits in a thread or a task
+            self._turn_taken.notify_all()
+            for loop, future in self._async_waiters.pop(turn, []):
+                loop.call_soon_threadsafe(lambda f=future: f.done() or f.set_result(None))
+
+    @staticmethod
+    def _time_left(started: float, max_wait: Optional[float], needed: float = 0.0) -> Optional[float]:
+        """Seconds left of `max_wait`, raising once `needed` more no longer fits"""
+        if max_wait is None:
+            return None
+        left = max_wait - (time.monotonic() - started)
+        if left <= 0 or left < needed:
+            raise DeadlineExceededError("Rate limit wait would outlast the request deadline")
+        return left
+
+    def _acquired(self) -> None:
+        with self._lock:
+            self._stats["acquired"] += 1
+
+    def acquire(self, model: str, api_key_id: str = "anonymous",
+                max_wait: Optional[float] = None) -> float:
+        """
+        Block until a call to `model` with the given key fits within every quota
+
+        Args:
+            model: Model identifier
+            api_key_id: Identifier of the API key (see `key_id`)
+            max_wait: Longest the call may be queued, in seconds (None: no limit)
+
+        Returns:
+            Seconds spent queued
+
+        Raises:
+            DeadlineExceededError: The quota would not allow the call within `max_wait`
+        """
+        specs = self._specs(model, api_key_id)
+        turn = (model, api_key_id)
+        if not self._has_queue(turn) and self._try_take(specs) <= 0:
+            self._acquired()
+            return 0.0
+
+        started = time.monotonic()
+        ticket = self._enter_queue(turn)
+        self.logger.info(f"Rate limit reached for {model}, queueing")
+        try:
+            with self._turn_taken:
+                while self._turns[turn][0] is not ticket:
+                    self._turn_taken.wait(self._time_left(started, max_wait))
+            wait = self._try_take(specs)
+            while wait > 0:
+                self._time_left(started, max_wait, wait)
+                self.sleep(min(wait, self.max_poll))
+                wait = self._try_take(specs)
+        finally:
+            waited = time.monotonic() - started
+            self._leave_queue(turn, ticket, waited)
+        self._acquired()
+        return waited
+
+    async def aacquire(self, model: str, api_key_id: str = "anonymous",
+                       max_wait: Optional[float] = None) -> float:
+        """
+        Async version of `acquire`; waits with asyncio.sleep, in the same
+        queue as sync callers
+
+        Args:
+            model: Model identifier
+            api_key_id: Identifier of the API key (see `key_id`)
+            max_wait: Longest the call may be queued, in seconds (None: no limit)
+
+        Returns:
+            Seconds spent queued
+
+        Raises:
+            DeadlineExceededError: The quota would not allow the call within `max_wait`
+        """
+        specs = self._specs(model, api_key_id)
+        turn = (model, api_key_id)
+
+        async def take() -> float:
+            return await asyncio.to_thread(self._try_take, specs) if self.db_path else self._try_take(specs)
+
+        if not self._has_queue(turn) and await take() <= 0:
+            self._acquired()
+            return 0.0
+
+        started = time.monotonic()
+        ticket = self._enter_queue(turn)
+        self.logger.info(f"Rate limit reached for {model}, queueing")
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                with self._lock:
+                    if self._turns[turn][0] is ticket:
+                        break
+                    future = loop.create_future()
+                    self._async_waiters[turn].append((loop, future))
+                try:
+                    await asyncio.wait_for(future, self._time_left(started, max_wait))
+                except asyncio.TimeoutError:
+                    pass
+            wait = await take()
+            while wait > 0:
+                self._time_left(started, max_wait, wait)
+                await asyncio.sleep(min(wait, self.max_poll))
+                wait = await take()
+        finally:
+            waited = time.monotonic() - started
+            self._leave_queue(turn, ticket, waited)
+        self._acquired()
+        return waited
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get queueing statistics for this process
+
+        Returns:
+            Dict with calls acquired, calls queued, current and peak queue
+            depth, and total/average/max wait in seconds
+        """
+        with self._lock:
+            stats = dict(self._stats)
+        stats["avg_wait_seconds"] = round(stats["total_wait_seconds"] / stats["queued"], 4) if stats["queued"] else 0.0
+        stats["total_wait_seconds"] = round(stats["total_wait_seconds"], 4)
+        stats["max_wait_seconds"] = round(stats["max_wait_seconds"], 4)
+        return stats
@@ -0,0 +1,244 @@
+"""
+Retry policy for model calls: error classification, backoff with jitter and Retry-After
+"""
+
+import asyncio
+import logging
+import random
+import re
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional
+
+
+RETRYABLE_STATUS_CODES = frozenset({408, 409, 425, 429, 500, 502, 503, 504})
+
+# A status code named as one ("HTTP 503", "status: 429", "Error code: 502"),
+# so numbers that merely occur in a message ("max_tokens must be <= 4096",
+# "limit 500 tokens", request ids) are never read as a status
+_MESSAGE_STATUS = re.compile(r"\b(?:status(?:[ _]code)?|http(?:/[\d.]+)?|error code)\W{0,3}([1-5]\d\d)\b",
+                             re.I)
+
+
+def status_code(error: BaseException) -> Optional[int]:
+    """
+    Get the HTTP status code carried by an API error, if any
+
+    Errors without a status attribute (wrapped or re-raised by a proxy or
+    SDK layer) are read for an explicit "HTTP 503" or "status 429".
+
+    Args:
+        error: Exception raised by a model call
+
+    Returns:
+        Status code, or None
+    """
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    if isinstance(status, int):
+        return status
+    match = _MESSAGE_STATUS.search(str(error))
+    return int(match.group(1)) if match else None
+
+
+def is_timeout(error: BaseException) -> bool:
+    """
+    Check whether an error is a timeout, by exception type
+
+    Args:
+        error: Exception raised by a model call
+
+    Returns:
+        True for built-in and SDK timeout errors
+    """
+    return isinstance(error, (TimeoutError, asyncio.TimeoutError)) or "Timeout" in type(error).__name__
+
+
+def is_connection_error(error: BaseException) -> bool:
+    """
+    Check whether an error is a failed or dropped connection, by exception type
+
+    Args:
+        error: Exception raised by a model call
+
+    Returns:
+        True for built-in and SDK connection errors
+    """
+    return isinstance(error, ConnectionError) or "Connection" in type(error).__name__
+
+
+def retry_after(error: BaseException, now: Optional[float] = None) -> Optional[float]:
+    """
+    Read the server's requested delay from an error's response headers
+
+    Supports `retry-after-ms`, and `retry-after` as seconds or an HTTP date.
+
+    Args:
+        error: Exception raised by a model call
+        now: Current wall-clock time (defaults to time.time())
+
+    Returns:
+        Seconds to wait, or None when the server did not say
+    """
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+
+    try:
+        value = headers.get("retry-after-ms")
+        if value is not None:
+            return max(0.0, float(value) / 1000.0)
+        value = headers.get("retry-after")
+        if value is None:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            now = time.time() if now is None else now
+            return max(0.0, parsedate_to_datetime(value).timestamp() - now)
+    except (TypeError, ValueError, AttributeError):
+        return None
+
+
+class RetryPolicy:
+    """
+    Decides which failed model calls to retry and how long to wait
+
+    Each call gets up to `max_attempts` tries. Waits follow exponential
+    backoff with full jitter, unless the server sent a Retry-After, which is
+    honoured instead. All waits within one request share a `budget` of
+    seconds; once a wait would exceed it, the last error is raised so the
+    caller can fall back.
+    """
+
+    def __init__(self, max_attempts: int = 3, base_delay: float = 1.0,
+                 max_delay: float = 30.0, multiplier: float = 2.0,
+                 budget: float = 60.0,
+                 retryable_status: Iterable[int] = RETRYABLE_STATUS_CODES,
+                 retryable: Optional[Callable[[BaseException], bool]] = None,
+                 sleep: Callable[[float], None] = time.sleep,
+                 rng: Optional[random.Random] = None):
+        """
+        Initialize the retry policy
+
+        Args:
+            max_attempts: Tries per call, including the first
+            base_delay: Backoff ceiling for the first retry, in seconds
+            max_delay: Upper bound for the backoff ceiling
+            multiplier: Growth factor of the backoff ceiling per retry
+            budget: Total seconds of waiting allowed per request
+            retryable_status: HTTP status codes worth retrying
+            retryable: Optional custom classifier replacing `is_retryable`
+            sleep: Sleep function for the synchronous path
+            rng: Random generator for jitter
+        """
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.multiplier = multiplier
+        self.budget = budget
+        self.retryable_status = frozenset(retryable_status)
+        self.retryable = retryable
+        self.sleep = sleep
+        self.rng = rng or random.Random()
+        self.logger = logging.getLogger("RetryPolicy")
+
+    def is_retryable(self, error: BaseException) -> bool:
+        """
+        Classify an error as transient
+
+        Args:
+            error: Exception raised by a model call
+
+        Returns:
+            True for retryable status codes, timeouts and connection errors
+        """
+        if self.retryable is not None:
+            return self.retryable(error)
+
+        status = status_code(error)
+        if status is not None:
+            return status in self.retryable_status
+        return is_timeout(error) or is_connection_error(error)
+
+    def backoff(self, retry: int) -> float:
+        """
+        Jittered backoff before a retry
+
+        Args:
+            retry: Retry number (1 for the first retry)
+
+        Returns:
+            Seconds to wait, uniformly drawn below the exponential ceiling
+        """
+        ceiling = min(self.max_delay, self.base_delay * self.multiplier ** (retry - 1))
+        return self.rng.uniform(0.0, ceiling)
+
+    def _next_delay(self, error: BaseException, attempt: int,
+                    state: Dict[str, Any]) -> Optional[float]:
+        """Seconds to wait before the next attempt, or None to give up"""
+        if attempt >= self.max_attempts or not self.is_retryable(error):
+            return None
+        requested = retry_after(error)
+        delay = requested if requested is not None else self.backoff(attempt)
+        waited = sum(r["delay_seconds"] for r in state.get("retries", []))
+        if waited + delay > self.budget:
+            self.logger.warning(f"Retry budget of {self.budget}s exhausted")
+            return None
+
+        state.setdefault("retries", []).append({
+            "attempt": attempt,
+            "error": f"{type(error).__name__}: {error}",
+            "delay_seconds": round(delay, 4),
+            "retry_after": requested is not None
+        })
+        return delay
+
+    def call(self, fn: Callable[[], Any], state: Dict[str, Any]) -> Any:
+        """
+        Call `fn`, retrying transient failures
+
+        Args:
+            fn: Zero-argument callable making one model call
+            state: Per-request dict; receives "attempts" and "retries"
+
+        Returns:
+            The first successful result
+        """
+        attempt = 0
+        while True:
+            attempt += 1
+            state["attempts"] = state.get("attempts", 0) + 1
+            try:
+                return fn()
+            except Exception as e:
+                delay = self._next_delay(e, attempt, state)
+                if delay is None:
+                    raise
+                self.logger.info(f"Retrying after {type(e).__name__} in {delay:.2f}s")
+                self.sleep(delay)
+
+    async def acall(self, fn: Callable[[], Awaitable[Any]], state: Dict[str, Any]) -> Any:
+        """
+        Async version of `call`
+
+        Args:
+            fn: Zero-argument coroutine function making one model call
+            state: Per-request dict; receives "attempts" and "retries"
+
+        Returns:
+            The first successful result
+        """
+        attempt = 0
+        while True:
+            attempt += 1
+            state["attempts"] = state.get("attempts", 0) + 1
+            try:
+                return await fn()
+            except Exception as e:
+                delay = self._next_delay(e, attempt, state)
+                if delay is None:
+                    raise
+                self.logger.info(f"Retrying after {type(e).__name__} in {delay:.2f}s")
+                await asyncio.sleep(delay)
@@ -0,0 +1,44 @@
+"""
+SQLite storage shared by the caches and the rate limiter
+"""
+
+import sqlite3
+import threading
+from pathlib import Path
+
+
+class SQLiteStore:
+    """
+    Per-thread connections to one SQLite file, set up for concurrent use
+
+    Every thread gets its own connection in autocommit mode with the
+    write-ahead log enabled, so readers in other threads and processes are
+    never blocked by a writer and writers wait up to `timeout` seconds for
+    each other instead of failing.
+    """
+
+    def __init__(self, db_path: str, schema: str, timeout: float = 30.0):
+        """
+        Initialize the store, creating the file and its table if needed
+
+        Args:
+            db_path: SQLite file, shared between threads and processes
+            schema: CREATE TABLE IF NOT EXISTS statement for the store's table
+            timeout: Seconds to wait for another connection's write lock
+        """
+        self.db_path = db_path
+        self.timeout = timeout
+        self._local = threading.local()
+
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self.connection().execute(schema)
+
+    def connection(self) -> sqlite3.Connection:
+        """Get the calling thread's connection, opening it on first use"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=self.timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
@@ -0,0 +1,235 @@
+"""
+Calibrated token estimates per model family, without loading a tokenizer
+"""
+
+from operator import mul
+from typing import Dict, Iterable, List, Optional, Sequence
+
+
+# Mean relative error the estimator is held to, per family, on the labelled
+# corpus in tests/data/token_corpus.jsonl (see benchmarks/tokens.py)
+ERROR_BOUND = 0.06
+
+# Byte-level tokenizers never produce more tokens than UTF-8 bytes, and
+# none of the calibrated families averages more than 8 bytes per token, so
+# estimates are clamped to that range whatever the text looks like
+MIN_TOKEN_BYTES = 1
+MAX_TOKEN_BYTES = 8
+
+
+def _byte_table(default: str, classes: Dict[str, Iterable[int]]) -> bytes:
+    table = bytearray(default.encode() * 256)
+    for name, members in classes.items():
+        for byte in members:
+            table[byte] = ord(name)
+    return bytes(table)
+
+
+# Every UTF-8 byte is mapped to a class letter, so each feature is a single
+# bytes.count over the translated text. Non-ASCII characters are classed by
+# their lead byte: C2-CD is accented Latin, CE-CF Greek, D0-D4 Cyrillic,
+# D5-DF the other two-byte scripts (Armenian, Hebrew, Arabic, ...), E4-E9 is
+# almost all Han, E3 kana and CJK punctuation, EA-ED Hangul; continuation
+# and control bytes fall into "_".
+_LETTERS = b"ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+_CLASSES = _byte_table("_", {
+    ".": range(0x21, 0x7f),
+    "a": _LETTERS,
+    "0": b"0123456789",
+    " ": b" \t",
+    "\n": b"\n",
+    "l": range(0xC2, 0xCE),
+    "g": [0xCE, 0xCF],
+    "c": range(0xD0, 0xD5),
+    "r": range(0xD5, 0xE0),
+    "o": [*range(0xE0, 0xE3), 0xEE, 0xEF],
+    "j": [0xE3],
+    "h": range(0xE4, 0xEA),
+    "k": range(0xEA, 0xEE),
+    "e": range(0xF0, 0xF5),
+})
+# Second pass tables, read with continuation bytes deleted: the start of
+# every Latin word (accented letters included), of every word or unbroken
+# run in another script, of every run of two or more spaces, and of every
+# punctuation run
+_WORD_RUNS = _byte_table("b", {"a": b"al"})
+_SCRIPT_WORD_RUNS = _byte_table("b", {"a": b"gcrhjk"})
+_SPACE_RUNS = _byte_table("b", {" ": b" "})
+_PUNCTUATION_RUNS = _byte_table("b", {".": b"."})
+
+FEATURES = ("letters", "word_starts", "script_word_starts", "spaces", "space_runs", "digits",
+            "punctuation", "punctuation_starts", "newlines", "han", "kana", "hangul",
+            "latin_extended", "greek", "cyrillic", "other_two_byte", "other_three_byte",
+            "four_byte", "constant")
+
+# Fitted with `python benchmarks/tokens.py fit` (non-negative least squares);
+# "default" is fitted to every labelled family at once and serves families
+# without a public tokenizer
+FAMILY_COEFFICIENTS = {
+    "deepseek": (0.0609, 0.7216, 1.7333, 0.0000, 0.3195, 0.3640, 0.0793, 0.9430,
+                 0.7675, 0.3551, 0.7472, 0.3436, 2.1133, 0.2249, 0.0879, 0.0761,
+                 1.4178, 1.8188, 0.0000),
+    "llama": (0.0437, 0.7733, 1.3863, 0.0000, 0.4449, 0.5070, 0.1061, 0.7277,
+              0.8154, 0.4081, 0.6226, 0.1843, 1.4277, 0.1248, 0.0372, 0.1479,
+              1.6460, 1.9464, 0.0000),
+    "mistral": (0.0425, 0.7518, 1.5114, 0.0000, 0.3526, 0.9922, 0.1244, 0.8744,
+                0.8533, 0.7842, 0.6940, 0.2258, 2.1148, 0.1581, 0.1001, 0.0727,
+                1.9594, 3.7156, 0.0000),
+    "qwen": (0.1150, 0.5370, 1.5283, 0.0147, 0.3469, 1.1522, 0.1249, 0.4797,
+             0.6458, 0.4257, 0.7459, 0.4491, 2.2038, 0.7173, 0.1856, 0.0943,
+             1.1254, 1.0551, 0.0000),
+    "default": (0.0976, 0.5706, 1.6624, 0.0028, 0.3547, 0.7027, 0.1067, 0.6826,
+                0.8062, 0.4323, 0.7142, 0.2425, 1.8684, 0.1779, 0.0655, 0.0748,
+                1.4775, 1.4853, 0.0000),
+}
+
+
+def text_features(text: str) -> List[float]:
+    """
+    Count the character classes that drive token counts
+
+    Args:
+        text: Text to describe
+
+    Returns:
+        Feature values in `FEATURES` order
+    """
+    return _features(text.encode("utf-8", "surrogatepass").translate(_CLASSES), text.isascii())
+
+
+def _estimate(weights: Sequence[float], text: str) -> int:
+    classes = text.encode("utf-8", "surrogatepass").translate(_CLASSES)
+    estimate = round(sum(map(mul, weights, _features(classes, text.isascii()))))
+    size = len(classes)
+    return min(size // MIN_TOKEN_BYTES, max(-(-size // MAX_TOKEN_BYTES), estimate))
+
+
+def _features(classes: bytes, ascii: bool) -> List[float]:
+    count = classes.count
+    spaces, digits, punctuation, newlines, other = (
+        count(b" "), count(b"0"), count(b"."), count(b"\n"), count(b"_"))
+    if ascii:
+        non_ascii = [0] * 9
+        word_starts = (b"b" + classes.translate(_WORD_RUNS)).count(b"ba")
+        script_word_starts = 0
+    else:
+        non_ascii = [count(b"h"), count(b"j"), count(b"k"), count(b"l"), count(b"g"),
+                     count(b"c"), count(b"r"), count(b"o"), count(b"e")]
+        characters = classes.translate(None, b"_")
+        word_starts = (b"b" + characters.translate(_WORD_RUNS)).count(b"ba")
+        script_word_starts = (b"b" + characters.translate(_SCRIPT_WORD_RUNS)).count(b"ba")
+    # Letters are the most common class, so they are counted as the remainder
+    letters = len(classes) - spaces - digits - punctuation - newlines - other - sum(non_ascii)
+    return [
+        letters,
+        word_starts,
+        script_word_starts,
+        spaces,
+        (b"b" + classes.translate(_SPACE_RUNS)).count(b"b  "),
+        digits,
+        punctuation,
+        (b"b" + classes.translate(_PUNCTUATION_RUNS)).count(b"b."),
+        newlines,
+        *non_ascii,
+        1.0,
+    ]
+
+
+_FAMILY_MARKERS = (
+    ("deepseek", ("deepseek",)),
+    ("qwen", ("qwen", "qwq")),
+    ("llama", ("llama",)),
+    ("mistral", ("mistral", "pixtral", "codestral")),
+    ("gemini", ("gemini", "gemma")),
+)
+
+
+def model_family(model: Optional[str]) -> str:
+    """
+    Map a model identifier to its tokenizer family
+
+    Args:
+        model: OpenRouter model identifier, e.g. "qwen/qwq-32b:free"
+
+    Returns:
+        Family name, or "default" when unknown
+    """
+    if not model:
+        return "default"
+    name = model.lower()
+    for family, markers in _FAMILY_MARKERS:
+        if any(marker in name for marker in markers):
+            return family
+    return "default"
+
+
+class TokenEstimator:
+    """
+    Estimates token counts from character-class counts
+
+    Each family's tokenizer is approximated by a linear model over
+    `text_features`, fitted to real tokenizer output with
+    benchmarks/tokens.py. Families without a published tokenizer use the
+    coefficients fitted across all families.
+    """
+
+    def __init__(self, coefficients: Optional[Dict[str, Sequence[float]]] = None):
+        """
+        Initialize the estimator
+
+        Args:
+            coefficients: Per-family coefficients in `FEATURES` order
+                (defaults to `FAMILY_COEFFICIENTS`)
+        """
+        self.coefficients = dict(coefficients or FAMILY_COEFFICIENTS)
+
+    def _weights(self, model: Optional[str]) -> Sequence[float]:
+        family = model_family(model)
+        return self.coefficients.get(family) or self.coefficients["default"]
+
+    def estimate(self, text: str, model: Optional[str] = None) -> int:
+        """
+        Estimate the tokens of one string
+
+        Args:
+            text: Text to measure
+            model: Model identifier; selects the family calibration
+
+        Returns:
+            Estimated token count
+        """
+        if not text:
+            return 0
+        return _estimate(self._weights(model), text)
+
+    def estimate_many(self, texts: Iterable[str], model: Optional[str] = None) -> List[int]:
+        """
+        Estimate the tokens of many strings at once
+
+        Args:
+            texts: Texts to measure
+            model: Model identifier shared by all texts
+
+        Returns:
+            Estimated token counts, in input order
+        """
+        weights = self._weights(model)
+        estimate = _estimate
+        return [estimate(weights, text) if text else 0 for text in texts]
+
+
+_default_estimator = TokenEstimator()
+
+
+def estimate_tokens(text: str, model: Optional[str] = None) -> int:
+    """
+    Estimate the tokens of a string with the shared calibrated estimator
+
+    Args:
+        text: Text to measure
+        model: Model identifier; selects the family calibration
+
+    Returns:
+        Estimated token count
+    """
+    return _default_estimator.estimate(text, model)
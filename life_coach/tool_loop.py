@@ -0,0 +1,169 @@
+"""
+Budget tracking for the multi-round tool-calling loop
+"""
+
+import time
+from typing import Any, Dict, List, Optional
+
+
+DEFAULT_MAX_TOOL_ROUNDS = 3
+
+
+class DeadlineExceededError(RuntimeError):
+    """Raised instead of starting a model call once the request deadline has passed"""
+
+
+def usage_tokens(response: Any) -> int:
+    """
+    Get the total token usage reported on a completion response
+
+    Args:
+        response: Chat completion response
+
+    Returns:
+        Total tokens, or 0 when the provider did not report usage
+    """
+    total = getattr(getattr(response, "usage", None), "total_tokens", None)
+    return total if isinstance(total, int) else 0
+
+
+class ToolLoop:
+    """Tracks rounds, tokens and elapsed time for one request's tool loop"""
+
+    def __init__(self, max_rounds: int = DEFAULT_MAX_TOOL_ROUNDS,
+                 token_budget: Optional[int] = None, deadline: Optional[float] = None):
+        """
+        Initialize the loop budget
+
+        Args:
+            max_rounds: Maximum rounds of tool execution
+            token_budget: Maximum cumulative tokens across completions
+            deadline: Maximum wall-clock seconds for the whole loop
+        """
+        self.max_rounds = max_rounds
+        self.token_budget = token_budget
+        self.deadline = deadline
+
+        self.started = time.monotonic()
+        self.attempts = 0
+        self.rounds: List[Dict[str, Any]] = []
+        self.tokens_used = 0
+        self.best_answer: Optional[str] = None
+
+    @property
+    def tool_rounds(self) -> int:
+        """Number of rounds in which tools were executed"""
+        return sum(1 for r in self.rounds if "tool_seconds" in r)
+
+    def elapsed(self) -> float:
+        """Seconds since the loop started"""
+        return time.monotonic() - self.started
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left before the deadline, or None without one"""
+        if self.deadline is None:
+            return None
+        return self.deadline - self.elapsed()
+
+    def start_attempt(self) -> Optional[float]:
+        """
+        Account for a model call (or a retry of one) about to start
+
+        Once the deadline has passed only the loop's very first call is
+        still made, so the request has an answer to return.
+
+        Returns:
+            Seconds left before the deadline, or None without one
+
+        Raises:
+            DeadlineExceededError: The deadline has passed and a call was
+                already made
+        """
+        self.attempts += 1
+        remaining = self.remaining()
+        if remaining is not None and remaining <= 0 and self.attempts > 1:
+            raise DeadlineExceededError("Request deadline exceeded")
+        return remaining
+
+    def record_completion(self, response: Any, seconds: float) -> None:
+        """
+        Record a completion as the start of a new round
+
+        Args:
+            response: Chat completion response
+            seconds: Time the completion call took
+        """
+        message = response.choices[0].message
+        tokens = usage_tokens(response)
+        self.tokens_used += tokens
+        if message.content:
+            self.best_answer = message.content
+        self.rounds.append({
+            "round": len(self.rounds) + 1,
+            "completion_seconds": round(seconds, 4),
+            "tokens": tokens,
+            "tool_calls": len(message.tool_calls or [])
+        })
+
+    def record_tools(self, seconds: float, tools: Optional[List[Dict[str, Any]]] = None) -> None:
+        """
+        Record tool execution for the current round
+
+        Args:
+            seconds: Time spent running the round's tools
+            tools: Optional per-call timings from the tool runner
+        """
+        self.rounds[-1]["tool_seconds"] = round(seconds, 4)
+        if tools is not None:
+            self.rounds[-1]["tools"] = tools
+
+    def stop_reason(self) -> Optional[str]:
+        """
+        Check whether another round of tools may run
+
+        Returns:
+            "max_rounds", "token_budget" or "deadline" when a budget is spent,
+            otherwise None
+        """
+        if self.tool_rounds >= self.max_rounds:
+            return "max_rounds"
+        if self.token_budget is not None and self.tokens_used >= self.token_budget:
+            return "token_budget"
+        if self.deadline is not None and self.elapsed() >= self.deadline:
+            return "deadline"
+        return None
+
+    def partial_answer(self, reason: str) -> str:
+        """
+        Best answer available when the loop stops early
+
+        Args:
+            reason: Why the loop stopped
+
+        Returns:
+            The latest content the model produced, or a short note
+        """
+        if self.best_answer:
+            return self.best_answer
+        return (
+            f"Research stopped after {self.tool_rounds} tool round(s) "
+            f"({reason.replace('_', ' ')}) before a final answer was produced."
+        )
+
+    def summary(self, stop_reason: str) -> Dict[str, Any]:
+        """
+        Build the metadata entry for this loop
+
+        Args:
+            stop_reason: "complete" or the budget that ended the loop
+
+        Returns:
+            Dict with per-round timings, token usage and the stop reason
+        """
+        return {
+            "stop_reason": stop_reason,
+            "tool_rounds": self.tool_rounds,
+            "tokens_used": self.tokens_used,
+            "elapsed_seconds": round(self.elapsed(), 4),
+            "rounds": self.rounds
+        }
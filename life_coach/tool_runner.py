@@ -0,0 +1,224 @@
+"""
+Parallel execution of the tool calls in a single model turn
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Any, Dict, List, Optional, Tuple
+
+from .cache import ToolResultCache
+
+
+DEFAULT_TOOL_WORKERS = 8
+DEFAULT_TOOL_TIMEOUT = 60.0
+
+
+def tool_message(call: Any, content: str) -> Dict[str, Any]:
+    """
+    Build a tool result message for a call that produced no Toolhouse output
+
+    Args:
+        call: Tool call from the assistant message
+        content: Text to report back to the model
+
+    Returns:
+        OpenAI-style tool message
+    """
+    return {"role": "tool", "tool_call_id": call.id, "content": content}
+
+
+class ParallelToolRunner:
+    """Runs independent tool calls from one model turn concurrently"""
+
+    def __init__(self, th: Any, max_workers: int = DEFAULT_TOOL_WORKERS,
+                 tool_timeout: float = DEFAULT_TOOL_TIMEOUT,
+                 result_cache: Optional[ToolResultCache] = None):
+        """
+        Initialize the tool runner
+
+        Args:
+            th: Toolhouse client used to execute tools
+            max_workers: Maximum tool calls executed at the same time
+            tool_timeout: Seconds each tool call may take before it is reported as timed out
+            result_cache: Optional cache answering repeated calls to idempotent tools
+        """
+        self.th = th
+        self.max_workers = max_workers
+        self.tool_timeout = tool_timeout
+        self.result_cache = result_cache
+        self.logger = logging.getLogger("ParallelToolRunner")
+
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _pool(self) -> ThreadPoolExecutor:
+        # Long-lived so a hung tool never blocks the request on pool shutdown
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                    thread_name_prefix="research-tools")
+            return self._executor
+
+    @staticmethod
+    def _split(response: Any) -> Optional[List[Any]]:
+        """Split a multi-call response into one response per tool call"""
+        if not hasattr(response, "model_copy"):
+            return None
+        choice = response.choices[0]
+        return [
+            response.model_copy(update={"choices": [
+                choice.model_copy(update={
+                    "message": choice.message.model_copy(update={"tool_calls": [call]})
+                })
+            ]})
+            for call in choice.message.tool_calls
+        ]
+
+    def _units(self, response: Any, calls: List[Any]) -> List[Tuple[Any, List[Any]]]:
+        """Pair each response to execute with the calls it answers; one unit per call when splittable"""
+        single_responses = self._split(response) if len(calls) > 1 else None
+        if single_responses is None:
+            return [(response, calls)]
+        return [(single, [call]) for single, call in zip(single_responses, calls)]
+
+    def _run_one(self, response: Any) -> Tuple[List[Dict[str, Any]], bool]:
+        """Execute a response's tool calls; returns the messages and whether they came from the cache"""
+        calls = response.choices[0].message.tool_calls or []
+        if self.result_cache is None or len(calls) != 1:
+            return self.th.run_tools(response, append=False), False
+
+        call = calls[0]
+        name = getattr(call.function, "name", None)
+        arguments = getattr(call.function, "arguments", None)
+        if not self.result_cache.cacheable(name):
+            return self.th.run_tools(response, append=False), False
+        cached = self.result_cache.get(name, arguments, call.id)
+        if cached is not None:
+            return [cached], True
+        results = self.th.run_tools(response, append=False)
+        if len(results) == 1:
+            self.result_cache.set(name, arguments, results[0])
+        return results, False
+
+    def run(self, response: Any, report: Optional[Dict[str, Any]] = None) -> List[Any]:
+        """
+        Execute every tool call in a response and return the tool messages
+
+        Calls run concurrently; results are returned in the original call
+        order. A call that raises or exceeds the timeout is answered with an
+        explanatory tool message so the follow-up completion still gets a
+        result for every call id.
+
+        Args:
+            response: Chat completion whose message contains tool calls
+            report: Optional dict that receives per-call timings under "tools"
+
+        Returns:
+            Tool result messages
+        """
+        calls = response.choices[0].message.tool_calls or []
+        units = self._units(response, calls)
+
+        pool = self._pool()
+        turn_started = time.monotonic()
+        finished_at: Dict[int, float] = {}
+
+        def run_call(index: int, unit: Any) -> Tuple[List[Dict[str, Any]], bool]:
+            try:
+                return self._run_one(unit)
+            finally:
+                finished_at[index] = time.monotonic()
+
+        # Even a lone call runs on the pool, so the timeout applies to it too
+        futures = [pool.submit(run_call, i, unit) for i, (unit, _) in enumerate(units)]
+
+        results: List[Any] = []
+        outcomes = []
+        for index, ((_, unit_calls), future) in enumerate(zip(units, futures)):
+            # Calls beyond the worker count queue behind earlier ones, so each
+            # "wave" of workers gets its own timeout window.
+            deadline = turn_started + self.tool_timeout * (index // self.max_workers + 1)
+            try:
+                messages, cached = future.result(timeout=max(0.0, deadline - time.monotonic()))
+                results.extend(messages)
+                outcomes += [("cached" if cached else "ok", finished_at[index] - turn_started)] * len(unit_calls)
+            except FutureTimeoutError:
+                for call in unit_calls:
+                    self.logger.warning(f"Tool {call.function.name} timed out after {self.tool_timeout}s")
+                    results.append(tool_message(call, f"Tool timed out after {self.tool_timeout} seconds."))
+                    outcomes.append(("timeout", time.monotonic() - turn_started))
+            except Exception as e:
+                for call in unit_calls:
+                    self.logger.error(f"Tool {call.function.name} failed: {e}")
+                    results.append(tool_message(call, f"Tool failed: {type(e).__name__}: {e}"))
+                    outcomes.append(("error", time.monotonic() - turn_started))
+
+        self._report(report, calls, outcomes)
+        return results
+
+    async def arun(self, response: Any, report: Optional[Dict[str, Any]] = None) -> List[Any]:
+        """
+        Async version of `run`; tool calls run in the default executor
+
+        Args:
+            response: Chat completion whose message contains tool calls
+            report: Optional dict that receives per-call timings under "tools"
+
+        Returns:
+            Tool result messages
+        """
+        calls = response.choices[0].message.tool_calls or []
+
+        async def run_call(unit: Any, unit_calls: List[Any]):
+            started = time.perf_counter()
+            try:
+                messages, cached = await asyncio.wait_for(asyncio.to_thread(self._run_one, unit),
+                                                          timeout=self.tool_timeout)
+                return messages, [("cached" if cached else "ok", time.perf_counter() - started)] * len(unit_calls)
+            except asyncio.TimeoutError:
+                for call in unit_calls:
+                    self.logger.warning(f"Tool {call.function.name} timed out after {self.tool_timeout}s")
+                return ([tool_message(call, f"Tool timed out after {self.tool_timeout} seconds.")
+                         for call in unit_calls],
+                        [("timeout", time.perf_counter() - started)] * len(unit_calls))
+            except Exception as e:
+                for call in unit_calls:
+                    self.logger.error(f"Tool {call.function.name} failed: {e}")
+                return ([tool_message(call, f"Tool failed: {type(e).__name__}: {e}") for call in unit_calls],
+                        [("error", time.perf_counter() - started)] * len(unit_calls))
+
+        in_flight = asyncio.Semaphore(self.max_workers)
+
+        async def bounded(unit: Any, unit_calls: List[Any]):
+            async with in_flight:
+                return await run_call(unit, unit_calls)
+
+        completed = await asyncio.gather(*(bounded(unit, unit_calls)
+                                           for unit, unit_calls in self._units(response, calls)))
+
+        results: List[Any] = []
+        outcomes: List[Any] = []
+        for messages, unit_outcomes in completed:
+            results.extend(messages)
+            outcomes.extend(unit_outcomes)
+        self._report(report, calls, outcomes)
+        return results
+
+    @staticmethod
+    def _report(report: Optional[Dict[str, Any]], calls: List[Any], outcomes: List[Any]) -> None:
+        if report is None:
+            return
+        report["tools"] = [
+            {"name": getattr(call.function, "name", None), "status": status, "seconds": round(seconds, 4)}
+            for call, (status, seconds) in zip(calls, outcomes)
+        ]
+
+    def close(self) -> None:
+        """Release the worker threads without waiting for running tools"""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
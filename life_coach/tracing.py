@@ -0,0 +1,312 @@
+"""
+Tracing hooks: spans around every upstream call, with a JSONL span-tree exporter
+"""
+
+import contextvars
+import itertools
+import json
+import logging
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from .tool_loop import usage_tokens
+
+
+logger = logging.getLogger("Tracer")
+
+_span_ids = itertools.count(1)
+
+
+class Span:
+    """
+    One timed operation: a request, a completion attempt, a tool round, ...
+
+    `attributes` carries what the operation was about (model, task_type,
+    attempt, token usage, tool names); `status` is "ok" or "error".
+    Times are `time.perf_counter()` values; `start_time` is wall-clock.
+    """
+
+    __slots__ = ("name", "span_id", "parent_id", "trace_id", "start", "start_time", "end",
+                 "attributes", "status", "error", "_tracer", "_token")
+
+    def __init__(self, tracer: "Tracer", name: str, parent: Optional["Span"], attributes: Dict[str, Any]):
+        self.name = name
+        self.span_id = f"{next(_span_ids):x}"
+        self.parent_id = parent.span_id if parent is not None else None
+        self.trace_id = parent.trace_id if parent is not None else uuid.uuid4().hex
+        self.attributes = attributes
+        self.status = "ok"
+        self.error: Optional[str] = None
+        self.start_time = time.time()
+        self.start = time.perf_counter()
+        self.end: Optional[float] = None
+        self._tracer = tracer
+        self._token: Optional[contextvars.Token] = None
+
+    @property
+    def duration(self) -> Optional[float]:
+        """Seconds from start to end, or None while the span is open"""
+        return None if self.end is None else self.end - self.start
+
+    def set(self, **attributes: Any) -> None:
+        """Add or replace attributes"""
+        self.attributes.update(attributes)
+
+    def record_error(self, error: BaseException) -> None:
+        """Mark the span as failed"""
+        self.status = "error"
+        self.error = f"{type(error).__name__}: {error}"
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-friendly view of the span"""
+        data = {
+            "name": self.name,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "trace_id": self.trace_id,
+            "start_time": round(self.start_time, 6),
+            "duration_ms": round(self.duration * 1000, 3) if self.end is not None else None,
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+        if self.error:
+            data["error"] = self.error
+        return data
+
+    def __enter__(self) -> "Span":
+        self._token = self._tracer._current.set(self)
+        self._tracer._emit("on_start", self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.end = time.perf_counter()
+        if exc is not None and isinstance(exc, Exception):
+            self.record_error(exc)
+        try:
+            self._tracer._current.reset(self._token)
+        except ValueError:
+            # Ended in another context (e.g. a generator finished elsewhere)
+            pass
+        self._tracer._emit("on_end", self)
+
+
+class _NoopSpan:
+    """Stands in for a span when no hooks are registered"""
+
+    __slots__ = ()
+
+    def set(self, **attributes: Any) -> None:
+        pass
+
+    def record_error(self, error: BaseException) -> None:
+        pass
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class SpanHook:
+    """Base class for span hooks; override either method"""
+
+    def on_start(self, span: Span) -> None:
+        """Called when a span starts"""
+
+    def on_end(self, span: Span) -> None:
+        """Called when a span ends, with `duration`, `status` and final attributes set"""
+
+
+class CallbackHook(SpanHook):
+    """Adapts plain callables to a hook"""
+
+    def __init__(self, on_start: Optional[Callable[[Span], None]] = None,
+                 on_end: Optional[Callable[[Span], None]] = None):
+        if on_start is not None:
+            self.on_start = on_start  # type: ignore[method-assign]
+        if on_end is not None:
+            self.on_end = on_end  # type: ignore[method-assign]
+
+
+class Tracer:
+    """
+    Opens spans and hands them to the registered hooks
+
+    With no hooks registered, `span` returns a shared no-op object, so
+    instrumented code costs one attribute check and a method call.
+    Parent/child links follow the current span of the calling context
+    (threads started through `bind` and asyncio tasks inherit it).
+    """
+
+    def __init__(self, hooks: Optional[List[SpanHook]] = None):
+        """
+        Initialize the tracer
+
+        Args:
+            hooks: Hooks to register
+        """
+        self._hooks: tuple = tuple(hooks or ())
+        self._lock = threading.Lock()
+        self._current: contextvars.ContextVar = contextvars.ContextVar("current_span", default=None)
+
+    @property
+    def enabled(self) -> bool:
+        """Whether any hook is registered"""
+        return bool(self._hooks)
+
+    def add_hook(self, hook: Optional[SpanHook] = None,
+                 on_start: Optional[Callable[[Span], None]] = None,
+                 on_end: Optional[Callable[[Span], None]] = None) -> SpanHook:
+        """
+        Register a hook object, or a pair of callbacks
+
+        Args:
+            hook: Object with `on_start(span)` and/or `on_end(span)`
+            on_start: Callback for span starts (when `hook` is not given)
+            on_end: Callback for span ends (when `hook` is not given)
+
+        Returns:
+            The registered hook, for `remove_hook`
+        """
+        hook = hook or CallbackHook(on_start, on_end)
+        with self._lock:
+            self._hooks = self._hooks + (hook,)
+        return hook
+
+    def remove_hook(self, hook: SpanHook) -> None:
+        """Unregister a hook"""
+        with self._lock:
+            self._hooks = tuple(h for h in self._hooks if h is not hook)
+
+    def span(self, name: str, **attributes: Any) -> Any:
+        """
+        Open a span as a context manager
+
+        Args:
+            name: Operation name
+            **attributes: Initial attributes
+
+        Returns:
+            The span (a no-op stand-in when tracing is off)
+        """
+        if not self._hooks:
+            return NOOP_SPAN
+        return Span(self, name, self._current.get(), attributes)
+
+    def current(self) -> Optional[Span]:
+        """The innermost open span of the calling context"""
+        return self._current.get()
+
+    def bind(self, fn: Callable[..., Any]) -> Callable[..., Any]:
+        """
+        Make `fn` run under the calling context's current span, even on another thread
+
+        Args:
+            fn: Callable to hand to a thread pool
+
+        Returns:
+            `fn` itself when tracing is off, otherwise a wrapper
+        """
+        if not self._hooks:
+            return fn
+        context = contextvars.copy_context()
+        return lambda *args, **kwargs: context.run(fn, *args, **kwargs)
+
+    def _emit(self, method: str, span: Span) -> None:
+        for hook in self._hooks:
+            try:
+                getattr(hook, method)(span)
+            except Exception as e:
+                logger.warning(f"Tracing hook {type(hook).__name__}.{method} failed: {e}")
+
+
+def completion_attributes(response: Any) -> Dict[str, Any]:
+    """
+    Token usage and requested tools of a completion, as span attributes
+
+    Args:
+        response: Chat completion response
+
+    Returns:
+        Dict with prompt/completion/total tokens and tool call names, where known
+    """
+    usage = getattr(response, "usage", None)
+    attributes: Dict[str, Any] = {"total_tokens": usage_tokens(response)}
+    for field in ("prompt_tokens", "completion_tokens"):
+        value = getattr(usage, field, None)
+        if isinstance(value, int):
+            attributes[field] = value
+    try:
+        calls = response.choices[0].message.tool_calls or []
+        names = [call.function.name for call in calls]
+    except (AttributeError, IndexError, TypeError):
+        names = []
+    if names and all(isinstance(name, str) for name in names):
+        attributes["tool_calls"] = names
+    return attributes
+
+
+class JsonlSpanExporter(SpanHook):
+    """
+    Writes each finished trace as one JSON line: the root span with nested "children"
+
+    Spans are buffered per trace until the root ends. A span that ends
+    after its root (e.g. a hedge loser still winding down) is written on
+    its own line with `"late": true`.
+    """
+
+    def __init__(self, path: str):
+        """
+        Initialize the exporter
+
+        Args:
+            path: JSONL file; appended to
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._pending: Dict[str, List[Span]] = {}
+        self._lock = threading.Lock()
+        # Line-buffered, so each trace reaches the file as soon as it ends
+        self._file = open(self.path, "a", encoding="utf-8", buffering=1)
+
+    def on_end(self, span: Span) -> None:
+        with self._lock:
+            if span.parent_id is not None:
+                if span.trace_id in self._pending:
+                    self._pending[span.trace_id].append(span)
+                    return
+                line = {**span.to_dict(), "late": True}
+            else:
+                line = self._tree(span, self._pending.pop(span.trace_id, []))
+            self._write(line)
+
+    def on_start(self, span: Span) -> None:
+        if span.parent_id is None:
+            with self._lock:
+                self._pending.setdefault(span.trace_id, [])
+
+    @staticmethod
+    def _tree(root: Span, spans: List[Span]) -> Dict[str, Any]:
+        nodes = {span.span_id: {**span.to_dict(), "children": []} for span in spans}
+        tree = {**root.to_dict(), "children": []}
+        nodes[root.span_id] = tree
+        for span in sorted(spans, key=lambda s: s.start):
+            parent = nodes.get(span.parent_id, tree)
+            parent["children"].append(nodes[span.span_id])
+        return tree
+
+    def _write(self, line: Dict[str, Any]) -> None:
+        if not self._file.closed:
+            self._file.write(json.dumps(line, separators=(",", ":"), default=str) + "\n")
+
+    def close(self) -> None:
+        """Close the file; traces that end afterwards are dropped"""
+        with self._lock:
+            self._file.close()
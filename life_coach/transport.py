@@ -0,0 +1,309 @@
+"""
+Process-wide pooled HTTP transport shared by every assistant instance
+"""
+
+import asyncio
+import importlib
+import importlib.util
+import logging
+import threading
+import weakref
+from typing import Any, Callable, Dict, Optional
+
+from openai import DefaultAsyncHttpxClient, DefaultHttpxClient
+
+# Recent OpenAI SDKs ship their own httpx fork; transports must come from
+# the same module as the clients they are plugged into.
+httpx = importlib.import_module(DefaultHttpxClient.__bases__[0].__module__.split(".")[0])
+
+
+DEFAULT_MAX_CONNECTIONS = 100
+DEFAULT_MAX_KEEPALIVE = 20
+DEFAULT_KEEPALIVE_EXPIRY = 30.0
+DEFAULT_TIMEOUT = httpx.Timeout(600.0, connect=5.0)
+
+logger = logging.getLogger("HttpPool")
+
+
+class _ReleasingStream(httpx.SyncByteStream):
+    """Response body that frees its host slot once the body is closed"""
+
+    def __init__(self, stream: Any, release: Callable[[], None]):
+        self._stream = stream
+        self._release = release
+
+    def __iter__(self):
+        yield from self._stream
+
+    def close(self) -> None:
+        try:
+            self._stream.close()
+        finally:
+            self._release()
+
+
+class _AsyncReleasingStream(httpx.AsyncByteStream):
+    def __init__(self, stream: Any, release: Callable[[], None]):
+        self._stream = stream
+        self._release = release
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self) -> None:
+        try:
+            await self._stream.aclose()
+        finally:
+            self._release()
+
+
+def _once(fn: Callable[[], None]) -> Callable[[], None]:
+    done = threading.Event()
+
+    def call() -> None:
+        if not done.is_set():
+            done.set()
+            fn()
+    return call
+
+
+class HostLimitedTransport(httpx.BaseTransport):
+    """Caps concurrent connections per host; a slot is held until the response body closes"""
+
+    def __init__(self, inner: httpx.BaseTransport, per_host_limits: Dict[str, int]):
+        """
+        Initialize the transport
+
+        Args:
+            inner: Transport that actually sends requests
+            per_host_limits: Maximum concurrent requests per host name
+        """
+        self.inner = inner
+        self._slots = {host: threading.BoundedSemaphore(limit)
+                       for host, limit in per_host_limits.items()}
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        slot = self._slots.get(request.url.host)
+        if slot is None:
+            return self.inner.handle_request(request)
+
+        slot.acquire()
+        release = _once(slot.release)
+        try:
+            response = self.inner.handle_request(request)
+        except BaseException:
+            release()
+            raise
+        if isinstance(response.stream, httpx.ByteStream):
+            # Already in memory (e.g. a mock transport): nothing left to wait for
+            release()
+        else:
+            response.stream = _ReleasingStream(response.stream, release)
+        return response
+
+    def close(self) -> None:
+        self.inner.close()
+
+
+class AsyncHostLimitedTransport(httpx.AsyncBaseTransport):
+    """Async version of `HostLimitedTransport`"""
+
+    def __init__(self, inner: httpx.AsyncBaseTransport, per_host_limits: Dict[str, int]):
+        """
+        Initialize the transport
+
+        Args:
+            inner: Transport that actually sends requests
+            per_host_limits: Maximum concurrent requests per host name
+        """
+        self.inner = inner
+        self._slots = {host: asyncio.Semaphore(limit) for host, limit in per_host_limits.items()}
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        slot = self._slots.get(request.url.host)
+        if slot is None:
+            return await self.inner.handle_async_request(request)
+
+        await slot.acquire()
+        release = _once(slot.release)
+        try:
+            response = await self.inner.handle_async_request(request)
+        except BaseException:
+            release()
+            raise
+        if isinstance(response.stream, httpx.ByteStream):
+            release()
+        else:
+            response.stream = _AsyncReleasingStream(response.stream, release)
+        return response
+
+    async def aclose(self) -> None:
+        await self.inner.aclose()
+
+
+class LoopLocalAsyncTransport(httpx.AsyncBaseTransport):
+    """
+    Keeps one async connection pool per event loop
+
+    Async connections cannot outlive the loop that opened them, so a single
+    shared AsyncClient would break as soon as a second `asyncio.run` used
+    it. This transport builds a pool lazily for each running loop and drops
+    it when the loop is garbage collected.
+    """
+
+    def __init__(self, factory: Callable[[], httpx.AsyncBaseTransport]):
+        """
+        Initialize the transport
+
+        Args:
+            factory: Builds the transport used within one event loop
+        """
+        self.factory = factory
+        self._transports: "weakref.WeakKeyDictionary[Any, httpx.AsyncBaseTransport]" = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def _current(self) -> httpx.AsyncBaseTransport:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            transport = self._transports.get(loop)
+            if transport is None:
+                transport = self._transports[loop] = self.factory()
+            return transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        return await self._current().handle_async_request(request)
+
+    async def aclose(self) -> None:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            transport = self._transports.pop(loop, None)
+        if transport is not None:
+            await transport.aclose()
+
+
+class HttpPool:
+    """Keep-alive connection pools for the OpenRouter clients of every assistant"""
+
+    def __init__(self, max_connections: int = DEFAULT_MAX_CONNECTIONS,
+                 max_keepalive_connections: int = DEFAULT_MAX_KEEPALIVE,
+                 keepalive_expiry: float = DEFAULT_KEEPALIVE_EXPIRY,
+                 http2: bool = False, per_host_limits: Optional[Dict[str, int]] = None,
+                 timeout: httpx.Timeout = DEFAULT_TIMEOUT,
+                 transport: Optional[httpx.BaseTransport] = None,
+                 async_transport: Optional[httpx.AsyncBaseTransport] = None):
+        """
+        Initialize the pool settings; clients are created on first use
+
+        Args:
+            max_connections: Maximum open connections per pool
+            max_keepalive_connections: Idle connections kept for reuse
+            keepalive_expiry: Seconds an idle connection is kept
+            http2: Negotiate HTTP/2 (requires the optional `h2` package)
+            per_host_limits: Maximum concurrent requests per host name
+            timeout: Request timeout
+            transport: Custom sync transport (e.g. a local stand-in server or
+                httpx.MockTransport); replaces the pooled transport
+            async_transport: Custom async transport; replaces the pooled one
+        """
+        if http2 and importlib.util.find_spec("h2") is None:
+            logger.warning("HTTP/2 requested but the 'h2' package is not installed; using HTTP/1.1")
+            http2 = False
+
+        self.limits = httpx.Limits(max_connections=max_connections,
+                                   max_keepalive_connections=max_keepalive_connections,
+                                   keepalive_expiry=keepalive_expiry)
+        self.http2 = http2
+        self.per_host_limits = dict(per_host_limits or {})
+        self.timeout = timeout
+        self.transport = transport
+        self.async_transport = async_transport
+
+        self._client: Optional[httpx.Client] = None
+        self._async_client: Optional[httpx.AsyncClient] = None
+        self._lock = threading.Lock()
+
+    def _sync_transport(self) -> httpx.BaseTransport:
+        transport = self.transport or httpx.HTTPTransport(limits=self.limits, http2=self.http2)
+        if self.per_host_limits:
+            transport = HostLimitedTransport(transport, self.per_host_limits)
+        return transport
+
+    def _loop_transport(self) -> httpx.AsyncBaseTransport:
+        transport = self.async_transport or httpx.AsyncHTTPTransport(limits=self.limits, http2=self.http2)
+        if self.per_host_limits:
+            transport = AsyncHostLimitedTransport(transport, self.per_host_limits)
+        return transport
+
+    def client(self) -> httpx.Client:
+        """
+        Get the shared synchronous client
+
+        Returns:
+            httpx client suitable for `OpenAI(http_client=...)`
+        """
+        with self._lock:
+            if self._client is None:
+                self._client = DefaultHttpxClient(transport=self._sync_transport(),
+                                                  timeout=self.timeout)
+            return self._client
+
+    def async_client(self) -> httpx.AsyncClient:
+        """
+        Get the shared asynchronous client
+
+        Returns:
+            httpx async client suitable for `AsyncOpenAI(http_client=...)`
+        """
+        with self._lock:
+            if self._async_client is None:
+                transport = (self.async_transport if self.async_transport and not self.per_host_limits
+                             else LoopLocalAsyncTransport(self._loop_transport))
+                self._async_client = DefaultAsyncHttpxClient(transport=transport,
+                                                             timeout=self.timeout)
+            return self._async_client
+
+    def close(self) -> None:
+        """Close the synchronous pool; async pools close with their event loops"""
+        with self._lock:
+            client, self._client = self._client, None
+            self._async_client = None
+        if client is not None:
+            client.close()
+
+
+_shared_pool: Optional[HttpPool] = None
+_shared_lock = threading.Lock()
+
+
+def get_http_pool() -> HttpPool:
+    """
+    Get the process-wide pool, creating it with default settings if needed
+
+    Returns:
+        Shared HttpPool
+    """
+    global _shared_pool
+    with _shared_lock:
+        if _shared_pool is None:
+            _shared_pool = HttpPool()
+        return _shared_pool
+
+
+def configure_http_pool(**settings: Any) -> HttpPool:
+    """
+    Replace the process-wide pool; assistants created afterwards use the new one
+
+    The previous pool is left open for the assistants still using it.
+
+    Args:
+        **settings: Keyword arguments for `HttpPool`
+
+    Returns:
+        The new shared HttpPool
+    """
+    global _shared_pool
+    pool = HttpPool(**settings)
+    with _shared_lock:
+        _shared_pool = pool
+    return pool
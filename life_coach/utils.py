@@ -108,13 +108,15 @@ def format_response(content: str, metadata: Optional[Dict] = None) -> Dict[str,
     return response
 
 
-def calculate_usage_stats(requests_made: int, daily_limit: int = 100) -> Dict[str, Any]:
+def calculate_usage_stats(requests_made: int, daily_limit: int = 100,
+                          scheduler_stats: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
     """
     Calculate API usage statistics
     
     Args:
         requests_made: Number of requests made today
         daily_limit: Daily request limit
+        scheduler_stats: Optional `RateLimiter.stats()` to report queueing
         
     Returns:
         Usage statistics
@@ -122,13 +124,24 @@ def calculate_usage_stats(requests_made: int, daily_limit: int = 100) -> Dict[st
     percentage_used = (requests_made / daily_limit) * 100
     remaining = daily_limit - requests_made
     
-    return {
+    stats = {
         "requests_made": requests_made,
         "daily_limit": daily_limit,
         "remaining": remaining,
         "percentage_used": round(percentage_used, 2),
         "status": "good" if percentage_used < 80 else "warning" if percentage_used < 95 else "critical"
     }
+    
+    if scheduler_stats is not None:
+        stats.update({
+            "queue_depth": scheduler_stats.get("queue_depth", 0),
+            "max_queue_depth": scheduler_stats.get("max_queue_depth", 0),
+            "queued_requests": scheduler_stats.get("queued", 0),
+            "avg_wait_seconds": scheduler_stats.get("avg_wait_seconds", 0.0),
+            "max_wait_seconds": scheduler_stats.get("max_wait_seconds", 0.0)
+        })
+    
+    return stats
 
 
 def extract_action_items(text: str) -> list:
@@ -157,17 +170,20 @@ def extract_action_items(text: str) -> list:
     return action_items
 
 
-def estimate_tokens(text: str) -> int:
+def estimate_tokens(text: str, model: Optional[str] = None) -> int:
     """
-    Rough estimation of token count (1 token ≈ 4 characters)
+    Estimate the token count of text for a model's tokenizer family
     
     Args:
         text: Text to estimate tokens for
+        model: Model identifier; unknown or missing models use the
+            calibration pooled across families
         
     Returns:
         Estimated token count
     """
-    return len(text) // 4
+    from .tokens import estimate_tokens as estimate
+    return estimate(text, model)
 
 
 def sanitize_input(user_input: str, max_length: int = 4000) -> str:
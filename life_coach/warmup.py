@@ -0,0 +1,124 @@
+"""
+Background warm-up: pay connection and schema costs while the user is still at the menu
+"""
+
+import logging
+import socket
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+from urllib.parse import urlsplit
+
+
+WarmupStep = Tuple[str, Callable[[], Any]]
+
+
+def resolve_host(url: str) -> int:
+    """
+    Resolve a URL's host so the system resolver has it cached
+
+    Args:
+        url: URL whose host should be resolved
+
+    Returns:
+        Number of addresses found
+    """
+    parts = urlsplit(url)
+    port = parts.port or (443 if parts.scheme == "https" else 80)
+    return len(socket.getaddrinfo(parts.hostname, port, type=socket.SOCK_STREAM))
+
+
+class Warmup:
+    """
+    Runs warm-up steps one after another in a daemon thread
+
+    Steps are best effort: a failing step is logged and recorded, and the
+    remaining steps still run. Nothing waits for the warm-up unless
+    `wait` is called, so it never holds up the caller.
+    """
+
+    def __init__(self, steps: Sequence[WarmupStep]):
+        """
+        Initialize the warm-up
+
+        Args:
+            steps: (name, callable) pairs, run in order
+        """
+        self.steps = list(steps)
+        self.logger = logging.getLogger("Warmup")
+
+        self._results: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._started_at: Optional[float] = None
+        self._finished_at: Optional[float] = None
+
+    def start(self) -> "Warmup":
+        """
+        Start the background thread (once)
+
+        Returns:
+            The warm-up itself
+        """
+        with self._lock:
+            if self._thread is None:
+                self._started_at = time.perf_counter()
+                self._thread = threading.Thread(target=self._run, name="research-warmup", daemon=True)
+                self._thread.start()
+        return self
+
+    def _run(self) -> None:
+        try:
+            for name, step in self.steps:
+                started = time.perf_counter()
+                result: Dict[str, Any] = {"ok": True}
+                try:
+                    step()
+                except Exception as e:
+                    result = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+                    self.logger.warning(f"Warm-up step '{name}' failed: {e}")
+                result["seconds"] = round(time.perf_counter() - started, 4)
+                with self._lock:
+                    self._results[name] = result
+        finally:
+            self._finished_at = time.perf_counter()
+            self._done.set()
+
+    @property
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Block until the warm-up has finished
+
+        Args:
+            timeout: Maximum seconds to wait
+
+        Returns:
+            True if the warm-up finished
+        """
+        return self._done.wait(timeout)
+
+    def report(self) -> Dict[str, Any]:
+        """
+        Summarize the warm-up
+
+        Returns:
+            Dict with "state" (pending, running or done), per-step results
+            and, once finished, "total_seconds"
+        """
+        with self._lock:
+            steps: Dict[str, Dict[str, Any]] = {name: dict(result) for name, result in self._results.items()}
+            started = self._started_at
+
+        pending: List[str] = [name for name, _ in self.steps if name not in steps]
+        report: Dict[str, Any] = {
+            "state": "done" if self.done else ("running" if started is not None else "pending"),
+            "steps": steps,
+            "pending_steps": pending
+        }
+        if self.done and started is not None:
+            report["total_seconds"] = round(self._finished_at - started, 4)
+        return report
@@ -6,10 +6,15 @@ A personal AI research assistant that helps gather information, analyze data, an
 using Toolhouse and OpenRouter.
 """
 
+import argparse
 import os
 import sys
 from datetime import datetime
 from life_coach import ResearchAnalysisAssistant
+from life_coach.cache import ToolResultCache
+from life_coach.helpers import load_environment
+from life_coach.profiling import RequestProfiler
+from life_coach.tracing import JsonlSpanExporter, Tracer
 from life_coach.utils import validate_environment
 
 
@@ -46,6 +51,18 @@ def get_user_choice() -> str:
         print("Invalid choice. Please enter a number between 1 and 9.")
 
 
+def print_streamed_response(assistant: ResearchAnalysisAssistant, request: str,
+                            task_type: str = "general") -> dict:
+    """Print a response as it streams in and return the final result"""
+    stream = assistant.handle_request_stream(request, task_type)
+    while True:
+        try:
+            print(next(stream), end="", flush=True)
+        except StopIteration as done:
+            print()
+            return done.value
+
+
 def handle_topic_research(assistant: ResearchAnalysisAssistant):
     """Handle topic research"""
     print("🔍 Let's research a topic!")
@@ -180,13 +197,12 @@ def handle_comprehensive_research(assistant: ResearchAnalysisAssistant):
     print("This may take a moment as I use multiple research tools...")
     
     try:
-        result = assistant.comprehensive_research_project(project_description)
         print("📋 Comprehensive Research Report:")
         print("-" * 60)
-        print(result["content"])
+        result = print_streamed_response(assistant, project_description, "reasoning")
         print()
         print(f"⏰ Completed at: {result['timestamp']}")
-        print(f"📝 Words: {result['word_count']}")
+        print(f"📝 Words: {len(result['response'].split())}")
     except Exception as e:
         print(f"❌ Error during comprehensive research: {e}")
 
@@ -261,6 +277,26 @@ def handle_usage_stats(assistant: ResearchAnalysisAssistant):
             print(f"  {task.title()}: {model_name}")
         print()
         print(f"Available models: {len(stats['available_models'])}")
+
+        metrics = stats["metrics"]
+        counters = metrics["counters"]
+        print()
+        print(f"Errors: {counters['errors']}  Fallbacks: {counters['fallbacks']}  "
+              f"Cache hits: {counters['cache_hits']}  Tool cache hits: {counters['tool_cache_hits']}")
+        if metrics["stages"]:
+            print()
+            print(f"{'Stage':<18}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+            for stage, summary in metrics["stages"].items():
+                print(f"{stage:<18}{summary['count']:>7}{summary['p50_ms']:>10}"
+                      f"{summary['p95_ms']:>10}{summary['p99_ms']:>10}")
+
+        rate_limit = stats["rate_limit"]
+        if rate_limit:
+            print()
+            print(f"Daily quota: {rate_limit['requests_made']}/{rate_limit['daily_limit']} "
+                  f"({rate_limit['status']})  Queued calls: {rate_limit['queued_requests']}  "
+                  f"Queue depth: {rate_limit['queue_depth']} (max {rate_limit['max_queue_depth']})  "
+                  f"Wait: avg {rate_limit['avg_wait_seconds']}s, max {rate_limit['max_wait_seconds']}s")
     except Exception as e:
         print(f"❌ Error getting usage stats: {e}")
 
@@ -290,9 +326,71 @@ def handle_model_info(assistant: ResearchAnalysisAssistant):
         print(f"❌ Error getting model info: {e}")
 
 
-def main():
+def preference_weight(value: str) -> tuple:
+    """Parse a TASK=WEIGHT option"""
+    task, sep, weight = value.partition("=")
+    try:
+        if not sep or not task:
+            raise ValueError
+        return task.strip(), float(weight)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected TASK=WEIGHT, got {value!r}")
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="AI Research & Analysis Assistant")
+    parser.add_argument("--warmup", action="store_true",
+                        help="connect to OpenRouter and Toolhouse and fetch tools in the background "
+                             "while the menu is shown")
+    parser.add_argument("--warmup-ping", action="store_true",
+                        help="also send a one-token request to the default model during warm-up "
+                             "(implies --warmup)")
+    parser.add_argument("--tool-cache", metavar="PATH",
+                        help="cache web search and page results in this SQLite file across runs")
+    cassettes = parser.add_mutually_exclusive_group()
+    cassettes.add_argument("--record", metavar="PATH",
+                           help="record all OpenRouter and Toolhouse traffic to this cassette file")
+    cassettes.add_argument("--replay", metavar="PATH",
+                           help="answer from a recorded cassette instead of the network (no API keys needed)")
+    parser.add_argument("--replay-realtime", action="store_true",
+                        help="with --replay, wait as long as each recorded call took")
+    parser.add_argument("--metrics-file", metavar="PATH",
+                        help="keep request metrics in this file in Prometheus text format "
+                             "(e.g. for node_exporter's textfile collector)")
+    parser.add_argument("--trace", metavar="PATH",
+                        help="append a span tree of every request (model calls, retries, tools) "
+                             "to this JSONL file")
+    parser.add_argument("--profile", metavar="DIR",
+                        help="profile every request and write pstats and collapsed-stack (flamegraph) "
+                             "files per task type to this directory on exit")
+    parser.add_argument("--prefer", metavar="TASK=WEIGHT", type=preference_weight, action="append",
+                        default=[],
+                        help="pick the model for TASK with a bandit that learns from call outcomes; "
+                             "WEIGHT is how strongly the default model order is trusted (repeatable)")
+    parser.add_argument("--bandit-state", metavar="PATH",
+                        help="keep the bandit's statistics in this JSON file across runs")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
     """Main application loop"""
+    args = parse_args(argv)
+
+    cassette = None
+    if args.record or args.replay:
+        # Imported here so a plain start stays free of the HTTP stack until first use
+        from life_coach.cassette import Cassette
+    if args.record:
+        cassette = Cassette.record(args.record)
+    elif args.replay:
+        cassette = Cassette.replay(args.replay, realtime=args.replay_realtime)
+        # Replays never reach the services, so placeholder keys will do
+        os.environ.setdefault("OPENROUTER_API_KEY", "replay")
+        os.environ.setdefault("TOOLHOUSE_API_KEY", "replay")
+
     # Check environment first
+    load_environment()
     validation = validate_environment()
     if not validation["valid"]:
         print("❌ Setup Error!")
@@ -317,7 +415,17 @@ def main():
     
     # Initialize the research assistant
     try:
-        assistant = ResearchAnalysisAssistant()
+        tool_result_cache = ToolResultCache(db_path=args.tool_cache) if args.tool_cache else None
+        tracer = Tracer([JsonlSpanExporter(args.trace)]) if args.trace else None
+        profiler = RequestProfiler() if args.profile else None
+        assistant = ResearchAnalysisAssistant(warmup=args.warmup or args.warmup_ping,
+                                              warmup_ping=args.warmup_ping,
+                                              tool_result_cache=tool_result_cache,
+                                              cassette=cassette,
+                                              tracer=tracer,
+                                              profiler=profiler,
+                                              preference_weights=dict(args.prefer) or None,
+                                              bandit_state=args.bandit_state)
         print("✅ AI Research & Analysis Assistant initialized successfully!")
         print("📚 Make sure you've created 'research_assistant_tools' bundle with:")
         print("   • Web search")
@@ -332,35 +440,49 @@ def main():
         sys.exit(1)
     
     # Main interaction loop
-    while True:
-        print_menu()
-        choice = get_user_choice()
-        print()
+    try:
+        while True:
+            print_menu()
+            choice = get_user_choice()
+            print()
         
-        if choice == '1':
-            handle_topic_research(assistant)
-        elif choice == '2':
-            handle_data_analysis(assistant)
-        elif choice == '3':
-            handle_trend_tracking(assistant)
-        elif choice == '4':
-            handle_comprehensive_research(assistant)
-        elif choice == '5':
-            handle_store_preference(assistant)
-        elif choice == '6':
-            handle_recall_preferences(assistant)
-        elif choice == '7':
-            handle_usage_stats(assistant)
-        elif choice == '8':
-            handle_model_info(assistant)
-        elif choice == '9':
-            print("👋 Thanks for using AI Research & Analysis Assistant!")
-            print("Keep researching and stay curious! 🌟")
-            break
+            if choice == '1':
+                handle_topic_research(assistant)
+            elif choice == '2':
+                handle_data_analysis(assistant)
+            elif choice == '3':
+                handle_trend_tracking(assistant)
+            elif choice == '4':
+                handle_comprehensive_research(assistant)
+            elif choice == '5':
+                handle_store_preference(assistant)
+            elif choice == '6':
+                handle_recall_preferences(assistant)
+            elif choice == '7':
+                handle_usage_stats(assistant)
+            elif choice == '8':
+                handle_model_info(assistant)
+            elif choice == '9':
+                print("👋 Thanks for using AI Research & Analysis Assistant!")
+                print("Keep researching and stay curious! 🌟")
+                break
         
-        print()
-        input("Press Enter to continue...")
-        print("\n" + "="*70 + "\n")
+            if args.metrics_file:
+                assistant.metrics.write_prometheus(args.metrics_file)
+
+            print()
+            input("Press Enter to continue...")
+            print("\n" + "="*70 + "\n")
+    finally:
+        assistant.model_selector.bandit.close()
+        if args.metrics_file:
+            assistant.metrics.write_prometheus(args.metrics_file)
+        if cassette is not None and cassette.recording:
+            cassette.save()
+            print(f"📼 Recorded {cassette.stats()['interactions']} interactions to {args.record}")
+        if profiler is not None and profiler.scopes():
+            profiler.write(args.profile)
+            print(f"🔬 Wrote profiles for {', '.join(profiler.scopes())} to {args.profile}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,1002 @@
+"""
+Unit tests for ResearchAnalysisAssistant
+"""
+
+import asyncio
+import os
+import time
+import unittest
+from unittest.mock import AsyncMock, Mock, patch
+
+from openai.types.chat import ChatCompletionChunk
+
+from life_coach.cache import ResponseCache, ToolResultCache
+from life_coach.compaction import CompactionRule, ToolResultCompactor
+from life_coach.concurrency import AdaptiveConcurrencyLimiter
+from life_coach.coach import ResearchAnalysisAssistant
+from life_coach.hedging import HedgePolicy
+from life_coach.rate_limit import RateLimit, RateLimiter
+from life_coach.retry import RetryPolicy
+from life_coach.tracing import Tracer
+from life_coach.transport import HttpPool, httpx
+
+
+def make_chunk(content=None, tool_calls=None):
+    """Build a streamed chat completion chunk"""
+    return ChatCompletionChunk.model_validate({
+        "id": "chunk",
+        "object": "chat.completion.chunk",
+        "created": 0,
+        "model": "test-model",
+        "choices": [{
+            "index": 0,
+            "delta": {"content": content, "tool_calls": tool_calls},
+            "finish_reason": None
+        }]
+    })
+
+
+def make_response(content="Test response", tool_calls=None):
+    """Build a mock chat completion response"""
+    response = Mock()
+    response.choices = [Mock()]
+    response.choices[0].message.content = content
+    response.choices[0].message.tool_calls = tool_calls
+    return response
+
+
+class AssistantTestCase(unittest.TestCase):
+    """Base fixture that builds an assistant with mocked clients"""
+
+    def start_patch(self, *args, **kwargs):
+        """Start a patcher that stays active until the test finishes"""
+        patcher = patch(*args, **kwargs)
+        mock = patcher.start()
+        self.addCleanup(patcher.stop)
+        return mock
+
+    def setUp(self):
+        """Set up test fixtures with mocked dependencies"""
+        # Clients are built on first use, so the patches must outlive setUp
+        env_patcher = patch.dict(os.environ, {
+            'TOOLHOUSE_API_KEY': 'test_toolhouse_key',
+            'OPENROUTER_API_KEY': 'test_openrouter_key',
+            'USER_ID': 'test_user'
+        })
+        env_patcher.start()
+        self.addCleanup(env_patcher.stop)
+        mock_toolhouse = self.start_patch('life_coach.coach.Toolhouse')
+        mock_openai = self.start_patch('life_coach.coach.OpenAI')
+        mock_async_openai = self.start_patch('life_coach.coach.AsyncOpenAI')
+
+        self.mock_th = Mock()
+        self.mock_th.get_tools.return_value = [{"type": "function", "function": {"name": "test_tool"}}]
+        self.mock_th.run_tools.return_value = [{"role": "tool", "content": "test result"}]
+        mock_toolhouse.return_value = self.mock_th
+
+        self.mock_client = Mock()
+        self.mock_client.chat.completions.create.return_value = make_response()
+        mock_openai.return_value = self.mock_client
+
+        self.mock_async_client = Mock()
+        self.mock_async_client.chat.completions.create = AsyncMock(return_value=make_response())
+        mock_async_openai.return_value = self.mock_async_client
+
+        self.mock_save_log = self.start_patch('life_coach.coach.save_markdown_log')
+        self.mock_log_writer = self.start_patch('life_coach.coach.MarkdownLogWriter').return_value.__enter__.return_value
+
+        self.assistant = ResearchAnalysisAssistant()
+
+
+class TestHandleRequest(AssistantTestCase):
+    """Test cases for the synchronous request path"""
+
+    def test_handle_request_structure(self):
+        """Test that handle_request returns the formatted response shape"""
+        result = self.assistant.handle_request("Test request", "general")
+
+        self.assertEqual(result["response"], "Test response")
+        self.assertEqual(result["metadata"]["type"], "custom_request")
+        self.assertEqual(result["metadata"]["task_type"], "general")
+        self.assertIn("timestamp", result)
+        self.mock_save_log.assert_called_once()
+
+    def test_tool_calls_trigger_follow_up_completion(self):
+        """Test that tool calls are run and followed by a second completion"""
+        self.mock_client.chat.completions.create.side_effect = [
+            make_response(content=None, tool_calls=[Mock()]),
+            make_response("Final answer"),
+        ]
+
+        result = self.assistant.handle_request("Research something")
+
+        self.assertEqual(result["response"], "Final answer")
+        self.mock_th.run_tools.assert_called_once()
+        self.assertEqual(self.mock_client.chat.completions.create.call_count, 2)
+        self.mock_th.get_tools.assert_called_once()
+
+    def test_tool_schema_is_cached_across_requests(self):
+        """Test that the bundle schema is fetched once for many requests"""
+        self.assistant.handle_request("first")
+        self.assistant.handle_request("second")
+        self.assistant.invalidate_tool_cache()
+        self.assistant.handle_request("third")
+
+        self.assertEqual(self.mock_th.get_tools.call_count, 2)
+
+
+class TestToolLoop(AssistantTestCase):
+    """Test cases for the multi-round tool loop"""
+
+    def tool_turn(self, content=None, total_tokens=0):
+        """Build a response that asks for one more tool call"""
+        response = make_response(content=content, tool_calls=[Mock()])
+        response.usage.total_tokens = total_tokens
+        return response
+
+    def test_runs_multiple_tool_rounds(self):
+        """Test that follow-up tool calls are executed instead of dropped"""
+        self.mock_client.chat.completions.create.side_effect = [
+            self.tool_turn(), self.tool_turn(), make_response("Done")
+        ]
+
+        result = self.assistant.handle_request("Deep research")
+
+        loop = result["metadata"]["tool_loop"]
+        self.assertEqual(result["response"], "Done")
+        self.assertEqual(self.mock_th.run_tools.call_count, 2)
+        self.assertEqual(loop["stop_reason"], "complete")
+        self.assertEqual(loop["tool_rounds"], 2)
+        self.assertEqual(len(loop["rounds"]), 3)
+        self.assertIn("tool_seconds", loop["rounds"][0])
+
+    def test_max_rounds_returns_partial_answer(self):
+        """Test that the loop stops at max_rounds with the best answer so far"""
+        self.mock_client.chat.completions.create.side_effect = [
+            self.tool_turn(), self.tool_turn("Partial findings"), self.tool_turn()
+        ]
+
+        result = self.assistant.handle_request("Deep research", limits={"max_rounds": 2})
+
+        self.assertEqual(result["response"], "Partial findings")
+        self.assertEqual(result["metadata"]["tool_loop"]["stop_reason"], "max_rounds")
+        self.assertEqual(self.mock_th.run_tools.call_count, 2)
+
+    def test_token_budget_stops_loop(self):
+        """Test that the cumulative token budget ends the loop"""
+        self.mock_client.chat.completions.create.side_effect = [
+            self.tool_turn(total_tokens=600), self.tool_turn(total_tokens=600)
+        ]
+
+        result = self.assistant.handle_request("Deep research", limits={"token_budget": 1000})
+
+        loop = result["metadata"]["tool_loop"]
+        self.assertEqual(loop["stop_reason"], "token_budget")
+        self.assertEqual(loop["tokens_used"], 1200)
+        self.assertIn("stopped", result["response"])
+
+    def test_deadline_stops_loop(self):
+        """Test that an expired deadline ends the loop before running tools"""
+        self.mock_client.chat.completions.create.return_value = self.tool_turn("Draft")
+
+        result = self.assistant.handle_request("Deep research", limits={"deadline": 0})
+
+        self.assertEqual(result["metadata"]["tool_loop"]["stop_reason"], "deadline")
+        self.assertEqual(result["response"], "Draft")
+        self.mock_th.run_tools.assert_not_called()
+
+    def test_attempt_timeout_is_bounded_by_deadline(self):
+        """Test that each call's timeout ends no later than the request deadline"""
+        self.assistant.handle_request("Question", limits={"deadline": 30})
+
+        timeout = self.mock_client.chat.completions.create.call_args.kwargs["timeout"]
+        self.assertLessEqual(timeout.read, 30)
+        self.assertGreater(timeout.read, 29)
+        self.assertEqual(timeout.connect, 5.0)
+
+        self.assistant.handle_request("Question")
+        self.assertNotIn("timeout", self.mock_client.chat.completions.create.call_args.kwargs)
+
+
+class TestHedging(AssistantTestCase):
+    """Test cases for hedged first completions"""
+
+    def setUp(self):
+        """Enable hedging with a short delay"""
+        super().setUp()
+        self.assistant.hedge_policy = HedgePolicy(default_delay=0.05, min_delay=0.0)
+        self.addCleanup(self.assistant.hedge_policy.close)
+
+    def test_backup_wins_when_primary_is_slow(self):
+        """Test that a slow primary is raced by the next preferred model"""
+        primary = self.assistant.model_selector.select_model("general")
+
+        def create(**kwargs):
+            if kwargs["model"] == primary:
+                time.sleep(0.5)
+                return make_response("Primary answer")
+            return make_response("Backup answer")
+        self.mock_client.chat.completions.create.side_effect = create
+
+        result = self.assistant.handle_request("Question", "general")
+
+        hedge = result["metadata"]["hedge"]
+        self.assertEqual(result["response"], "Backup answer")
+        self.assertTrue(hedge["hedged"])
+        self.assertEqual(hedge["winner"], hedge["backup"])
+        self.assertEqual(result["metadata"]["model_used"], hedge["backup"])
+
+    def test_fast_primary_is_not_hedged(self):
+        """Test that no backup request is sent when the primary is fast"""
+        result = self.assistant.handle_request("Question", "general")
+
+        self.assertFalse(result["metadata"]["hedge"]["hedged"])
+        self.mock_client.chat.completions.create.assert_called_once()
+
+
+class TestResponseCaching(AssistantTestCase):
+    """Test cases for the opt-in response cache"""
+
+    def setUp(self):
+        """Attach an in-memory response cache to the assistant"""
+        super().setUp()
+        self.assistant.response_cache = ResponseCache()
+
+    def test_repeated_prompt_served_from_cache(self):
+        """Test that a repeated prompt does not call the model again"""
+        first = self.assistant.handle_request("What is AI?")
+        second = self.assistant.handle_request("  What is   AI? ")
+
+        self.assertFalse(first["metadata"]["cached"])
+        self.assertTrue(second["metadata"]["cached"])
+        self.assertEqual(second["response"], "Test response")
+        self.mock_client.chat.completions.create.assert_called_once()
+
+    def test_deadline_stopped_answer_is_not_cached(self):
+        """Test that a draft cut off by the deadline is not served as a cache hit"""
+        self.mock_client.chat.completions.create.return_value = make_response(
+            content="Draft", tool_calls=[Mock()]
+        )
+        first = self.assistant.handle_request("What is AI?", limits={"deadline": 0})
+        self.assertEqual(first["metadata"]["tool_loop"]["stop_reason"], "deadline")
+
+        self.mock_client.chat.completions.create.return_value = make_response("Full answer")
+        second = self.assistant.handle_request("What is AI?")
+
+        self.assertFalse(second["metadata"]["cached"])
+        self.assertEqual(second["response"], "Full answer")
+        self.assertEqual(self.assistant.response_cache.stats()["writes"], 1)
+
+    def test_fallback_answer_is_not_served_for_primary(self):
+        """Test that a fallback model's answer is cached under that model only"""
+        self.mock_client.chat.completions.create.side_effect = [
+            RuntimeError("primary down"), make_response("Fallback answer")
+        ]
+        metadata = self.assistant.handle_request("What is AI?")["metadata"]
+
+        def cached_for(model):
+            return self.assistant.response_cache.get(self.assistant._response_cache_key("What is AI?", model, False))
+
+        self.assertNotEqual(metadata["fallback_model"], metadata["model_used"])
+        self.assertIsNone(cached_for(metadata["model_used"]))
+        self.assertEqual(cached_for(metadata["fallback_model"]), "Fallback answer")
+
+    def test_bypass_flag_skips_cache(self):
+        """Test that bypass_cache forces a fresh completion"""
+        self.assistant.handle_request("What is AI?")
+        result = self.assistant.handle_request("What is AI?", bypass_cache=True)
+
+        self.assertFalse(result["metadata"]["cached"])
+        self.assertEqual(self.mock_client.chat.completions.create.call_count, 2)
+
+    def test_errors_are_not_cached(self):
+        """Test that failed requests are retried on the next call"""
+        self.mock_client.chat.completions.create.side_effect = RuntimeError("down")
+        self.assistant.handle_request("What is AI?")
+
+        self.assertEqual(self.assistant.response_cache.stats()["writes"], 0)
+
+
+class TestStreaming(AssistantTestCase):
+    """Test cases for handle_request_stream"""
+
+    def consume(self, stream):
+        """Drain a stream, returning the deltas and the final result"""
+        deltas = []
+        while True:
+            try:
+                deltas.append(next(stream))
+            except StopIteration as done:
+                return deltas, done.value
+
+    def test_deltas_are_yielded_and_logged(self):
+        """Test that content deltas are yielded and written as they arrive"""
+        self.mock_client.chat.completions.create.return_value = iter([
+            make_chunk("Hello"), make_chunk(", "), make_chunk("world")
+        ])
+
+        deltas, result = self.consume(self.assistant.handle_request_stream("Hi"))
+
+        self.assertEqual(deltas, ["Hello", ", ", "world"])
+        self.assertEqual(result["response"], "Hello, world")
+        self.assertTrue(result["metadata"]["streamed"])
+        self.assertEqual(self.mock_log_writer.write.call_count, 3)
+
+    def test_tool_calls_run_mid_stream(self):
+        """Test that streamed tool-call deltas are assembled and executed"""
+        self.mock_client.chat.completions.create.side_effect = [
+            iter([
+                make_chunk(tool_calls=[{"index": 0, "id": "call_1", "type": "function",
+                                        "function": {"name": "web_search", "arguments": '{"q"'}}]),
+                make_chunk(tool_calls=[{"index": 0, "function": {"arguments": ': "ai"}'}}]),
+            ]),
+            iter([make_chunk("Found it")]),
+        ]
+
+        deltas, result = self.consume(self.assistant.handle_request_stream("Search"))
+
+        self.assertEqual(deltas, ["Found it"])
+        tool_response = self.mock_th.run_tools.call_args.args[0]
+        tool_call = tool_response.choices[0].message.tool_calls[0]
+        self.assertEqual(tool_call.function.name, "web_search")
+        self.assertEqual(tool_call.function.arguments, '{"q": "ai"}')
+
+    def test_fallback_only_before_first_delta(self):
+        """Test that the fallback model streams when the primary fails up front"""
+        self.mock_client.chat.completions.create.side_effect = [
+            RuntimeError("primary down"),
+            iter([make_chunk("Fallback")]),
+        ]
+
+        deltas, result = self.consume(self.assistant.handle_request_stream("Hi"))
+
+        self.assertEqual(deltas, ["Fallback"])
+        self.assertNotIn("error", result["metadata"])
+
+    def test_stream_holds_its_slot_until_finished(self):
+        """Test that a streamed call is settled when the stream ends, not when it opens"""
+        limiter = self.assistant.concurrency_limiter = AdaptiveConcurrencyLimiter(initial_limit=4)
+        self.mock_client.chat.completions.create.return_value = iter([make_chunk("Hello"), make_chunk("!")])
+
+        stream = self.assistant.handle_request_stream("Hi", "general")
+        self.assertEqual(next(stream), "Hello")
+        model = self.mock_client.chat.completions.create.call_args.kwargs["model"]
+        self.assertEqual(limiter.snapshot()[model]["in_flight"], 1)
+        self.assertEqual(self.assistant.model_selector.get_health()[model]["successes"], 0)
+
+        self.consume(stream)
+        self.assertEqual(limiter.snapshot()[model]["in_flight"], 0)
+        self.assertEqual(self.assistant.model_selector.get_health()[model]["successes"], 1)
+
+    def test_failure_mid_stream_is_recorded(self):
+        """Test that a stream that breaks after opening counts as a failed call"""
+        limiter = self.assistant.concurrency_limiter = AdaptiveConcurrencyLimiter(initial_limit=4)
+
+        def broken_stream():
+            yield make_chunk("Hel")
+            raise RuntimeError("connection reset")
+
+        self.mock_client.chat.completions.create.return_value = broken_stream()
+
+        deltas, result = self.consume(self.assistant.handle_request_stream("Hi", "general"))
+
+        model = result["metadata"]["model_used"]
+        self.assertEqual(deltas[0], "Hel")
+        self.assertIn("connection reset", result["metadata"]["error"])
+        self.assertEqual(limiter.snapshot()[model]["in_flight"], 0)
+        health = self.assistant.model_selector.get_health()[model]
+        self.assertEqual((health["successes"], health["failures"]), (0, 1))
+
+    def test_async_stream_is_settled_at_the_end(self):
+        """Test that _acomplete settles a streamed call once it is read"""
+        limiter = self.assistant.concurrency_limiter = AdaptiveConcurrencyLimiter(initial_limit=4)
+
+        async def chunks():
+            yield make_chunk("Hi")
+
+        self.mock_async_client.chat.completions.create = AsyncMock(return_value=chunks())
+
+        async def run():
+            stream = await self.assistant._acomplete("model/a", "general", messages=[], stream=True)
+            self.assertEqual(limiter.snapshot()["model/a"]["in_flight"], 1)
+            return [chunk async for chunk in stream]
+
+        self.assertEqual(len(asyncio.run(run())), 1)
+        self.assertEqual(limiter.snapshot()["model/a"]["in_flight"], 0)
+        self.assertEqual(self.assistant.model_selector.get_health()["model/a"]["successes"], 1)
+
+
+class TestRetries(AssistantTestCase):
+    """Test cases for retrying transient errors before falling back"""
+
+    def setUp(self):
+        """Attach a retry policy that does not really sleep"""
+        super().setUp()
+        self.sleeps = []
+        self.assistant.retry_policy = RetryPolicy(sleep=self.sleeps.append)
+
+    def test_no_retry_or_fallback_after_deadline(self):
+        """Test that a call that runs past the deadline is not retried on any model"""
+        def slow_failure(**kwargs):
+            time.sleep(0.06)
+            raise RuntimeError("HTTP 503 upstream")
+
+        self.mock_client.chat.completions.create.side_effect = slow_failure
+
+        result = self.assistant.handle_request("Question", limits={"deadline": 0.05})
+
+        self.assertEqual(self.mock_client.chat.completions.create.call_count, 1)
+        self.assertEqual(result["metadata"]["tool_loop"]["stop_reason"], "deadline")
+        self.assertNotIn("fallback_model", result["metadata"])
+        self.assertIn("deadline", result["response"])
+
+    def test_transient_error_is_retried_on_same_model(self):
+        """Test that a 503 is retried instead of switching models"""
+        self.mock_client.chat.completions.create.side_effect = [
+            RuntimeError("HTTP 503 upstream"), make_response("Recovered")
+        ]
+
+        result = self.assistant.handle_request("Question", "general")
+
+        self.assertEqual(result["response"], "Recovered")
+        self.assertEqual(result["metadata"]["attempts"], 2)
+        self.assertEqual(len(result["metadata"]["retries"]), 1)
+        self.assertNotIn("fallback_model", result["metadata"])
+        self.assertEqual(len(self.sleeps), 1)
+
+    def test_fallback_runs_the_tool_loop(self):
+        """Test that a non-retryable error falls back to a model that still executes tools"""
+        self.mock_client.chat.completions.create.side_effect = [
+            ValueError("bad request"),
+            make_response(content=None, tool_calls=[Mock()]),
+            make_response("Answer with tools")
+        ]
+
+        result = self.assistant.handle_request("Question", "general")
+
+        self.assertEqual(result["response"], "Answer with tools")
+        self.assertIn("fallback_model", result["metadata"])
+        self.assertEqual(result["metadata"]["attempts"], 3)
+        self.mock_th.run_tools.assert_called_once()
+        self.assertEqual(self.sleeps, [])
+
+    def test_attempts_recorded_without_policy(self):
+        """Test that attempt counts are reported even when retries are off"""
+        self.assistant.retry_policy = None
+        result = self.assistant.handle_request("Question", "general")
+        self.assertEqual(result["metadata"]["attempts"], 1)
+
+
+class TestRetryUpstreamHits(unittest.TestCase):
+    """Test cases for retries as seen by the server"""
+
+    def setUp(self):
+        """Build an assistant on the real SDK against an upstream that always fails"""
+        env_patcher = patch.dict(os.environ, {'TOOLHOUSE_API_KEY': 'test', 'OPENROUTER_API_KEY': 'test'})
+        env_patcher.start()
+        self.addCleanup(env_patcher.stop)
+        for target in ('life_coach.coach.Toolhouse', 'life_coach.coach.save_markdown_log'):
+            patcher = patch(target)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.hits = 0
+
+        def handler(request):
+            self.hits += 1
+            return httpx.Response(503, json={"error": {"message": "overloaded"}})
+
+        transport = httpx.MockTransport(handler)
+        self.assistant = ResearchAnalysisAssistant(
+            http_pool=HttpPool(transport=transport, async_transport=transport),
+            retry_policy=RetryPolicy(max_attempts=2, sleep=lambda seconds: None, base_delay=0.0)
+        )
+        self.assistant.tool_cache.get = Mock(return_value=[])
+
+    def test_each_attempt_is_one_request(self):
+        """Test that the SDK does not retry underneath the retry policy"""
+        result = self.assistant.handle_request("Question", "general")
+
+        self.assertIn("error", result["metadata"])
+        self.assertEqual(self.hits, result["metadata"]["attempts"])
+        self.assertEqual(self.hits, 4)
+
+    def test_each_async_attempt_is_one_request(self):
+        """Test the same for the async client"""
+        result = asyncio.run(self.assistant.ahandle_request("Question", "general"))
+
+        self.assertEqual(self.hits, result["metadata"]["attempts"])
+        self.assertEqual(self.hits, 4)
+
+
+class TestModelHealth(AssistantTestCase):
+    """Test cases for feeding call outcomes into model health"""
+
+    def test_calls_feed_health_and_fallback_uses_task_preferences(self):
+        """Test that failures are recorded and the fallback stays within the task's list"""
+        self.mock_client.chat.completions.create.side_effect = [
+            RuntimeError("HTTP 503 upstream"), make_response("Fallback answer")
+        ]
+
+        result = self.assistant.handle_request("Question", "reasoning")
+
+        preferences = self.assistant.model_selector.task_preferences["reasoning"]
+        health = self.assistant.get_model_info()["model_health"]
+        self.assertEqual(result["metadata"]["fallback_model"], preferences[1])
+        self.assertEqual(health[preferences[0]]["failures"], 1)
+        self.assertEqual(health[preferences[1]]["successes"], 1)
+
+    def test_probe_already_taken_fails_over(self):
+        """Test that a model whose half-open probe is taken is not called"""
+        preferences = self.assistant.model_selector.task_preferences["reasoning"]
+        self.assistant.model_selector.try_acquire = lambda model: model != preferences[0]
+        self.mock_client.chat.completions.create.return_value = make_response("Fallback answer")
+
+        result = self.assistant.handle_request("Question", "reasoning")
+
+        self.assertEqual(result["response"], "Fallback answer")
+        self.assertEqual(result["metadata"]["fallback_model"], preferences[1])
+        self.assertEqual(self.mock_client.chat.completions.create.call_count, 1)
+        self.assertEqual(self.mock_client.chat.completions.create.call_args.kwargs["model"], preferences[1])
+
+
+class TestRateLimiting(AssistantTestCase):
+    """Test cases for queueing calls behind the rate limiter"""
+
+    def test_calls_over_quota_are_queued_not_failed(self):
+        """Test that a request over the model's quota waits and then succeeds"""
+        sleeps = []
+        self.assistant.rate_limiter = RateLimiter(
+            default_model_limit=RateLimit(per_minute=1), key_limit=RateLimit(),
+            sleep=sleeps.append, clock=lambda: 0.0 + sum(sleeps)
+        )
+
+        first = self.assistant.handle_request("First", "general")
+        second = self.assistant.handle_request("Second", "general")
+
+        self.assertEqual(second["response"], "Test response")
+        self.assertNotIn("error", second["metadata"])
+        self.assertEqual(first["metadata"]["model_used"], second["metadata"]["model_used"])
+        self.assertGreater(sum(sleeps), 0)
+        self.assertEqual(self.assistant.rate_limiter.stats()["queued"], 1)
+
+        usage = self.assistant.get_usage_stats()["rate_limit"]
+        self.assertEqual(usage["requests_made"], 2)
+        self.assertEqual(usage["daily_limit"], 50)
+        self.assertEqual(usage["queued_requests"], 1)
+        self.assertEqual(usage["max_queue_depth"], 1)
+        self.assertGreater(usage["max_wait_seconds"], 0)
+
+    def test_queueing_is_bounded_by_deadline(self):
+        """Test that a request stops at its deadline instead of queueing past it"""
+        sleeps = []
+        self.assistant.rate_limiter = RateLimiter(
+            default_model_limit=RateLimit(per_minute=1), key_limit=RateLimit(),
+            sleep=sleeps.append, clock=lambda: 0.0 + sum(sleeps)
+        )
+        self.assistant.handle_request("First", "general")
+
+        result = self.assistant.handle_request("Second", "general", limits={"deadline": 5})
+
+        self.assertEqual(result["metadata"]["tool_loop"]["stop_reason"], "deadline")
+        self.assertEqual(sleeps, [])
+        self.assertEqual(self.mock_client.chat.completions.create.call_count, 1)
+
+    def test_usage_stats_without_limiter(self):
+        """Test that usage stats report no rate limit when none is configured"""
+        self.assertIsNone(self.assistant.get_usage_stats()["rate_limit"])
+
+
+class TestAdaptiveConcurrency(AssistantTestCase):
+    """Test cases for the per-model adaptive concurrency limit"""
+
+    def test_overload_cuts_limit_and_is_inspectable(self):
+        """Test that a 429 from the model lowers its limit and shows in get_model_info"""
+        self.assistant.concurrency_limiter = AdaptiveConcurrencyLimiter(initial_limit=4)
+        self.mock_client.chat.completions.create.side_effect = [
+            RuntimeError("HTTP 429 Too Many Requests"), make_response("Fallback answer")
+        ]
+
+        result = self.assistant.handle_request("Question", "general")
+
+        model = result["metadata"]["model_used"]
+        info = self.assistant.get_model_info()["concurrency"]
+        self.assertEqual(info["limits"][model]["limit"], 2)
+        self.assertEqual(info["limits"][model]["in_flight"], 0)
+        self.assertEqual(info["history"][-1]["reason"], "rate_limited")
+
+
+class TestPromptBudget(AssistantTestCase):
+    """Test cases for context-window budgeting"""
+
+    def test_small_request_keeps_model(self):
+        """Test that an ordinary request is measured but not changed"""
+        result = self.assistant.handle_request("Test request", "fast")
+        budget = result["metadata"]["prompt_budget"]
+        self.assertEqual(budget["actions"], [])
+        self.assertGreater(budget["tokens"]["user"], 0)
+        self.assertEqual(result["metadata"]["model_used"], budget["model"])
+
+    def test_oversized_request_is_rerouted(self):
+        """Test that a request too large for the model goes to a larger window"""
+        small = self.assistant.model_selector.select_model("fast")
+        result = self.assistant.handle_request("word " * 40_000, "fast")
+
+        model = self.mock_client.chat.completions.create.call_args.kwargs["model"]
+        self.assertNotEqual(model, small)
+        self.assertEqual(result["metadata"]["model_used"], model)
+        self.assertEqual(result["metadata"]["prompt_budget"]["actions"][-1]["action"], "reroute")
+
+
+class TestToolCompaction(AssistantTestCase):
+    """Test cases for compacting tool output before the follow-up call"""
+
+    PAGE = "<html><script>track();</script><p>Fact: 42 &amp; counting.</p></html>"
+
+    def tool_turn(self):
+        """Build a response that calls the web_search tool"""
+        tool_call = Mock(id="call_1")
+        tool_call.function.name = "web_search"
+        return make_response(content=None, tool_calls=[tool_call])
+
+    def test_follow_up_gets_compacted_results(self):
+        """Test that the follow-up completion sees stripped output and metadata has sizes"""
+        self.mock_th.run_tools.return_value = [{"role": "tool", "tool_call_id": "call_1", "content": self.PAGE}]
+        self.mock_client.chat.completions.create.side_effect = [self.tool_turn(), make_response("Done")]
+
+        result = self.assistant.handle_request("Research something")
+
+        follow_up = self.mock_client.chat.completions.create.call_args.kwargs["messages"]
+        self.assertEqual(follow_up[-1], {"role": "tool", "tool_call_id": "call_1",
+                                         "content": "Fact: 42 & counting."})
+        compaction = result["metadata"]["tool_compaction"]
+        self.assertEqual(compaction["bytes_before"], len(self.PAGE))
+        self.assertEqual(compaction["bytes_after"], len("Fact: 42 & counting."))
+        self.assertLess(compaction["tokens_after"], compaction["tokens_before"])
+
+    def test_long_results_are_summarized_by_fast_model(self):
+        """Test that a tool configured for summaries goes through the fast model"""
+        self.assistant.tool_compactor = ToolResultCompactor(
+            rules={"web_search": CompactionRule(summarize_over=50)}
+        )
+        self.mock_th.run_tools.return_value = [
+            {"role": "tool", "tool_call_id": "call_1", "content": "long finding " * 20}
+        ]
+        self.mock_client.chat.completions.create.side_effect = [
+            self.tool_turn(), make_response("Short finding"), make_response("Done")
+        ]
+
+        result = self.assistant.handle_request("Research something")
+
+        calls = self.mock_client.chat.completions.create.call_args_list
+        self.assertEqual(calls[1].kwargs["model"], self.assistant.model_selector.select_model("fast"))
+        self.assertEqual(calls[2].kwargs["messages"][-1]["content"], "Short finding")
+        self.assertEqual(result["metadata"]["tool_compaction"]["summarized"], 1)
+
+
+class TestToolResultCaching(AssistantTestCase):
+    """Test cases for reusing idempotent tool results across requests"""
+
+    def search_turn(self, call_id):
+        """Build a response that calls web_search"""
+        tool_call = Mock(id=call_id)
+        tool_call.function.name = "web_search"
+        tool_call.function.arguments = '{"query": "solar output"}'
+        return make_response(content=None, tool_calls=[tool_call])
+
+    def test_repeated_search_is_served_from_cache(self):
+        """Test that a second request reuses the search result under its own call id"""
+        assistant = ResearchAnalysisAssistant(tool_result_cache=ToolResultCache())
+        self.mock_th.run_tools.return_value = [
+            {"role": "tool", "tool_call_id": "call_1", "content": "42 GWh"}
+        ]
+        self.mock_client.chat.completions.create.side_effect = [
+            self.search_turn("call_1"), make_response("First"),
+            self.search_turn("call_2"), make_response("Second"),
+        ]
+
+        assistant.handle_request("How much solar?")
+        assistant.handle_request("How much solar, again?")
+
+        self.mock_th.run_tools.assert_called_once()
+        follow_up = self.mock_client.chat.completions.create.call_args.kwargs["messages"]
+        self.assertEqual(follow_up[-1], {"role": "tool", "tool_call_id": "call_2", "content": "42 GWh"})
+        self.assertEqual(assistant.get_model_info()["tool_result_cache"]["hits"], 1)
+
+
+class TestMetrics(AssistantTestCase):
+    """Test cases for per-stage timings and counters"""
+
+    def test_stages_are_timed(self):
+        """Test that a request with a tool round records every stage it passed"""
+        self.mock_client.chat.completions.create.side_effect = [
+            make_response(content=None, tool_calls=[Mock()]),
+            make_response("Final answer"),
+        ]
+
+        self.assistant.handle_request("Research something", "fast")
+
+        stages = self.assistant.get_usage_stats()["metrics"]["stages"]
+        for stage in ("model_selection", "first_completion", "tool_execution", "follow_up", "log_write"):
+            self.assertEqual(stages[stage]["count"], 1, stage)
+        self.assertNotIn("fallback", stages)
+        self.assertEqual(list(stages["first_completion"]["by_task"]), ["fast"])
+        self.assertIsNotNone(stages["follow_up"]["p99_ms"])
+
+    def test_fallback_and_errors_are_counted(self):
+        """Test that failed completions, the fallback and the final error are counted"""
+        self.mock_client.chat.completions.create.side_effect = Exception("API Error")
+
+        self.assistant.handle_request("Test request")
+
+        metrics = self.assistant.get_usage_stats()["metrics"]
+        self.assertEqual(metrics["counters"]["completion_errors"], 2)
+        self.assertEqual(metrics["counters"]["fallbacks"], 1)
+        self.assertEqual(metrics["counters"]["errors"], 1)
+        self.assertEqual(metrics["stages"]["fallback"]["count"], 1)
+
+    def test_cache_hits_are_counted(self):
+        """Test that answers served from the response cache are counted"""
+        assistant = ResearchAnalysisAssistant(response_cache=ResponseCache())
+        assistant.handle_request("Same question")
+        assistant.handle_request("Same question")
+
+        self.assertEqual(assistant.metrics.count("cache_hits"), 1)
+        self.assertEqual(assistant.metrics.count("requests"), 2)
+
+    def test_stream_log_writes_are_timed(self):
+        """Test that the streaming path times its log writes"""
+        self.mock_client.chat.completions.create.return_value = iter([make_chunk("Hi")])
+
+        list(self.assistant.handle_request_stream("Hello"))
+
+        self.assertEqual(self.assistant.metrics.snapshot()["stages"]["log_write"]["count"], 1)
+
+    def test_usage_stats_shape(self):
+        """Test the keys the CLI's usage screen reads"""
+        stats = self.assistant.get_usage_stats()
+
+        for key in ("requests_made_this_session", "bundle_name", "timezone_offset",
+                    "current_model_preferences", "available_models", "metrics"):
+            self.assertIn(key, stats)
+        self.assertIn("# TYPE research_assistant_stage_duration_seconds histogram",
+                      self.assistant.prometheus_metrics())
+
+    def test_usage_stats_do_not_sample_models(self):
+        """Test that the stats and info screens report without drawing from the bandit"""
+        selector = self.assistant.model_selector
+        selector.preference_weights["general"] = 1.0
+        with patch.object(selector, "select_model", side_effect=AssertionError("sampled")):
+            first = self.assistant.get_usage_stats()["current_model_preferences"]
+            second = self.assistant.get_usage_stats()["current_model_preferences"]
+            info = self.assistant.get_model_info()["current_preferences"]
+        self.assertEqual(first, second)
+        self.assertEqual(first, info)
+
+
+class TestTracing(AssistantTestCase):
+    """Test cases for spans around upstream calls"""
+
+    def setUp(self):
+        """Collect every finished span"""
+        super().setUp()
+        self.spans = []
+        self.assistant.tracer = Tracer()
+        self.assistant.tracer.add_hook(on_end=self.spans.append)
+
+    def named(self, name):
+        return [span for span in self.spans if span.name == name]
+
+    def test_request_span_tree(self):
+        """Test the spans of a request with one tool round"""
+        tool_call = Mock(id="call_1")
+        tool_call.function.name = "web_search"
+        self.mock_th.run_tools.return_value = [{"role": "tool", "tool_call_id": "call_1", "content": "ok"}]
+        self.mock_client.chat.completions.create.side_effect = [
+            make_response(content=None, tool_calls=[tool_call]),
+            make_response("Final answer"),
+        ]
+
+        self.assistant.handle_request("Research something", "fast")
+
+        request = self.named("request")[0]
+        self.assertEqual(self.spans[-1], request)
+        self.assertEqual(request.attributes["task_type"], "fast")
+        self.assertEqual(request.attributes["tool_rounds"], 1)
+        completions = self.named("completion")
+        self.assertEqual(len(completions), 2)
+        self.assertEqual(completions[0].attributes["attempt"], 1)
+        self.assertEqual(completions[0].attributes["tool_calls"], ["web_search"])
+        self.assertEqual({span.trace_id for span in self.spans}, {request.trace_id})
+        tools = self.named("tools")[0]
+        self.assertEqual(tools.parent_id, request.span_id)
+        self.assertEqual([tool["name"] for tool in tools.attributes["tools"]], ["web_search"])
+        self.assertEqual(len(self.named("log_write")), 1)
+
+    def test_retries_and_fallback_are_traced(self):
+        """Test that each attempt and the fallback get their own spans"""
+        self.assistant.retry_policy = RetryPolicy(max_attempts=2, sleep=lambda seconds: None)
+        self.mock_client.chat.completions.create.side_effect = [
+            RuntimeError("HTTP 503 upstream"), RuntimeError("HTTP 503 upstream"), make_response("Fallback answer")
+        ]
+
+        result = self.assistant.handle_request("Question")
+
+        attempts = [span.attributes["attempt"] for span in self.named("attempt")]
+        self.assertEqual(attempts, [1, 2, 1])
+        failed = [span for span in self.named("completion") if span.status == "error"]
+        self.assertEqual(len(failed), 2)
+        fallback = self.named("fallback")[0]
+        self.assertEqual(fallback.attributes["model"], result["metadata"]["fallback_model"])
+        self.assertEqual(fallback.status, "ok")
+        self.assertEqual(self.named("completion")[-1].parent_id, self.named("attempt")[-1].span_id)
+
+    def test_failed_request_span(self):
+        """Test that a request answered with an error message is marked failed"""
+        self.mock_client.chat.completions.create.side_effect = Exception("API Error")
+
+        self.assistant.handle_request("Question")
+
+        self.assertEqual(self.named("request")[0].status, "error")
+        self.assertEqual(self.named("fallback")[0].status, "error")
+
+    def test_hedged_racers_share_the_attempt(self):
+        """Test that completions on hedge threads are children of the attempt"""
+        self.assistant.hedge_policy = HedgePolicy(default_delay=0.01, min_delay=0.0)
+        self.addCleanup(self.assistant.hedge_policy.close)
+        primary = self.assistant.model_selector.select_model("general")
+
+        def create(**kwargs):
+            if kwargs["model"] == primary:
+                time.sleep(0.2)
+            return make_response("Answer")
+        self.mock_client.chat.completions.create.side_effect = create
+
+        result = self.assistant.handle_request("Question", "general")
+        time.sleep(0.3)  # let the losing primary finish its span
+
+        self.assertTrue(result["metadata"]["hedge"]["hedged"])
+        attempt = self.named("attempt")[0]
+        racers = [span for span in self.named("completion") if span.parent_id == attempt.span_id]
+        self.assertEqual(len(racers), 2)
+
+
+class TestWarmup(AssistantTestCase):
+    """Test cases for the background warm-up"""
+
+    def setUp(self):
+        """Set up a pool that answers locally and a stubbed resolver"""
+        super().setUp()
+        self.requests = []
+        self.pool = HttpPool(transport=httpx.MockTransport(
+            lambda request: self.requests.append(request) or httpx.Response(200)))
+        self.addCleanup(self.pool.close)
+        self.mock_resolve = self.start_patch('life_coach.coach.resolve_host', return_value=1)
+
+    def test_disabled_by_default(self):
+        """Test that no warm-up runs unless asked for"""
+        self.assertIsNone(self.assistant.warmup)
+        self.mock_th.get_tools.assert_not_called()
+
+    def test_warmup_prepares_first_request(self):
+        """Test that the warm-up connects, prefetches tools and pings"""
+        assistant = ResearchAnalysisAssistant(http_pool=self.pool, warmup=True, warmup_ping=True)
+        self.assertTrue(assistant.warmup.wait(5))
+
+        steps = assistant.get_model_info()["warmup"]["steps"]
+        self.assertEqual(list(steps), ["resolve", "openrouter", "tools", "ping"])
+        self.assertTrue(all(step["ok"] for step in steps.values()))
+        self.assertEqual(self.mock_resolve.call_count, 2)
+        self.assertEqual(self.requests[0].method, "HEAD")
+        self.assertEqual(self.mock_client.chat.completions.create.call_args.kwargs["max_tokens"], 1)
+
+        assistant.handle_request("Test request")
+        self.mock_th.get_tools.assert_called_once()
+
+    def test_failed_step_does_not_break_requests(self):
+        """Test that an unreachable host only shows up in the report"""
+        self.mock_th.get_tools.side_effect = [ConnectionError("offline"),
+                                              [{"type": "function", "function": {"name": "test_tool"}}]]
+        with patch('life_coach.warmup.logging'):
+            assistant = ResearchAnalysisAssistant(http_pool=self.pool, warmup=True)
+            self.assertTrue(assistant.warmup.wait(5))
+
+        self.assertFalse(assistant.warmup.report()["steps"]["tools"]["ok"])
+        self.assertEqual(assistant.handle_request("Test request")["response"], "Test response")
+
+
+class TestBatchRequests(AssistantTestCase):
+    """Test cases for the batch entry point"""
+
+    def test_results_preserve_input_order(self):
+        """Test that batch results line up with the input requests"""
+        def create(**kwargs):
+            return make_response(f"Answer to {kwargs['messages'][1]['content']}")
+        self.mock_client.chat.completions.create.side_effect = create
+
+        requests = [(f"question {i}", "general") for i in range(10)]
+        results = self.assistant.handle_requests(requests, max_workers=4, max_in_flight=2)
+
+        self.assertEqual([r["response"] for r in results],
+                         [f"Answer to question {i}" for i in range(10)])
+        self.assertEqual(self.assistant.request_count, 10)
+
+    def test_item_errors_do_not_abort_batch(self):
+        """Test that a failing item is reported without stopping the others"""
+        self.mock_save_log.side_effect = [None, OSError("disk full"), None]
+
+        results = self.assistant.handle_requests(
+            [("a", "general"), ("b", "fast"), ("c", "general")], max_workers=1
+        )
+
+        self.assertEqual(len(results), 3)
+        self.assertNotIn("error", results[0]["metadata"])
+        self.assertIn("OSError", results[1]["metadata"]["error"])
+        self.assertEqual(results[1]["metadata"]["task_type"], "fast")
+        self.assertEqual(results[2]["response"], "Test response")
+
+
+class TestAsyncHandleRequest(AssistantTestCase, unittest.IsolatedAsyncioTestCase):
+    """Test cases for the asyncio request path"""
+
+    async def test_ahandle_request_matches_sync_shape(self):
+        """Test that ahandle_request returns the same shape as handle_request"""
+        result = await self.assistant.ahandle_request("Test request", "general")
+
+        self.assertEqual(set(result), {"response", "metadata", "timestamp"})
+        self.assertEqual(result["response"], "Test response")
+        self.assertEqual(result["metadata"]["task_type"], "general")
+        self.mock_client.chat.completions.create.assert_not_called()
+        self.assertEqual(self.assistant.request_count, 1)
+
+    async def test_async_tool_calls(self):
+        """Test that tool calls run off the event loop and feed the follow-up call"""
+        self.mock_async_client.chat.completions.create.side_effect = [
+            make_response(content=None, tool_calls=[Mock()]),
+            make_response("Final answer"),
+        ]
+
+        result = await self.assistant.ahandle_request("Research something")
+
+        self.assertEqual(result["response"], "Final answer")
+        self.mock_th.run_tools.assert_called_once()
+
+    async def test_async_tool_results_are_compacted(self):
+        """Test that the async loop compacts tool output too"""
+        self.mock_th.run_tools.return_value = [{"role": "tool", "content": "<p>Fact</p>"}]
+        self.mock_async_client.chat.completions.create.side_effect = [
+            make_response(content=None, tool_calls=[Mock()]),
+            make_response("Final answer"),
+        ]
+
+        result = await self.assistant.ahandle_request("Research something")
+
+        follow_up = self.mock_async_client.chat.completions.create.call_args.kwargs["messages"]
+        self.assertEqual(follow_up[-1]["content"], "Fact")
+        self.assertEqual(result["metadata"]["tool_compaction"]["results"], 1)
+
+    async def test_async_fallback_on_error(self):
+        """Test that a failing primary model falls back like the sync path"""
+        self.mock_async_client.chat.completions.create.side_effect = [
+            RuntimeError("primary down"),
+            make_response("Fallback answer"),
+        ]
+
+        result = await self.assistant.ahandle_request("Test request")
+
+        self.assertEqual(result["response"], "Fallback answer")
+        primary_call, fallback_call = self.mock_async_client.chat.completions.create.call_args_list
+        self.assertNotEqual(fallback_call.kwargs["model"], primary_call.kwargs["model"])
+
+    async def test_ahandle_requests_preserves_order(self):
+        """Test that the async batch returns results in input order"""
+        results = await self.assistant.ahandle_requests(
+            [("a", "general"), ("b", "coding")], max_in_flight=1
+        )
+
+        self.assertEqual([r["metadata"]["task_type"] for r in results],
+                         ["general", "coding"])
+
+
+if __name__ == "__main__":
+    unittest.main()
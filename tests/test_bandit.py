@@ -0,0 +1,137 @@
+"""
+Unit tests for bandit-based model selection
+"""
+
+import os
+import random
+import tempfile
+import unittest
+from collections import Counter
+
+from life_coach.bandit import ModelBandit, _flush_on_exit
+from life_coach.models import ModelSelector
+
+
+MODELS = ["model-a", "model-b", "model-c"]
+
+
+class TestModelBandit(unittest.TestCase):
+    """Test cases for ModelBandit sampling and persistence"""
+
+    def setUp(self):
+        """Set up a bandit with a seeded generator"""
+        self.bandit = ModelBandit(rng=random.Random(7))
+
+    def picks(self, n=300, weight=1.0):
+        return Counter(self.bandit.choose("general", MODELS, weight) for _ in range(n))
+
+    def test_prior_follows_preference_order(self):
+        """Test that without data the first preference is picked most often"""
+        counts = self.picks()
+        self.assertEqual(counts.most_common(1)[0][0], "model-a")
+        self.assertGreater(counts["model-b"] + counts["model-c"], 0)
+
+    def test_weight_strengthens_prior(self):
+        """Test that a larger weight explores less"""
+        weak = self.picks(weight=0.5)
+        strong = self.picks(weight=20.0)
+        self.assertGreater(strong["model-a"], weak["model-a"])
+
+    def test_fast_reliable_model_takes_over(self):
+        """Test that observed outcomes shift traffic away from the first choice"""
+        for _ in range(40):
+            self.bandit.record("general", "model-a", False)
+            self.bandit.record("general", "model-b", True, latency=1.0)
+        self.assertEqual(self.picks().most_common(1)[0][0], "model-b")
+
+    def test_latency_lowers_reward(self):
+        """Test that slow successes are worth less than fast ones"""
+        self.assertGreater(self.bandit.reward(True, 1.0), self.bandit.reward(True, 60.0))
+        self.assertEqual(self.bandit.reward(False, 1.0), 0.0)
+
+    def test_excluded_models_are_never_chosen(self):
+        """Test that excluded models are skipped unless nothing else is left"""
+        for _ in range(50):
+            self.assertNotEqual(self.bandit.choose("general", MODELS, exclude=["model-a"]), "model-a")
+        self.assertIn(self.bandit.choose("general", MODELS, exclude=MODELS), MODELS)
+
+    def test_stats_persist_between_runs(self):
+        """Test that statistics are saved and loaded from the state file"""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "bandit.json")
+            bandit = ModelBandit(state_path=path, save_every=2)
+            bandit.record("coding", "model-b", True, latency=3.0)
+            self.assertFalse(os.path.exists(path))
+            bandit.record("coding", "model-b", False)
+            self.assertTrue(os.path.exists(path))
+
+            reloaded = ModelBandit(state_path=path)
+            self.assertEqual(reloaded.stats("coding"), bandit.stats("coding"))
+            self.assertEqual(reloaded.stats("coding")["coding"]["model-b"]["pulls"], 2)
+
+    def test_close_flushes_pending_updates(self):
+        """Test that updates below save_every are saved on close and at exit"""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "bandit.json")
+            bandit = ModelBandit(state_path=path, save_every=10)
+            bandit.record("coding", "model-b", True, latency=3.0)
+            self.assertFalse(os.path.exists(path))
+            bandit.close()
+            self.assertEqual(ModelBandit(state_path=path).stats("coding")["coding"]["model-b"]["pulls"], 1)
+
+            bandit.record("coding", "model-b", False)
+            _flush_on_exit()
+            self.assertEqual(ModelBandit(state_path=path).stats("coding")["coding"]["model-b"]["pulls"], 2)
+
+
+class TestWeightedSelection(unittest.TestCase):
+    """Test cases for ModelSelector with preference weights"""
+
+    def setUp(self):
+        """Set up a selector that routes reasoning tasks through the bandit"""
+        self.selector = ModelSelector(
+            preference_weights={"reasoning": 1.0},
+            bandit=ModelBandit(rng=random.Random(3))
+        )
+        self.preferences = self.selector.task_preferences["reasoning"]
+
+    def test_outcomes_feed_the_bandit(self):
+        """Test that recorded calls for weighted task types update the bandit"""
+        self.selector.record_success(self.preferences[1], 2.0, "reasoning")
+        self.selector.record_failure(self.preferences[0], None, "general")
+        stats = self.selector.bandit.stats()
+        self.assertEqual(stats["reasoning"][self.preferences[1]]["pulls"], 1)
+        self.assertNotIn("general", stats)
+
+    def test_learns_faster_model(self):
+        """Test that selection converges on the model with the best outcomes"""
+        for _ in range(40):
+            self.selector.record_failure(self.preferences[0], None, "reasoning")
+            self.selector.record_success(self.preferences[2], 1.5, "reasoning")
+        picks = Counter(self.selector.select_model("reasoning") for _ in range(200))
+        self.assertEqual(picks.most_common(1)[0][0], self.preferences[2])
+
+    def test_open_circuit_is_skipped(self):
+        """Test that the bandit never samples a model whose circuit is open"""
+        for _ in range(self.selector.health.failure_threshold):
+            self.selector.record_failure(self.preferences[0])
+        for _ in range(50):
+            self.assertNotEqual(self.selector.select_model("reasoning"), self.preferences[0])
+
+    def test_preferred_model_does_not_sample(self):
+        """Test that reporting the preferred model is stable and leaves the bandit's draws alone"""
+        for _ in range(40):
+            self.selector.record_failure(self.preferences[0], None, "reasoning")
+            self.selector.record_success(self.preferences[2], 1.5, "reasoning")
+        state = self.selector.bandit.rng.getstate()
+        picks = {self.selector.preferred_model("reasoning") for _ in range(50)}
+        self.assertEqual(picks, {self.preferences[2]})
+        self.assertEqual(self.selector.bandit.rng.getstate(), state)
+
+    def test_preferred_model_without_data_is_first_preference(self):
+        """Test that with no outcomes the prior's first choice is reported"""
+        self.assertEqual(self.selector.preferred_model("reasoning"), self.preferences[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,119 @@
+"""
+Unit tests for context-window budgeting
+"""
+
+import json
+import unittest
+
+from life_coach.budget import (
+    PromptBudgeter, PromptTooLargeError, compress_text, trim_text
+)
+from life_coach.models import ModelSelector, context_window
+
+
+SMALL = "mistralai/mistral-small-3.1-24b-instruct:free"
+
+
+def conversation(user="What changed?", tool_results=()):
+    """Build a message list with optional tool results"""
+    messages = [{"role": "system", "content": "You are a research assistant."},
+                {"role": "user", "content": user}]
+    messages.extend({"role": "tool", "tool_call_id": f"call_{i}", "content": content}
+                    for i, content in enumerate(tool_results))
+    return messages
+
+
+class TestHelpers(unittest.TestCase):
+    """Test cases for the text helpers"""
+
+    def test_compress_json(self):
+        """Test that JSON loses its indentation"""
+        text = json.dumps({"results": [1, 2, 3]}, indent=4)
+        self.assertEqual(compress_text(text), '{"results":[1,2,3]}')
+
+    def test_compress_text(self):
+        """Test that runs of whitespace collapse"""
+        self.assertEqual(compress_text("a    b\n\n\n\nc  "), "a b\n\nc")
+
+    def test_trim_keeps_head_and_tail(self):
+        """Test that trimming cuts the middle"""
+        trimmed = trim_text("A" * 60 + "B" * 40 + "C" * 30, 90)
+        self.assertTrue(trimmed.startswith("A" * 60))
+        self.assertTrue(trimmed.endswith("C" * 30))
+        self.assertIn("40 characters trimmed", trimmed)
+
+
+class TestPromptBudgeter(unittest.TestCase):
+    """Test cases for PromptBudgeter"""
+
+    def setUp(self):
+        """Set up a budgeter with a small output reserve"""
+        self.budgeter = PromptBudgeter(ModelSelector(), reserve_output=1000)
+
+    def test_measure_breakdown(self):
+        """Test the per-part token estimate"""
+        tools = [{"type": "function", "function": {"name": "search"}}]
+        parts = self.budgeter.measure(conversation(tool_results=["x" * 400]), tools)
+        self.assertEqual(parts["tool_results"], self.budgeter.estimator.estimate("x" * 400) + 4)
+        self.assertGreater(parts["tools"], 0)
+        self.assertEqual(parts["total"], sum(v for k, v in parts.items() if k != "total"))
+
+    def test_small_prompt_is_untouched(self):
+        """Test that a prompt within the window is left alone"""
+        messages = conversation()
+        model, report = self.budgeter.fit(SMALL, messages)
+        self.assertEqual(model, SMALL)
+        self.assertEqual(report["actions"], [])
+        self.assertEqual(messages, conversation())
+
+    def test_compression_is_tried_first(self):
+        """Test that compressible tool output avoids a reroute"""
+        limit = self.budgeter.limit(SMALL)
+        padded = json.dumps([{"value": i} for i in range(limit // 8)], indent=12)
+        messages = conversation(tool_results=[padded])
+        self.assertFalse(self.budgeter.fits(SMALL, messages))
+
+        model, report = self.budgeter.fit(SMALL, messages, task_type="fast")
+        self.assertEqual(model, SMALL)
+        self.assertEqual([a["action"] for a in report["actions"]], ["compress"])
+        self.assertTrue(self.budgeter.fits(SMALL, messages))
+
+    def test_reroute_to_larger_window(self):
+        """Test that an incompressible overflow switches model"""
+        messages = conversation(user="word " * 40_000)
+        model, report = self.budgeter.fit(SMALL, messages, task_type="fast")
+
+        self.assertNotEqual(model, SMALL)
+        self.assertGreater(context_window(model), context_window(SMALL))
+        self.assertEqual(report["actions"][-1]["action"], "reroute")
+        self.assertTrue(self.budgeter.fits(model, messages))
+
+    def test_trim_without_reroute(self):
+        """Test that tool results are trimmed, oldest first, when rerouting is off"""
+        budgeter = PromptBudgeter(reserve_output=1000, strategies=("trim",))
+        limit = budgeter.limit(SMALL)
+        older, newer = "old " * limit, "new " * (limit // 4)
+        messages = conversation(tool_results=[older, newer])
+
+        model, report = budgeter.fit(SMALL, messages)
+        self.assertEqual(model, SMALL)
+        self.assertEqual(report["actions"][0]["action"], "trim")
+        self.assertIn("trimmed", messages[2]["content"])
+        self.assertEqual(messages[3]["content"], newer)
+        self.assertLessEqual(report["tokens"]["total"], limit)
+
+    def test_impossible_prompt_raises(self):
+        """Test that a prompt nothing can fit is refused"""
+        budgeter = PromptBudgeter(reserve_output=1000, strategies=("compress",))
+        with self.assertRaises(PromptTooLargeError):
+            budgeter.fit(SMALL, conversation(user="word " * 40_000))
+
+    def test_unknown_model_is_not_limited(self):
+        """Test that models outside the catalog are passed through"""
+        model, report = self.budgeter.fit("other/model", conversation(user="x" * 10 ** 6))
+        self.assertEqual(model, "other/model")
+        self.assertIsNone(report["limit"])
+
+
+if __name__ == "__main__":
+    unittest.main()
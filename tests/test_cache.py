@@ -0,0 +1,191 @@
+"""
+Unit tests for the caching helpers
+"""
+
+import os
+import tempfile
+import time
+import unittest
+from unittest.mock import Mock
+
+from life_coach.cache import (
+    ResponseCache, ToolResultCache, ToolSchemaCache, content_hash, normalize_arguments
+)
+
+
+TOOLS = [{"type": "function", "function": {"name": "web_search"}}]
+
+
+class TestToolSchemaCache(unittest.TestCase):
+    """Test cases for ToolSchemaCache"""
+
+    def setUp(self):
+        """Set up a cache with a mocked fetch function"""
+        self.fetch = Mock(return_value=TOOLS)
+        self.cache = ToolSchemaCache(self.fetch, ttl=60)
+
+    def test_fetches_once_within_ttl(self):
+        """Test that repeated lookups reuse the cached schema"""
+        for _ in range(3):
+            self.assertEqual(self.cache.get("bundle"), TOOLS)
+
+        self.fetch.assert_called_once_with("bundle")
+        self.assertEqual(self.cache.schema_hash("bundle"), content_hash(TOOLS))
+
+    def test_expired_entry_is_refetched(self):
+        """Test that entries older than the TTL are refetched"""
+        self.cache.ttl = 0
+        self.cache.get("bundle")
+        self.cache.get("bundle")
+
+        self.assertEqual(self.fetch.call_count, 2)
+
+    def test_invalidate(self):
+        """Test that invalidation forces a refetch"""
+        self.cache.get("bundle")
+        self.cache.invalidate("bundle")
+        self.cache.get("bundle")
+
+        self.assertEqual(self.fetch.call_count, 2)
+
+    def test_stale_schema_served_when_fetch_fails(self):
+        """Test that a failed refetch falls back to the stale schema"""
+        self.cache.get("bundle")
+        self.cache.ttl = 0
+        self.fetch.side_effect = ConnectionError("offline")
+
+        self.assertEqual(self.cache.get("bundle"), TOOLS)
+
+    def test_snapshot_round_trip(self):
+        """Test that a new cache starts from the snapshot without fetching"""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "tools.json")
+            ToolSchemaCache(self.fetch, snapshot_path=path).get("bundle")
+
+            cold_fetch = Mock(return_value=[])
+            cold_cache = ToolSchemaCache(cold_fetch, snapshot_path=path)
+
+            self.assertEqual(cold_cache.get("bundle"), TOOLS)
+            cold_fetch.assert_not_called()
+            self.assertLessEqual(time.time() - cold_cache._entries["bundle"]["fetched_at"], 60)
+
+
+class TestResponseCache(unittest.TestCase):
+    """Test cases for ResponseCache"""
+
+    def setUp(self):
+        """Set up a cache backed by a temporary SQLite file"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.db_path = os.path.join(self.tmp.name, "responses.sqlite3")
+        self.cache = ResponseCache(max_entries=2, db_path=self.db_path)
+
+    def test_key_normalizes_prompt_whitespace(self):
+        """Test that whitespace differences map to the same key"""
+        key_a = ResponseCache.make_key("model", "persona", "  What is  AI?\n", "h")
+        key_b = ResponseCache.make_key("model", "persona", "What is AI?", "h")
+        key_c = ResponseCache.make_key("other", "persona", "What is AI?", "h")
+
+        self.assertEqual(key_a, key_b)
+        self.assertNotEqual(key_a, key_c)
+
+    def test_memory_lru_eviction_and_disk_hit(self):
+        """Test LRU eviction in memory with the SQLite tier still serving"""
+        for key in ("a", "b", "c"):
+            self.cache.set(key, f"value {key}")
+
+        self.assertEqual(self.cache.get("a"), "value a")
+        self.assertIsNone(self.cache.get("missing"))
+
+        stats = self.cache.stats()
+        self.assertEqual(stats["evictions"], 2)
+        self.assertEqual(stats["disk_hits"], 1)
+        self.assertEqual(stats["misses"], 1)
+
+    def test_shared_store_across_instances(self):
+        """Test that a second cache on the same file sees earlier writes"""
+        self.cache.set("key", "shared")
+        other = ResponseCache(db_path=self.db_path)
+
+        self.assertEqual(other.get("key"), "shared")
+
+    def test_ttl_expiry(self):
+        """Test that expired entries are not served"""
+        self.cache.set("key", "old")
+        self.cache.ttl = 0
+
+        self.assertIsNone(self.cache.get("key"))
+        self.assertGreaterEqual(self.cache.stats()["expirations"], 1)
+
+
+class TestToolResultCache(unittest.TestCase):
+    """Test cases for ToolResultCache"""
+
+    def setUp(self):
+        """Set up a cache backed by a temporary SQLite file"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.db_path = os.path.join(self.tmp.name, "tools.sqlite3")
+        self.cache = ToolResultCache({"web_search": 60.0, "trends": 600.0}, db_path=self.db_path)
+        self.message = {"role": "tool", "tool_call_id": "call_1", "content": "results"}
+
+    def test_arguments_are_normalized(self):
+        """Test that key order and whitespace do not change the key"""
+        self.assertEqual(normalize_arguments('{"q": "  solar   power ", "n": 5}'),
+                         {"q": "solar power", "n": 5})
+        self.assertEqual(ToolResultCache.make_key("web_search", '{"q": "ai", "n": 5}'),
+                         ToolResultCache.make_key("web_search", '{"n":5,"q":" ai"}'))
+        self.assertNotEqual(ToolResultCache.make_key("web_search", '{"q": "ai"}'),
+                            ToolResultCache.make_key("trends", '{"q": "ai"}'))
+
+    def test_hit_is_shaped_for_the_new_call(self):
+        """Test that a hit answers the current call id"""
+        self.assertTrue(self.cache.set("web_search", '{"q": "ai"}', self.message))
+
+        hit = self.cache.get("web_search", '{ "q": "ai" }', "call_9")
+
+        self.assertEqual(hit, {"role": "tool", "tool_call_id": "call_9", "content": "results"})
+        self.assertIsNone(self.cache.get("web_search", '{"q": "ml"}', "call_9"))
+        self.assertEqual(self.cache.stats()["hits"], 1)
+
+    def test_only_allow_listed_tools_are_cached(self):
+        """Test that unlisted tools are neither stored nor served"""
+        self.assertFalse(self.cache.set("code_interpreter", "{}", self.message))
+        self.assertIsNone(self.cache.get("code_interpreter", "{}", "call_1"))
+        self.assertEqual(self.cache.stats()["misses"], 0)
+
+    def test_memory_tools_are_refused(self):
+        """Test that tools with side effects cannot be allow-listed"""
+        with self.assertRaises(ValueError):
+            ToolResultCache({"web_search": 60.0, "memory_store": 60.0})
+
+    def test_ttl_per_tool(self):
+        """Test that each tool expires on its own TTL"""
+        self.cache.set("web_search", "{}", self.message)
+        self.cache.set("trends", "{}", self.message)
+        self.cache.tool_ttls["web_search"] = 0
+
+        self.assertIsNone(self.cache.get("web_search", "{}", "call_2"))
+        self.assertIsNotNone(self.cache.get("trends", "{}", "call_2"))
+        self.assertGreaterEqual(self.cache.stats()["expirations"], 1)
+
+    def test_persists_across_instances(self):
+        """Test that results survive a restart through the SQLite file"""
+        self.cache.set("web_search", '{"q": "ai"}', self.message)
+        restarted = ToolResultCache({"web_search": 60.0}, db_path=self.db_path)
+
+        self.assertEqual(restarted.get("web_search", '{"q": "ai"}', "call_3")["content"], "results")
+        self.assertEqual(restarted.stats()["disk_hits"], 1)
+
+    def test_clear_one_tool(self):
+        """Test that clearing a tool keeps the others"""
+        self.cache.set("web_search", "{}", self.message)
+        self.cache.set("trends", "{}", self.message)
+        self.cache.clear("web_search")
+
+        self.assertIsNone(self.cache.get("web_search", "{}", "call_4"))
+        self.assertIsNotNone(self.cache.get("trends", "{}", "call_4"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,224 @@
+"""
+Test cases for record/replay cassettes
+"""
+
+import asyncio
+import json
+import os
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from life_coach.cassette import Cassette, CassetteMismatchError
+from life_coach.coach import ResearchAnalysisAssistant
+from life_coach.transport import HttpPool, httpx
+
+
+FIXTURE = Path(__file__).resolve().parent / "data" / "cassettes" / "fallback.json"
+# Nothing listens here; a replay that reached the network would fail
+UNREACHABLE = "http://127.0.0.1:9/api/v1"
+
+
+def completion(content: str) -> dict:
+    return {
+        "id": "gen-1", "object": "chat.completion", "created": 0, "model": "test/model",
+        "choices": [{"index": 0, "finish_reason": "stop",
+                     "message": {"role": "assistant", "content": content}}],
+        "usage": {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15}
+    }
+
+
+class FakeToolhouse:
+    """Toolhouse stand-in that serves an empty bundle"""
+
+    def set_api_key(self, api_key):
+        pass
+
+    def set_provider(self, provider):
+        pass
+
+    def set_metadata(self, key, value):
+        pass
+
+    def get_tools(self, bundle="default"):
+        return []
+
+    def run_tools(self, response, append=True):
+        return []
+
+
+class CassetteTestCase(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = Path(tmp.name)
+        cwd = os.getcwd()
+        os.chdir(self.tmp)
+        self.addCleanup(os.chdir, cwd)
+        env = patch.dict(os.environ, {"OPENROUTER_API_KEY": "test", "TOOLHOUSE_API_KEY": "test"})
+        env.start()
+        self.addCleanup(env.stop)
+
+
+class TestReplay(CassetteTestCase):
+    """Test cases for replaying the recorded fixture offline"""
+
+    def replay(self, **kwargs):
+        cassette = Cassette.replay(str(FIXTURE), **kwargs)
+        # The Toolhouse SDK must not even be constructed during a replay
+        with patch("life_coach.coach.Toolhouse", side_effect=AssertionError("Toolhouse used")):
+            assistant = ResearchAnalysisAssistant(base_url=UNREACHABLE, cassette=cassette)
+            results = [assistant.handle_request(item["request"], item["task_type"])
+                       for item in cassette.requests]
+        return cassette, results
+
+    def test_full_pipeline_replays_offline(self):
+        """Test that tool calls, retries and a fallback replay without the network"""
+        cassette, results = self.replay()
+
+        stats = cassette.stats()
+        self.assertEqual(stats["misses"], [])
+        self.assertEqual(stats["played"], stats["interactions"])
+        self.assertEqual(len(results), 6)
+        metadata = [result["metadata"] for result in results]
+        self.assertFalse(any("error" in m for m in metadata))
+        self.assertEqual(sum(1 for m in metadata if m.get("fallback_model")), 1)
+        self.assertGreater(sum(m["tool_loop"]["tool_rounds"] for m in metadata), 0)
+
+    def test_replay_is_deterministic(self):
+        """Test that two replays give identical answers"""
+        _, first = self.replay()
+        _, second = self.replay()
+        self.assertEqual([r["response"] for r in first], [r["response"] for r in second])
+
+    def test_async_replay(self):
+        """Test that the async path replays the same exchanges"""
+        cassette = Cassette.replay(str(FIXTURE))
+        assistant = ResearchAnalysisAssistant(base_url=UNREACHABLE, cassette=cassette)
+
+        async def run():
+            return [await assistant.ahandle_request(item["request"], item["task_type"])
+                    for item in cassette.requests]
+
+        results = asyncio.run(run())
+        self.assertEqual(cassette.stats()["misses"], [])
+        self.assertFalse(any("error" in r["metadata"] for r in results))
+
+    def test_unrecorded_request_is_a_miss(self):
+        """Test that a request without a recording fails instead of going online"""
+        cassette = Cassette.replay(str(FIXTURE))
+        assistant = ResearchAnalysisAssistant(base_url=UNREACHABLE, cassette=cassette)
+        result = assistant.handle_request("Something never recorded", "general")
+
+        self.assertIn("error", result["metadata"])
+        self.assertTrue(cassette.stats()["misses"])
+
+    def test_rewind(self):
+        """Test that rewinding makes every interaction playable again"""
+        cassette, _ = self.replay()
+        cassette.rewind()
+        self.assertEqual(cassette.stats()["played"], 0)
+
+
+class TestRecord(CassetteTestCase):
+    """Test cases for recording"""
+
+    def test_record_then_replay(self):
+        """Test a round trip through a gzipped cassette"""
+        sent = []
+
+        def handler(request):
+            sent.append(json.loads(request.content))
+            return httpx.Response(200, json=completion(f"Answer {len(sent)}"))
+
+        path = str(self.tmp / "session.json.gz")
+        pool = HttpPool(transport=httpx.MockTransport(handler))
+        with patch("life_coach.coach.Toolhouse", FakeToolhouse):
+            with Cassette.record(path) as cassette:
+                assistant = ResearchAnalysisAssistant(cassette=cassette, http_pool=pool)
+                recorded = assistant.handle_request("First question", "general")
+            self.assertEqual(len(sent), 1)
+
+            replay = Cassette.replay(path)
+            assistant = ResearchAnalysisAssistant(base_url=UNREACHABLE, cassette=replay)
+            replayed = assistant.handle_request("First question", "general")
+
+        self.assertEqual(replay.requests, [{"request": "First question", "task_type": "general"}])
+        self.assertEqual(recorded["response"], replayed["response"])
+        self.assertEqual(len(sent), 1)
+        self.assertEqual(replay.stats()["misses"], [])
+
+    def test_rejects_unknown_mode(self):
+        """Test that only record and replay modes exist"""
+        with self.assertRaises(ValueError):
+            Cassette(str(self.tmp / "c.json"), mode="rewrite")
+
+
+class TestReplayTransport(CassetteTestCase):
+    """Test cases for the replayed HTTP exchanges"""
+
+    def write(self, interactions):
+        path = self.tmp / "cassette.json"
+        path.write_text(json.dumps({"version": 1, "recorded_at": None, "requests": [],
+                                    "interactions": interactions}))
+        return str(path)
+
+    def interaction(self, status=200, elapsed=0.2, model="a/model"):
+        return {
+            "service": "openrouter", "started": 0.0, "elapsed": elapsed,
+            "request": {"method": "POST", "path": "/v1/chat/completions",
+                        "body": {"model": model, "messages": []}},
+            "response": {"status": status, "headers": {"content-type": "application/json"},
+                         "body": completion("hi")}
+        }
+
+    def post(self, cassette, model="a/model"):
+        with httpx.Client(transport=cassette.http_pool().transport) as client:
+            return client.post("http://x/v1/chat/completions", json={"model": model, "messages": []})
+
+    def test_realtime_waits_for_recorded_latency(self):
+        """Test that realtime replay sleeps the recorded time, scaled by speed"""
+        path = self.write([self.interaction(), self.interaction()])
+        started = time.perf_counter()
+        self.post(Cassette.replay(path))
+        fast = time.perf_counter() - started
+
+        started = time.perf_counter()
+        self.post(Cassette.replay(path, realtime=True, speed=2.0))
+        realtime = time.perf_counter() - started
+
+        self.assertLess(fast, 0.1)
+        self.assertGreaterEqual(realtime, 0.1)
+
+    def test_loose_match_ignores_model(self):
+        """Test that a request for another model still finds its exchange"""
+        cassette = Cassette.replay(self.write([self.interaction(model="a/model")]))
+        self.assertEqual(self.post(cassette, model="b/model").status_code, 200)
+        with self.assertRaises(CassetteMismatchError):
+            self.post(cassette)
+
+    def test_fast_replay_shortens_retry_after(self):
+        """Test that replayed errors do not make clients back off"""
+        cassette = Cassette.replay(self.write([self.interaction(status=503)]))
+        self.assertEqual(self.post(cassette).headers["retry-after-ms"], "1")
+
+    def test_toolhouse_replay(self):
+        """Test that Toolhouse calls are answered from the cassette"""
+        call = SimpleNamespace(id="call_1", function=SimpleNamespace(name="web_search", arguments="{}"))
+        response = SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(tool_calls=[call]))])
+        result = [{"role": "tool", "tool_call_id": "call_1", "content": "ok"}]
+        cassette = Cassette.replay(self.write([{
+            "service": "toolhouse", "started": 0.0, "elapsed": 0.0,
+            "request": {"method": "run_tools", "body": {
+                "tool_calls": [{"id": "call_1", "name": "web_search", "arguments": "{}"}], "append": False}},
+            "response": {"body": result}
+        }]))
+        th = cassette.toolhouse(lambda: self.fail("SDK constructed"))
+        self.assertEqual(th.run_tools(response, append=False), result)
+
+
+if __name__ == "__main__":
+    unittest.main()
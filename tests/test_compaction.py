@@ -0,0 +1,187 @@
+"""
+Unit tests for tool-result compaction
+"""
+
+import asyncio
+import json
+import unittest
+from types import SimpleNamespace
+
+from life_coach.compaction import (
+    CAPPED_RULE, RAW_RULE, CompactionRule, ToolResultCompactor, strip_markup, summary_messages
+)
+
+
+def call(call_id, name):
+    """Build a tool call as it appears on the assistant message"""
+    return SimpleNamespace(id=call_id, function=SimpleNamespace(name=name, arguments="{}"))
+
+
+def result(call_id, content):
+    """Build a tool result message"""
+    return {"role": "tool", "tool_call_id": call_id, "content": content}
+
+
+PAGE = """<html><head><title>Ignored</title><style>body { color: red }</style></head>
+<body><nav>Home | About</nav><script>track();</script>
+<h1>Solar output</h1><p>Panels produced <b>42&nbsp;GWh</b> in 2024.</p>
+<!-- ad slot --><p>![chart](https://example.com/chart.png)</p></body></html>"""
+
+
+class TestStripMarkup(unittest.TestCase):
+    """Test cases for strip_markup"""
+
+    def test_html_is_reduced_to_text(self):
+        """Test that scripts, styles, tags and entities are removed"""
+        text = strip_markup(PAGE)
+        self.assertIn("Solar output", text)
+        self.assertIn("Panels produced 42 GWh in 2024.", text)
+        self.assertIn("chart", text)
+        for removed in ("<", "track()", "color: red", "ad slot", "Ignored", "png"):
+            self.assertNotIn(removed, text)
+
+    def test_generics_survive(self):
+        """Test that angle brackets that are not HTML are kept"""
+        self.assertEqual(strip_markup("def f(x: List<str>) -> Map<K, V>"),
+                         "def f(x: List<str>) -> Map<K, V>")
+
+
+class TestToolResultCompactor(unittest.TestCase):
+    """Test cases for ToolResultCompactor"""
+
+    def test_duplicate_hits_within_a_result_are_dropped(self):
+        """Test that a page listed twice by one search is kept once"""
+        hits = {"results": [{"url": "https://a.example", "title": "A"},
+                            {"url": "https://b.example", "title": "B"},
+                            {"url": "https://b.example", "title": "B again"}]}
+        report = {}
+        compacted = ToolResultCompactor().compact(
+            [call("1", "web_search")], [result("1", json.dumps(hits, indent=2))], report=report
+        )
+        self.assertEqual([h["title"] for h in json.loads(compacted[0]["content"])["results"]], ["A", "B"])
+        self.assertEqual(report["duplicates_removed"], 1)
+
+    def test_results_are_deduplicated_independently(self):
+        """Test that one tool result never removes records from another"""
+        hits = [{"url": "https://a.example", "title": "A"}]
+        compacted = ToolResultCompactor().compact(
+            [call("1", "web_search"), call("2", "web_search")],
+            [result("1", json.dumps(hits)), result("2", json.dumps(hits))]
+        )
+        self.assertEqual([json.loads(r["content"]) for r in compacted], [hits, hits])
+        self.assertEqual([r["tool_call_id"] for r in compacted], ["1", "2"])
+
+    def test_nested_identical_records_survive(self):
+        """Test that equal nested values and records without a URL or id are kept"""
+        slot = {"day": "Mon", "open": "09:00", "close": "17:00"}
+        rows = {"stores": [{"id": 1, "hours": [slot, slot]}, {"id": 2, "hours": [slot, slot]}],
+                "notes": [{"text": "closed on holidays"}, {"text": "closed on holidays"}]}
+        report = {}
+        compacted = ToolResultCompactor().compact([call("1", "lookup")],
+                                                  [result("1", json.dumps(rows))], report=report)
+        self.assertEqual(json.loads(compacted[0]["content"]), rows)
+        self.assertEqual(report["duplicates_removed"], 0)
+
+    def test_default_rule_is_lossless(self):
+        """Test that without an opt-in long results are neither capped nor cut"""
+        payload = json.dumps([{"url": f"https://{i}.example", "body": "x" * 1000} for i in range(30)])
+        compacted = ToolResultCompactor().compact([call("1", "lookup")], [result("1", payload)])
+        self.assertEqual(json.loads(compacted[0]["content"]), json.loads(payload))
+
+    def test_items_are_capped_per_tool(self):
+        """Test that result lists are capped by the tool's rule"""
+        payload = json.dumps({"results": [{"url": f"https://{i}.example"} for i in range(30)]})
+        compactor = ToolResultCompactor(rules={"web_search": CompactionRule(max_items=3),
+                                               "news_search": CAPPED_RULE})
+
+        searched = compactor.compact([call("1", "web_search")], [result("1", payload)])
+        news = compactor.compact([call("1", "news_search")], [result("1", payload)])
+        other = compactor.compact([call("1", "other_tool")], [result("1", payload)])
+
+        self.assertEqual(len(json.loads(searched[0]["content"])["results"]), 3)
+        self.assertEqual(len(json.loads(news[0]["content"])["results"]), 10)
+        self.assertEqual(len(json.loads(other[0]["content"])["results"]), 30)
+
+    def test_repeated_paragraphs_and_long_text(self):
+        """Test that boilerplate paragraphs are dropped and text is capped"""
+        footer = "Subscribe to our newsletter for the latest research updates."
+        report = {}
+        compacted = ToolResultCompactor(default_rule=CompactionRule(max_chars=200)).compact(
+            [call("1", "scrape"), call("2", "scrape")],
+            [result("1", f"First article.\n\n{footer}"),
+             result("2", f"{footer}\n\nSecond article.\n\n{footer}\n\n" + "x" * 500)],
+            report=report
+        )
+        self.assertIn(footer, compacted[0]["content"])
+        self.assertEqual(compacted[1]["content"].count(footer), 1)
+        self.assertIn("characters omitted", compacted[1]["content"])
+        self.assertEqual(report["duplicates_removed"], 1)
+        self.assertEqual(report["truncated"], 1)
+
+    def test_report_counts_bytes_and_tokens(self):
+        """Test that sizes before and after are recorded and accumulate"""
+        report = {}
+        compactor = ToolResultCompactor()
+        for _ in range(2):
+            compactor.compact([call("1", "scrape")], [result("1", PAGE)], "qwen/qwq-32b:free", report=report)
+
+        self.assertEqual(report["results"], 2)
+        self.assertEqual(report["bytes_before"], 2 * len(PAGE.encode("utf-8")))
+        self.assertLess(report["bytes_after"], report["bytes_before"])
+        self.assertLess(report["tokens_after"], report["tokens_before"])
+
+    def test_raw_rule_leaves_results_alone(self):
+        """Test that a tool can opt out of compaction"""
+        original = [result("1", json.dumps([{"a": 1}, {"a": 1}], indent=4)), result("2", PAGE)]
+        compacted = ToolResultCompactor(default_rule=RAW_RULE).compact(
+            [call("1", "code"), call("2", "code")], original
+        )
+        self.assertEqual(compacted, original)
+
+    def test_unknown_shapes_pass_through(self):
+        """Test that results without string content are not touched"""
+        blocks = {"role": "tool", "tool_call_id": "1", "content": [{"type": "text", "text": "hi"}]}
+        self.assertEqual(ToolResultCompactor().compact(None, [blocks]), [blocks])
+
+    def test_summarizer_is_used_over_threshold(self):
+        """Test that long results are summarized and failures keep the text"""
+        compactor = ToolResultCompactor(rules={"scrape": CompactionRule(summarize_over=100)})
+        calls = [call("1", "scrape"), call("2", "scrape"), call("3", "search")]
+        results = [result("1", "alpha " * 50), result("2", "beta " * 50), result("3", "gamma " * 50)]
+        seen = []
+
+        def summarize(tool, text):
+            seen.append(tool)
+            if text.startswith("beta"):
+                raise RuntimeError("summary model down")
+            return "alpha, summarized"
+
+        report = {}
+        compacted = compactor.compact(calls, results, summarize=summarize, report=report)
+
+        self.assertEqual(seen, ["scrape", "scrape"])
+        self.assertEqual(compacted[0]["content"], "alpha, summarized")
+        self.assertTrue(compacted[1]["content"].startswith("beta"))
+        self.assertEqual(report["summarized"], 1)
+
+    def test_async_summarizer(self):
+        """Test that acompact summarizes like compact"""
+        compactor = ToolResultCompactor(default_rule=CompactionRule(summarize_over=10))
+
+        async def summarize(tool, text):
+            return f"{tool}: short"
+
+        compacted = asyncio.run(compactor.acompact([call("1", "scrape")],
+                                                   [result("1", "long text " * 10)],
+                                                   summarize=summarize))
+        self.assertEqual(compacted[0]["content"], "scrape: short")
+
+    def test_summary_prompt_names_tool(self):
+        """Test the summary request"""
+        messages = summary_messages("web_search", "text")
+        self.assertIn("web_search", messages[0]["content"])
+        self.assertEqual(messages[1], {"role": "user", "content": "text"})
+
+
+if __name__ == "__main__":
+    unittest.main()
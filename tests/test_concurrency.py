@@ -0,0 +1,159 @@
+"""
+Unit tests for adaptive per-model concurrency limits
+"""
+
+import asyncio
+import threading
+import time
+import unittest
+
+from life_coach.concurrency import AdaptiveConcurrencyLimiter, overload_reason
+from life_coach.tool_loop import DeadlineExceededError
+
+
+class StatusError(Exception):
+    """Exception carrying an HTTP status code like openai.APIStatusError"""
+
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+class TestOverloadReason(unittest.TestCase):
+    """Test cases for classifying overload signals"""
+
+    def test_classification(self):
+        """Test that 429s, 5xx and timeouts are overload signals and 4xx are not"""
+        self.assertEqual(overload_reason(StatusError(429)), "rate_limited")
+        self.assertEqual(overload_reason(StatusError(503)), "server_error")
+        self.assertEqual(overload_reason(TimeoutError()), "timeout")
+        self.assertEqual(overload_reason(RuntimeError("HTTP 503 upstream")), "server_error")
+        self.assertIsNone(overload_reason(StatusError(400)))
+        self.assertIsNone(overload_reason(ValueError("bad prompt")))
+
+    def test_numbers_in_messages_are_not_overloads(self):
+        """Test that status-like numbers in a message do not cut the limit"""
+        for message in ("max_tokens must be <= 4096", "limit 500 tokens per request",
+                        "invalid prompt (request id req_502ab9)", "context length 429 exceeded"):
+            with self.subTest(message=message):
+                self.assertIsNone(overload_reason(ValueError(message)))
+
+
+class TestAdaptiveConcurrencyLimiter(unittest.TestCase):
+    """Test cases for AIMD limit adjustment"""
+
+    def setUp(self):
+        """Set up a limiter without a decrease cooldown"""
+        self.limiter = AdaptiveConcurrencyLimiter(initial_limit=2, max_limit=4, cooldown=0.0)
+
+    def saturate(self, model="model-a"):
+        """Run one full window of healthy calls at the current limit"""
+        limit = self.limiter.limit(model)
+        for _ in range(limit):
+            self.limiter.acquire(model)
+        for _ in range(limit):
+            self.limiter.release(model, latency=1.0)
+
+    def test_additive_increase_when_saturated(self):
+        """Test that healthy calls at the limit grow it within a few windows"""
+        for _ in range(3):
+            self.saturate()
+        self.assertEqual(self.limiter.limit("model-a"), 3)
+        self.assertEqual(self.limiter.history("model-a")[-1]["reason"], "healthy")
+
+    def test_no_increase_when_not_saturated(self):
+        """Test that an idle model's limit does not creep upward"""
+        for _ in range(10):
+            self.limiter.acquire("model-a")
+            self.limiter.release("model-a", latency=1.0)
+        self.assertEqual(self.limiter.limit("model-a"), 2)
+
+    def test_slow_calls_hold_the_limit(self):
+        """Test that latency far above the average stops the increase"""
+        self.limiter.acquire("model-a")
+        self.limiter.release("model-a", latency=1.0)
+        self.limiter.acquire("model-a")
+        self.limiter.acquire("model-a")
+        self.limiter.release("model-a", latency=10.0)
+        self.limiter.release("model-a", latency=10.0)
+        self.assertEqual(self.limiter.limit("model-a"), 2)
+
+    def test_multiplicative_decrease_on_overload(self):
+        """Test that a 429 halves the limit and is recorded in the history"""
+        while self.limiter.limit("model-a") < 4:
+            self.saturate()
+        self.limiter.acquire("model-a")
+        self.limiter.release("model-a", error=StatusError(429))
+
+        self.assertEqual(self.limiter.limit("model-a"), 2)
+        change = self.limiter.history("model-a")[-1]
+        self.assertEqual((change["from"], change["to"], change["reason"]), (4, 2, "rate_limited"))
+
+    def test_non_overload_errors_do_not_cut(self):
+        """Test that client errors leave the limit alone"""
+        self.limiter.acquire("model-a")
+        self.limiter.release("model-a", error=StatusError(400))
+        self.assertEqual(self.limiter.limit("model-a"), 2)
+
+    def test_cooldown_limits_decreases(self):
+        """Test that a burst of failures from one window only cuts once"""
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=8, cooldown=60.0)
+        for _ in range(3):
+            limiter.acquire("model-a")
+        for _ in range(3):
+            limiter.release("model-a", error=TimeoutError())
+        self.assertEqual(limiter.limit("model-a"), 4)
+
+    def test_acquire_blocks_at_limit(self):
+        """Test that callers beyond the limit wait for a release"""
+        self.limiter.acquire("model-a")
+        self.limiter.acquire("model-a")
+        acquired = threading.Event()
+
+        def third():
+            self.limiter.acquire("model-a")
+            acquired.set()
+
+        worker = threading.Thread(target=third)
+        worker.start()
+        self.assertFalse(acquired.wait(0.05))
+        self.limiter.release("model-a", latency=1.0)
+        self.assertTrue(acquired.wait(1.0))
+        worker.join()
+        self.assertEqual(self.limiter.snapshot()["model-a"]["in_flight"], 2)
+
+    def test_wait_is_bounded_by_max_wait(self):
+        """Test that a caller gives up on a slot once its max_wait has passed"""
+        self.limiter.acquire("model-a")
+        self.limiter.acquire("model-a")
+
+        with self.assertRaises(DeadlineExceededError):
+            self.limiter.acquire("model-a", max_wait=0.05)
+        with self.assertRaises(DeadlineExceededError):
+            asyncio.run(self.limiter.aacquire("model-a", max_wait=0.05))
+        self.assertEqual(self.limiter.snapshot()["model-a"]["in_flight"], 2)
+
+    def test_async_callers_respect_limit(self):
+        """Test that aacquire never exceeds the model's limit"""
+        peak = {"now": 0, "max": 0}
+
+        async def call():
+            await self.limiter.aacquire("model-a")
+            peak["now"] += 1
+            peak["max"] = max(peak["max"], peak["now"])
+            await asyncio.sleep(0.01)
+            peak["now"] -= 1
+            self.limiter.release("model-a", error=StatusError(503))
+
+        async def run():
+            await asyncio.gather(*(call() for _ in range(6)))
+
+        started = time.perf_counter()
+        asyncio.run(run())
+        self.assertLess(time.perf_counter() - started, 2.0)
+        self.assertLessEqual(peak["max"], 2)
+        self.assertEqual(self.limiter.limit("model-a"), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+"""
+Smoke test for the offline benchmark harness and its fake servers
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "benchmarks"))
+
+import harness  # noqa: E402
+from fakes import LatencyModel  # noqa: E402
+
+
+class TestLatencyModel(unittest.TestCase):
+    """Test cases for LatencyModel"""
+
+    def test_parse_specs(self):
+        """Test the distribution specs"""
+        self.assertEqual(LatencyModel.parse("0.25").sample(), 0.25)
+        uniform = LatencyModel.parse("uniform:0.1:0.2", seed=1)
+        self.assertTrue(all(0.1 <= uniform.sample() <= 0.2 for _ in range(100)))
+        self.assertGreaterEqual(LatencyModel.parse("normal:0:1", seed=1).sample(), 0.0)
+        with self.assertRaises(ValueError):
+            LatencyModel.parse("lognormal:0.1")
+
+    def test_percentile(self):
+        """Test nearest-rank percentiles"""
+        samples = list(range(1, 101))
+        self.assertEqual(harness.percentile(samples, 0.50), 50)
+        self.assertEqual(harness.percentile(samples, 0.99), 99)
+
+
+class TestHarness(unittest.TestCase):
+    """End-to-end run against the fake OpenRouter and Toolhouse servers"""
+
+    def test_workloads_report_latency(self):
+        """Test that every workload completes and reports percentiles"""
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        args = harness.parse_args(["--requests", "4", "--concurrency", "2", "--latency", "0",
+                                   "--tool-latency", "0", "--tool-call-rate", "1",
+                                   "--output", os.path.join(tmp.name, "results.json")])
+        cwd = os.getcwd()
+        os.chdir(tmp.name)
+        self.addCleanup(os.chdir, cwd)
+
+        # run_workload installs the fake Toolhouse client; patching restores the SDK afterwards
+        with patch.dict(os.environ, {"OPENROUTER_API_KEY": "test", "TOOLHOUSE_API_KEY": "test"}), \
+                patch("life_coach.coach.Toolhouse"):
+            results = {name: harness.run_workload(name, args) for name in args.workloads}
+
+        for name, summary in results.items():
+            with self.subTest(workload=name):
+                self.assertEqual(summary["requests"], 4)
+                self.assertEqual(summary["errors"], 0)
+                self.assertEqual(summary["tool_rounds"], 4)
+                self.assertEqual(summary["servers"]["openrouter"]["completions"], 8)
+                self.assertGreater(summary["latency_ms"]["p99"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
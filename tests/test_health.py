@@ -0,0 +1,123 @@
+"""
+Unit tests for model health tracking
+"""
+
+import threading
+import time
+import unittest
+
+from life_coach.health import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, HealthTracker
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    """Test cases for CircuitBreaker state transitions"""
+
+    def setUp(self):
+        """Set up a breaker that opens after two failures"""
+        self.breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10.0)
+
+    def test_opens_after_threshold(self):
+        """Test that consecutive failures open the circuit"""
+        self.breaker.on_failure(now=0.0)
+        self.assertTrue(self.breaker.is_available(now=0.0))
+
+        self.breaker.on_failure(now=1.0)
+        self.assertEqual(self.breaker.state, OPEN)
+        self.assertFalse(self.breaker.is_available(now=5.0))
+
+    def test_half_open_admits_one_probe(self):
+        """Test that a half-open circuit admits a single probe at a time"""
+        self.breaker.on_failure(now=0.0)
+        self.breaker.on_failure(now=0.0)
+
+        self.assertTrue(self.breaker.is_available(now=10.0))
+        self.assertEqual(self.breaker.state, HALF_OPEN)
+        self.breaker.on_attempt(now=10.0)
+        self.assertFalse(self.breaker.is_available(now=11.0))
+
+        self.breaker.on_success()
+        self.assertEqual(self.breaker.state, CLOSED)
+
+    def test_try_acquire_claims_the_probe(self):
+        """Test that only the first caller on a half-open circuit is admitted"""
+        self.breaker.on_failure(now=0.0)
+        self.breaker.on_failure(now=0.0)
+
+        self.assertTrue(self.breaker.try_acquire(now=10.0))
+        self.assertFalse(self.breaker.try_acquire(now=10.5))
+        self.assertTrue(self.breaker.try_acquire(now=20.0))
+
+    def test_failed_probe_reopens(self):
+        """Test that a failed probe reopens the circuit immediately"""
+        self.breaker.on_failure(now=0.0)
+        self.breaker.on_failure(now=0.0)
+        self.breaker.on_attempt(now=10.0)
+        self.breaker.on_failure(now=10.5)
+
+        self.assertEqual(self.breaker.state, OPEN)
+        self.assertFalse(self.breaker.is_available(now=15.0))
+
+
+class TestHealthTracker(unittest.TestCase):
+    """Test cases for HealthTracker"""
+
+    def test_latency_ewma_and_error_rate(self):
+        """Test that latency and error rate are smoothed"""
+        tracker = HealthTracker(alpha=0.5)
+        tracker.record_success("model", 2.0)
+        tracker.record_success("model", 4.0)
+        tracker.record_failure("model", RuntimeError("boom"))
+
+        snapshot = tracker.snapshot()["model"]
+        self.assertEqual(tracker.latency("model"), 3.0)
+        self.assertEqual(snapshot["error_rate"], 0.5)
+        self.assertEqual(snapshot["last_error"], "RuntimeError: boom")
+        self.assertEqual(snapshot["circuit"], CLOSED)
+
+    def test_concurrent_updates(self):
+        """Test that concurrent recording keeps consistent counters"""
+        tracker = HealthTracker()
+
+        def worker():
+            for _ in range(500):
+                tracker.record_success("model", 1.0)
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(tracker.snapshot()["model"]["successes"], 4000)
+
+    def test_availability_check_does_not_track_model(self):
+        """Test that checking an unseen model does not add it to the snapshot"""
+        tracker = HealthTracker()
+        self.assertTrue(tracker.is_available("never-called"))
+        self.assertEqual(tracker.snapshot(), {})
+
+    def test_concurrent_admission_on_half_open_circuit(self):
+        """Test that concurrent callers cannot all claim a half-open circuit's probe"""
+        tracker = HealthTracker(failure_threshold=1, reset_timeout=0.5)
+        tracker.record_failure("model", RuntimeError("boom"))
+        time.sleep(0.6)
+        barrier = threading.Barrier(8)
+        admitted = []
+
+        def worker():
+            barrier.wait()
+            if tracker.is_available("model") and tracker.try_acquire("model"):
+                admitted.append(threading.get_ident())
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(admitted), 1)
+        self.assertEqual(tracker.snapshot()["model"]["circuit"], HALF_OPEN)
+
+
+if __name__ == "__main__":
+    unittest.main()
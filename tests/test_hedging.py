@@ -0,0 +1,75 @@
+"""
+Unit tests for hedged requests
+"""
+
+import asyncio
+import unittest
+
+from life_coach.hedging import HedgePolicy
+
+
+class TestHedgePolicy(unittest.TestCase):
+    """Test cases for HedgePolicy delay estimation"""
+
+    def test_default_delay_until_enough_samples(self):
+        """Test that the default delay is used for models without history"""
+        policy = HedgePolicy(default_delay=7.0, min_samples=5)
+        policy.record("model", 1.0)
+
+        self.assertEqual(policy.delay_for("model"), 7.0)
+
+    def test_delay_tracks_percentile(self):
+        """Test that the delay follows the recorded latency percentile"""
+        policy = HedgePolicy(percentile=0.95, min_samples=10, min_delay=0.0, max_delay=1000.0)
+        for i in range(1, 101):
+            policy.record("model", float(i))
+
+        self.assertEqual(policy.delay_for("model"), 95.0)
+        self.assertEqual(policy.expected_remaining("model", 98.0), 1.5)
+        self.assertIsNone(policy.expected_remaining("model", 500.0))
+
+
+class TestAsyncHedging(unittest.IsolatedAsyncioTestCase):
+    """Test cases for HedgePolicy.arun"""
+
+    async def test_backup_wins_and_primary_is_cancelled(self):
+        """Test that the slower primary task is cancelled once the backup answers"""
+        policy = HedgePolicy(default_delay=0.05, min_delay=0.0)
+        cancelled = asyncio.Event()
+
+        async def primary():
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        async def backup():
+            return "backup"
+
+        result, info = await policy.arun(primary, backup, "primary", "backup")
+        await asyncio.sleep(0)
+
+        self.assertEqual(result, "backup")
+        self.assertEqual(info["winner"], "backup")
+        self.assertTrue(cancelled.is_set())
+
+    async def test_primary_error_falls_through_to_backup(self):
+        """Test that a failing primary does not lose a successful backup"""
+        policy = HedgePolicy(default_delay=0.01, min_delay=0.0)
+
+        async def primary():
+            await asyncio.sleep(0.05)
+            raise RuntimeError("primary failed")
+
+        async def backup():
+            await asyncio.sleep(0.1)
+            return "backup"
+
+        result, info = await policy.arun(primary, backup, "primary", "backup")
+
+        self.assertEqual(result, "backup")
+
+
+if __name__ == "__main__":
+    unittest.main()
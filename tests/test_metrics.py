@@ -0,0 +1,133 @@
+"""
+Test cases for request metrics
+"""
+
+import os
+import tempfile
+import threading
+import unittest
+from collections import deque
+
+from life_coach.metrics import LatencyHistogram, RequestMetrics, percentile
+
+
+class TestLatencyHistogram(unittest.TestCase):
+    """Test cases for LatencyHistogram"""
+
+    def test_buckets_are_cumulative(self):
+        """Test that each bucket counts observations at or below its bound"""
+        histogram = LatencyHistogram(buckets=(0.1, 1.0))
+        for seconds in (0.05, 0.1, 0.5, 5.0):
+            histogram.observe(seconds)
+
+        self.assertEqual(histogram.cumulative(), [2, 3])
+        self.assertEqual(histogram.count, 4)
+        self.assertAlmostEqual(histogram.sum, 5.65)
+
+    def test_window_bounds_samples(self):
+        """Test that only recent samples are kept for percentiles"""
+        histogram = LatencyHistogram(window=3)
+        for seconds in range(10):
+            histogram.observe(seconds)
+        self.assertEqual(list(histogram.samples), [7, 8, 9])
+        self.assertEqual(histogram.count, 10)
+
+    def test_percentile(self):
+        """Test nearest-rank percentiles"""
+        samples = list(range(1, 101))
+        self.assertEqual(percentile(samples, 0.50), 50)
+        self.assertEqual(percentile(samples, 0.99), 99)
+        self.assertIsNone(percentile([], 0.5))
+
+
+class TestRequestMetrics(unittest.TestCase):
+    """Test cases for RequestMetrics"""
+
+    def setUp(self):
+        self.metrics = RequestMetrics()
+        for index in range(100):
+            self.metrics.observe("first_completion", (index + 1) / 1000, "model/a", "general")
+        self.metrics.observe("first_completion", 2.0, "model/b", "fast")
+        self.metrics.increment("fallbacks", "model/b", "fast")
+        self.metrics.increment("errors", task_type="fast", amount=2)
+
+    def test_snapshot_splits_by_model_and_task(self):
+        """Test the overall, per-model and per-task summaries"""
+        stage = self.metrics.snapshot()["stages"]["first_completion"]
+
+        self.assertEqual(stage["count"], 101)
+        self.assertEqual(stage["by_model"]["model/a"]["p50_ms"], 50.0)
+        self.assertEqual(stage["by_model"]["model/a"]["p99_ms"], 99.0)
+        self.assertEqual(stage["by_task"]["fast"]["count"], 1)
+        self.assertEqual(stage["p99_ms"], 100.0)
+
+    def test_snapshot_is_consistent_with_concurrent_observations(self):
+        """Test that an observation made mid-snapshot is left out of it entirely"""
+        metrics = RequestMetrics()
+        metrics.observe("tool_execution", 0.01, "model/a", "general")
+        observer = threading.Thread(target=metrics.observe, args=("tool_execution", 5.0, "model/a", "general"))
+
+        class InterleavedSamples(deque):
+            """Samples that let another thread observe while they are read"""
+
+            def __iter__(self):
+                if observer.ident is None:
+                    observer.start()
+                    observer.join(timeout=0.1)
+                return super().__iter__()
+
+        histogram = metrics._histograms[("tool_execution", "model/a", "general")]
+        histogram.samples = InterleavedSamples(histogram.samples, maxlen=histogram.samples.maxlen)
+
+        stage = metrics.snapshot()["stages"]["tool_execution"]
+        observer.join()
+        self.assertEqual(stage["count"], 1)
+        self.assertEqual(stage["p99_ms"], 10.0)
+        self.assertEqual(metrics.snapshot()["stages"]["tool_execution"]["count"], 2)
+
+    def test_counters(self):
+        """Test counter totals and splits"""
+        counters = self.metrics.snapshot()["counters"]
+
+        self.assertEqual(counters["fallbacks"], 1)
+        self.assertEqual(counters["errors"], 2)
+        self.assertEqual(counters["cache_hits"], 0)
+        self.assertEqual(counters["by_model"]["fallbacks"], {"model/b": 1})
+        self.assertEqual(counters["by_task"]["errors"], {"fast": 2})
+        self.assertEqual(self.metrics.count("errors"), 2)
+
+    def test_prometheus_text(self):
+        """Test the exposition format"""
+        text = self.metrics.prometheus()
+
+        self.assertIn("# TYPE research_assistant_stage_duration_seconds histogram", text)
+        self.assertIn('research_assistant_stage_duration_seconds_bucket{stage="first_completion",'
+                      'model="model/b",task_type="fast",le="+Inf"} 1', text)
+        self.assertIn('research_assistant_stage_duration_seconds_count{stage="first_completion",'
+                      'model="model/a",task_type="general"} 100', text)
+        self.assertIn("# TYPE research_assistant_fallbacks_total counter", text)
+        self.assertIn('research_assistant_errors_total{task_type="fast"} 2', text)
+        self.assertTrue(text.endswith("\n"))
+
+    def test_label_values_are_escaped(self):
+        """Test that quotes in label values cannot break the format"""
+        self.metrics.increment("errors", 'bad"model')
+        self.assertIn('model="bad\\"model"', self.metrics.prometheus())
+
+    def test_write_prometheus(self):
+        """Test writing the exposition text to a file"""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "metrics", "assistant.prom")
+            self.metrics.write_prometheus(path)
+            with open(path, encoding="utf-8") as f:
+                self.assertEqual(f.read(), self.metrics.prometheus())
+            self.assertEqual(os.listdir(os.path.dirname(path)), ["assistant.prom"])
+
+    def test_reset(self):
+        """Test forgetting everything"""
+        self.metrics.reset()
+        self.assertEqual(self.metrics.snapshot()["stages"], {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -3,7 +3,9 @@ Unit tests for the AI Life Coach models module
 """
 
 import unittest
-from life_coach.models import ModelSelector, FREE_MODELS
+from life_coach.models import (
+    ModelSelector, FREE_MODELS, MODEL_CATALOG, context_window, parse_context_size
+)
 
 
 class TestModelSelector(unittest.TestCase):
@@ -48,6 +50,33 @@ class TestModelSelector(unittest.TestCase):
         self.assertNotEqual(original_model, fallback_model)
         self.assertIn(fallback_model, FREE_MODELS)
     
+    def test_hedge_model_is_next_preference(self):
+        """Test that the hedge model is the next model in the task's list"""
+        preferences = self.selector.task_preferences["reasoning"]
+        
+        self.assertEqual(self.selector.get_hedge_model("reasoning", preferences[0]),
+                         preferences[1])
+        self.assertEqual(self.selector.get_hedge_model("reasoning", preferences[-1]),
+                         preferences[0])
+    
+    def test_open_circuit_is_skipped(self):
+        """Test that selection and fallback avoid models with an open circuit"""
+        preferences = self.selector.task_preferences["reasoning"]
+        for _ in range(self.selector.health.failure_threshold):
+            self.selector.record_failure(preferences[0])
+        
+        self.assertEqual(self.selector.select_model("reasoning"), preferences[1])
+        self.assertEqual(self.selector.get_fallback_model(preferences[1], "reasoning"),
+                         preferences[2])
+    
+    def test_much_faster_model_is_preferred(self):
+        """Test that a much faster healthy model outranks a slow first choice"""
+        preferences = self.selector.task_preferences["general"]
+        self.selector.record_success(preferences[0], 30.0)
+        self.selector.record_success(preferences[1], 2.0)
+        
+        self.assertEqual(self.selector.select_model("general"), preferences[1])
+    
     def test_list_models_by_strength(self):
         """Test filtering models by strength"""
         reasoning_models = self.selector.list_models_by_strength("reasoning")
@@ -134,5 +163,39 @@ class TestFreeModels(unittest.TestCase):
                           f"Model {model_id} should end with ':free'")
 
 
+
+class TestModelCatalog(unittest.TestCase):
+    """Test cases for the numeric model catalog"""
+    
+    def test_parse_context_size(self):
+        """Test parsing of human-readable context sizes"""
+        self.assertEqual(parse_context_size("33K tokens"), 33_000)
+        self.assertEqual(parse_context_size("10M tokens"), 10_000_000)
+        self.assertEqual(parse_context_size("1.5M"), 1_500_000)
+        self.assertEqual(parse_context_size("8192"), 8192)
+        with self.assertRaises(ValueError):
+            parse_context_size("unknown")
+    
+    def test_catalog_covers_every_model(self):
+        """Test that every free model has a numeric context window"""
+        self.assertEqual(set(MODEL_CATALOG), set(FREE_MODELS))
+        for model_id in FREE_MODELS:
+            self.assertGreater(context_window(model_id), 0)
+        self.assertIsNone(context_window("unknown/model"))
+    
+    def test_larger_context_model(self):
+        """Test finding a model with a large enough window"""
+        selector = ModelSelector()
+        model = selector.get_larger_context_model(500_000, "general")
+        self.assertGreaterEqual(context_window(model), 500_000)
+        # The task's own preferences come first
+        self.assertIn(model, selector.task_preferences["general"])
+        
+        model = selector.get_larger_context_model(500_000, "coding")
+        self.assertEqual(model, "google/gemini-2.0-flash-exp:free")
+        
+        self.assertIsNone(selector.get_larger_context_model(10 ** 9))
+
+
 if __name__ == "__main__":
     unittest.main()
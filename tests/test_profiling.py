@@ -0,0 +1,231 @@
+"""
+Test cases for the request profiler
+"""
+
+import asyncio
+import os
+import pstats
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from life_coach.coach import ResearchAnalysisAssistant
+from life_coach.profiling import RequestProfiler, categorize
+from life_coach.transport import HttpPool, httpx
+
+
+def completion(content: str) -> dict:
+    return {
+        "id": "gen-1", "object": "chat.completion", "created": 0, "model": "test/model",
+        "choices": [{"index": 0, "finish_reason": "stop",
+                     "message": {"role": "assistant", "content": content}}],
+        "usage": {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15}
+    }
+
+
+class FakeToolhouse:
+    """Toolhouse stand-in that serves an empty bundle"""
+
+    def set_api_key(self, api_key):
+        pass
+
+    def set_provider(self, provider):
+        pass
+
+    def set_metadata(self, key, value):
+        pass
+
+    def get_tools(self, bundle="default"):
+        return []
+
+    def run_tools(self, response, append=True):
+        return []
+
+
+def slow_step(seconds=0.05):
+    time.sleep(seconds)
+
+
+def code(filename, name="f"):
+    return SimpleNamespace(co_filename=filename, co_name=name, co_qualname=name)
+
+
+class TestRequestProfiler(unittest.TestCase):
+    """Test cases for RequestProfiler"""
+
+    def setUp(self):
+        self.profiler = RequestProfiler(sample_interval=0.002)
+
+    def test_aggregates_per_scope(self):
+        """Test that cProfile sessions are merged per scope"""
+        for _ in range(2):
+            with self.profiler.profile("fast"):
+                slow_step(0.001)
+        with self.profiler.profile("planning"):
+            slow_step(0.001)
+
+        self.assertEqual(self.profiler.scopes(), ["fast", "planning"])
+        calls = {name: stat[1] for (_, _, name), stat in self.profiler.stats("fast").stats.items()}
+        self.assertEqual(calls["slow_step"], 2)
+        summary = self.profiler.summary()
+        self.assertEqual(summary["fast"]["requests"], 2)
+        self.assertEqual(summary["planning"]["requests"], 1)
+        combined = {name: stat[1] for (_, _, name), stat in self.profiler.stats().stats.items()}
+        self.assertEqual(combined["slow_step"], 3)
+
+    def test_samples_collapsed_stacks(self):
+        """Test that sampled stacks name the functions that were running"""
+        with self.profiler.profile("fast"):
+            slow_step(0.1)
+
+        stacks = self.profiler.collapsed("fast")
+        self.assertTrue(stacks)
+        self.assertTrue(any("slow_step" in stack for stack in stacks))
+        self.assertGreater(self.profiler.summary()["fast"]["samples"], 0)
+
+    def test_concurrent_requests_stay_in_their_scope(self):
+        """Test that requests on several threads are profiled separately"""
+        def run(scope):
+            with self.profiler.profile(scope):
+                slow_step(0.05)
+
+        threads = [threading.Thread(target=run, args=(scope,)) for scope in ("a", "b", "a")]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        summary = self.profiler.summary()
+        self.assertEqual(summary["a"]["requests"], 2)
+        self.assertEqual(summary["b"]["requests"], 1)
+
+    def test_nested_blocks_profile_once(self):
+        """Test that an inner profile block is folded into the outer one"""
+        with self.profiler.profile("outer"):
+            with self.profiler.profile("inner"):
+                slow_step(0.001)
+        self.assertEqual(self.profiler.scopes(), ["outer"])
+
+    def test_sampling_only(self):
+        """Test that deterministic profiling can be turned off"""
+        profiler = RequestProfiler(deterministic=False, sample_interval=0.002)
+        with profiler.profile("fast"):
+            slow_step(0.05)
+        self.assertIsNone(profiler.stats())
+        self.assertTrue(profiler.collapsed())
+
+    def test_write(self):
+        """Test that pstats, collapsed stacks and a summary are written"""
+        with self.profiler.profile("deep research"):
+            slow_step(0.05)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            written = {path.name for path in self.profiler.write(tmp)}
+            self.assertEqual(written, {"deep_research.pstats", "deep_research.collapsed",
+                                       "all.pstats", "all.collapsed", "summary.txt"})
+            stats = pstats.Stats(os.path.join(tmp, "deep_research.pstats"))
+            self.assertTrue(any(name == "slow_step" for _, _, name in stats.stats))
+            for line in Path(tmp, "all.collapsed").read_text().splitlines():
+                stack, count = line.rsplit(" ", 1)
+                self.assertGreater(int(count), 0)
+                self.assertIn(";", stack)
+            self.assertIn("deep research", Path(tmp, "summary.txt").read_text())
+
+
+class TestCategorize(unittest.TestCase):
+    """Test cases for attributing samples to categories"""
+
+    def test_innermost_known_frame_wins(self):
+        """Test that a stack is attributed by its innermost recognised frame"""
+        stack = [code("/usr/lib/python3.11/ssl.py"), code("/site-packages/openai/_base_client.py"),
+                 code("/app/life_coach/coach.py")]
+        self.assertEqual(categorize(stack), "network")
+        stack = [code("/usr/lib/python3.11/json/decoder.py"), code("/site-packages/openai/_base_client.py")]
+        self.assertEqual(categorize(stack), "sdk_parsing")
+
+    def test_log_write(self):
+        """Test that time under the markdown logger counts as log writing"""
+        stack = [code("/usr/lib/python3.11/pathlib.py"),
+                 code("/app/life_coach/helpers.py", "save_markdown_log"),
+                 code("/app/life_coach/coach.py")]
+        self.assertEqual(categorize(stack), "log_write")
+
+    def test_unknown(self):
+        """Test that unrecognised stacks are "other" """
+        self.assertEqual(categorize([code("/app/main.py")]), "other")
+
+
+class TestAssistantProfiling(unittest.TestCase):
+    """Test cases for profiling assistant requests"""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        cwd = os.getcwd()
+        os.chdir(tmp.name)
+        self.addCleanup(os.chdir, cwd)
+        env = patch.dict(os.environ, {"OPENROUTER_API_KEY": "test", "TOOLHOUSE_API_KEY": "test"})
+        env.start()
+        self.addCleanup(env.stop)
+        toolhouse = patch("life_coach.coach.Toolhouse", FakeToolhouse)
+        toolhouse.start()
+        self.addCleanup(toolhouse.stop)
+        transport = httpx.MockTransport(lambda request: httpx.Response(200, json=completion("Answer")))
+        self.pool = HttpPool(transport=transport, async_transport=transport)
+
+    def test_requests_are_scoped_by_task_type(self):
+        """Test that each request lands in its task type's profile"""
+        profiler = RequestProfiler(sample_interval=0.002)
+        assistant = ResearchAnalysisAssistant(http_pool=self.pool, profiler=profiler)
+        assistant.handle_request("Quick question", "fast")
+        list(assistant.handle_request_stream("Plan a study", "planning"))
+
+        summary = profiler.summary()
+        self.assertEqual(set(summary), {"fast", "planning"})
+        functions = {name for _, _, name in profiler.stats("fast").stats}
+        self.assertIn("_handle_request", functions)
+
+    def test_async_requests_are_profiled(self):
+        """Test that async requests land in their task type's profile like sync ones"""
+        profiler = RequestProfiler(sample_interval=0.002)
+        assistant = ResearchAnalysisAssistant(http_pool=self.pool, profiler=profiler)
+        asyncio.run(assistant.ahandle_request("Quick question", "fast"))
+
+        self.assertEqual(profiler.summary()["fast"]["requests"], 1)
+        functions = {name for _, _, name in profiler.stats("fast").stats}
+        self.assertIn("_ahandle_request", functions)
+
+        asyncio.run(assistant.ahandle_requests([("a", "fast"), ("b", "reasoning")]))
+        summary = profiler.summary()
+        self.assertEqual(summary["mixed"]["requests"], 1)
+        self.assertEqual(summary["fast"]["requests"], 1)
+
+    def test_batch_profiler(self):
+        """Test that a batch can be profiled without profiling the assistant"""
+        profiler = RequestProfiler(sample_interval=0.002)
+        assistant = ResearchAnalysisAssistant(http_pool=self.pool)
+        results = assistant.handle_requests([("a", "fast"), ("b", "reasoning"), ("c", "fast")],
+                                            profiler=profiler)
+
+        self.assertFalse(any("error" in result["metadata"] for result in results))
+        summary = profiler.summary()
+        self.assertEqual(summary["fast"]["requests"], 2)
+        self.assertEqual(summary["reasoning"]["requests"], 1)
+        self.assertIsNone(assistant.profiler)
+
+    def test_async_batch_is_one_profile(self):
+        """Test that an async batch is profiled as a whole"""
+        profiler = RequestProfiler(sample_interval=0.002)
+        assistant = ResearchAnalysisAssistant(http_pool=self.pool)
+        results = asyncio.run(assistant.ahandle_requests([("a", "fast"), ("b", "reasoning")],
+                                                         profiler=profiler))
+        self.assertFalse(any("error" in result["metadata"] for result in results))
+        self.assertEqual(profiler.summary()["mixed"]["requests"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
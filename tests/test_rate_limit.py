@@ -0,0 +1,174 @@
+"""
+Unit tests for the token-bucket rate limiter
+"""
+
+import asyncio
+import os
+import tempfile
+import threading
+import unittest
+
+from life_coach.rate_limit import RateLimit, RateLimiter, key_id
+from life_coach.tool_loop import DeadlineExceededError
+from life_coach.utils import calculate_usage_stats
+
+
+class FakeClock:
+    """Wall clock that only moves when the limiter sleeps"""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.slept = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+class TestRateLimiter(unittest.TestCase):
+    """Test cases for RateLimiter queueing"""
+
+    def make_limiter(self, clock, **kwargs):
+        kwargs.setdefault("default_model_limit", RateLimit(per_minute=2))
+        kwargs.setdefault("key_limit", RateLimit())
+        return RateLimiter(clock=clock, sleep=clock.sleep, max_poll=60.0, **kwargs)
+
+    def test_burst_within_quota_is_not_queued(self):
+        """Test that calls up to the bucket capacity go straight through"""
+        clock = FakeClock()
+        limiter = self.make_limiter(clock)
+
+        self.assertEqual(limiter.acquire("model-a"), 0.0)
+        self.assertEqual(limiter.acquire("model-a"), 0.0)
+        self.assertEqual(clock.slept, [])
+
+    def test_excess_call_waits_for_refill(self):
+        """Test that a call over quota is queued until a token refills"""
+        clock = FakeClock()
+        limiter = self.make_limiter(clock)
+        limiter.acquire("model-a")
+        limiter.acquire("model-a")
+
+        limiter.acquire("model-a")
+
+        self.assertAlmostEqual(sum(clock.slept), 30.0)
+        stats = limiter.stats()
+        self.assertEqual(stats["queued"], 1)
+        self.assertEqual(stats["queue_depth"], 0)
+        self.assertEqual(stats["acquired"], 3)
+
+    def test_models_have_separate_buckets(self):
+        """Test that one model's quota does not throttle another"""
+        clock = FakeClock()
+        limiter = self.make_limiter(clock)
+        limiter.acquire("model-a")
+        limiter.acquire("model-a")
+
+        self.assertEqual(limiter.acquire("model-b"), 0.0)
+        self.assertEqual(clock.slept, [])
+
+    def test_key_quota_spans_models(self):
+        """Test that the per-key daily quota applies across all models"""
+        clock = FakeClock()
+        limiter = self.make_limiter(clock, default_model_limit=RateLimit(),
+                                    key_limit=RateLimit(per_day=2))
+        limiter.acquire("model-a", "key")
+        limiter.acquire("model-b", "key")
+
+        limiter.acquire("model-c", "key")
+
+        self.assertAlmostEqual(sum(clock.slept), 86400.0 / 2)
+
+    def test_sqlite_store_is_shared(self):
+        """Test that limiters on the same database draw from one quota"""
+        clock = FakeClock()
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "limits.db")
+            first = self.make_limiter(clock, db_path=path)
+            second = self.make_limiter(clock, db_path=path)
+            first.acquire("model-a")
+            first.acquire("model-a")
+
+            second.acquire("model-a")
+
+            self.assertAlmostEqual(sum(clock.slept), 30.0)
+            self.assertEqual(second.stats()["queued"], 1)
+
+    def test_async_acquire_queues(self):
+        """Test that aacquire waits instead of failing"""
+        limiter = RateLimiter(default_model_limit=RateLimit(per_minute=600),
+                              key_limit=RateLimit())
+
+        async def burst():
+            return await asyncio.gather(*(limiter.aacquire("model-a") for _ in range(601)))
+
+        waits = asyncio.run(burst())
+        self.assertEqual(sum(1 for w in waits if w > 0), 1)
+        self.assertEqual(limiter.stats()["acquired"], 601)
+
+    def test_wait_past_max_wait_raises(self):
+        """Test that a call whose quota refills too late fails fast instead of waiting"""
+        clock = FakeClock()
+        limiter = self.make_limiter(clock)
+        limiter.acquire("model-a")
+        limiter.acquire("model-a")
+
+        with self.assertRaises(DeadlineExceededError):
+            limiter.acquire("model-a", max_wait=5.0)
+
+        self.assertEqual(clock.slept, [])
+        self.assertEqual(limiter.stats()["queue_depth"], 0)
+        limiter.acquire("model-a", max_wait=60.0)
+        self.assertAlmostEqual(sum(clock.slept), 30.0)
+
+    def test_async_caller_waits_behind_queued_thread(self):
+        """Test that aacquire joins the same queue as acquire instead of taking the next token"""
+        clock = FakeClock()
+        sleeping, proceed = threading.Event(), threading.Event()
+
+        def sleep(seconds):
+            sleeping.set()
+            proceed.wait(5)
+            clock.sleep(seconds)
+
+        limiter = RateLimiter(default_model_limit=RateLimit(per_minute=1), key_limit=RateLimit(),
+                              clock=clock, sleep=sleep, max_poll=60.0)
+        limiter.acquire("model-a")
+        queued = threading.Thread(target=limiter.acquire, args=("model-a",))
+        queued.start()
+        self.assertTrue(sleeping.wait(5))
+        clock.now += 60.0
+
+        with self.assertRaises(DeadlineExceededError):
+            asyncio.run(limiter.aacquire("model-a", max_wait=0.2))
+        proceed.set()
+        queued.join(5)
+
+        self.assertEqual(limiter.stats()["acquired"], 2)
+        self.assertEqual(limiter.stats()["queue_depth"], 0)
+
+    def test_key_id_hides_secret(self):
+        """Test that API keys are hashed before being used as bucket names"""
+        self.assertNotIn("secret", key_id("secret-key"))
+        self.assertEqual(key_id(None), "anonymous")
+
+    def test_usage_stats_include_queueing(self):
+        """Test that calculate_usage_stats reports queue depth and wait time"""
+        clock = FakeClock()
+        limiter = self.make_limiter(clock)
+        for _ in range(3):
+            limiter.acquire("model-a")
+
+        stats = calculate_usage_stats(3, 50, scheduler_stats=limiter.stats())
+
+        self.assertEqual(stats["queued_requests"], 1)
+        self.assertEqual(stats["queue_depth"], 0)
+        self.assertIn("avg_wait_seconds", stats)
+        self.assertNotIn("queue_depth", calculate_usage_stats(3, 50))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,143 @@
+"""
+Unit tests for the retry policy
+"""
+
+import asyncio
+import random
+import unittest
+from email.utils import formatdate
+from unittest.mock import Mock
+
+from life_coach.retry import RetryPolicy, retry_after
+
+
+def api_error(status, headers=None):
+    """Build an exception shaped like openai.APIStatusError"""
+    error = Exception(f"Error code: {status}")
+    error.status_code = status
+    error.response = Mock(status_code=status, headers=headers or {})
+    return error
+
+
+class TestRetryAfter(unittest.TestCase):
+    """Test cases for Retry-After parsing"""
+
+    def test_seconds_and_milliseconds(self):
+        """Test numeric Retry-After headers"""
+        self.assertEqual(retry_after(api_error(429, {"retry-after": "7"})), 7.0)
+        self.assertEqual(retry_after(api_error(429, {"retry-after-ms": "1500"})), 1.5)
+
+    def test_http_date(self):
+        """Test Retry-After given as an HTTP date"""
+        error = api_error(503, {"retry-after": formatdate(1000.0 + 30, usegmt=True)})
+        self.assertAlmostEqual(retry_after(error, now=1000.0), 30.0)
+
+    def test_missing_or_invalid(self):
+        """Test that absent or garbled headers are ignored"""
+        self.assertIsNone(retry_after(RuntimeError("boom")))
+        self.assertIsNone(retry_after(api_error(429, {"retry-after": "soon"})))
+
+
+class TestRetryPolicy(unittest.TestCase):
+    """Test cases for RetryPolicy"""
+
+    def setUp(self):
+        """Set up a policy that records sleeps instead of sleeping"""
+        self.sleeps = []
+        self.policy = RetryPolicy(max_attempts=3, base_delay=1.0, budget=10.0,
+                                  sleep=self.sleeps.append, rng=random.Random(1))
+
+    def test_classification(self):
+        """Test which errors are retryable"""
+        self.assertTrue(self.policy.is_retryable(api_error(429)))
+        self.assertTrue(self.policy.is_retryable(api_error(503)))
+        self.assertTrue(self.policy.is_retryable(TimeoutError()))
+        self.assertTrue(self.policy.is_retryable(ConnectionError()))
+        self.assertFalse(self.policy.is_retryable(api_error(400)))
+        self.assertFalse(self.policy.is_retryable(ValueError("bad")))
+
+    def test_numbers_in_messages_are_not_status_codes(self):
+        """Test that only an explicitly named status in a message is read as one"""
+        for message in ("max_tokens must be <= 4096", "limit 500 tokens per request",
+                        "invalid prompt (request id req_502ab9)", "context length 429 exceeded"):
+            with self.subTest(message=message):
+                self.assertFalse(self.policy.is_retryable(ValueError(message)))
+        self.assertTrue(self.policy.is_retryable(RuntimeError("HTTP 503 Service Unavailable")))
+        self.assertTrue(self.policy.is_retryable(RuntimeError("upstream returned status: 429")))
+        self.assertFalse(self.policy.is_retryable(RuntimeError("HTTP/1.1 400 Bad Request")))
+
+    def test_custom_classifier(self):
+        """Test that a custom classifier replaces the default"""
+        policy = RetryPolicy(retryable=lambda e: isinstance(e, ValueError))
+        self.assertTrue(policy.is_retryable(ValueError()))
+        self.assertFalse(policy.is_retryable(api_error(503)))
+
+    def test_transient_error_is_retried(self):
+        """Test that a transient failure is retried and recorded"""
+        fn = Mock(side_effect=[api_error(503), "ok"])
+        state = {}
+
+        self.assertEqual(self.policy.call(fn, state), "ok")
+        self.assertEqual(state["attempts"], 2)
+        self.assertEqual(len(state["retries"]), 1)
+        self.assertEqual(len(self.sleeps), 1)
+
+    def test_backoff_is_jittered_and_bounded(self):
+        """Test that backoff grows exponentially with full jitter"""
+        for retry in range(1, 8):
+            ceiling = min(self.policy.max_delay, 2 ** (retry - 1))
+            self.assertTrue(0.0 <= self.policy.backoff(retry) <= ceiling)
+
+    def test_retry_after_is_honoured(self):
+        """Test that a Retry-After header sets the wait"""
+        fn = Mock(side_effect=[api_error(429, {"retry-after": "4"}), "ok"])
+        state = {}
+        self.policy.call(fn, state)
+        self.assertEqual(self.sleeps, [4.0])
+        self.assertTrue(state["retries"][0]["retry_after"])
+
+    def test_non_retryable_error_raises_immediately(self):
+        """Test that client errors are not retried"""
+        fn = Mock(side_effect=api_error(400))
+        with self.assertRaises(Exception):
+            self.policy.call(fn, {})
+        fn.assert_called_once()
+
+    def test_max_attempts(self):
+        """Test that the last error is raised after max_attempts"""
+        fn = Mock(side_effect=api_error(503))
+        state = {}
+        with self.assertRaises(Exception):
+            self.policy.call(fn, state)
+        self.assertEqual(state["attempts"], 3)
+
+    def test_budget_is_shared_across_calls(self):
+        """Test that waits within one request share the retry budget"""
+        state = {}
+        fn = Mock(side_effect=[api_error(429, {"retry-after": "6"}), "ok"])
+        self.policy.call(fn, state)
+
+        fn = Mock(side_effect=api_error(429, {"retry-after": "6"}))
+        with self.assertRaises(Exception):
+            self.policy.call(fn, state)
+        fn.assert_called_once()
+        self.assertEqual(self.sleeps, [6.0])
+
+    def test_async_call(self):
+        """Test that acall retries with asyncio.sleep"""
+        policy = RetryPolicy(base_delay=0.001)
+        calls = []
+
+        async def fn():
+            calls.append(1)
+            if len(calls) == 1:
+                raise api_error(502)
+            return "ok"
+
+        state = {}
+        self.assertEqual(asyncio.run(policy.acall(fn, state)), "ok")
+        self.assertEqual(state["attempts"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
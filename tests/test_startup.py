@@ -0,0 +1,37 @@
+"""
+Regression tests for command line startup cost
+"""
+
+import os
+import subprocess
+import sys
+import unittest
+from pathlib import Path
+
+
+ROOT = Path(__file__).resolve().parent.parent
+
+PROBE = """
+import sys
+import life_coach
+assistant = life_coach.ResearchAnalysisAssistant()
+heavy = sorted(name for name in ("openai", "toolhouse", "httpx", "httpx2", "pytz") if name in sys.modules)
+print(",".join(heavy))
+"""
+
+
+class TestStartup(unittest.TestCase):
+    """Test cases for lazy imports"""
+
+    def test_sdks_are_not_imported_at_startup(self):
+        """Test that importing the package and building an assistant skips the SDKs"""
+        env = dict(os.environ, OPENROUTER_API_KEY="test", TOOLHOUSE_API_KEY="test")
+        result = subprocess.run([sys.executable, "-c", PROBE], cwd=ROOT, env=env,
+                                capture_output=True, text=True, timeout=60)
+
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual(result.stdout.strip(), "")
+
+
+if __name__ == "__main__":
+    unittest.main()
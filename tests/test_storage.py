@@ -0,0 +1,46 @@
+"""
+Unit tests for the shared SQLite store
+"""
+
+import os
+import tempfile
+import threading
+import unittest
+
+from life_coach.storage import SQLiteStore
+
+
+SCHEMA = "CREATE TABLE IF NOT EXISTS items (key TEXT PRIMARY KEY, value TEXT NOT NULL)"
+
+
+class TestSQLiteStore(unittest.TestCase):
+    """Test cases for SQLiteStore"""
+
+    def setUp(self):
+        """Set up a store in a directory that does not exist yet"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.db_path = os.path.join(self.tmp.name, "nested", "store.sqlite3")
+        self.store = SQLiteStore(self.db_path, SCHEMA)
+
+    def test_creates_file_and_table_in_wal_mode(self):
+        """Test that the file, its directory and the table are created"""
+        conn = self.store.connection()
+        self.assertTrue(os.path.exists(self.db_path))
+        self.assertEqual(conn.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+        conn.execute("INSERT INTO items (key, value) VALUES ('a', '1')")
+        self.assertEqual(SQLiteStore(self.db_path, SCHEMA).connection().execute(
+            "SELECT value FROM items WHERE key = 'a'").fetchone(), ("1",))
+
+    def test_one_connection_per_thread(self):
+        """Test that a thread reuses its connection and other threads get their own"""
+        self.assertIs(self.store.connection(), self.store.connection())
+        other = []
+        thread = threading.Thread(target=lambda: other.append(self.store.connection()))
+        thread.start()
+        thread.join()
+        self.assertIsNot(other[0], self.store.connection())
+
+
+if __name__ == "__main__":
+    unittest.main()
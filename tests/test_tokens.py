@@ -0,0 +1,171 @@
+"""
+Unit tests for the calibrated token estimator
+"""
+
+import json
+import unittest
+from pathlib import Path
+
+from life_coach import utils
+from life_coach.tokens import (
+    ERROR_BOUND, FAMILY_COEFFICIENTS, FEATURES, MAX_TOKEN_BYTES, TokenEstimator, estimate_tokens,
+    model_family, text_features
+)
+
+
+CORPUS = Path(__file__).parent / "data" / "token_corpus.jsonl"
+
+# A model id per labelled family
+FAMILY_MODELS = {
+    "deepseek": "deepseek/deepseek-chat-v3-0324:free",
+    "llama": "meta-llama/llama-4-scout:free",
+    "mistral": "mistralai/mistral-small-3.1-24b-instruct:free",
+    "qwen": "qwen/qwq-32b:free",
+}
+
+
+def load_corpus():
+    """Load the labelled samples"""
+    with open(CORPUS, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+class TestTokenEstimator(unittest.TestCase):
+    """Test cases for TokenEstimator"""
+
+    @classmethod
+    def setUpClass(cls):
+        """Load the corpus once"""
+        cls.corpus = load_corpus()
+        cls.estimator = TokenEstimator()
+
+    def test_accuracy_per_family(self):
+        """Test that each family stays within the error bound on the corpus"""
+        texts = [sample["text"] for sample in self.corpus]
+        for family, model in FAMILY_MODELS.items():
+            with self.subTest(family=family):
+                estimates = self.estimator.estimate_many(texts, model)
+                errors = [abs(estimate - sample["tokens"][family]) / sample["tokens"][family]
+                          for estimate, sample in zip(estimates, self.corpus)]
+                self.assertLessEqual(sum(errors) / len(errors), ERROR_BOUND)
+
+    def test_beats_character_heuristic(self):
+        """Test that the estimator is closer than len // 4 on CJK text"""
+        cjk = [s for s in self.corpus if s["kind"] == "cjk"]
+        self.assertTrue(cjk)
+        ours = sum(abs(self.estimator.estimate(s["text"], FAMILY_MODELS["qwen"]) - s["tokens"]["qwen"])
+                   for s in cjk)
+        naive = sum(abs(len(s["text"]) // 4 - s["tokens"]["qwen"]) for s in cjk)
+        self.assertLess(ours, naive)
+
+    def test_accuracy_on_other_scripts_and_emoji(self):
+        """Test that Cyrillic, other two-byte scripts and emoji are estimated sensibly"""
+        for kind in ("cyrillic", "two_byte", "emoji"):
+            samples = [s for s in self.corpus if s["kind"] == kind]
+            self.assertGreaterEqual(len(samples), 30, kind)
+            for family, model in FAMILY_MODELS.items():
+                with self.subTest(kind=kind, family=family):
+                    estimates = self.estimator.estimate_many([s["text"] for s in samples], model)
+                    errors = [abs(estimate - s["tokens"][family]) / s["tokens"][family]
+                              for estimate, s in zip(estimates, samples)]
+                    self.assertLessEqual(sum(errors) / len(errors), 0.15)
+
+    def test_estimates_stay_within_byte_bounds(self):
+        """Test that text unlike the corpus still gets an estimate between bytes/8 and bytes"""
+        texts = ["😀" * 1000, "🚀🔥📈👍" * 250, "é" * 1000, " " * 5000, "Привет, мир! " * 100,
+                 "\u0301" * 500, "a" * 5000]
+        for text in texts:
+            size = len(text.encode("utf-8"))
+            for model in list(FAMILY_MODELS.values()) + [None]:
+                with self.subTest(text=text[:10], model=model):
+                    estimate = self.estimator.estimate(text, model)
+                    self.assertGreaterEqual(estimate, -(-size // MAX_TOKEN_BYTES))
+                    self.assertLessEqual(estimate, size)
+
+    def test_emoji_are_not_free(self):
+        """Test that emoji-only text costs at least a token per emoji"""
+        for model in FAMILY_MODELS.values():
+            self.assertGreaterEqual(self.estimator.estimate("😀" * 1000, model), 1000)
+
+    def test_estimate_many_matches_estimate(self):
+        """Test that the batch path agrees with single estimates"""
+        texts = [sample["text"] for sample in self.corpus[:20]] + [""]
+        model = FAMILY_MODELS["llama"]
+        self.assertEqual(self.estimator.estimate_many(texts, model),
+                         [self.estimator.estimate(text, model) for text in texts])
+
+    def test_empty_and_tiny_text(self):
+        """Test that empty text is free and any text costs a token"""
+        self.assertEqual(estimate_tokens(""), 0)
+        self.assertEqual(estimate_tokens("a"), 1)
+        self.assertEqual(estimate_tokens("."), 1)
+
+    def test_unknown_model_uses_default(self):
+        """Test that models without a calibration use the pooled coefficients"""
+        text = "The quick brown fox jumps over the lazy dog."
+        default = self.estimator.estimate(text)
+        self.assertEqual(self.estimator.estimate(text, "google/gemini-2.0-flash-exp:free"), default)
+        self.assertEqual(self.estimator.estimate(text, "someone/new-model"), default)
+
+    def test_custom_coefficients(self):
+        """Test that coefficients can be supplied"""
+        per_letter = {"default": [1.0 if name == "letters" else 0.0 for name in FEATURES]}
+        self.assertEqual(TokenEstimator(per_letter).estimate("abc def", "any/model"), 6)
+
+    def test_utils_delegates(self):
+        """Test that utils.estimate_tokens uses the calibrated estimator"""
+        text = "日本語のテキストと English text, mixed."
+        model = FAMILY_MODELS["deepseek"]
+        self.assertEqual(utils.estimate_tokens(text, model), estimate_tokens(text, model))
+
+
+class TestFeatures(unittest.TestCase):
+    """Test cases for the feature extraction"""
+
+    def test_feature_counts(self):
+        """Test the character-class counts"""
+        features = dict(zip(FEATURES, text_features("def f(x):\n    return x + 10  # 漢字かな한")))
+        self.assertEqual(features["letters"], 12)
+        self.assertEqual(features["word_starts"], 5)
+        self.assertEqual(features["script_word_starts"], 1)
+        self.assertEqual(features["digits"], 2)
+        self.assertEqual(features["newlines"], 1)
+        self.assertEqual(features["space_runs"], 2)
+        self.assertEqual(features["han"], 2)
+        self.assertEqual(features["kana"], 2)
+        self.assertEqual(features["hangul"], 1)
+        self.assertEqual(features["constant"], 1.0)
+
+    def test_two_byte_script_counts(self):
+        """Test that two-byte characters are classed by script and words are not split by them"""
+        features = dict(zip(FEATURES, text_features("Größe Привет мир Ωμέγα")))
+        self.assertEqual(features["latin_extended"], 2)
+        self.assertEqual(features["cyrillic"], 9)
+        self.assertEqual(features["greek"], 5)
+        self.assertEqual(features["word_starts"], 1)
+        self.assertEqual(features["script_word_starts"], 3)
+
+    def test_coefficients_cover_features(self):
+        """Test that every family has one coefficient per feature"""
+        self.assertIn("default", FAMILY_COEFFICIENTS)
+        for family, coefficients in FAMILY_COEFFICIENTS.items():
+            self.assertEqual(len(coefficients), len(FEATURES), family)
+
+    def test_coefficients_are_non_negative(self):
+        """Test that no character class lowers an estimate"""
+        for family, coefficients in FAMILY_COEFFICIENTS.items():
+            self.assertTrue(all(value >= 0 for value in coefficients), family)
+
+    def test_model_family(self):
+        """Test model id to family mapping"""
+        self.assertEqual(model_family("deepseek/deepseek-r1:free"), "deepseek")
+        self.assertEqual(model_family("qwen/qwq-32b:free"), "qwen")
+        self.assertEqual(model_family("meta-llama/llama-3.3-70b-instruct:free"), "llama")
+        self.assertEqual(model_family("mistralai/mistral-small-3.1-24b-instruct:free"), "mistral")
+        self.assertEqual(model_family("google/gemini-2.0-flash-exp:free"), "gemini")
+        self.assertEqual(model_family(None), "default")
+        self.assertEqual(model_family("unknown/model"), "default")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,150 @@
+"""
+Unit tests for the parallel tool runner
+"""
+
+import time
+import unittest
+from unittest.mock import Mock
+
+from openai.types.chat import ChatCompletion
+
+from life_coach.cache import ToolResultCache
+from life_coach.tool_runner import ParallelToolRunner
+
+
+def tool_call_response(*names, arguments="{}"):
+    """Build a completion that requests one tool call per name"""
+    return ChatCompletion.model_validate({
+        "id": "resp",
+        "object": "chat.completion",
+        "created": 0,
+        "model": "test-model",
+        "choices": [{
+            "index": 0,
+            "finish_reason": "tool_calls",
+            "message": {
+                "role": "assistant",
+                "content": None,
+                "tool_calls": [
+                    {"id": f"call_{i}", "type": "function",
+                     "function": {"name": name, "arguments": arguments}}
+                    for i, name in enumerate(names)
+                ]
+            }
+        }]
+    })
+
+
+class SleepyToolhouse:
+    """Fake Toolhouse client whose tools sleep for a per-name duration"""
+
+    def __init__(self, delays):
+        self.delays = delays
+
+    def run_tools(self, response, append=True):
+        call = response.choices[0].message.tool_calls[0]
+        delay = self.delays[call.function.name]
+        if delay < 0:
+            raise RuntimeError("tool crashed")
+        time.sleep(delay)
+        return [{"role": "tool", "tool_call_id": call.id, "content": call.function.name}]
+
+
+class TestParallelToolRunner(unittest.TestCase):
+    """Test cases for ParallelToolRunner"""
+
+    def test_calls_run_concurrently_in_order(self):
+        """Test that a turn takes about as long as its slowest tool"""
+        th = SleepyToolhouse({"slow": 0.3, "medium": 0.2, "fast": 0.1})
+        runner = ParallelToolRunner(th)
+        self.addCleanup(runner.close)
+
+        report = {}
+        started = time.perf_counter()
+        results = runner.run(tool_call_response("slow", "medium", "fast"), report)
+        elapsed = time.perf_counter() - started
+
+        self.assertEqual([r["content"] for r in results], ["slow", "medium", "fast"])
+        self.assertLess(elapsed, 0.5)
+        self.assertEqual([t["status"] for t in report["tools"]], ["ok", "ok", "ok"])
+
+    def test_timeout_and_error_become_tool_messages(self):
+        """Test that slow or failing tools still answer their call id"""
+        th = SleepyToolhouse({"hang": 1.0, "broken": -1, "fine": 0})
+        runner = ParallelToolRunner(th, tool_timeout=0.1)
+        self.addCleanup(runner.close)
+
+        report = {}
+        results = runner.run(tool_call_response("hang", "broken", "fine"), report)
+
+        self.assertEqual([r["tool_call_id"] for r in results], ["call_0", "call_1", "call_2"])
+        self.assertIn("timed out", results[0]["content"])
+        self.assertIn("tool crashed", results[1]["content"])
+        self.assertEqual([t["status"] for t in report["tools"]], ["timeout", "error", "ok"])
+
+    def test_single_call_timeout_and_error(self):
+        """Test that a lone tool call gets the same timeout and error handling"""
+        th = SleepyToolhouse({"hang": 1.0, "broken": -1})
+        runner = ParallelToolRunner(th, tool_timeout=0.1)
+        self.addCleanup(runner.close)
+
+        report = {}
+        started = time.perf_counter()
+        results = runner.run(tool_call_response("hang"), report)
+        self.assertLess(time.perf_counter() - started, 0.5)
+        self.assertEqual(results, [{"role": "tool", "tool_call_id": "call_0",
+                                    "content": "Tool timed out after 0.1 seconds."}])
+        self.assertEqual(report["tools"][0]["status"], "timeout")
+
+        report = {}
+        results = runner.run(tool_call_response("broken"), report)
+        self.assertEqual(results[0]["tool_call_id"], "call_0")
+        self.assertIn("tool crashed", results[0]["content"])
+        self.assertEqual(report["tools"][0]["status"], "error")
+
+    def test_cached_results_skip_toolhouse(self):
+        """Test that repeated idempotent calls are answered from the cache"""
+        th = SleepyToolhouse({"web_search": 0, "scrape": 0})
+        th.run_tools = Mock(wraps=th.run_tools)
+        runner = ParallelToolRunner(th, result_cache=ToolResultCache({"web_search": 60.0}))
+        self.addCleanup(runner.close)
+
+        runner.run(tool_call_response("web_search", "scrape", arguments='{"q": "ai"}'))
+        report = {}
+        results = runner.run(tool_call_response("web_search", "scrape", arguments='{"q":"ai"}'), report)
+
+        self.assertEqual(th.run_tools.call_count, 3)
+        self.assertEqual(results[0], {"role": "tool", "tool_call_id": "call_0", "content": "web_search"})
+        self.assertEqual([t["status"] for t in report["tools"]], ["cached", "ok"])
+
+
+class TestAsyncParallelToolRunner(unittest.IsolatedAsyncioTestCase):
+    """Test cases for ParallelToolRunner.arun"""
+
+    async def test_arun_runs_concurrently(self):
+        """Test that the async runner fans calls out and keeps order"""
+        runner = ParallelToolRunner(SleepyToolhouse({"a": 0.2, "b": 0.2, "c": 0.2}))
+
+        started = time.perf_counter()
+        results = await runner.arun(tool_call_response("a", "b", "c"))
+
+        self.assertLess(time.perf_counter() - started, 0.5)
+        self.assertEqual([r["content"] for r in results], ["a", "b", "c"])
+
+    async def test_arun_single_call_timeout_and_error(self):
+        """Test that a lone async tool call is timed out and its errors captured"""
+        runner = ParallelToolRunner(SleepyToolhouse({"hang": 1.0, "broken": -1}), tool_timeout=0.1)
+
+        report = {}
+        results = await runner.arun(tool_call_response("hang"), report)
+        self.assertIn("timed out", results[0]["content"])
+        self.assertEqual(report["tools"][0]["status"], "timeout")
+
+        report = {}
+        results = await runner.arun(tool_call_response("broken"), report)
+        self.assertIn("tool crashed", results[0]["content"])
+        self.assertEqual(report["tools"][0]["status"], "error")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,163 @@
+"""
+Test cases for tracing hooks and the JSONL exporter
+"""
+
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from life_coach.tracing import NOOP_SPAN, JsonlSpanExporter, SpanHook, Tracer
+
+
+class RecordingHook(SpanHook):
+    """Keeps every start and end event"""
+
+    def __init__(self):
+        self.events = []
+
+    def on_start(self, span):
+        self.events.append(("start", span.name))
+
+    def on_end(self, span):
+        self.events.append(("end", span.name))
+
+
+class TestTracer(unittest.TestCase):
+    """Test cases for Tracer"""
+
+    def test_disabled_tracer_returns_noop(self):
+        """Test that spans cost nothing without hooks"""
+        tracer = Tracer()
+        self.assertFalse(tracer.enabled)
+        with tracer.span("request", model="m") as span:
+            span.set(tokens=3)
+        self.assertIs(span, NOOP_SPAN)
+        fn = lambda: 1  # noqa: E731
+        self.assertIs(tracer.bind(fn), fn)
+
+    def test_hooks_see_nested_spans(self):
+        """Test start/end order and parent links"""
+        hook = RecordingHook()
+        tracer = Tracer([hook])
+        with tracer.span("request") as root:
+            with tracer.span("completion", model="m") as child:
+                child.set(total_tokens=12)
+
+        self.assertEqual(hook.events, [("start", "request"), ("start", "completion"),
+                                       ("end", "completion"), ("end", "request")])
+        self.assertEqual(child.parent_id, root.span_id)
+        self.assertEqual(child.trace_id, root.trace_id)
+        self.assertEqual(child.attributes, {"model": "m", "total_tokens": 12})
+        self.assertGreaterEqual(root.duration, child.duration)
+        self.assertIsNone(tracer.current())
+
+    def test_errors_mark_the_span(self):
+        """Test that an exception leaving a span sets its status"""
+        ended = []
+        tracer = Tracer()
+        tracer.add_hook(on_end=ended.append)
+        with self.assertRaises(RuntimeError):
+            with tracer.span("completion"):
+                raise RuntimeError("boom")
+        self.assertEqual(ended[0].status, "error")
+        self.assertEqual(ended[0].error, "RuntimeError: boom")
+
+    def test_failing_hook_does_not_break_the_call(self):
+        """Test that hook errors are logged, not raised"""
+        tracer = Tracer()
+        tracer.add_hook(on_start=lambda span: 1 / 0)
+        with self.assertLogs("Tracer", level="WARNING"):
+            with tracer.span("request"):
+                pass
+
+    def test_remove_hook(self):
+        """Test that removing the last hook disables tracing"""
+        tracer = Tracer()
+        hook = tracer.add_hook(on_end=lambda span: None)
+        tracer.remove_hook(hook)
+        self.assertFalse(tracer.enabled)
+
+    def test_bind_carries_parent_to_threads(self):
+        """Test that bound callables open children of the caller's span"""
+        ended = []
+        tracer = Tracer()
+        tracer.add_hook(on_end=ended.append)
+
+        def work():
+            with tracer.span("completion") as span:
+                return span
+
+        with tracer.span("attempt") as parent:
+            with ThreadPoolExecutor(max_workers=2) as pool:
+                children = [pool.submit(tracer.bind(work)).result() for _ in range(2)]
+        self.assertTrue(all(child.parent_id == parent.span_id for child in children))
+
+    def test_async_tasks_inherit_parent(self):
+        """Test that spans opened in gathered tasks nest under the caller"""
+        tracer = Tracer()
+        tracer.add_hook(on_end=lambda span: None)
+
+        async def child():
+            with tracer.span("completion") as span:
+                await asyncio.sleep(0)
+                return span
+
+        async def main():
+            with tracer.span("request") as root:
+                return root, await asyncio.gather(child(), child())
+
+        root, children = asyncio.run(main())
+        self.assertEqual({c.parent_id for c in children}, {root.span_id})
+
+
+class TestJsonlSpanExporter(unittest.TestCase):
+    """Test cases for JsonlSpanExporter"""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "traces", "spans.jsonl")
+        exporter = JsonlSpanExporter(self.path)
+        self.addCleanup(exporter.close)
+        self.tracer = Tracer([exporter])
+
+    def read(self):
+        with open(self.path, encoding="utf-8") as f:
+            return [json.loads(line) for line in f]
+
+    def test_writes_one_tree_per_request(self):
+        """Test that each root span becomes one nested JSON line"""
+        for _ in range(2):
+            with self.tracer.span("request", task_type="fast"):
+                with self.tracer.span("attempt", attempt=1):
+                    with self.tracer.span("completion", model="m"):
+                        pass
+                with self.tracer.span("tools", tools=[{"name": "web_search"}]):
+                    pass
+
+        lines = self.read()
+        self.assertEqual(len(lines), 2)
+        tree = lines[0]
+        self.assertEqual(tree["name"], "request")
+        self.assertEqual([c["name"] for c in tree["children"]], ["attempt", "tools"])
+        self.assertEqual(tree["children"][0]["children"][0]["attributes"], {"model": "m"})
+        self.assertIsNotNone(tree["duration_ms"])
+
+    def test_late_spans_are_written_alone(self):
+        """Test that a span ending after its root still reaches the file"""
+        with self.tracer.span("request"):
+            late = self.tracer.span("completion")
+            late.__enter__()
+        late.__exit__(None, None, None)
+
+        lines = self.read()
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(lines[1]["late"])
+        self.assertEqual(lines[1]["trace_id"], lines[0]["trace_id"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,119 @@
+"""
+Unit tests for the shared HTTP transport
+"""
+
+import asyncio
+import importlib.util
+import os
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+from life_coach import transport
+from life_coach.coach import ResearchAnalysisAssistant
+from life_coach.transport import HttpPool, configure_http_pool, get_http_pool, httpx
+
+
+class ConcurrencyProbe:
+    """Mock transport handler that tracks concurrent requests"""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.active = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, request):
+        with self.lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(self.delay)
+        with self.lock:
+            self.active -= 1
+        return httpx.Response(200, json={"host": request.url.host})
+
+
+class TestHttpPool(unittest.TestCase):
+    """Test cases for HttpPool"""
+
+    def test_client_is_reused(self):
+        """Test that the pool hands out one client per kind"""
+        pool = HttpPool(transport=httpx.MockTransport(ConcurrencyProbe()))
+        self.addCleanup(pool.close)
+        self.assertIs(pool.client(), pool.client())
+        self.assertIs(pool.async_client(), pool.async_client())
+
+    def test_injected_transport_receives_requests(self):
+        """Test that a custom transport replaces the network"""
+        pool = HttpPool(transport=httpx.MockTransport(ConcurrencyProbe()))
+        self.addCleanup(pool.close)
+        response = pool.client().get("http://stand-in.local/v1/models")
+        self.assertEqual(response.json(), {"host": "stand-in.local"})
+
+    def test_per_host_cap(self):
+        """Test that concurrent requests to a capped host are limited"""
+        probe = ConcurrencyProbe(delay=0.02)
+        pool = HttpPool(transport=httpx.MockTransport(probe),
+                        per_host_limits={"capped.local": 2})
+        self.addCleanup(pool.close)
+
+        with ThreadPoolExecutor(max_workers=6) as executor:
+            list(executor.map(lambda _: pool.client().get("http://capped.local/"), range(12)))
+
+        self.assertEqual(probe.peak, 2)
+
+    def test_async_client_survives_new_event_loops(self):
+        """Test that the shared async client works across separate asyncio.run calls"""
+        async def handler(request):
+            return httpx.Response(200, text="ok")
+
+        pool = HttpPool(async_transport=httpx.MockTransport(handler),
+                        per_host_limits={"api.local": 1})
+
+        async def fetch():
+            response = await pool.async_client().get("http://api.local/")
+            return response.text
+
+        self.assertEqual(asyncio.run(fetch()), "ok")
+        self.assertEqual(asyncio.run(fetch()), "ok")
+
+    @unittest.skipIf(importlib.util.find_spec("h2") is not None, "h2 is installed")
+    def test_http2_falls_back_without_h2(self):
+        """Test that HTTP/2 is disabled with a warning when h2 is missing"""
+        with self.assertLogs("HttpPool", level="WARNING"):
+            pool = HttpPool(http2=True)
+        self.assertFalse(pool.http2)
+
+
+class TestSharedPool(unittest.TestCase):
+    """Test cases for the process-wide pool"""
+
+    def setUp(self):
+        """Restore the shared pool after each test"""
+        previous = transport._shared_pool
+        self.addCleanup(setattr, transport, "_shared_pool", previous)
+
+    def test_configure_replaces_shared_pool(self):
+        """Test that configure_http_pool changes what get_http_pool returns"""
+        pool = configure_http_pool(max_connections=5)
+        self.assertIs(get_http_pool(), pool)
+        self.assertEqual(pool.limits.max_connections, 5)
+
+    @patch.dict(os.environ, {'OPENROUTER_API_KEY': 'test', 'TOOLHOUSE_API_KEY': 'test'})
+    @patch('life_coach.coach.Toolhouse')
+    def test_assistants_share_connections(self, mock_toolhouse):
+        """Test that separate assistants use the same HTTP clients"""
+        configure_http_pool(transport=httpx.MockTransport(ConcurrencyProbe()))
+
+        first = ResearchAnalysisAssistant()
+        second = ResearchAnalysisAssistant()
+
+        self.assertIs(first.client._client, second.client._client)
+        self.assertIs(first.async_client._client, second.async_client._client)
+        self.assertIs(first.client._client, get_http_pool().client())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+"""
+Unit tests for the background warm-up
+"""
+
+import threading
+import unittest
+from unittest.mock import patch
+
+from life_coach.warmup import Warmup, resolve_host
+
+
+class TestWarmup(unittest.TestCase):
+    """Test cases for Warmup"""
+
+    def test_steps_run_in_order(self):
+        """Test that every step runs once, in order"""
+        calls = []
+        warmup = Warmup([("first", lambda: calls.append(1)), ("second", lambda: calls.append(2))])
+
+        self.assertEqual(warmup.report()["state"], "pending")
+        self.assertTrue(warmup.start().wait(5))
+        self.assertEqual(calls, [1, 2])
+
+        report = warmup.report()
+        self.assertEqual(report["state"], "done")
+        self.assertEqual(set(report["steps"]), {"first", "second"})
+        self.assertTrue(all(step["ok"] for step in report["steps"].values()))
+        self.assertIn("total_seconds", report)
+
+    def test_start_does_not_block(self):
+        """Test that start returns while a step is still running"""
+        release = threading.Event()
+        warmup = Warmup([("slow", lambda: release.wait(5)), ("after", lambda: None)])
+        self.addCleanup(release.set)
+
+        warmup.start()
+        report = warmup.report()
+        self.assertEqual(report["state"], "running")
+        self.assertEqual(report["pending_steps"], ["slow", "after"])
+
+        release.set()
+        self.assertTrue(warmup.wait(5))
+
+    def test_failing_step_is_recorded(self):
+        """Test that a failure is reported and later steps still run"""
+        calls = []
+
+        def fail():
+            raise ConnectionError("unreachable")
+
+        warmup = Warmup([("broken", fail), ("next", lambda: calls.append(1))])
+        with self.assertLogs("Warmup", level="WARNING"):
+            warmup.start().wait(5)
+
+        steps = warmup.report()["steps"]
+        self.assertFalse(steps["broken"]["ok"])
+        self.assertIn("unreachable", steps["broken"]["error"])
+        self.assertEqual(calls, [1])
+
+    def test_resolve_host(self):
+        """Test that the URL's host and default port are looked up"""
+        with patch("life_coach.warmup.socket.getaddrinfo", return_value=[object(), object()]) as lookup:
+            self.assertEqual(resolve_host("https://api.example.com/v1"), 2)
+        self.assertEqual(lookup.call_args[0][:2], ("api.example.com", 443))
+
+
+if __name__ == "__main__":
+    unittest.main()